@@ -0,0 +1,163 @@
+"""
+Benchmark for the GET /users?company_id= query.
+
+Builds a SQLite database from migrations/ (D1 is SQLite), loads 100k users
+and 1M company_access rows, then times the original DISTINCT + OR EXISTS
+query against the UNION query in src/db/users.ts.
+
+    python3 bench/users_company_filter.py [--users N] [--access N] [--runs N]
+"""
+
+import argparse
+import random
+import sqlite3
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from pathlib import Path
+
+MIGRATIONS = Path(__file__).resolve().parent.parent / "migrations"
+
+OLD_COUNT = """
+SELECT COUNT(DISTINCT u.id) AS count FROM users u
+WHERE {status}(u.primary_company_id = ? OR EXISTS (
+  SELECT 1 FROM company_access ca WHERE ca.user_id = u.id AND ca.company_id = ?))
+"""
+
+OLD_PAGE = """
+SELECT DISTINCT u.* FROM users u
+WHERE {status}(u.primary_company_id = ? OR EXISTS (
+  SELECT 1 FROM company_access ca WHERE ca.user_id = u.id AND ca.company_id = ?))
+ORDER BY u.created_at DESC LIMIT 50 OFFSET 0
+"""
+
+MEMBERS_CTE = """
+WITH members(user_id) AS (
+  SELECT id FROM users WHERE primary_company_id = ?
+  UNION
+  SELECT user_id FROM company_access WHERE company_id = ?
+)
+"""
+
+NEW_COUNT = MEMBERS_CTE + "SELECT COUNT(*) AS count FROM members"
+
+NEW_COUNT_STATUS = (
+    MEMBERS_CTE
+    + "SELECT COUNT(*) AS count FROM members m JOIN users u ON u.id = m.user_id WHERE u.status = ?"
+)
+
+NEW_PAGE = (
+    MEMBERS_CTE
+    + """SELECT u.* FROM members m JOIN users u ON u.id = m.user_id {status}
+ORDER BY u.created_at DESC LIMIT 50 OFFSET 0"""
+)
+
+
+def build(conn, users, access, companies):
+    for migration in sorted(MIGRATIONS.glob("*.sql")):
+        conn.executescript(migration.read_text())
+
+    rng = random.Random(42)
+    company_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(companies)]
+    conn.executemany(
+        "INSERT INTO companies (id, name, status, created_at) VALUES (?, ?, 'active', ?)",
+        [(cid, f"company {i}", f"2024-01-01T00:00:{i % 60:02d}Z") for i, cid in enumerate(company_ids)],
+    )
+
+    # Zipf-like tenant sizes: a few MSP-scale companies, a long tail of small ones
+    cum_weights = list(accumulate(1 / (rank + 1) for rank in range(companies)))
+    statuses = ["active"] * 8 + ["inactive", "suspended"]
+
+    # Distinct timestamps so both queries agree on the page order
+    epoch = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    offsets = list(range(users))
+    rng.shuffle(offsets)
+
+    user_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(users)]
+    conn.executemany(
+        "INSERT INTO users (id, email, name, primary_company_id, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (
+                uid,
+                f"user{i}@example.com",
+                f"User {i}",
+                rng.choices(company_ids, cum_weights=cum_weights)[0],
+                rng.choice(statuses),
+                (epoch + timedelta(minutes=offsets[i])).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            )
+            for i, uid in enumerate(user_ids)
+        ],
+    )
+
+    per_user = min(companies, max(1, access // users))
+    rows = []
+    for uid in user_ids:
+        memberships = set()
+        while len(memberships) < per_user:
+            memberships.add(rng.choices(company_ids, cum_weights=cum_weights)[0])
+        for cid in memberships:
+            rows.append((str(uuid.UUID(int=rng.getrandbits(128))), uid, cid, "member", "2024-01-01T00:00:00Z"))
+    conn.executemany(
+        "INSERT INTO company_access (id, user_id, company_id, role, created_at) VALUES (?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    return company_ids, len(rows)
+
+
+def timed(conn, sql, params, runs):
+    samples = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = conn.execute(sql, params).fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--access", type=int, default=1_000_000)
+    parser.add_argument("--companies", type=int, default=5_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(":memory:")
+    start = time.perf_counter()
+    company_ids, access_rows = build(conn, args.users, args.access, args.companies)
+    print(f"loaded {args.users} users, {access_rows} access rows in {time.perf_counter() - start:.1f}s")
+
+    # Largest tenant, a mid-sized one and a small one
+    targets = {"large": company_ids[0], "medium": company_ids[50], "small": company_ids[-1]}
+
+    print(f"{'tenant':<8} {'filter':<8} {'members':>8} {'old ms':>9} {'new ms':>9} {'speedup':>8}")
+    for label, cid in targets.items():
+        for status in (None, "active"):
+            old_status = "u.status = ? AND " if status else ""
+            old_params = ([status] if status else []) + [cid, cid]
+            new_params = [cid, cid] + ([status] if status else [])
+
+            old_ms, old_count = timed(conn, OLD_COUNT.format(status=old_status), old_params, args.runs)
+            page_ms, old_page = timed(conn, OLD_PAGE.format(status=old_status), old_params, args.runs)
+            old_ms += page_ms
+
+            new_ms, new_count = timed(conn, NEW_COUNT_STATUS if status else NEW_COUNT, new_params, args.runs)
+            page_ms, new_page = timed(
+                conn, NEW_PAGE.format(status="WHERE u.status = ?" if status else ""), new_params, args.runs
+            )
+            new_ms += page_ms
+
+            assert old_count == new_count, (label, status, old_count, new_count)
+            assert [row[0] for row in old_page] == [row[0] for row in new_page], (label, status)
+
+            print(
+                f"{label:<8} {status or '-':<8} {new_count[0][0]:>8} {old_ms:>9.2f} {new_ms:>9.2f} {old_ms / new_ms:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+-- Delta Sync Migration
+-- Supports keyset scans over a company's audit trail for GET /sync
+
+CREATE INDEX idx_audit_logs_company_created ON audit_logs(company_id, created_at, id);
@@ -0,0 +1,6 @@
+-- Row Versions Migration
+-- Adds optimistic concurrency versions surfaced as ETags
+
+ALTER TABLE companies ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE assets ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
@@ -0,0 +1,19 @@
+-- Background Jobs Migration
+-- Chunked tenant deletion driven by the scheduled() handler
+
+ALTER TABLE companies ADD COLUMN deletion_requested_at TEXT;
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'completed', 'failed')),
+    company_id TEXT NOT NULL,
+    progress TEXT NOT NULL DEFAULT '{}',
+    error TEXT,
+    locked_until TEXT,
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
+
+CREATE INDEX idx_jobs_status ON jobs(status, created_at);
+CREATE INDEX idx_jobs_company ON jobs(company_id);
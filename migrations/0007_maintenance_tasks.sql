@@ -0,0 +1,32 @@
+-- Maintenance Tasks Migration
+-- Resumable cursors and run history for scheduled maintenance, plus the
+-- company stats rollup they refresh
+
+CREATE TABLE IF NOT EXISTS maintenance_task_state (
+    task TEXT PRIMARY KEY,
+    cursor TEXT,
+    last_run_at TEXT,
+    updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
+
+CREATE TABLE IF NOT EXISTS maintenance_runs (
+    id TEXT PRIMARY KEY,
+    task TEXT NOT NULL,
+    status TEXT NOT NULL CHECK (status IN ('completed', 'partial', 'failed')),
+    processed INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT NOT NULL
+);
+
+CREATE INDEX idx_maintenance_runs_task ON maintenance_runs(task, started_at);
+CREATE INDEX idx_maintenance_runs_started ON maintenance_runs(started_at);
+
+CREATE TABLE IF NOT EXISTS company_stats (
+    company_id TEXT PRIMARY KEY,
+    asset_count INTEGER NOT NULL DEFAULT 0,
+    user_count INTEGER NOT NULL DEFAULT 0,
+    access_count INTEGER NOT NULL DEFAULT 0,
+    refreshed_at TEXT NOT NULL,
+    FOREIGN KEY (company_id) REFERENCES companies(id) ON DELETE CASCADE
+);
@@ -0,0 +1,19 @@
+-- Audit Archive Migration
+-- Manifest of audit log segments moved from D1 to R2. Archived rows are not
+-- deleted from the trail, only relocated; GET /audit-logs reads through.
+
+CREATE TABLE IF NOT EXISTS audit_archive_segments (
+    id TEXT PRIMARY KEY,
+    company_id TEXT NOT NULL,
+    month TEXT NOT NULL,
+    object_key TEXT NOT NULL UNIQUE,
+    row_count INTEGER NOT NULL,
+    -- JSON object of row counts keyed by "entity_type:action"
+    counts TEXT NOT NULL DEFAULT '{}',
+    first_created_at TEXT NOT NULL,
+    last_created_at TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
+
+CREATE INDEX idx_audit_archive_company ON audit_archive_segments(company_id, last_created_at);
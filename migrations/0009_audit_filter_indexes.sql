@@ -0,0 +1,16 @@
+-- Audit Filter Indexes Migration
+-- Composite indexes for the user_id, entity_id and from/to filters on
+-- GET /audit-logs and GET /users/:id/audit-logs. Time-range-only queries
+-- use idx_audit_logs_company_created from 0003.
+
+CREATE INDEX idx_audit_logs_company_user ON audit_logs(company_id, user_id, created_at);
+CREATE INDEX idx_audit_logs_company_entity ON audit_logs(company_id, entity_id, created_at);
+CREATE INDEX idx_audit_logs_company_type_action ON audit_logs(company_id, entity_type, action, created_at);
+
+-- Replaces the (entity_type, entity_id) index with one that also serves
+-- the time window and ordering for per-entity history
+CREATE INDEX idx_audit_logs_entity_created ON audit_logs(entity_type, entity_id, created_at);
+DROP INDEX IF EXISTS idx_audit_logs_entity;
+
+-- Prefix of idx_audit_logs_company_created
+DROP INDEX IF EXISTS idx_audit_logs_company;
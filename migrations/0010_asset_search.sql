@@ -0,0 +1,39 @@
+-- Asset Search Migration
+-- FTS5 index over asset name, identifier and metadata for GET /assets/search.
+-- External-content table: the text lives only in `assets`, triggers keep the
+-- index in step. company_id is indexed so queries are scoped per tenant
+-- inside the FTS index rather than filtered afterwards.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS assets_fts USING fts5(
+    name,
+    identifier,
+    metadata,
+    company_id,
+    content = 'assets',
+    content_rowid = 'rowid',
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+
+-- Name matches outrank identifier matches, which outrank metadata matches
+INSERT INTO assets_fts (assets_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0, 0.0)');
+
+CREATE TRIGGER assets_fts_after_insert AFTER INSERT ON assets BEGIN
+    INSERT INTO assets_fts (rowid, name, identifier, metadata, company_id)
+    VALUES (new.rowid, new.name, new.identifier, new.metadata, new.company_id);
+END;
+
+CREATE TRIGGER assets_fts_after_delete AFTER DELETE ON assets BEGIN
+    INSERT INTO assets_fts (assets_fts, rowid, name, identifier, metadata, company_id)
+    VALUES ('delete', old.rowid, old.name, old.identifier, old.metadata, old.company_id);
+END;
+
+CREATE TRIGGER assets_fts_after_update AFTER UPDATE OF name, identifier, metadata, company_id ON assets BEGIN
+    INSERT INTO assets_fts (assets_fts, rowid, name, identifier, metadata, company_id)
+    VALUES ('delete', old.rowid, old.name, old.identifier, old.metadata, old.company_id);
+    INSERT INTO assets_fts (rowid, name, identifier, metadata, company_id)
+    VALUES (new.rowid, new.name, new.identifier, new.metadata, new.company_id);
+END;
+
+-- Index the assets that already exist
+INSERT INTO assets_fts (assets_fts) VALUES ('rebuild');
@@ -0,0 +1,6 @@
+-- Lookup Indexes Migration
+-- Case-insensitive prefix scans for GET /users/lookup. Company names are
+-- already covered by idx_companies_name (COLLATE NOCASE), and emails are
+-- stored lowercased so idx_users_email serves their prefix scans.
+
+CREATE INDEX idx_users_name_nocase ON users(name COLLATE NOCASE);
@@ -0,0 +1,42 @@
+-- Promoted Attributes Migration
+-- Per-company metadata keys copied out of assets.metadata into an indexed
+-- side table, so GET /assets?meta.<key>= is an index lookup instead of a
+-- scan over parsed JSON.
+
+CREATE TABLE IF NOT EXISTS promoted_attributes (
+    company_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    type TEXT NOT NULL CHECK (type IN ('string', 'number', 'boolean', 'date')),
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    PRIMARY KEY (company_id, key),
+    FOREIGN KEY (company_id) REFERENCES companies(id) ON DELETE CASCADE
+);
+
+-- value has no declared type so json_extract() keeps numbers numeric
+CREATE TABLE IF NOT EXISTS asset_attributes (
+    asset_id TEXT NOT NULL,
+    company_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value,
+    PRIMARY KEY (asset_id, key),
+    FOREIGN KEY (asset_id) REFERENCES assets(id) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_asset_attributes_lookup ON asset_attributes(company_id, key, value, asset_id);
+
+CREATE TRIGGER asset_attributes_after_insert AFTER INSERT ON assets BEGIN
+    INSERT OR REPLACE INTO asset_attributes (asset_id, company_id, key, value)
+    SELECT new.id, new.company_id, p.key, json_extract(new.metadata, '$.' || p.key)
+    FROM promoted_attributes p
+    WHERE p.company_id = new.company_id
+      AND json_extract(new.metadata, '$.' || p.key) IS NOT NULL;
+END;
+
+CREATE TRIGGER asset_attributes_after_update AFTER UPDATE OF metadata, company_id ON assets BEGIN
+    DELETE FROM asset_attributes WHERE asset_id = old.id;
+    INSERT OR REPLACE INTO asset_attributes (asset_id, company_id, key, value)
+    SELECT new.id, new.company_id, p.key, json_extract(new.metadata, '$.' || p.key)
+    FROM promoted_attributes p
+    WHERE p.company_id = new.company_id
+      AND json_extract(new.metadata, '$.' || p.key) IS NOT NULL;
+END;
@@ -0,0 +1,18 @@
+-- Asset Identifier Migration
+-- Identifiers (barcodes, serials) are unique within a company and resolved
+-- by GET /assets/by-identifier.
+
+-- Existing duplicates would fail the index: the oldest asset keeps the
+-- identifier and later ones get their id appended. See the README for a
+-- query that lists them before applying.
+UPDATE assets SET identifier = identifier || '-' || id
+WHERE identifier IS NOT NULL
+  AND rowid NOT IN (
+    SELECT MIN(rowid) FROM assets WHERE identifier IS NOT NULL GROUP BY company_id, identifier
+  );
+
+CREATE UNIQUE INDEX idx_assets_company_identifier ON assets(company_id, identifier)
+    WHERE identifier IS NOT NULL;
+
+-- Superseded by the tenant-scoped index above
+DROP INDEX IF EXISTS idx_assets_identifier;
@@ -0,0 +1,8 @@
+-- Assignee Asset Index Migration
+-- Serves GET /users/:id/assets as a keyset walk over (assigned_to, created_at)
+-- and per-user asset counts as index-only scans
+
+CREATE INDEX idx_assets_assigned_created ON assets(assigned_to, created_at, id);
+
+-- Covered by the leading column of the new index
+DROP INDEX IF EXISTS idx_assets_assigned_to;
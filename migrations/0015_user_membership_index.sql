@@ -0,0 +1,7 @@
+-- User Membership Index Migration
+-- Serves GET /users/:id/companies newest first without a sort step
+
+CREATE INDEX idx_company_access_user_created ON company_access(user_id, created_at);
+
+-- Covered by the leading column of the new index
+DROP INDEX IF EXISTS idx_company_access_user;
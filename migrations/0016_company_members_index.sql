@@ -0,0 +1,8 @@
+-- Company Members Index Migration
+-- Lets the company_access side of the getAllUsers company filter read
+-- user ids straight from the index
+
+CREATE INDEX idx_company_access_company_user ON company_access(company_id, user_id);
+
+-- Covered by the leading column of the new index
+DROP INDEX IF EXISTS idx_company_access_company;
@@ -0,0 +1,15 @@
+-- Tenant Shards Migration
+-- Directory mapping companies to the D1 binding that holds their data.
+-- Applied to every shard so schemas stay identical, but only read and
+-- written on the DB binding; companies without a row live on DB.
+
+CREATE TABLE IF NOT EXISTS tenant_shards (
+    company_id TEXT PRIMARY KEY,
+    shard TEXT NOT NULL,
+    -- Set while a tenant_move job copies the company; writes are refused
+    moving_to TEXT,
+    updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+    FOREIGN KEY (company_id) REFERENCES companies(id) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_tenant_shards_moving ON tenant_shards(moving_to) WHERE moving_to IS NOT NULL;
@@ -0,0 +1,12 @@
+-- Audit Log Quarantine Migration
+-- Deferred audit rows that failed a constraint even when written one at a
+-- time (e.g. their company was deleted before the flush). The row is kept
+-- as JSON with the error; no foreign keys, so the insert cannot fail the same way.
+
+CREATE TABLE IF NOT EXISTS audit_log_quarantine (
+    id TEXT PRIMARY KEY,
+    company_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    error TEXT NOT NULL,
+    quarantined_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
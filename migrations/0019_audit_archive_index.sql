@@ -0,0 +1,22 @@
+-- Audit Archive Index Migration
+-- Row counts of each archived segment by entity, user and action, so
+-- activity checks and per-entity reads find their segments without
+-- downloading them. Segments archived earlier keep indexed = 0 until the
+-- archive-audit-logs task reads them back and fills in their rows.
+
+ALTER TABLE audit_archive_segments ADD COLUMN indexed INTEGER NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS audit_archive_index (
+    segment_id TEXT NOT NULL,
+    company_id TEXT NOT NULL,
+    entity_type TEXT NOT NULL,
+    entity_id TEXT NOT NULL,
+    user_id TEXT,
+    action TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    FOREIGN KEY (segment_id) REFERENCES audit_archive_segments(id) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_audit_archive_index_entity ON audit_archive_index(entity_type, entity_id, action);
+CREATE INDEX idx_audit_archive_index_segment ON audit_archive_index(segment_id, user_id);
+CREATE INDEX idx_audit_archive_index_company ON audit_archive_index(company_id);
@@ -0,0 +1,5 @@
+-- Idempotency Response Headers Migration
+-- Headers a replayed response must carry (e.g. ETag, Location), stored as a
+-- JSON object next to the body
+
+ALTER TABLE idempotency_keys ADD COLUMN response_headers TEXT;
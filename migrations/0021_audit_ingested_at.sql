@@ -0,0 +1,15 @@
+-- Audit Ingestion Time Migration
+-- created_at keeps the time of the change; ingested_at records when the row
+-- reached D1 (later for deferred and queued rows) and orders /sync and the
+-- change feed cursors. Existing rows were stamped at write time, so both
+-- columns start equal.
+
+ALTER TABLE audit_logs ADD COLUMN ingested_at TEXT;
+UPDATE audit_logs SET ingested_at = created_at;
+
+CREATE INDEX idx_audit_logs_company_ingested ON audit_logs(company_id, ingested_at, id);
+
+-- Latest ingested_at in each archived segment, so /sync can tell which
+-- segments a cursor has passed
+ALTER TABLE audit_archive_segments ADD COLUMN last_ingested_at TEXT;
+UPDATE audit_archive_segments SET last_ingested_at = last_created_at;
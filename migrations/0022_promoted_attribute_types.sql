@@ -0,0 +1,53 @@
+-- Promoted Attribute Types Migration
+-- Only values of the promoted type are indexed. A value stored under a key
+-- before it was promoted (e.g. "5" under a number key) is left out of
+-- asset_attributes rather than indexed as the wrong type, so meta filters
+-- never half-match it.
+
+DROP TRIGGER IF EXISTS asset_attributes_after_insert;
+DROP TRIGGER IF EXISTS asset_attributes_after_update;
+
+CREATE TRIGGER asset_attributes_after_insert AFTER INSERT ON assets BEGIN
+    INSERT OR REPLACE INTO asset_attributes (asset_id, company_id, key, value)
+    SELECT new.id, new.company_id, p.key, json_extract(new.metadata, '$.' || p.key)
+    FROM promoted_attributes p
+    WHERE p.company_id = new.company_id
+      AND CASE p.type
+            WHEN 'number' THEN json_type(new.metadata, '$.' || p.key) IN ('integer', 'real')
+            WHEN 'boolean' THEN json_type(new.metadata, '$.' || p.key) IN ('true', 'false')
+            WHEN 'date' THEN json_type(new.metadata, '$.' || p.key) = 'text'
+              AND json_extract(new.metadata, '$.' || p.key) GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+            ELSE json_type(new.metadata, '$.' || p.key) = 'text'
+          END;
+END;
+
+CREATE TRIGGER asset_attributes_after_update AFTER UPDATE OF metadata, company_id ON assets BEGIN
+    DELETE FROM asset_attributes WHERE asset_id = old.id;
+    INSERT OR REPLACE INTO asset_attributes (asset_id, company_id, key, value)
+    SELECT new.id, new.company_id, p.key, json_extract(new.metadata, '$.' || p.key)
+    FROM promoted_attributes p
+    WHERE p.company_id = new.company_id
+      AND CASE p.type
+            WHEN 'number' THEN json_type(new.metadata, '$.' || p.key) IN ('integer', 'real')
+            WHEN 'boolean' THEN json_type(new.metadata, '$.' || p.key) IN ('true', 'false')
+            WHEN 'date' THEN json_type(new.metadata, '$.' || p.key) = 'text'
+              AND json_extract(new.metadata, '$.' || p.key) GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+            ELSE json_type(new.metadata, '$.' || p.key) = 'text'
+          END;
+END;
+
+-- Drop the mismatched values earlier backfills indexed
+DELETE FROM asset_attributes
+WHERE rowid IN (
+    SELECT aa.rowid
+    FROM asset_attributes aa
+    JOIN assets a ON a.id = aa.asset_id
+    JOIN promoted_attributes p ON p.company_id = aa.company_id AND p.key = aa.key
+    WHERE NOT COALESCE(CASE p.type
+            WHEN 'number' THEN json_type(a.metadata, '$.' || p.key) IN ('integer', 'real')
+            WHEN 'boolean' THEN json_type(a.metadata, '$.' || p.key) IN ('true', 'false')
+            WHEN 'date' THEN json_type(a.metadata, '$.' || p.key) = 'text'
+              AND json_extract(a.metadata, '$.' || p.key) GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+            ELSE json_type(a.metadata, '$.' || p.key) = 'text'
+          END, 0)
+);
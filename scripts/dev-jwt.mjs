@@ -0,0 +1,84 @@
+// ============================================================================
+// Local JWKS Stand-in
+// Issues ES256 tokens for wrangler dev and API tests without an identity
+// provider. The signing key is kept in .dev-jwt-key.json; put the printed
+// JWKS_JSON line in .dev.vars and send the token as a bearer token.
+//
+//   node scripts/dev-jwt.mjs <user-id> [ttl-seconds]
+//
+// Tests import generateSigningKey, signToken and toJwks instead.
+// ============================================================================
+
+import { existsSync, readFileSync, writeFileSync } from 'node:fs';
+import { pathToFileURL } from 'node:url';
+
+const KEY_FILE = new URL('../.dev-jwt-key.json', import.meta.url);
+const ALGORITHM = { name: 'ECDSA', namedCurve: 'P-256' };
+
+if (process.argv[1] && import.meta.url === pathToFileURL(process.argv[1]).href) {
+  await main(process.argv.slice(2));
+}
+
+async function main([subject, ttlArg = '3600']) {
+  if (!subject) {
+    console.error('usage: node scripts/dev-jwt.mjs <user-id> [ttl-seconds]');
+    process.exit(1);
+  }
+
+  const privateJwk = await loadOrCreateKey();
+  const now = Math.floor(Date.now() / 1000);
+  const token = await signToken(privateJwk, { sub: subject, iat: now, exp: now + Number(ttlArg) });
+
+  console.log(`JWKS_JSON='${JSON.stringify(toJwks([privateJwk]))}'`);
+  console.log();
+  console.log(token);
+}
+
+// A P-256 private JWK with its kid
+export async function generateSigningKey(kid = `dev-${crypto.randomUUID().slice(0, 8)}`) {
+  const pair = await crypto.subtle.generateKey(ALGORITHM, true, ['sign', 'verify']);
+  const jwk = await crypto.subtle.exportKey('jwk', pair.privateKey);
+  return {
+    kty: jwk.kty,
+    crv: jwk.crv,
+    x: jwk.x,
+    y: jwk.y,
+    d: jwk.d,
+    kid,
+    alg: 'ES256',
+    use: 'sig',
+  };
+}
+
+// Header fields in `header` override the defaults, e.g. a foreign kid or alg
+export async function signToken(privateJwk, claims, header = {}) {
+  const fullHeader = { alg: 'ES256', typ: 'JWT', kid: privateJwk.kid, ...header };
+  const signingInput = `${encode(fullHeader)}.${encode(claims)}`;
+  const key = await crypto.subtle.importKey('jwk', privateJwk, ALGORITHM, false, ['sign']);
+  const signature = await crypto.subtle.sign(
+    { name: 'ECDSA', hash: 'SHA-256' },
+    key,
+    new TextEncoder().encode(signingInput)
+  );
+
+  return `${signingInput}.${Buffer.from(signature).toString('base64url')}`;
+}
+
+// The public JWKS for a list of private JWKs
+export function toJwks(privateJwks) {
+  return { keys: privateJwks.map(({ d, ...publicJwk }) => publicJwk) };
+}
+
+export function encode(value) {
+  return Buffer.from(JSON.stringify(value)).toString('base64url');
+}
+
+async function loadOrCreateKey() {
+  if (existsSync(KEY_FILE)) {
+    return JSON.parse(readFileSync(KEY_FILE, 'utf8'));
+  }
+
+  const created = await generateSigningKey();
+  writeFileSync(KEY_FILE, JSON.stringify(created, null, 2));
+  return created;
+}
@@ -0,0 +1,377 @@
+// ============================================================================
+// Audit Log Archive
+// Moves old audit rows to gzip-compressed NDJSON segments in R2 (one or more
+// per company and month) and reads them back for the audit log lists and
+// /sync
+// ============================================================================
+
+import type {
+  AuditLog,
+  AuditLogFilters,
+  AuditArchiveSegment,
+  AuditArchiveIndexEntry,
+  EntityType,
+} from '../types';
+import type { KeysetCursor } from '../utils/cursor';
+import { compareIngested } from '../db/sync';
+import {
+  getNextArchiveGroup,
+  getArchivableAuditLogs,
+  commitArchiveSegment,
+  commitArchiveIndex,
+  getUnindexedArchiveSegment,
+  getArchiveSegmentsByCompany,
+  getArchiveSegmentsByEntity,
+  getArchiveIndexCounts,
+  getOrphanedArchiveSegments,
+  deleteArchiveSegments,
+} from '../db/audit-archive';
+
+export const DEFAULT_ARCHIVE_AFTER_DAYS = 90;
+
+const SEGMENT_MAX_ROWS = 5000;
+
+export function archiveCutoff(afterDays: string | undefined): string {
+  const days = parseInt(afterDays || '') || DEFAULT_ARCHIVE_AFTER_DAYS;
+  return new Date(Date.now() - days * 24 * 60 * 60 * 1000).toISOString();
+}
+
+// Archives one segment; returns the number of rows moved, 0 when caught up
+// or when an overlapping run got to the rows first
+export async function archiveNextSegment(
+  db: D1Database,
+  bucket: R2Bucket,
+  cutoff: string
+): Promise<number> {
+  const group = await getNextArchiveGroup(db, cutoff);
+  if (!group) {
+    return 0;
+  }
+
+  const logs = await getArchivableAuditLogs(
+    db,
+    group.companyId,
+    group.month,
+    cutoff,
+    SEGMENT_MAX_ROWS
+  );
+  if (logs.length === 0) {
+    return 0;
+  }
+
+  const id = crypto.randomUUID();
+  const objectKey = `audit-logs/${group.companyId}/${group.month}/${id}.ndjson.gz`;
+  const body = await gzip(logs.map((log) => JSON.stringify(log)).join('\n') + '\n');
+
+  const counts: Record<string, number> = {};
+  for (const log of logs) {
+    const key = `${log.entity_type}:${log.action}`;
+    counts[key] = (counts[key] || 0) + 1;
+  }
+
+  const first = logs[0];
+  const last = logs[logs.length - 1];
+  const lastIngestedAt = logs.reduce(
+    (latest, log) => (log.ingested_at > latest ? log.ingested_at : latest),
+    last.ingested_at
+  );
+
+  // Written before the manifest so a committed segment always has its object;
+  // an object orphaned by a failed commit is simply never referenced
+  await bucket.put(objectKey, body, {
+    httpMetadata: { contentType: 'application/x-ndjson', contentEncoding: 'gzip' },
+    customMetadata: { company_id: group.companyId, month: group.month },
+  });
+
+  const committed = await commitArchiveSegment(
+    db,
+    {
+      id,
+      company_id: group.companyId,
+      month: group.month,
+      object_key: objectKey,
+      row_count: logs.length,
+      counts,
+      first_created_at: first.created_at,
+      last_created_at: last.created_at,
+      last_ingested_at: lastIngestedAt,
+      bytes: body.byteLength,
+      indexed: 1,
+      created_at: new Date().toISOString(),
+    },
+    logs.map((log) => log.id),
+    buildIndex(logs)
+  );
+  if (!committed) {
+    // An overlapping run archived some of these rows first; what it left
+    // behind is picked up on the next pass
+    await bucket.delete(objectKey);
+    return 0;
+  }
+
+  return logs.length;
+}
+
+// Fills in the index of one segment archived before it existed; returns
+// false when every segment is indexed
+export async function indexNextSegment(db: D1Database, bucket: R2Bucket): Promise<boolean> {
+  const segment = await getUnindexedArchiveSegment(db);
+  if (!segment) {
+    return false;
+  }
+
+  await commitArchiveIndex(db, segment, buildIndex(await readSegment(bucket, segment.object_key)));
+  return true;
+}
+
+function buildIndex(logs: AuditLog[]): AuditArchiveIndexEntry[] {
+  const entries = new Map<string, AuditArchiveIndexEntry>();
+  for (const log of logs) {
+    const key = `${log.entity_type}:${log.entity_id}:${log.user_id}:${log.action}`;
+    const entry = entries.get(key);
+    if (entry) {
+      entry.row_count++;
+    } else {
+      entries.set(key, {
+        entity_type: log.entity_type,
+        entity_id: log.entity_id,
+        user_id: log.user_id,
+        action: log.action,
+        row_count: 1,
+      });
+    }
+  }
+  return [...entries.values()];
+}
+
+// Removes segments of deleted companies; returns the number removed
+export async function purgeOrphanedSegments(
+  db: D1Database,
+  bucket: R2Bucket,
+  limit: number
+): Promise<number> {
+  const segments = await getOrphanedArchiveSegments(db, limit);
+  if (segments.length === 0) {
+    return 0;
+  }
+
+  await bucket.delete(segments.map((segment) => segment.object_key));
+  await deleteArchiveSegments(
+    db,
+    segments.map((segment) => segment.id)
+  );
+
+  return segments.length;
+}
+
+export async function readSegment(bucket: R2Bucket, objectKey: string): Promise<AuditLog[]> {
+  const object = await bucket.get(objectKey);
+  if (!object) {
+    throw new Error(`Audit archive segment ${objectKey} is missing`);
+  }
+
+  const text = await new Response(
+    object.body.pipeThrough(new DecompressionStream('gzip'))
+  ).text();
+
+  // Segments written before ingested_at existed were ingested at created_at
+  return text
+    .split('\n')
+    .filter(Boolean)
+    .map((line) => {
+      const log = JSON.parse(line) as AuditLog;
+      return { ...log, ingested_at: log.ingested_at ?? log.created_at };
+    });
+}
+
+// Archived rows are older than every hot row of the same company, so they
+// continue the newest-first listing where D1 runs out
+export async function getArchivedAuditLogs(
+  db: D1Database,
+  bucket: R2Bucket,
+  companyId: string,
+  options: { limit: number; offset: number } & AuditLogFilters
+): Promise<{ logs: AuditLog[]; total: number }> {
+  const { limit, offset, ...filters } = options;
+
+  const segments = await getArchiveSegmentsByCompany(db, companyId);
+
+  // user_id and entity_id filters are counted from the segment index
+  if (filters.userId || filters.entityId) {
+    const indexed = await getArchiveIndexCounts(db, companyId, filters);
+    return pageSegments(bucket, segments, filters, limit, offset, (segment) =>
+      segment.indexed && !cutByWindow(segment, filters) ? (indexed.get(segment.id) ?? 0) : null
+    );
+  }
+
+  return pageSegments(bucket, segments, filters, limit, offset, (segment) =>
+    countFromManifest(segment, filters)
+  );
+}
+
+// The archived rows of one entity (e.g. a user's own trail), found through
+// the segment index rather than by company
+export async function getArchivedEntityAuditLogs(
+  db: D1Database,
+  bucket: R2Bucket,
+  entityType: EntityType,
+  entityId: string,
+  options: { limit: number; offset: number } & Pick<
+    AuditLogFilters,
+    'action' | 'from' | 'to' | 'excludeCompanyIds'
+  >
+): Promise<{ logs: AuditLog[]; total: number }> {
+  const { limit, offset, ...rest } = options;
+  const filters: AuditLogFilters = { ...rest, entityType, entityId };
+
+  const excluded = new Set(filters.excludeCompanyIds);
+  const segments = (
+    await getArchiveSegmentsByEntity(db, entityType, entityId, filters.action)
+  ).filter((segment) => !excluded.has(segment.company_id));
+  return pageSegments(bucket, segments, filters, limit, offset, (segment) =>
+    cutByWindow(segment, filters) ? null : segment.entity_rows
+  );
+}
+
+// Changes after `since` that are still in the archive, in ingestion order.
+// Each call covers the window up to the next segment's last ingested_at and
+// returns every archived row in it; the caller adds the hot rows of the same
+// window, since rows ingested late can put the two side by side. null once
+// the cursor is past the archive.
+export async function getArchivedChanges(
+  db: D1Database,
+  bucket: R2Bucket,
+  companyId: string,
+  since: KeysetCursor | undefined
+): Promise<{ rows: AuditLog[]; until: string } | null> {
+  const segments = (await getArchiveSegmentsByCompany(db, companyId))
+    .filter((segment) => !since || segment.last_ingested_at >= since.createdAt)
+    .sort((a, b) => (a.last_ingested_at < b.last_ingested_at ? -1 : 1));
+
+  const loaded = new Map<string, AuditLog[]>();
+  for (const next of segments) {
+    const until = next.last_ingested_at;
+    const rows: AuditLog[] = [];
+
+    // Rows are ingested no earlier than created, so a segment starting
+    // after the window holds none of it
+    for (const segment of segments) {
+      if (segment.first_created_at > until) {
+        continue;
+      }
+      let logs = loaded.get(segment.id);
+      if (!logs) {
+        logs = await readSegment(bucket, segment.object_key);
+        loaded.set(segment.id, logs);
+      }
+      rows.push(
+        ...logs.filter(
+          (log) =>
+            log.ingested_at <= until &&
+            (!since ||
+              log.ingested_at > since.createdAt ||
+              (log.ingested_at === since.createdAt && log.id > since.id))
+        )
+      );
+    }
+
+    if (rows.length > 0) {
+      return { rows: rows.sort(compareIngested), until };
+    }
+  }
+
+  return null;
+}
+
+// Pages newest first through segments ordered newest first. countFor gives
+// a segment's matching rows without reading it, or null when it must be read.
+async function pageSegments<S extends AuditArchiveSegment>(
+  bucket: R2Bucket,
+  allSegments: S[],
+  filters: AuditLogFilters,
+  limit: number,
+  offset: number,
+  countFor: (segment: S) => number | null
+): Promise<{ logs: AuditLog[]; total: number }> {
+  const segments = allSegments.filter(
+    (segment) =>
+      (!filters.from || segment.last_created_at >= filters.from) &&
+      (!filters.to || segment.first_created_at < filters.to)
+  );
+
+  // Segments are read at most once, either to count or to page through
+  const loaded = new Map<string, AuditLog[]>();
+  const load = async (segment: AuditArchiveSegment): Promise<AuditLog[]> => {
+    let rows = loaded.get(segment.id);
+    if (!rows) {
+      rows = (await readSegment(bucket, segment.object_key))
+        .filter((log) => matchesFilters(log, filters))
+        .reverse();
+      loaded.set(segment.id, rows);
+    }
+    return rows;
+  };
+
+  const counts: number[] = [];
+  for (const segment of segments) {
+    const count = countFor(segment);
+    counts.push(count ?? (await load(segment)).length);
+  }
+
+  const total = counts.reduce((sum, count) => sum + count, 0);
+
+  const logs: AuditLog[] = [];
+  let skip = offset;
+
+  for (let i = 0; i < segments.length && logs.length < limit; i++) {
+    // Whole segments before the requested page are skipped without a read
+    if (counts[i] === 0 || skip >= counts[i]) {
+      skip -= counts[i];
+      continue;
+    }
+
+    const rows = await load(segments[i]);
+    logs.push(...rows.slice(skip, skip + limit - logs.length));
+    skip = 0;
+  }
+
+  return { logs, total };
+}
+
+function cutByWindow(segment: AuditArchiveSegment, filters: AuditLogFilters): boolean {
+  return Boolean(
+    (filters.from && segment.first_created_at < filters.from) ||
+      (filters.to && segment.last_created_at >= filters.to)
+  );
+}
+
+// The manifest only counts by entity_type and action over the whole segment;
+// a window cutting through it needs the rows
+function countFromManifest(segment: AuditArchiveSegment, filters: AuditLogFilters): number | null {
+  if (cutByWindow(segment, filters)) {
+    return null;
+  }
+
+  return Object.entries(segment.counts).reduce((sum, [key, count]) => {
+    const [entityType, action] = key.split(':');
+    if (filters.entityType && entityType !== filters.entityType) return sum;
+    if (filters.action && action !== filters.action) return sum;
+    return sum + count;
+  }, 0);
+}
+
+function matchesFilters(log: AuditLog, filters: AuditLogFilters): boolean {
+  return (
+    (!filters.entityType || log.entity_type === filters.entityType) &&
+    (!filters.action || log.action === filters.action) &&
+    (!filters.userId || log.user_id === filters.userId) &&
+    (!filters.entityId || log.entity_id === filters.entityId) &&
+    (!filters.from || log.created_at >= filters.from) &&
+    (!filters.to || log.created_at < filters.to)
+  );
+}
+
+async function gzip(text: string): Promise<ArrayBuffer> {
+  const stream = new Blob([text]).stream().pipeThrough(new CompressionStream('gzip'));
+  return new Response(stream).arrayBuffer();
+}
@@ -0,0 +1,288 @@
+// ============================================================================
+// Authentication and Tenant Authorization
+// Establishes the caller (bearer JWT when a JWKS is configured) and checks
+// their role in the company a request targets before any route runs. Roles
+// come from the membership cache in db/company-access.
+// ============================================================================
+
+import type { Env, RequestContext, AccessRole, AuthMode } from '../types';
+import { getMembershipRole, getUserCompanyIds, roleAtMost } from '../db/company-access';
+import { getAssetCompanyId } from '../db/assets';
+import { getJobById } from '../db/jobs';
+import { validateUUID } from '../utils/validation';
+import { errorResponse, unauthorizedResponse, forbiddenResponse } from '../utils/response';
+import { fanOut, findEntityCompanyId, resolveDb } from '../sharding';
+import { isJwtAuthEnabled, verifyToken } from './jwt';
+
+export function getAuthMode(env: Env): AuthMode {
+  return env.AUTH_MODE === 'enforce' ? 'enforce' : 'off';
+}
+
+// With a JWKS configured every request needs a valid bearer token, and its
+// subject replaces X-User-Id. Returns a response to send instead, or null.
+export async function authenticateRequest(
+  request: Request,
+  env: Env,
+  ctx: RequestContext
+): Promise<Response | null> {
+  if (!isJwtAuthEnabled(env)) {
+    return null;
+  }
+
+  const match = /^Bearer\s+(\S+)$/i.exec(request.headers.get('Authorization') || '');
+  if (!match) {
+    return withBearerChallenge(unauthorizedResponse('Authorization: Bearer token is required'));
+  }
+
+  let result;
+  try {
+    result = await verifyToken(match[1], env);
+  } catch (error) {
+    console.error('Token verification unavailable:', error);
+    return errorResponse('AUTH_UNAVAILABLE', 'Unable to verify tokens right now', 503);
+  }
+
+  if (!result.valid) {
+    return withBearerChallenge(unauthorizedResponse(result.error));
+  }
+
+  ctx.userId = result.claims.sub;
+  return null;
+}
+
+function withBearerChallenge(response: Response): Response {
+  response.headers.set('WWW-Authenticate', 'Bearer error="invalid_token"');
+  return response;
+}
+
+// Returns a response to send instead of routing, or null to continue. The
+// company is the one the request names or, for /assets/:id and /jobs/:id,
+// the one owning the row. Lists of a company's rows must name it; routes
+// that create or look up shared rows (POST /companies, POST /users, the
+// lookups) only need a caller and scope what they return with
+// getVisibleCompanyIds.
+export async function authorizeRequest(
+  request: Request,
+  url: URL,
+  env: Env,
+  ctx: RequestContext
+): Promise<Response | null> {
+  if (getAuthMode(env) === 'off') {
+    return null;
+  }
+
+  if (!ctx.userId) {
+    return unauthorizedResponse('A caller identity (bearer token or X-User-Id) is required');
+  }
+
+  const pathParts = url.pathname.split('/').filter(Boolean);
+
+  // Run history spans every tenant
+  if (pathParts[0] === 'maintenance' && !isOperator(env, ctx.userId)) {
+    return forbiddenResponse('Maintenance history is only available to operators (OPERATOR_USER_IDS)');
+  }
+
+  // Another user's record is reached through a company both belong to. The
+  // sub-resources span every company the user is in, so they stay private.
+  const otherUserId = targetOtherUser(pathParts, ctx.userId);
+  if (otherUserId && pathParts.length > 2) {
+    return forbiddenResponse("Another user's memberships, assets and audit logs cannot be read");
+  }
+
+  if (isCompanyScopedList(request.method, pathParts) && !url.searchParams.get('company_id')) {
+    return forbiddenResponse('company_id query parameter is required');
+  }
+
+  const candidates = await targetCompanies(request, url, pathParts, ctx);
+  const owner = await owningCompany(env, pathParts);
+  if (owner) {
+    candidates.push(owner);
+  }
+
+  if (new Set(candidates).size > 1) {
+    return forbiddenResponse('Request names more than one company');
+  }
+  if (candidates.length === 0) {
+    if (otherUserId) {
+      return forbiddenResponse("Name a company you share with this user (X-Company-Id) to access their record");
+    }
+    return null;
+  }
+
+  const companyId = candidates[0];
+  const db = await resolveDb(env, companyId);
+  const role = await getMembershipRole(db, companyId, ctx.userId);
+  if (!role) {
+    return forbiddenResponse('You do not have access to this company');
+  }
+
+  const required = requiredRole(request.method, pathParts, otherUserId !== null);
+  if (!roleAtMost(required, role)) {
+    return forbiddenResponse(`This action requires the ${required} role or higher`);
+  }
+
+  if (otherUserId) {
+    const otherRole = await getMembershipRole(db, companyId, otherUserId);
+    if (!otherRole) {
+      return forbiddenResponse('That user is not a member of this company');
+    }
+    // An ADMIN must not be able to change or delete an OWNER
+    if (required !== 'READ_ONLY' && !roleAtMost(otherRole, role)) {
+      return forbiddenResponse(`Changing a user with the ${otherRole} role requires that role`);
+    }
+  }
+
+  ctx.companyId = companyId;
+  ctx.role = role;
+  return null;
+}
+
+// The companies a caller may see in cross-tenant lists and lookups, from
+// their memberships on every shard; null when authorization is off and
+// nothing is scoped
+export async function getVisibleCompanyIds(
+  env: Env,
+  ctx: RequestContext
+): Promise<string[] | null> {
+  if (getAuthMode(env) === 'off' || !ctx.userId) {
+    return null;
+  }
+
+  const userId = ctx.userId;
+  const perShard = await fanOut(env, (db) => getUserCompanyIds(db, userId));
+  return [...new Set(perShard.flat())];
+}
+
+function isOperator(env: Env, userId: string): boolean {
+  return (env.OPERATOR_USER_IDS || '')
+    .split(',')
+    .map((part) => part.trim())
+    .includes(userId);
+}
+
+// Every place a request can name its company: the /companies/:id path, the
+// company_id query parameter, a POST body's company_id, a POST or PATCH
+// body's primary_company_id and X-Company-Id
+async function targetCompanies(
+  request: Request,
+  url: URL,
+  pathParts: string[],
+  ctx: RequestContext
+): Promise<string[]> {
+  const candidates: string[] = [];
+
+  if (pathParts[0] === 'companies' && pathParts.length >= 2 && validateUUID(pathParts[1], 'id').valid) {
+    candidates.push(pathParts[1]);
+  }
+
+  const queryCompanyId = url.searchParams.get('company_id');
+  if (queryCompanyId) {
+    candidates.push(queryCompanyId);
+  }
+
+  if (request.method === 'POST' || request.method === 'PATCH') {
+    candidates.push(...(await readBodyCompanyIds(request)));
+  }
+
+  if (ctx.companyId) {
+    candidates.push(ctx.companyId);
+  }
+
+  return candidates;
+}
+
+// The company owning the asset or job a route addresses by id. Null when the
+// route addresses neither or no shard has the row, which the route answers
+// with 404.
+async function owningCompany(env: Env, pathParts: string[]): Promise<string | null> {
+  if (pathParts.length !== 2 || !validateUUID(pathParts[1], 'id').valid) {
+    return null;
+  }
+
+  const id = pathParts[1];
+  if (pathParts[0] === 'assets') {
+    return findEntityCompanyId(env, (db) => getAssetCompanyId(db, id));
+  }
+  if (pathParts[0] === 'jobs') {
+    return findEntityCompanyId(env, async (db) => (await getJobById(db, id))?.company_id ?? null);
+  }
+  return null;
+}
+
+// The user a /users/:id route addresses, when that is not the caller
+function targetOtherUser(pathParts: string[], callerId: string): string | null {
+  if (pathParts[0] !== 'users' || pathParts.length < 2 || !validateUUID(pathParts[1], 'id').valid) {
+    return null;
+  }
+  return pathParts[1] === callerId ? null : pathParts[1];
+}
+
+// Lists of one company's rows. Their routes filter by the company_id query
+// parameter, and without it they would read across every tenant.
+function isCompanyScopedList(method: string, pathParts: string[]): boolean {
+  if (method !== 'GET') {
+    return false;
+  }
+
+  const [resource, sub] = pathParts;
+  if (resource === 'assets') {
+    return pathParts.length === 1 || sub === 'search' || sub === 'by-identifier';
+  }
+  if (resource === 'users') {
+    return pathParts.length === 1 || (pathParts.length === 2 && sub === 'asset-counts');
+  }
+  return resource === 'audit-logs' || resource === 'sync' || resource === 'changes';
+}
+
+// A user's primary_company_id attaches them to that company, so it is
+// checked like a company_id
+async function readBodyCompanyIds(request: Request): Promise<string[]> {
+  if (!(request.headers.get('Content-Type') || '').includes('application/json')) {
+    return [];
+  }
+
+  let body: Record<string, unknown> | null;
+  try {
+    body = (await request.clone().json()) as Record<string, unknown> | null;
+  } catch {
+    return [];
+  }
+
+  const companyIds: string[] = [];
+  if (request.method === 'POST' && typeof body?.company_id === 'string') {
+    companyIds.push(body.company_id);
+  }
+  if (typeof body?.primary_company_id === 'string') {
+    companyIds.push(body.primary_company_id);
+  }
+  return companyIds;
+}
+
+// Reads need any role; company settings, membership changes and changes to
+// another member's user record need ADMIN; deleting the company or moving it
+// to another shard needs OWNER
+function requiredRole(method: string, pathParts: string[], otherUser: boolean): AccessRole {
+  if (method === 'GET' || method === 'HEAD') {
+    return 'READ_ONLY';
+  }
+
+  if (otherUser) {
+    return 'ADMIN';
+  }
+
+  if (pathParts[0] === 'companies') {
+    if ((pathParts.length === 2 && method === 'DELETE') || pathParts[2] === 'move') {
+      return 'OWNER';
+    }
+    if (
+      pathParts.length === 2 ||
+      pathParts[2] === 'attributes' ||
+      pathParts[2] === 'users' ||
+      pathParts[2]?.startsWith('users:')
+    ) {
+      return 'ADMIN';
+    }
+  }
+
+  return 'MEMBER';
+}
@@ -0,0 +1,222 @@
+// ============================================================================
+// JWT Verification
+// Verifies bearer tokens against a JWKS with WebCrypto. The key set is loaded
+// once per isolate and reloaded when a token names an unknown kid; verified
+// tokens are cached by digest so repeat requests skip the signature check.
+// ============================================================================
+
+import type { Env, JwtClaims } from '../types';
+import { TtlCache } from '../utils/cache';
+import { sha256Hex } from '../utils/hash';
+
+type JwtAlgorithm = 'RS256' | 'ES256';
+
+interface SigningKey {
+  alg: JwtAlgorithm;
+  key: CryptoKey;
+}
+
+interface KeySet {
+  keys: Map<string, SigningKey>;
+  loadedAt: number;
+}
+
+const ALGORITHMS: Record<
+  JwtAlgorithm,
+  { importParams: RsaHashedImportParams | EcKeyImportParams; verifyParams: Algorithm | EcdsaParams }
+> = {
+  RS256: {
+    importParams: { name: 'RSASSA-PKCS1-v1_5', hash: 'SHA-256' },
+    verifyParams: { name: 'RSASSA-PKCS1-v1_5' },
+  },
+  ES256: {
+    importParams: { name: 'ECDSA', namedCurve: 'P-256' },
+    verifyParams: { name: 'ECDSA', hash: 'SHA-256' },
+  },
+};
+
+const KEY_SET_MAX_AGE_MS = 60 * 60 * 1000;
+// Unknown kids trigger a reload at most this often, so junk tokens cannot
+// hammer the identity provider
+const KEY_SET_MIN_RELOAD_MS = 30_000;
+const CLOCK_SKEW_SECONDS = 60;
+
+const verifiedTokens = new TtlCache<string, JwtClaims>(10_000, 60_000);
+
+let keySet: KeySet | null = null;
+let keySetLoading: Promise<KeySet> | null = null;
+
+export type TokenVerification =
+  | { valid: true; claims: JwtClaims }
+  | { valid: false; error: string };
+
+export function isJwtAuthEnabled(env: Env): boolean {
+  return Boolean(env.JWKS_URL || env.JWKS_JSON);
+}
+
+export async function verifyToken(token: string, env: Env): Promise<TokenVerification> {
+  const now = Date.now();
+  const digest = await sha256Hex(token);
+
+  const cached = verifiedTokens.get(digest);
+  if (cached) {
+    return { valid: true, claims: cached };
+  }
+
+  const parts = token.split('.');
+  if (parts.length !== 3) {
+    return { valid: false, error: 'Malformed token' };
+  }
+
+  const header = decodeJson(parts[0]);
+  const claims = decodeJson(parts[1]) as JwtClaims | null;
+  if (!header || !claims) {
+    return { valid: false, error: 'Malformed token' };
+  }
+
+  if (typeof header.kid !== 'string' || !(header.alg === 'RS256' || header.alg === 'ES256')) {
+    return { valid: false, error: 'Token must be RS256 or ES256 and carry a kid' };
+  }
+
+  const signingKey = await getSigningKey(env, header.kid);
+  // The key decides the algorithm, never the token alone
+  if (!signingKey || signingKey.alg !== header.alg) {
+    return { valid: false, error: 'Token is signed with an unknown key' };
+  }
+
+  const signature = fromBase64Url(parts[2]);
+  const verified =
+    signature !== null &&
+    (await crypto.subtle.verify(
+      ALGORITHMS[signingKey.alg].verifyParams,
+      signingKey.key,
+      signature,
+      new TextEncoder().encode(`${parts[0]}.${parts[1]}`)
+    ));
+  if (!verified) {
+    return { valid: false, error: 'Invalid token signature' };
+  }
+
+  const claimsError = checkClaims(claims, env, now / 1000);
+  if (claimsError) {
+    return { valid: false, error: claimsError };
+  }
+
+  verifiedTokens.set(digest, claims, Math.min(60_000, claims.exp * 1000 - now));
+  return { valid: true, claims };
+}
+
+function checkClaims(claims: JwtClaims, env: Env, nowSeconds: number): string | null {
+  if (typeof claims.sub !== 'string' || claims.sub === '') {
+    return 'Token has no subject';
+  }
+  if (typeof claims.exp !== 'number' || claims.exp <= nowSeconds - CLOCK_SKEW_SECONDS) {
+    return 'Token has expired';
+  }
+  if (typeof claims.nbf === 'number' && claims.nbf > nowSeconds + CLOCK_SKEW_SECONDS) {
+    return 'Token is not valid yet';
+  }
+  if (env.JWT_ISSUER && claims.iss !== env.JWT_ISSUER) {
+    return 'Token issuer is not accepted';
+  }
+  if (env.JWT_AUDIENCE) {
+    const audiences = Array.isArray(claims.aud) ? claims.aud : [claims.aud];
+    if (!audiences.includes(env.JWT_AUDIENCE)) {
+      return 'Token audience is not accepted';
+    }
+  }
+  return null;
+}
+
+async function getSigningKey(env: Env, kid: string): Promise<SigningKey | null> {
+  let keys = await loadKeySet(env, false);
+  let key = keys.keys.get(kid);
+
+  // Refresh-on-unknown-kid picks up rotated keys without waiting for max age
+  if (!key && Date.now() - keys.loadedAt >= KEY_SET_MIN_RELOAD_MS) {
+    keys = await loadKeySet(env, true);
+    key = keys.keys.get(kid);
+  }
+
+  return key || null;
+}
+
+// Concurrent requests share one in-flight load
+async function loadKeySet(env: Env, force: boolean): Promise<KeySet> {
+  if (keySet && !force && Date.now() - keySet.loadedAt < KEY_SET_MAX_AGE_MS) {
+    return keySet;
+  }
+
+  if (!keySetLoading) {
+    keySetLoading = fetchKeySet(env)
+      .catch((error) => {
+        // Keep verifying with the keys we have while the provider is down
+        if (keySet) {
+          console.error('JWKS reload failed, keeping previous keys:', error);
+          return { keys: keySet.keys, loadedAt: Date.now() };
+        }
+        throw error;
+      })
+      .then((loaded) => {
+        keySet = loaded;
+        return loaded;
+      })
+      .finally(() => {
+        keySetLoading = null;
+      });
+  }
+
+  return keySetLoading;
+}
+
+// JWKS_JSON is the local stand-in for JWKS_URL (wrangler dev, tests)
+async function fetchKeySet(env: Env): Promise<KeySet> {
+  let jwks: { keys?: (JsonWebKey & { kid?: string; use?: string })[] };
+
+  if (env.JWKS_JSON) {
+    jwks = JSON.parse(env.JWKS_JSON);
+  } else {
+    const response = await fetch(env.JWKS_URL as string, { headers: { Accept: 'application/json' } });
+    if (!response.ok) {
+      throw new Error(`JWKS request failed with ${response.status}`);
+    }
+    jwks = await response.json();
+  }
+
+  const keys = new Map<string, SigningKey>();
+  for (const jwk of jwks.keys || []) {
+    const alg: JwtAlgorithm | null =
+      jwk.kty === 'RSA' ? 'RS256' : jwk.kty === 'EC' && jwk.crv === 'P-256' ? 'ES256' : null;
+    if (!alg || !jwk.kid || (jwk.alg && jwk.alg !== alg) || (jwk.use && jwk.use !== 'sig')) {
+      continue;
+    }
+
+    const key = await crypto.subtle.importKey('jwk', jwk, ALGORITHMS[alg].importParams, false, ['verify']);
+    keys.set(jwk.kid, { alg, key });
+  }
+
+  return { keys, loadedAt: Date.now() };
+}
+
+function decodeJson(segment: string): Record<string, unknown> | null {
+  const bytes = fromBase64Url(segment);
+  if (!bytes) {
+    return null;
+  }
+  try {
+    const value = JSON.parse(new TextDecoder().decode(bytes));
+    return value && typeof value === 'object' && !Array.isArray(value) ? value : null;
+  } catch {
+    return null;
+  }
+}
+
+function fromBase64Url(value: string): Uint8Array | null {
+  try {
+    const base64 = value.replace(/-/g, '+').replace(/_/g, '/');
+    const binary = atob(base64 + '='.repeat((4 - (base64.length % 4)) % 4));
+    return Uint8Array.from(binary, (char) => char.charCodeAt(0));
+  } catch {
+    return null;
+  }
+}
@@ -2,8 +2,53 @@
 // Assets Database Operations
 // ============================================================================
 
-import type { Asset, CreateAssetRequest, UpdateAssetRequest } from '../types';
-import { createAuditLog } from './audit';
+import type {
+  Asset,
+  AuditEntry,
+  CreateAssetRequest,
+  UpdateAssetRequest,
+  BulkUpdateAssetsRequest,
+  BulkUpdateAssetsResult,
+} from '../types';
+import { createAuditLog, createAuditLogs } from './audit';
+import { hasArchivedEntityActivity } from './audit-archive';
+import type { KeysetCursor, SearchCursor } from '../utils/cursor';
+import { updateVersionedRow } from './versioning';
+import { TtlCache } from '../utils/cache';
+
+// Hot identifier lookups (barcode scanners); null caches a miss
+const identifierCache = new TtlCache<string, Asset | null>(5000, 30_000);
+const IDENTIFIER_MISS_TTL_MS = 5_000;
+const IDENTIFIERS_PER_QUERY = 90;
+
+// Bulk updates: ids per statement keeps ids + filter + patch params under 100
+export const BULK_UPDATE_MAX_ASSETS = 1000;
+const BULK_UPDATE_IDS_PER_QUERY = 80;
+
+export const ASSET_COUNTS_MAX_USERS = 100;
+const ASSIGNEES_PER_QUERY = 90;
+
+function identifierCacheKey(companyId: string, identifier: string): string {
+  return `${companyId}:${identifier}`;
+}
+
+function invalidateIdentifier(companyId: string, identifier: string | null): void {
+  if (identifier) {
+    identifierCache.delete(identifierCacheKey(companyId, identifier));
+  }
+}
+
+// For bulk removals (company deletion, tenant moves) that bypass deleteAsset
+export function forgetCompanyIdentifiers(companyId: string): void {
+  identifierCache.deleteMatching((key) => key.startsWith(`${companyId}:`));
+}
+
+function parseAssetRow(row: Asset & { metadata: string }): Asset {
+  return {
+    ...row,
+    metadata: typeof row.metadata === 'string' ? JSON.parse(row.metadata) : row.metadata,
+  };
+}
 
 export async function createAsset(
   db: D1Database,
@@ -42,9 +87,12 @@ export async function createAsset(
     status,
     metadata: data.metadata || {},
     assigned_to: data.assigned_to || null,
+    version: 1,
     created_at: createdAt,
   };
 
+  invalidateIdentifier(asset.company_id, asset.identifier);
+
   await createAuditLog(db, {
     companyId: data.company_id,
     userId,
@@ -70,10 +118,20 @@ export async function getAssetById(
     return null;
   }
 
-  return {
-    ...result,
-    metadata: typeof result.metadata === 'string' ? JSON.parse(result.metadata) : result.metadata,
-  };
+  return parseAssetRow(result);
+}
+
+// Owning company of an asset, for routes addressed by the asset id alone
+export async function getAssetCompanyId(
+  db: D1Database,
+  id: string
+): Promise<string | null> {
+  const result = await db
+    .prepare(`SELECT company_id FROM assets WHERE id = ?`)
+    .bind(id)
+    .first<{ company_id: string }>();
+
+  return result?.company_id ?? null;
 }
 
 export async function getAllAssets(
@@ -84,9 +142,23 @@ export async function getAllAssets(
     company_id?: string;
     type?: string;
     status?: string;
+    assigned_to?: string;
+    // Promoted metadata filters; require company_id
+    attributes?: { key: string; value: string | number }[];
+    // Companies whose rows on this shard are copies left by a tenant move
+    excludeCompanyIds?: string[];
   } = {}
 ): Promise<{ assets: Asset[]; total: number }> {
-  const { limit = 50, offset = 0, company_id, type, status } = options;
+  const {
+    limit = 50,
+    offset = 0,
+    company_id,
+    type,
+    status,
+    assigned_to,
+    attributes = [],
+    excludeCompanyIds = [],
+  } = options;
 
   const conditions: string[] = [];
   const params: (string | number)[] = [];
@@ -106,6 +178,24 @@ export async function getAllAssets(
     params.push(status);
   }
 
+  if (assigned_to) {
+    conditions.push('assigned_to = ?');
+    params.push(assigned_to);
+  }
+
+  // Each filter is a seek on idx_asset_attributes_lookup
+  for (const attribute of attributes) {
+    conditions.push(
+      'id IN (SELECT asset_id FROM asset_attributes WHERE company_id = ? AND key = ? AND value = ?)'
+    );
+    params.push(company_id || '', attribute.key, attribute.value);
+  }
+
+  if (excludeCompanyIds.length > 0) {
+    conditions.push('company_id NOT IN (SELECT value FROM json_each(?))');
+    params.push(JSON.stringify(excludeCompanyIds));
+  }
+
   const whereClause = conditions.length > 0 ? 'WHERE ' + conditions.join(' AND ') : '';
 
   const countResult = await db
@@ -122,90 +212,393 @@ export async function getAllAssets(
     .bind(...params, limit, offset)
     .all<Asset & { metadata: string }>();
 
-  const assets: Asset[] = (assetsResult.results || []).map((row) => ({
-    ...row,
-    metadata: typeof row.metadata === 'string' ? JSON.parse(row.metadata) : row.metadata,
-  }));
+  const assets: Asset[] = (assetsResult.results || []).map(parseAssetRow);
 
   return { assets, total };
 }
 
-export async function updateAsset(
+// Newest first, keyed on (created_at, id) within one assignee so every page
+// is a range scan on idx_assets_assigned_created
+export async function getAssetsByAssignee(
   db: D1Database,
-  id: string,
-  data: UpdateAssetRequest,
-  userId?: string
-): Promise<Asset | null> {
-  const existing = await getAssetById(db, id);
-  if (!existing) {
+  userId: string,
+  options: { limit?: number; after?: KeysetCursor } = {}
+): Promise<{ assets: Asset[]; cursor: KeysetCursor | null; has_more: boolean }> {
+  const { limit = 50, after } = options;
+
+  const keyset = after ? 'AND (created_at, id) < (?, ?)' : '';
+  const params: string[] = after ? [userId, after.createdAt, after.id] : [userId];
+
+  const result = await db
+    .prepare(
+      `SELECT * FROM assets
+       WHERE assigned_to = ? ${keyset}
+       ORDER BY created_at DESC, id DESC
+       LIMIT ?`
+    )
+    .bind(...params, limit + 1)
+    .all<Asset & { metadata: string }>();
+
+  const rows = result.results || [];
+  const hasMore = rows.length > limit;
+  const assets = rows.slice(0, limit).map(parseAssetRow);
+  const last = assets[assets.length - 1];
+
+  return {
+    assets,
+    cursor: hasMore && last ? { createdAt: last.created_at, id: last.id } : null,
+    has_more: hasMore,
+  };
+}
+
+// Assigned asset counts for many users at once; users with none map to 0
+export async function countAssetsByAssignees(
+  db: D1Database,
+  userIds: string[],
+  // Counts only this company's assets when given
+  companyId?: string
+): Promise<Record<string, number>> {
+  const counts: Record<string, number> = {};
+  const ids = [...new Set(userIds)];
+
+  for (const id of ids) {
+    counts[id] = 0;
+  }
+
+  for (let i = 0; i < ids.length; i += ASSIGNEES_PER_QUERY) {
+    const chunk = ids.slice(i, i + ASSIGNEES_PER_QUERY);
+    const result = await db
+      .prepare(
+        `SELECT assigned_to, COUNT(*) as count FROM assets
+         WHERE assigned_to IN (${chunk.map(() => '?').join(', ')})${companyId ? ' AND company_id = ?' : ''}
+         GROUP BY assigned_to`
+      )
+      .bind(...chunk, ...(companyId ? [companyId] : []))
+      .all<{ assigned_to: string; count: number }>();
+
+    for (const row of result.results || []) {
+      counts[row.assigned_to] = row.count;
+    }
+  }
+
+  return counts;
+}
+
+// FTS5 query over the searchable columns, scoped to one company. Each word
+// becomes a quoted prefix term so user input cannot inject query syntax.
+const MAX_SEARCH_TERMS = 8;
+
+export function buildAssetSearchQuery(q: string, companyId: string): string | null {
+  const terms = (q.match(/[\p{L}\p{N}]+/gu) || []).slice(0, MAX_SEARCH_TERMS);
+  if (terms.length === 0) {
     return null;
   }
 
+  const match = terms.map((term) => `"${term}"*`).join(' AND ');
+  return `company_id : "${companyId}" AND {name identifier metadata} : (${match})`;
+}
+
+// Search pages stop here: every page scores and sorts all matches, and bm25
+// ranks shift with each write to the company's assets, so deeper paging
+// would cost more and still skip or repeat rows. Refine the query instead.
+export const MAX_SEARCH_RESULTS = 500;
+
+// Ranked by bm25 (best first), paged by offset up to MAX_SEARCH_RESULTS
+export async function searchAssets(
+  db: D1Database,
+  companyId: string,
+  query: string,
+  options: { limit?: number; after?: SearchCursor } = {}
+): Promise<{ assets: Asset[]; cursor: SearchCursor | null; has_more: boolean }> {
+  const offset = Math.min(options.after?.offset ?? 0, MAX_SEARCH_RESULTS);
+  const limit = Math.min(options.limit ?? 20, MAX_SEARCH_RESULTS - offset);
+  if (limit <= 0) {
+    return { assets: [], cursor: null, has_more: false };
+  }
+
+  const result = await db
+    .prepare(
+      `SELECT a.*
+       FROM assets_fts
+       JOIN assets a ON a.rowid = assets_fts.rowid
+       WHERE assets_fts MATCH ?
+       ORDER BY assets_fts.rank, assets_fts.rowid
+       LIMIT ? OFFSET ?`
+    )
+    .bind(query, limit + 1, offset)
+    .all<Asset & { metadata: string }>();
+
+  const rows = result.results || [];
+  const hasMore = rows.length > limit && offset + limit < MAX_SEARCH_RESULTS;
+
+  return {
+    assets: rows.slice(0, limit).map(parseAssetRow),
+    cursor: hasMore ? { offset: offset + limit } : null,
+    has_more: hasMore,
+  };
+}
+
+export async function updateAsset(
+  db: D1Database,
+  id: string,
+  data: UpdateAssetRequest,
+  userId?: string,
+  expectedVersion?: number
+): Promise<{ success: boolean; asset?: Asset; error?: string }> {
   const updates: string[] = [];
   const values: (string | null)[] = [];
-  const changes: Record<string, { from: unknown; to: unknown }> = {};
 
   if (data.type !== undefined) {
     updates.push('type = ?');
     values.push(data.type);
-    changes.type = { from: existing.type, to: data.type };
   }
 
   if (data.name !== undefined) {
     updates.push('name = ?');
     values.push(data.name.trim());
-    changes.name = { from: existing.name, to: data.name.trim() };
   }
 
   if (data.identifier !== undefined) {
     updates.push('identifier = ?');
     values.push(data.identifier);
-    changes.identifier = { from: existing.identifier, to: data.identifier };
   }
 
   if (data.status !== undefined) {
     updates.push('status = ?');
     values.push(data.status);
-    changes.status = { from: existing.status, to: data.status };
   }
 
   if (data.metadata !== undefined) {
     updates.push('metadata = ?');
     values.push(JSON.stringify(data.metadata));
-    changes.metadata = { from: existing.metadata, to: data.metadata };
   }
 
   if (data.assigned_to !== undefined) {
     updates.push('assigned_to = ?');
     values.push(data.assigned_to);
-    changes.assigned_to = { from: existing.assigned_to, to: data.assigned_to };
   }
 
   if (updates.length === 0) {
-    return existing;
+    const existing = await getAssetById(db, id);
+    return existing
+      ? { success: true, asset: existing }
+      : { success: false, error: 'Asset not found' };
   }
 
-  values.push(id);
+  const result = await updateVersionedRow<Asset & { metadata: string }>(
+    db,
+    'assets',
+    id,
+    updates,
+    values,
+    expectedVersion
+  );
 
-  await db
-    .prepare(`UPDATE assets SET ${updates.join(', ')} WHERE id = ?`)
-    .bind(...values)
-    .run();
+  if (!result.before) {
+    return { success: false, error: 'Asset not found' };
+  }
+  if (!result.after) {
+    return { success: false, error: 'Version mismatch' };
+  }
+
+  const before = parseAssetRow(result.before);
+  const after = parseAssetRow(result.after);
+  invalidateIdentifier(before.company_id, before.identifier);
+  invalidateIdentifier(after.company_id, after.identifier);
+  const changes: Record<string, { from: unknown; to: unknown }> = {};
 
-  const updated = await getAssetById(db, id);
+  if (data.type !== undefined) {
+    changes.type = { from: before.type, to: after.type };
+  }
 
-  if (updated) {
-    await createAuditLog(db, {
-      companyId: existing.company_id,
-      userId,
-      entityType: 'asset',
-      entityId: id,
-      action: 'update',
-      changes,
-    });
+  if (data.name !== undefined) {
+    changes.name = { from: before.name, to: after.name };
+  }
+
+  if (data.identifier !== undefined) {
+    changes.identifier = { from: before.identifier, to: after.identifier };
   }
 
-  return updated;
+  if (data.status !== undefined) {
+    changes.status = { from: before.status, to: after.status };
+  }
+
+  if (data.metadata !== undefined) {
+    changes.metadata = { from: before.metadata, to: after.metadata };
+  }
+
+  if (data.assigned_to !== undefined) {
+    changes.assigned_to = { from: before.assigned_to, to: after.assigned_to };
+  }
+
+  await createAuditLog(db, {
+    companyId: before.company_id,
+    userId,
+    entityType: 'asset',
+    entityId: id,
+    action: 'update',
+    changes,
+  });
+
+  return { success: true, asset: after };
+}
+
+type BulkUpdateRow = Pick<Asset, 'id' | 'identifier' | 'status' | 'assigned_to'>;
+
+// Applies one patch to many assets of a company. Each chunk reads the old
+// values and runs a set-based UPDATE ... RETURNING in one batch; rows that
+// already match the patch are left alone (no version bump, no audit row).
+export async function bulkUpdateAssets(
+  db: D1Database,
+  data: BulkUpdateAssetsRequest,
+  userId?: string
+): Promise<{ success: boolean; result?: BulkUpdateAssetsResult; error?: string }> {
+  const filterConditions: string[] = [];
+  const filterParams: string[] = [];
+
+  for (const field of ['type', 'status', 'assigned_to'] as const) {
+    const value = data.filter?.[field];
+    if (value !== undefined) {
+      filterConditions.push(` AND ${field} = ?`);
+      filterParams.push(value);
+    }
+  }
+
+  let ids: string[];
+  if (data.ids) {
+    ids = [...new Set(data.ids)];
+  } else {
+    const matches = await db
+      .prepare(
+        `SELECT id FROM assets WHERE company_id = ?${filterConditions.join('')} ORDER BY id LIMIT ?`
+      )
+      .bind(data.company_id, ...filterParams, BULK_UPDATE_MAX_ASSETS + 1)
+      .all<{ id: string }>();
+
+    ids = (matches.results || []).map((row) => row.id);
+    if (ids.length > BULK_UPDATE_MAX_ASSETS) {
+      return {
+        success: false,
+        error: `Filter matches more than ${BULK_UPDATE_MAX_ASSETS} assets`,
+      };
+    }
+  }
+
+  const assignments: string[] = [];
+  const differs: string[] = [];
+  const values: (string | null)[] = [];
+  const fields = (['status', 'assigned_to'] as const).filter((field) => data.patch[field] !== undefined);
+
+  for (const field of fields) {
+    assignments.push(`${field} = ?`);
+    differs.push(`${field} IS NOT ?`);
+    values.push(data.patch[field] as string | null);
+  }
+
+  const found = new Set<string>();
+  const entries: AuditEntry[] = [];
+
+  for (let i = 0; i < ids.length; i += BULK_UPDATE_IDS_PER_QUERY) {
+    const chunk = ids.slice(i, i + BULK_UPDATE_IDS_PER_QUERY);
+    // The filter is re-applied so rows that changed since the id scan are skipped
+    const scope = `company_id = ? AND id IN (${chunk.map(() => '?').join(', ')})${filterConditions.join('')}`;
+    const scopeParams = [data.company_id, ...chunk, ...filterParams];
+
+    const [beforeResult, afterResult] = await db.batch<BulkUpdateRow>([
+      db.prepare(`SELECT id, identifier, status, assigned_to FROM assets WHERE ${scope}`).bind(...scopeParams),
+      db
+        .prepare(
+          `UPDATE assets SET ${[...assignments, 'version = version + 1'].join(', ')}
+           WHERE ${scope} AND (${differs.join(' OR ')})
+           RETURNING id, identifier, status, assigned_to`
+        )
+        .bind(...values, ...scopeParams, ...values),
+    ]);
+
+    const before = new Map<string, BulkUpdateRow>();
+    for (const row of beforeResult.results || []) {
+      before.set(row.id, row);
+      found.add(row.id);
+    }
+
+    for (const after of afterResult.results || []) {
+      const previous = before.get(after.id) as BulkUpdateRow;
+      invalidateIdentifier(data.company_id, after.identifier);
+
+      const changes: Record<string, { from: unknown; to: unknown }> = {};
+      for (const field of fields) {
+        changes[field] = { from: previous[field], to: after[field] };
+      }
+
+      entries.push({
+        companyId: data.company_id,
+        userId,
+        entityType: 'asset',
+        entityId: after.id,
+        action: 'update',
+        changes,
+      });
+    }
+  }
+
+  await createAuditLogs(db, entries);
+
+  return {
+    success: true,
+    result: {
+      matched: found.size,
+      updated: entries.length,
+      unchanged: found.size - entries.length,
+      not_found: data.ids ? ids.filter((id) => !found.has(id)) : [],
+    },
+  };
+}
+
+// Resolves identifiers within one company, serving repeats from the isolate
+// cache; identifiers with no asset are absent from the returned map
+export async function getAssetsByIdentifiers(
+  db: D1Database,
+  companyId: string,
+  identifiers: string[]
+): Promise<Map<string, Asset>> {
+  const found = new Map<string, Asset>();
+  const misses: string[] = [];
+
+  for (const identifier of new Set(identifiers)) {
+    const cached = identifierCache.get(identifierCacheKey(companyId, identifier));
+    if (cached === undefined) {
+      misses.push(identifier);
+    } else if (cached) {
+      found.set(identifier, cached);
+    }
+  }
+
+  for (let i = 0; i < misses.length; i += IDENTIFIERS_PER_QUERY) {
+    const chunk = misses.slice(i, i + IDENTIFIERS_PER_QUERY);
+    const result = await db
+      .prepare(
+        `SELECT * FROM assets
+         WHERE company_id = ? AND identifier IN (${chunk.map(() => '?').join(', ')})`
+      )
+      .bind(companyId, ...chunk)
+      .all<Asset & { metadata: string }>();
+
+    for (const row of result.results || []) {
+      const asset = parseAssetRow(row);
+      found.set(asset.identifier as string, asset);
+    }
+
+    for (const identifier of chunk) {
+      const asset = found.get(identifier);
+      identifierCache.set(
+        identifierCacheKey(companyId, identifier),
+        asset || null,
+        asset ? undefined : IDENTIFIER_MISS_TTL_MS
+      );
+    }
+  }
+
+  return found;
 }
 
 export async function assetExists(db: D1Database, id: string): Promise<boolean> {
@@ -236,7 +629,10 @@ export async function deleteAsset(
     .bind(id)
     .first<{ count: number }>();
 
-  if (auditCount && auditCount.count > 0) {
+  if (
+    (auditCount && auditCount.count > 0) ||
+    (await hasArchivedEntityActivity(db, existing.company_id, 'asset', id))
+  ) {
     return { success: false, error: 'Cannot delete asset with activity history' };
   }
 
@@ -252,5 +648,7 @@ export async function deleteAsset(
     .bind(id)
     .run();
 
+  invalidateIdentifier(existing.company_id, existing.identifier);
+
   return { success: true };
 }
@@ -0,0 +1,187 @@
+// ============================================================================
+// Promoted Attribute Database Operations
+// Selected metadata keys mirrored into asset_attributes for indexed filters
+// ============================================================================
+
+import type { Job, PromotedAttribute, PromotedAttributeType } from '../types';
+import { getJobById } from './jobs';
+
+export async function getPromotedAttributes(
+  db: D1Database,
+  companyId: string
+): Promise<PromotedAttribute[]> {
+  const result = await db
+    .prepare(`SELECT * FROM promoted_attributes WHERE company_id = ? ORDER BY key`)
+    .bind(companyId)
+    .all<PromotedAttribute>();
+
+  return result.results || [];
+}
+
+export async function getPromotedAttributesForAsset(
+  db: D1Database,
+  assetId: string
+): Promise<PromotedAttribute[]> {
+  const result = await db
+    .prepare(
+      `SELECT p.* FROM promoted_attributes p
+       JOIN assets a ON a.company_id = p.company_id
+       WHERE a.id = ?
+       ORDER BY p.key`
+    )
+    .bind(assetId)
+    .all<PromotedAttribute>();
+
+  return result.results || [];
+}
+
+// Records the key and queues a backfill of existing assets in one batch;
+// new and updated assets are indexed by triggers from this point on
+export async function promoteAttribute(
+  db: D1Database,
+  companyId: string,
+  key: string,
+  type: PromotedAttributeType
+): Promise<{ attribute: PromotedAttribute; job: Job | null }> {
+  const jobId = crypto.randomUUID();
+  const createdAt = new Date().toISOString();
+  const progress = { action: 'backfill', key, after_rowid: 0, processed: 0, mismatched: 0 };
+
+  await db.batch([
+    db
+      .prepare(
+        `INSERT INTO promoted_attributes (company_id, key, type, created_at) VALUES (?, ?, ?, ?)`
+      )
+      .bind(companyId, key, type, createdAt),
+    db
+      .prepare(
+        `INSERT INTO jobs (id, type, status, company_id, progress, created_at, updated_at)
+         VALUES (?, 'attribute_backfill', 'pending', ?, ?, ?, ?)`
+      )
+      .bind(jobId, companyId, JSON.stringify(progress), createdAt, createdAt),
+  ]);
+
+  return {
+    attribute: { company_id: companyId, key, type, created_at: createdAt },
+    job: await getJobById(db, jobId),
+  };
+}
+
+// Filters stop accepting the key at once; its rows are removed by a job
+export async function demoteAttribute(
+  db: D1Database,
+  companyId: string,
+  key: string
+): Promise<{ success: boolean; job?: Job; error?: string }> {
+  const jobId = crypto.randomUUID();
+  const createdAt = new Date().toISOString();
+  const progress = { action: 'remove', key, processed: 0 };
+
+  const [removed] = await db.batch([
+    db
+      .prepare(`DELETE FROM promoted_attributes WHERE company_id = ? AND key = ?`)
+      .bind(companyId, key),
+    db
+      .prepare(
+        `INSERT INTO jobs (id, type, status, company_id, progress, created_at, updated_at)
+         SELECT ?, 'attribute_backfill', 'pending', ?, ?, ?, ? WHERE changes() = 1`
+      )
+      .bind(jobId, companyId, JSON.stringify(progress), createdAt, createdAt),
+  ]);
+
+  if (removed.meta.changes === 0) {
+    return { success: false, error: 'Attribute not found' };
+  }
+
+  const job = await getJobById(db, jobId);
+  return job ? { success: true, job } : { success: false, error: 'Attribute not found' };
+}
+
+// Whether the value under the promoted key has the promoted type; the same
+// test the asset_attributes triggers apply (migration 0022)
+function typeMatchesSql(metadata: string): string {
+  const path = `'$.' || p.key`;
+  return `CASE p.type
+            WHEN 'number' THEN json_type(${metadata}, ${path}) IN ('integer', 'real')
+            WHEN 'boolean' THEN json_type(${metadata}, ${path}) IN ('true', 'false')
+            WHEN 'date' THEN json_type(${metadata}, ${path}) = 'text'
+              AND json_extract(${metadata}, ${path}) GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+            ELSE json_type(${metadata}, ${path}) = 'text'
+          END`;
+}
+
+// Indexes the next page of the company's assets after `afterRowid`. Values
+// stored before the key was promoted that do not have its type are left
+// out of the index and counted as mismatched.
+export async function backfillAttributeChunk(
+  db: D1Database,
+  companyId: string,
+  key: string,
+  afterRowid: number,
+  chunkSize: number
+): Promise<{ scanned: number; lastRowid: number; mismatched: number }> {
+  const page = await db
+    .prepare(
+      `SELECT COUNT(*) AS scanned, MAX(rowid) AS last_rowid FROM (
+         SELECT rowid FROM assets WHERE company_id = ? AND rowid > ? ORDER BY rowid LIMIT ?
+       )`
+    )
+    .bind(companyId, afterRowid, chunkSize)
+    .first<{ scanned: number; last_rowid: number | null }>();
+
+  if (!page || page.scanned === 0 || page.last_rowid === null) {
+    return { scanned: 0, lastRowid: afterRowid, mismatched: 0 };
+  }
+
+  // Both skipped if the key was demoted while the backfill was queued
+  const [, mismatchResult] = await db.batch<{ mismatched: number }>([
+    db
+      .prepare(
+        `INSERT OR REPLACE INTO asset_attributes (asset_id, company_id, key, value)
+         SELECT a.id, a.company_id, p.key, json_extract(a.metadata, '$.' || p.key)
+         FROM assets a
+         JOIN promoted_attributes p ON p.company_id = a.company_id AND p.key = ?
+         WHERE a.company_id = ? AND a.rowid > ? AND a.rowid <= ?
+           AND ${typeMatchesSql('a.metadata')}`
+      )
+      .bind(key, companyId, afterRowid, page.last_rowid),
+    db
+      .prepare(
+        `SELECT COUNT(*) AS mismatched
+         FROM assets a
+         JOIN promoted_attributes p ON p.company_id = a.company_id AND p.key = ?
+         WHERE a.company_id = ? AND a.rowid > ? AND a.rowid <= ?
+           AND json_type(a.metadata, '$.' || p.key) != 'null'
+           AND NOT COALESCE(${typeMatchesSql('a.metadata')}, 0)`
+      )
+      .bind(key, companyId, afterRowid, page.last_rowid),
+  ]);
+
+  return {
+    scanned: page.scanned,
+    lastRowid: page.last_rowid,
+    mismatched: mismatchResult.results?.[0]?.mismatched ?? 0,
+  };
+}
+
+// Leaves the rows alone if the key has been promoted again since
+export async function removeAttributeChunk(
+  db: D1Database,
+  companyId: string,
+  key: string,
+  chunkSize: number
+): Promise<number> {
+  const result = await db
+    .prepare(
+      `DELETE FROM asset_attributes WHERE rowid IN (
+         SELECT rowid FROM asset_attributes
+         WHERE company_id = ? AND key = ?
+           AND NOT EXISTS (SELECT 1 FROM promoted_attributes WHERE company_id = ? AND key = ?)
+         LIMIT ?
+       )`
+    )
+    .bind(companyId, key, companyId, key, chunkSize)
+    .run();
+
+  return result.meta.changes;
+}
@@ -0,0 +1,303 @@
+// ============================================================================
+// Audit Archive Manifest Database Operations
+// ============================================================================
+
+import type { AuditLog, AuditLogFilters, AuditArchiveSegment, AuditArchiveIndexEntry } from '../types';
+import { parseAuditLogRow } from './audit';
+import { isNotNullViolation } from '../utils/db-errors';
+
+type SegmentRow = AuditArchiveSegment & { counts: string };
+
+function parseSegmentRow(row: SegmentRow): AuditArchiveSegment {
+  return {
+    ...row,
+    counts: typeof row.counts === 'string' ? JSON.parse(row.counts) : row.counts,
+  };
+}
+
+// The oldest archivable row decides which company and month to archive next,
+// so a company's archived rows are always older than its hot rows
+export async function getNextArchiveGroup(
+  db: D1Database,
+  cutoff: string
+): Promise<{ companyId: string; month: string } | null> {
+  const result = await db
+    .prepare(
+      `SELECT company_id, substr(created_at, 1, 7) AS month FROM audit_logs
+       WHERE created_at < ? ORDER BY created_at ASC LIMIT 1`
+    )
+    .bind(cutoff)
+    .first<{ company_id: string; month: string }>();
+
+  return result ? { companyId: result.company_id, month: result.month } : null;
+}
+
+export async function getArchivableAuditLogs(
+  db: D1Database,
+  companyId: string,
+  month: string,
+  cutoff: string,
+  limit: number
+): Promise<AuditLog[]> {
+  const result = await db
+    .prepare(
+      `SELECT * FROM audit_logs
+       WHERE company_id = ? AND created_at >= ? AND created_at < ? AND substr(created_at, 1, 7) = ?
+       ORDER BY created_at ASC, id ASC
+       LIMIT ?`
+    )
+    .bind(companyId, month, cutoff, month, limit)
+    .all<AuditLog & { changes: string }>();
+
+  return (result.results || []).map(parseAuditLogRow);
+}
+
+// Removes the segment's rows from D1 and records the segment and its index in
+// one transaction. Rows are deleted by id, so one inserted late with an older
+// created_at stays in D1 for a later segment instead of being lost.
+//
+// Returns false, with nothing changed, when the delete did not match every
+// id: an overlapping run already archived some of the rows. The segment
+// insert then binds a NULL company_id, and the NOT NULL failure rolls back
+// the whole batch, so no row is archived twice or deleted without a segment.
+export async function commitArchiveSegment(
+  db: D1Database,
+  segment: AuditArchiveSegment,
+  logIds: string[],
+  index: AuditArchiveIndexEntry[]
+): Promise<boolean> {
+  try {
+    await db.batch([
+      // One JSON array parameter instead of D1's 100 bound parameters
+      db
+        .prepare(
+          `DELETE FROM audit_logs
+           WHERE company_id = ? AND id IN (SELECT value FROM json_each(?))`
+        )
+        .bind(segment.company_id, JSON.stringify(logIds)),
+      db
+        .prepare(
+          `INSERT INTO audit_archive_segments
+             (id, company_id, month, object_key, row_count, counts, first_created_at, last_created_at,
+              last_ingested_at, bytes, indexed, created_at)
+           SELECT ?, CASE WHEN changes() = ? THEN ? END, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?`
+        )
+        .bind(
+          segment.id,
+          logIds.length,
+          segment.company_id,
+          segment.month,
+          segment.object_key,
+          segment.row_count,
+          JSON.stringify(segment.counts),
+          segment.first_created_at,
+          segment.last_created_at,
+          segment.last_ingested_at,
+          segment.bytes,
+          segment.created_at
+        ),
+      insertIndexStatement(db, segment, index),
+    ]);
+  } catch (error) {
+    if (isNotNullViolation(error, 'audit_archive_segments.company_id')) {
+      return false;
+    }
+    throw error;
+  }
+
+  return true;
+}
+
+// For segments archived before the index existed
+export async function commitArchiveIndex(
+  db: D1Database,
+  segment: AuditArchiveSegment,
+  index: AuditArchiveIndexEntry[]
+): Promise<void> {
+  await db.batch([
+    db.prepare(`DELETE FROM audit_archive_index WHERE segment_id = ?`).bind(segment.id),
+    insertIndexStatement(db, segment, index),
+    db.prepare(`UPDATE audit_archive_segments SET indexed = 1 WHERE id = ?`).bind(segment.id),
+  ]);
+}
+
+function insertIndexStatement(
+  db: D1Database,
+  segment: AuditArchiveSegment,
+  index: AuditArchiveIndexEntry[]
+): D1PreparedStatement {
+  return db
+    .prepare(
+      `INSERT INTO audit_archive_index
+         (segment_id, company_id, entity_type, entity_id, user_id, action, row_count)
+       SELECT ?, ?, json_extract(value, '$.entity_type'), json_extract(value, '$.entity_id'),
+              json_extract(value, '$.user_id'), json_extract(value, '$.action'),
+              json_extract(value, '$.row_count')
+       FROM json_each(?)`
+    )
+    .bind(segment.id, segment.company_id, JSON.stringify(index));
+}
+
+export async function getUnindexedArchiveSegment(db: D1Database): Promise<AuditArchiveSegment | null> {
+  const result = await db
+    .prepare(`SELECT * FROM audit_archive_segments WHERE indexed = 0 LIMIT 1`)
+    .first<SegmentRow>();
+
+  return result ? parseSegmentRow(result) : null;
+}
+
+// Whether any archived row of the company is more than a 'create'
+export async function hasArchivedCompanyActivity(db: D1Database, companyId: string): Promise<boolean> {
+  const result = await db
+    .prepare(
+      `SELECT 1 FROM audit_archive_segments s, json_each(s.counts) c
+       WHERE s.company_id = ? AND c.key NOT LIKE '%:create'
+       LIMIT 1`
+    )
+    .bind(companyId)
+    .first();
+
+  return result !== null;
+}
+
+// Whether any archived row of the entity is more than its 'create'. A
+// segment not yet indexed counts when it holds such rows for any entity of
+// the type, so the answer errs towards keeping the entity.
+export async function hasArchivedEntityActivity(
+  db: D1Database,
+  companyId: string,
+  entityType: string,
+  entityId: string
+): Promise<boolean> {
+  const result = await db
+    .prepare(
+      `SELECT 1 FROM audit_archive_index
+       WHERE entity_type = ? AND entity_id = ? AND action != 'create'
+       UNION ALL
+       SELECT 1 FROM audit_archive_segments s, json_each(s.counts) c
+       WHERE s.company_id = ? AND s.indexed = 0 AND c.key LIKE ? AND c.key != ?
+       LIMIT 1`
+    )
+    .bind(entityType, entityId, companyId, `${entityType}:%`, `${entityType}:create`)
+    .first();
+
+  return result !== null;
+}
+
+// Segments holding rows of one entity, newest first, each with the number
+// of those rows (of one action when given)
+export async function getArchiveSegmentsByEntity(
+  db: D1Database,
+  entityType: string,
+  entityId: string,
+  action?: string
+): Promise<(AuditArchiveSegment & { entity_rows: number })[]> {
+  const params: string[] = [entityType, entityId];
+  let actionClause = '';
+  if (action) {
+    actionClause = ' AND i.action = ?';
+    params.push(action);
+  }
+
+  const result = await db
+    .prepare(
+      `SELECT s.*, SUM(i.row_count) AS entity_rows
+       FROM audit_archive_index i
+       JOIN audit_archive_segments s ON s.id = i.segment_id
+       WHERE i.entity_type = ? AND i.entity_id = ?${actionClause}
+       GROUP BY s.id
+       ORDER BY s.last_created_at DESC, s.id DESC`
+    )
+    .bind(...params)
+    .all<SegmentRow & { entity_rows: number }>();
+
+  return (result.results || []).map((row) => ({
+    ...parseSegmentRow(row),
+    entity_rows: row.entity_rows,
+  }));
+}
+
+// Newest first, matching the order audit logs are listed in
+export async function getArchiveSegmentsByCompany(
+  db: D1Database,
+  companyId: string
+): Promise<AuditArchiveSegment[]> {
+  const result = await db
+    .prepare(
+      `SELECT * FROM audit_archive_segments WHERE company_id = ?
+       ORDER BY last_created_at DESC, id DESC`
+    )
+    .bind(companyId)
+    .all<SegmentRow>();
+
+  return (result.results || []).map(parseSegmentRow);
+}
+
+// Matching rows per indexed segment of the company, for the filters the
+// manifest's entity_type:action counts cannot answer (user_id, entity_id).
+// Segments without matching rows are absent from the map.
+export async function getArchiveIndexCounts(
+  db: D1Database,
+  companyId: string,
+  filters: AuditLogFilters
+): Promise<Map<string, number>> {
+  let whereClause = 'WHERE company_id = ?';
+  const params: string[] = [companyId];
+
+  if (filters.entityType) {
+    whereClause += ' AND entity_type = ?';
+    params.push(filters.entityType);
+  }
+  if (filters.action) {
+    whereClause += ' AND action = ?';
+    params.push(filters.action);
+  }
+  if (filters.userId) {
+    whereClause += ' AND user_id = ?';
+    params.push(filters.userId);
+  }
+  if (filters.entityId) {
+    whereClause += ' AND entity_id = ?';
+    params.push(filters.entityId);
+  }
+
+  const result = await db
+    .prepare(
+      `SELECT segment_id, SUM(row_count) AS count FROM audit_archive_index
+       ${whereClause} GROUP BY segment_id`
+    )
+    .bind(...params)
+    .all<{ segment_id: string; count: number }>();
+
+  return new Map((result.results || []).map((row) => [row.segment_id, row.count]));
+}
+
+// Segments left behind by companies that have since been deleted
+export async function getOrphanedArchiveSegments(
+  db: D1Database,
+  limit: number
+): Promise<AuditArchiveSegment[]> {
+  const result = await db
+    .prepare(
+      `SELECT s.* FROM audit_archive_segments s
+       WHERE NOT EXISTS (SELECT 1 FROM companies c WHERE c.id = s.company_id)
+       LIMIT ?`
+    )
+    .bind(limit)
+    .all<SegmentRow>();
+
+  return (result.results || []).map(parseSegmentRow);
+}
+
+export async function deleteArchiveSegments(db: D1Database, ids: string[]): Promise<void> {
+  if (ids.length === 0) {
+    return;
+  }
+
+  await db
+    .prepare(
+      `DELETE FROM audit_archive_segments WHERE id IN (${ids.map(() => '?').join(', ')})`
+    )
+    .bind(...ids)
+    .run();
+}
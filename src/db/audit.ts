@@ -3,70 +3,326 @@
 // Immutable audit trail for all mutations
 // ============================================================================
 
-import type { Env, AuditEntry, AuditLog, EntityType, AuditAction } from '../types';
+import type { AuditEntry, AuditLog, AuditLogFilters, AuditMode, EntityType } from '../types';
+import { encodeChanges, decodeChanges } from '../utils/audit-changes';
+import { isConstraintViolation } from '../utils/db-errors';
+
+type AuditLogListener = (logs: AuditLog[]) => void;
+
+const listeners: AuditLogListener[] = [];
+
+// Listeners run after the rows are written and must not block the request.
+// They get every row of a write or flush at once (a bulk update can write
+// hundreds), so they can batch their own work.
+export function onAuditLogsCreated(listener: AuditLogListener): void {
+  listeners.push(listener);
+}
+
+function notifyListeners(logs: AuditLog[]): void {
+  for (const listener of listeners) {
+    try {
+      listener(logs);
+    } catch (error) {
+      console.error('Audit log listener failed:', error);
+    }
+  }
+}
+
+// 'strict' writes each audit row before the mutation returns; 'deferred'
+// buffers rows for the request and writes them in one batch afterwards
+let auditMode: AuditMode = 'strict';
+const buffer: AuditLog[] = [];
+
+// Rows kept in memory when no retry queue is bound and a flush fails
+const MAX_BUFFERED_LOGS = 1000;
+
+// 9 bound parameters per row keeps each statement under D1's 100 limit
+const ROWS_PER_INSERT = 11;
+
+export function setAuditMode(mode: string | undefined): void {
+  auditMode = mode === 'deferred' ? 'deferred' : 'strict';
+}
+
+// When tenants are sharded, rows written outside a caller's batch go to the
+// database the resolver picks for their company instead of the handle given
+type AuditDbResolver = (companyId: string) => Promise<D1Database>;
+let auditDbResolver: AuditDbResolver | null = null;
+
+export function setAuditDbResolver(resolver: AuditDbResolver | null): void {
+  auditDbResolver = resolver;
+}
 
 export async function createAuditLog(
   db: D1Database,
   entry: AuditEntry
 ): Promise<AuditLog> {
-  const id = crypto.randomUUID();
-  const createdAt = new Date().toISOString();
-  const changesJson = JSON.stringify(entry.changes || {});
+  const [log] = await createAuditLogs(db, [entry]);
+  return log;
+}
 
-  await db
-    .prepare(
-      `INSERT INTO audit_logs (id, company_id, user_id, entity_type, entity_id, action, changes, created_at)
-       VALUES (?, ?, ?, ?, ?, ?, ?, ?)`
-    )
-    .bind(
-      id,
-      entry.companyId,
-      entry.userId || null,
-      entry.entityType,
-      entry.entityId,
-      entry.action,
-      changesJson,
-      createdAt
-    )
-    .run();
+// Writes several entries with one batch of multi-row INSERTs
+export async function createAuditLogs(
+  db: D1Database,
+  entries: AuditEntry[]
+): Promise<AuditLog[]> {
+  const logs = entries.map(buildAuditLog);
 
+  if (auditMode === 'deferred') {
+    buffer.push(...logs);
+    return logs;
+  }
+
+  await insertAuditLogs(db, logs);
+  publishAuditLogs(logs);
+
+  return logs;
+}
+
+// For callers that want the audit rows inside their own db.batch(), so they
+// commit or roll back with the change. `committed` must be called once the
+// batch succeeds; in deferred mode there are no statements and it buffers.
+export function prepareAuditLogs(
+  db: D1Database,
+  entries: AuditEntry[]
+): { statements: D1PreparedStatement[]; committed: () => void } {
+  const logs = entries.map(buildAuditLog);
+
+  if (auditMode === 'deferred') {
+    return { statements: [], committed: () => buffer.push(...logs) };
+  }
+
+  return {
+    statements: auditLogStatements(db, logs),
+    committed: () => publishAuditLogs(logs),
+  };
+}
+
+// Deferred rows are re-stamped with their ingested_at when flushed
+function buildAuditLog(entry: AuditEntry): AuditLog {
+  const now = new Date().toISOString();
   return {
-    id,
+    id: crypto.randomUUID(),
     company_id: entry.companyId,
     user_id: entry.userId || null,
     entity_type: entry.entityType,
     entity_id: entry.entityId,
     action: entry.action,
     changes: entry.changes || {},
-    created_at: createdAt,
+    created_at: now,
+    ingested_at: now,
   };
 }
 
-export async function getAuditLogsByCompany(
+// Idempotent so a retried flush cannot duplicate rows
+export async function insertAuditLogs(db: D1Database, logs: AuditLog[]): Promise<void> {
+  for (const [target, targetLogs] of await groupByTarget(db, logs)) {
+    await target.batch(auditLogStatements(target, targetLogs));
+  }
+}
+
+// For rows written after their request has responded: one bad row (e.g. its
+// company deleted meanwhile) must not hold back the rest. When a batch fails
+// on a constraint it is retried row by row, and rows that still fail are
+// moved to audit_log_quarantine. Returns the rows stored; other errors are
+// rethrown for the caller to retry.
+export async function insertAuditLogsIsolated(
   db: D1Database,
-  companyId: string,
-  options: {
-    limit?: number;
-    offset?: number;
-    entityType?: EntityType;
-    action?: AuditAction;
-  } = {}
-): Promise<{ logs: AuditLog[]; total: number }> {
-  const { limit = 50, offset = 0, entityType, action } = options;
+  logs: AuditLog[]
+): Promise<AuditLog[]> {
+  const stored: AuditLog[] = [];
 
-  let whereClause = 'WHERE company_id = ?';
-  const params: (string | number)[] = [companyId];
+  for (const [target, targetLogs] of await groupByTarget(db, logs)) {
+    try {
+      await target.batch(auditLogStatements(target, targetLogs));
+      stored.push(...targetLogs);
+      continue;
+    } catch (error) {
+      if (!isConstraintViolation(error)) {
+        throw error;
+      }
+    }
+
+    for (const log of targetLogs) {
+      if (await insertAuditLogRow(target, log)) {
+        stored.push(log);
+      }
+    }
+  }
+
+  return stored;
+}
+
+// Writes one row, or quarantines it when it fails a constraint
+async function insertAuditLogRow(db: D1Database, log: AuditLog): Promise<boolean> {
+  try {
+    await db.batch(auditLogStatements(db, [log]));
+    return true;
+  } catch (error) {
+    if (!isConstraintViolation(error)) {
+      throw error;
+    }
+
+    console.error(`Quarantining audit log ${log.id}:`, error);
+    await db
+      .prepare(
+        `INSERT OR IGNORE INTO audit_log_quarantine (id, company_id, payload, error)
+         VALUES (?, ?, ?, ?)`
+      )
+      .bind(
+        log.id,
+        log.company_id,
+        JSON.stringify(log),
+        error instanceof Error ? error.message : String(error)
+      )
+      .run();
+
+    return false;
+  }
+}
+
+// Deferred rows keep the created_at of their request and take ingested_at
+// from the flush, so none is stored behind a sync or change-feed cursor
+// issued in between
+export function stampAuditLogs(logs: AuditLog[]): AuditLog[] {
+  const ingestedAt = new Date().toISOString();
+  return logs.map((log) => ({ ...log, ingested_at: ingestedAt }));
+}
 
-  if (entityType) {
+async function groupByTarget(
+  db: D1Database,
+  logs: AuditLog[]
+): Promise<[D1Database, AuditLog[]][]> {
+  if (logs.length === 0) {
+    return [];
+  }
+
+  if (!auditDbResolver) {
+    return [[db, logs]];
+  }
+
+  const byCompany = new Map<string, AuditLog[]>();
+  for (const log of logs) {
+    const companyLogs = byCompany.get(log.company_id) || [];
+    companyLogs.push(log);
+    byCompany.set(log.company_id, companyLogs);
+  }
+
+  const groups: [D1Database, AuditLog[]][] = [];
+  for (const [companyId, companyLogs] of byCompany) {
+    groups.push([await auditDbResolver(companyId), companyLogs]);
+  }
+  return groups;
+}
+
+// An acting user that does not exist is stored as NULL, as the SET NULL on
+// users would, so a foreign key error in a batch always comes from the
+// entity write the rows accompany
+function auditLogStatements(db: D1Database, logs: AuditLog[]): D1PreparedStatement[] {
+  const statements: D1PreparedStatement[] = [];
+  for (let i = 0; i < logs.length; i += ROWS_PER_INSERT) {
+    const chunk = logs.slice(i, i + ROWS_PER_INSERT);
+    const params = chunk.flatMap((log) => [
+      log.id,
+      log.company_id,
+      log.user_id,
+      log.entity_type,
+      log.entity_id,
+      log.action,
+      encodeChanges(log.changes, log.entity_id),
+      log.created_at,
+      log.ingested_at,
+    ]);
+
+    statements.push(
+      db
+        .prepare(
+          `INSERT OR IGNORE INTO audit_logs (id, company_id, user_id, entity_type, entity_id, action, changes, created_at, ingested_at)
+           VALUES ${chunk.map(() => '(?, ?, (SELECT id FROM users WHERE id = ?), ?, ?, ?, ?, ?, ?)').join(', ')}`
+        )
+        .bind(...params)
+    );
+  }
+
+  return statements;
+}
+
+export function takeBufferedAuditLogs(): AuditLog[] {
+  return buffer.splice(0, buffer.length);
+}
+
+// Puts logs back for the next flush, dropping the oldest past the cap
+export function restoreBufferedAuditLogs(logs: AuditLog[]): void {
+  buffer.unshift(...logs);
+  if (buffer.length > MAX_BUFFERED_LOGS) {
+    const dropped = buffer.splice(0, buffer.length - MAX_BUFFERED_LOGS);
+    console.error(`Dropped ${dropped.length} buffered audit log(s)`);
+  }
+}
+
+export function publishAuditLogs(logs: AuditLog[]): void {
+  if (logs.length > 0) {
+    notifyListeners(logs);
+  }
+}
+
+export function parseAuditLogRow(row: AuditLog & { changes: string }): AuditLog {
+  return { ...row, changes: decodeChanges(row.changes, row.entity_id) };
+}
+
+function appendFilters(
+  whereClause: string,
+  params: (string | number)[],
+  filters: AuditLogFilters
+): string {
+  if (filters.entityType) {
     whereClause += ' AND entity_type = ?';
-    params.push(entityType);
+    params.push(filters.entityType);
   }
 
-  if (action) {
+  if (filters.action) {
     whereClause += ' AND action = ?';
-    params.push(action);
+    params.push(filters.action);
   }
 
+  if (filters.userId) {
+    whereClause += ' AND user_id = ?';
+    params.push(filters.userId);
+  }
+
+  if (filters.entityId) {
+    whereClause += ' AND entity_id = ?';
+    params.push(filters.entityId);
+  }
+
+  // created_at is an ISO-8601 string, so the window compares lexically
+  if (filters.from) {
+    whereClause += ' AND created_at >= ?';
+    params.push(filters.from);
+  }
+
+  if (filters.to) {
+    whereClause += ' AND created_at < ?';
+    params.push(filters.to);
+  }
+
+  if (filters.excludeCompanyIds?.length) {
+    whereClause += ' AND company_id NOT IN (SELECT value FROM json_each(?))';
+    params.push(JSON.stringify(filters.excludeCompanyIds));
+  }
+
+  return whereClause;
+}
+
+export async function getAuditLogsByCompany(
+  db: D1Database,
+  companyId: string,
+  options: { limit?: number; offset?: number } & AuditLogFilters = {}
+): Promise<{ logs: AuditLog[]; total: number }> {
+  const { limit = 50, offset = 0, ...filters } = options;
+
+  const params: (string | number)[] = [companyId];
+  const whereClause = appendFilters('WHERE company_id = ?', params, filters);
+
   const countResult = await db
     .prepare(`SELECT COUNT(*) as count FROM audit_logs ${whereClause}`)
     .bind(...params)
@@ -81,10 +337,7 @@ export async function getAuditLogsByCompany(
     .bind(...params, limit, offset)
     .all<AuditLog & { changes: string }>();
 
-  const logs: AuditLog[] = (logsResult.results || []).map((row) => ({
-    ...row,
-    changes: typeof row.changes === 'string' ? JSON.parse(row.changes) : row.changes,
-  }));
+  const logs: AuditLog[] = (logsResult.results || []).map(parseAuditLogRow);
 
   return { logs, total };
 }
@@ -93,30 +346,31 @@ export async function getAuditLogsByEntity(
   db: D1Database,
   entityType: EntityType,
   entityId: string,
-  options: { limit?: number; offset?: number } = {}
+  options: { limit?: number; offset?: number } & Pick<
+    AuditLogFilters,
+    'action' | 'from' | 'to' | 'excludeCompanyIds'
+  > = {}
 ): Promise<{ logs: AuditLog[]; total: number }> {
-  const { limit = 50, offset = 0 } = options;
+  const { limit = 50, offset = 0, ...filters } = options;
+
+  const params: (string | number)[] = [entityType, entityId];
+  const whereClause = appendFilters('WHERE entity_type = ? AND entity_id = ?', params, filters);
 
   const countResult = await db
-    .prepare(
-      `SELECT COUNT(*) as count FROM audit_logs WHERE entity_type = ? AND entity_id = ?`
-    )
-    .bind(entityType, entityId)
+    .prepare(`SELECT COUNT(*) as count FROM audit_logs ${whereClause}`)
+    .bind(...params)
     .first<{ count: number }>();
 
   const total = countResult?.count || 0;
 
   const logsResult = await db
     .prepare(
-      `SELECT * FROM audit_logs WHERE entity_type = ? AND entity_id = ? ORDER BY created_at DESC LIMIT ? OFFSET ?`
+      `SELECT * FROM audit_logs ${whereClause} ORDER BY created_at DESC LIMIT ? OFFSET ?`
     )
-    .bind(entityType, entityId, limit, offset)
+    .bind(...params, limit, offset)
     .all<AuditLog & { changes: string }>();
 
-  const logs: AuditLog[] = (logsResult.results || []).map((row) => ({
-    ...row,
-    changes: typeof row.changes === 'string' ? JSON.parse(row.changes) : row.changes,
-  }));
+  const logs: AuditLog[] = (logsResult.results || []).map(parseAuditLogRow);
 
   return { logs, total };
 }
@@ -2,40 +2,93 @@
 // Companies Database Operations
 // ============================================================================
 
-import type { Company, CreateCompanyRequest, UpdateCompanyRequest } from '../types';
-import { createAuditLog } from './audit';
-
+import type {
+  AuditEntry,
+  Company,
+  CompanyAccess,
+  CreateCompanyRequest,
+  UpdateCompanyRequest,
+  Job,
+} from '../types';
+import { createAuditLog, prepareAuditLogs } from './audit';
+import { invalidateMembership } from './company-access';
+import { hasArchivedCompanyActivity } from './audit-archive';
+import { forgetCompanyIdentifiers } from './assets';
+import { getJobById } from './jobs';
+import { updateVersionedRow } from './versioning';
+
+// The creator becomes the company's OWNER in the same batch; without a
+// membership nobody could reach the company once authorization is enforced
 export async function createCompany(
   db: D1Database,
   data: CreateCompanyRequest,
-  userId?: string
+  userId?: string,
+  ownerId?: string
 ): Promise<Company> {
   const id = crypto.randomUUID();
   const createdAt = new Date().toISOString();
   const status = data.status || 'active';
 
-  await db
-    .prepare(
-      `INSERT INTO companies (id, name, status, created_at) VALUES (?, ?, ?, ?)`
-    )
-    .bind(id, data.name.trim(), status, createdAt)
-    .run();
-
   const company: Company = {
     id,
     name: data.name.trim(),
     status,
+    version: 1,
+    deletion_requested_at: null,
     created_at: createdAt,
   };
 
-  await createAuditLog(db, {
-    companyId: id,
-    userId,
-    entityType: 'company',
-    entityId: id,
-    action: 'create',
-    changes: { created: company },
-  });
+  const statements = [
+    db
+      .prepare(
+        `INSERT INTO companies (id, name, status, created_at) VALUES (?, ?, ?, ?)`
+      )
+      .bind(id, company.name, status, createdAt),
+  ];
+  const entries: AuditEntry[] = [
+    {
+      companyId: id,
+      userId,
+      entityType: 'company',
+      entityId: id,
+      action: 'create',
+      changes: { created: company },
+    },
+  ];
+
+  if (ownerId) {
+    const owner: CompanyAccess = {
+      id: crypto.randomUUID(),
+      user_id: ownerId,
+      company_id: id,
+      role: 'OWNER',
+      created_at: createdAt,
+    };
+    statements.push(
+      db
+        .prepare(
+          `INSERT INTO company_access (id, user_id, company_id, role, created_at)
+           VALUES (?, ?, ?, 'owner', ?)`
+        )
+        .bind(owner.id, ownerId, id, createdAt)
+    );
+    entries.push({
+      companyId: id,
+      userId,
+      entityType: 'company_access',
+      entityId: owner.id,
+      action: 'create',
+      changes: { created: owner },
+    });
+  }
+
+  const audit = prepareAuditLogs(db, entries);
+  await db.batch([...statements, ...audit.statements]);
+  audit.committed();
+
+  if (ownerId) {
+    invalidateMembership(id, ownerId);
+  }
 
   return company;
 }
@@ -45,7 +98,7 @@ export async function getCompanyById(
   id: string
 ): Promise<Company | null> {
   const result = await db
-    .prepare(`SELECT * FROM companies WHERE id = ?`)
+    .prepare(`SELECT * FROM companies WHERE id = ? AND deletion_requested_at IS NULL`)
     .bind(id)
     .first<Company>();
 
@@ -66,18 +119,25 @@ export async function getCompanyByName(
 
 export async function getAllCompanies(
   db: D1Database,
-  options: { limit?: number; offset?: number; status?: string } = {}
+  options: { limit?: number; offset?: number; status?: string; ids?: string[] } = {}
 ): Promise<{ companies: Company[]; total: number }> {
-  const { limit = 50, offset = 0, status } = options;
+  const { limit = 50, offset = 0, status, ids } = options;
 
-  let whereClause = '';
+  // Companies pending deletion are hidden from every read path
+  let whereClause = 'WHERE deletion_requested_at IS NULL';
   const params: (string | number)[] = [];
 
   if (status) {
-    whereClause = 'WHERE status = ?';
+    whereClause += ' AND status = ?';
     params.push(status);
   }
 
+  // One JSON parameter, however many companies the caller belongs to
+  if (ids) {
+    whereClause += ' AND id IN (SELECT value FROM json_each(?))';
+    params.push(JSON.stringify(ids));
+  }
+
   const countResult = await db
     .prepare(`SELECT COUNT(*) as count FROM companies ${whereClause}`)
     .bind(...params)
@@ -102,70 +162,81 @@ export async function updateCompany(
   db: D1Database,
   id: string,
   data: UpdateCompanyRequest,
-  userId?: string
-): Promise<Company | null> {
-  const existing = await getCompanyById(db, id);
-  if (!existing) {
-    return null;
-  }
-
+  userId?: string,
+  expectedVersion?: number
+): Promise<{ success: boolean; company?: Company; error?: string }> {
   const updates: string[] = [];
   const values: (string | null)[] = [];
-  const changes: Record<string, { from: unknown; to: unknown }> = {};
 
   if (data.name !== undefined) {
     updates.push('name = ?');
     values.push(data.name.trim());
-    changes.name = { from: existing.name, to: data.name.trim() };
   }
 
   if (data.status !== undefined) {
     updates.push('status = ?');
     values.push(data.status);
-    changes.status = { from: existing.status, to: data.status };
   }
 
   if (updates.length === 0) {
-    return existing;
+    const existing = await getCompanyById(db, id);
+    return existing
+      ? { success: true, company: existing }
+      : { success: false, error: 'Company not found' };
   }
 
-  values.push(id);
+  const { before, after } = await updateVersionedRow<Company>(
+    db,
+    'companies',
+    id,
+    updates,
+    values,
+    expectedVersion
+  );
+
+  if (!before) {
+    return { success: false, error: 'Company not found' };
+  }
+  if (!after) {
+    return { success: false, error: 'Version mismatch' };
+  }
 
-  await db
-    .prepare(`UPDATE companies SET ${updates.join(', ')} WHERE id = ?`)
-    .bind(...values)
-    .run();
+  const changes: Record<string, { from: unknown; to: unknown }> = {};
 
-  const updated = await getCompanyById(db, id);
+  if (data.name !== undefined) {
+    changes.name = { from: before.name, to: after.name };
+  }
 
-  if (updated) {
-    await createAuditLog(db, {
-      companyId: id,
-      userId,
-      entityType: 'company',
-      entityId: id,
-      action: 'update',
-      changes,
-    });
+  if (data.status !== undefined) {
+    changes.status = { from: before.status, to: after.status };
   }
 
-  return updated;
+  await createAuditLog(db, {
+    companyId: id,
+    userId,
+    entityType: 'company',
+    entityId: id,
+    action: 'update',
+    changes,
+  });
+
+  return { success: true, company: after };
 }
 
 export async function companyExists(db: D1Database, id: string): Promise<boolean> {
   const result = await db
-    .prepare(`SELECT 1 FROM companies WHERE id = ?`)
+    .prepare(`SELECT 1 FROM companies WHERE id = ? AND deletion_requested_at IS NULL`)
     .bind(id)
     .first();
 
   return result !== null;
 }
 
-export async function deleteCompany(
+export async function requestCompanyDeletion(
   db: D1Database,
   id: string,
   userId?: string
-): Promise<{ success: boolean; error?: string }> {
+): Promise<{ success: boolean; job?: Job; error?: string }> {
   const existing = await getCompanyById(db, id);
   if (!existing) {
     return { success: false, error: 'Company not found' };
@@ -180,33 +251,96 @@ export async function deleteCompany(
     .bind(id)
     .first<{ count: number }>();
 
-  if (auditCount && auditCount.count > 0) {
+  if ((auditCount && auditCount.count > 0) || (await hasArchivedCompanyActivity(db, id))) {
     return { success: false, error: 'Cannot delete company with activity history' };
   }
 
-  // Delete company access records
-  await db
-    .prepare(`DELETE FROM company_access WHERE company_id = ?`)
-    .bind(id)
-    .run();
+  // Mark the company and enqueue its job atomically; the INSERT only runs
+  // when this request won the UPDATE, so concurrent deletes share one job
+  const jobId = crypto.randomUUID();
+  const requestedAt = new Date().toISOString();
+  const progress = { phase: DELETION_PHASES[0], deleted: {}, requested_by: userId || null };
+
+  const [marked] = await db.batch([
+    db
+      .prepare(
+        `UPDATE companies SET deletion_requested_at = ?
+         WHERE id = ? AND deletion_requested_at IS NULL`
+      )
+      .bind(requestedAt, id),
+    db
+      .prepare(
+        `INSERT INTO jobs (id, type, status, company_id, progress, created_at, updated_at)
+         SELECT ?, 'company_deletion', 'pending', ?, ?, ?, ? WHERE changes() = 1`
+      )
+      .bind(jobId, id, JSON.stringify(progress), requestedAt, requestedAt),
+  ]);
+
+  if (marked.meta.changes === 0) {
+    return { success: false, error: 'Company not found' };
+  }
 
-  // Delete assets for this company
-  await db
-    .prepare(`DELETE FROM assets WHERE company_id = ?`)
-    .bind(id)
-    .run();
+  const job = await getJobById(db, jobId);
+  return job ? { success: true, job } : { success: false, error: 'Company not found' };
+}
 
-  // Delete audit logs for this company
-  await db
-    .prepare(`DELETE FROM audit_logs WHERE company_id = ?`)
-    .bind(id)
-    .run();
+// ============================================================================
+// Chunked Tenant Deletion
+// ============================================================================
 
-  // Delete the company
-  await db
-    .prepare(`DELETE FROM companies WHERE id = ?`)
-    .bind(id)
-    .run();
+export type DeletionPhase = 'company_access' | 'assets' | 'users' | 'audit_logs' | 'company';
+
+// Audit logs go last: they RESTRICT deletion of the company row
+export const DELETION_PHASES: DeletionPhase[] = [
+  'company_access',
+  'assets',
+  'users',
+  'audit_logs',
+  'company',
+];
 
-  return { success: true };
+// Removes (or detaches) up to `chunkSize` rows for one phase and returns
+// how many rows were affected; 0 means the phase is finished
+export async function deleteCompanyChunk(
+  db: D1Database,
+  companyId: string,
+  phase: DeletionPhase,
+  chunkSize: number
+): Promise<number> {
+  let statement: D1PreparedStatement;
+
+  switch (phase) {
+    case 'company_access':
+    case 'assets':
+    case 'audit_logs':
+      statement = db
+        .prepare(
+          `DELETE FROM ${phase} WHERE rowid IN (
+             SELECT rowid FROM ${phase} WHERE company_id = ? LIMIT ?
+           )`
+        )
+        .bind(companyId, chunkSize);
+      break;
+    case 'users':
+      statement = db
+        .prepare(
+          `UPDATE users SET primary_company_id = NULL WHERE rowid IN (
+             SELECT rowid FROM users WHERE primary_company_id = ? LIMIT ?
+           )`
+        )
+        .bind(companyId, chunkSize);
+      break;
+    case 'company':
+    default:
+      statement = db
+        .prepare(`DELETE FROM companies WHERE id = ? AND deletion_requested_at IS NOT NULL`)
+        .bind(companyId);
+      break;
+  }
+
+  const result = await statement.run();
+  if (phase === 'assets' && result.meta.changes > 0) {
+    forgetCompanyIdentifiers(companyId);
+  }
+  return result.meta.changes;
 }
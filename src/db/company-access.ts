@@ -2,8 +2,18 @@
 // Company Access Database Operations
 // ============================================================================
 
-import type { CompanyAccess, AddUserToCompanyRequest, AccessRole } from '../types';
-import { createAuditLog } from './audit';
+import type {
+  CompanyAccess,
+  UserMembership,
+  AddUserToCompanyRequest,
+  AccessRole,
+  AuditEntry,
+  BulkAddUsersToCompanyResult,
+  BulkRemoveUsersFromCompanyResult,
+} from '../types';
+import { createAuditLog, prepareAuditLogs } from './audit';
+import { TtlCache } from '../utils/cache';
+import { defer } from '../utils/background';
 
 // Map lowercase DB roles to uppercase API roles
 const ROLE_MAP: Record<string, AccessRole> = {
@@ -13,10 +23,120 @@ const ROLE_MAP: Record<string, AccessRole> = {
   viewer: 'READ_ONLY',
 };
 
-function normalizeRole(dbRole: string): AccessRole {
+export function normalizeRole(dbRole: string): AccessRole {
   return ROLE_MAP[dbRole.toLowerCase()] || 'MEMBER';
 }
 
+const ROLE_RANK: Record<AccessRole, number> = {
+  READ_ONLY: 0,
+  MEMBER: 1,
+  ADMIN: 2,
+  OWNER: 3,
+};
+
+// Whether `role` ranks no higher than `limit`; without a limit (authorization
+// off) every role passes
+export function roleAtMost(role: AccessRole, limit: AccessRole | undefined): boolean {
+  return limit === undefined || ROLE_RANK[role] <= ROLE_RANK[limit];
+}
+
+function toDbRole(role: AccessRole): string {
+  return Object.keys(ROLE_MAP).find((key) => ROLE_MAP[key] === role) || 'member';
+}
+
+// Role lookups for authorization: this isolate's LRU first, then the KV
+// namespace shared by all isolates (when bound), then D1. '' caches "no role".
+const membershipCache = new TtlCache<string, AccessRole | ''>(10_000, 30_000);
+const MEMBERSHIP_MISS_TTL_MS = 5_000;
+const MEMBERSHIP_KV_TTL_SECONDS = 120;
+// Allowance for clock differences between the isolates comparing KV times
+const MEMBERSHIP_CLOCK_MARGIN_MS = 1_000;
+
+let membershipStore: KVNamespace | undefined;
+
+export function attachMembershipStore(store: KVNamespace | undefined): void {
+  membershipStore = store;
+}
+
+function membershipKey(companyId: string, userId: string): string {
+  return `membership:${companyId}:${userId}`;
+}
+
+function membershipChangedKey(companyId: string, userId: string): string {
+  return `membership-changed:${companyId}:${userId}`;
+}
+
+// KV entries are "<role>@<ms>", stamped with when their D1 read began. KV
+// has no compare-and-set, so a write-back racing an invalidation can land
+// after it; readers instead ignore any entry read before the membership's
+// last change. The change marker outlives every entry it can overrule.
+function parseStoredRole(value: string | null): { role: AccessRole | ''; readAt: number } | null {
+  const at = value?.lastIndexOf('@') ?? -1;
+  if (!value || at < 0) {
+    return null;
+  }
+  return { role: value.slice(0, at) as AccessRole | '', readAt: Number(value.slice(at + 1)) };
+}
+
+// Drops the role from this isolate and marks it changed in KV; other
+// isolates keep theirs until the in-memory TTL runs out
+export function invalidateMembership(companyId: string, userId: string): void {
+  membershipCache.delete(membershipKey(companyId, userId));
+  if (membershipStore) {
+    defer(
+      membershipStore.put(membershipChangedKey(companyId, userId), String(Date.now()), {
+        expirationTtl: MEMBERSHIP_KV_TTL_SECONDS * 2,
+      })
+    );
+  }
+}
+
+export async function getMembershipRole(
+  db: D1Database,
+  companyId: string,
+  userId: string
+): Promise<AccessRole | null> {
+  const key = membershipKey(companyId, userId);
+  let role = membershipCache.get(key);
+  let changedAt = 0;
+
+  if (role === undefined && membershipStore) {
+    const [stored, changed] = await Promise.all([
+      membershipStore.get(key),
+      membershipStore.get(membershipChangedKey(companyId, userId)),
+    ]);
+    changedAt = Number(changed) || 0;
+    const entry = parseStoredRole(stored);
+    if (entry && entry.readAt > changedAt + MEMBERSHIP_CLOCK_MARGIN_MS) {
+      role = entry.role;
+    }
+  }
+
+  if (role === undefined) {
+    const readAt = Date.now();
+    const row = await db
+      .prepare(`SELECT role FROM company_access WHERE company_id = ? AND user_id = ?`)
+      .bind(companyId, userId)
+      .first<{ role: string }>();
+
+    role = row ? normalizeRole(row.role) : '';
+    // Right after a change the entry would be ignored anyway
+    if (membershipStore && readAt > changedAt + MEMBERSHIP_CLOCK_MARGIN_MS) {
+      defer(
+        membershipStore.put(key, `${role}@${readAt}`, { expirationTtl: MEMBERSHIP_KV_TTL_SECONDS })
+      );
+    }
+  }
+
+  membershipCache.set(key, role, role ? undefined : MEMBERSHIP_MISS_TTL_MS);
+  return role || null;
+}
+
+export const BULK_MEMBERSHIP_MAX_USERS = 100;
+const MEMBERSHIP_IDS_PER_QUERY = 90;
+// 5 bound parameters per row
+const MEMBERSHIP_ROWS_PER_INSERT = 18;
+
 export async function addUserToCompany(
   db: D1Database,
   companyId: string,
@@ -27,15 +147,7 @@ export async function addUserToCompany(
   const createdAt = new Date().toISOString();
   // Convert uppercase role to lowercase for database storage (DB constraint uses lowercase)
   const roleInput = data.role || 'MEMBER';
-  const dbRole = roleInput.toLowerCase();
-
-  await db
-    .prepare(
-      `INSERT INTO company_access (id, user_id, company_id, role, created_at)
-       VALUES (?, ?, ?, ?, ?)`
-    )
-    .bind(id, data.user_id, companyId, dbRole, createdAt)
-    .run();
+  const dbRole = toDbRole(roleInput);
 
   const access: CompanyAccess = {
     id,
@@ -45,27 +157,47 @@ export async function addUserToCompany(
     created_at: createdAt,
   };
 
-  await createAuditLog(db, {
-    companyId,
-    userId: actingUserId,
-    entityType: 'company_access',
-    entityId: id,
-    action: 'create',
-    changes: { created: access },
-  });
+  // The membership and its audit entry commit together
+  const audit = prepareAuditLogs(db, [
+    {
+      companyId,
+      userId: actingUserId,
+      entityType: 'company_access',
+      entityId: id,
+      action: 'create',
+      changes: { created: access },
+    },
+  ]);
+  await db.batch([
+    db
+      .prepare(
+        `INSERT INTO company_access (id, user_id, company_id, role, created_at)
+         VALUES (?, ?, ?, ?, ?)`
+      )
+      .bind(id, data.user_id, companyId, dbRole, createdAt),
+    ...audit.statements,
+  ]);
+  audit.committed();
+
+  invalidateMembership(companyId, data.user_id);
 
   return access;
 }
 
+// A membership ranking above maxRole (the caller's own role) is left alone
 export async function removeUserFromCompany(
   db: D1Database,
   companyId: string,
   userId: string,
-  actingUserId?: string
-): Promise<boolean> {
+  actingUserId?: string,
+  maxRole?: AccessRole
+): Promise<'removed' | 'not_found' | 'forbidden'> {
   const existing = await getCompanyAccess(db, companyId, userId);
   if (!existing) {
-    return false;
+    return 'not_found';
+  }
+  if (!roleAtMost(existing.role, maxRole)) {
+    return 'forbidden';
   }
 
   await db
@@ -73,6 +205,8 @@ export async function removeUserFromCompany(
     .bind(companyId, userId)
     .run();
 
+  invalidateMembership(companyId, userId);
+
   await createAuditLog(db, {
     companyId,
     userId: actingUserId,
@@ -82,7 +216,223 @@ export async function removeUserFromCompany(
     changes: { deleted: existing },
   });
 
-  return true;
+  return 'removed';
+}
+
+// Existing users and current memberships for a set of user ids, one batch
+// per chunk
+async function getMembershipState(
+  db: D1Database,
+  companyId: string,
+  userIds: string[]
+): Promise<{ users: Set<string>; access: Map<string, CompanyAccess> }> {
+  const users = new Set<string>();
+  const access = new Map<string, CompanyAccess>();
+
+  for (let i = 0; i < userIds.length; i += MEMBERSHIP_IDS_PER_QUERY) {
+    const chunk = userIds.slice(i, i + MEMBERSHIP_IDS_PER_QUERY);
+    const placeholders = chunk.map(() => '?').join(', ');
+
+    const [usersResult, accessResult] = await db.batch<{ id: string } | (CompanyAccess & { role: string })>([
+      db.prepare(`SELECT id FROM users WHERE id IN (${placeholders})`).bind(...chunk),
+      db
+        .prepare(`SELECT * FROM company_access WHERE company_id = ? AND user_id IN (${placeholders})`)
+        .bind(companyId, ...chunk),
+    ]);
+
+    for (const row of usersResult.results || []) {
+      users.add(row.id);
+    }
+    for (const row of (accessResult.results || []) as (CompanyAccess & { role: string })[]) {
+      access.set(row.user_id, { ...row, role: normalizeRole(row.role) });
+    }
+  }
+
+  return { users, access };
+}
+
+// Adds or re-roles many users at once. Memberships are upserted and their
+// audit rows written in one db.batch(); members that already hold the
+// requested role are left alone. Nothing is written when a requested or
+// current role ranks above maxRole (the caller's own role).
+export async function bulkAddUsersToCompany(
+  db: D1Database,
+  companyId: string,
+  members: AddUserToCompanyRequest[],
+  actingUserId?: string,
+  maxRole?: AccessRole
+): Promise<{
+  success: boolean;
+  result?: BulkAddUsersToCompanyResult;
+  error?: string;
+  missingUserIds?: string[];
+  forbiddenUserIds?: string[];
+}> {
+  const state = await getMembershipState(
+    db,
+    companyId,
+    members.map((member) => member.user_id)
+  );
+
+  const missingUserIds = members
+    .map((member) => member.user_id)
+    .filter((userId) => !state.users.has(userId));
+  if (missingUserIds.length > 0) {
+    return { success: false, error: 'Users do not exist', missingUserIds };
+  }
+
+  const forbiddenUserIds = members
+    .filter((member) => {
+      const existing = state.access.get(member.user_id);
+      return (
+        !roleAtMost(member.role || 'MEMBER', maxRole) ||
+        (existing !== undefined && !roleAtMost(existing.role, maxRole))
+      );
+    })
+    .map((member) => member.user_id);
+  if (forbiddenUserIds.length > 0) {
+    return { success: false, error: 'Roles rank above the caller', forbiddenUserIds };
+  }
+
+  const createdAt = new Date().toISOString();
+  const rows: CompanyAccess[] = [];
+  const entries: AuditEntry[] = [];
+  const result: BulkAddUsersToCompanyResult = { created: 0, updated: 0, unchanged: 0 };
+
+  for (const member of members) {
+    const role = member.role || 'MEMBER';
+    const existing = state.access.get(member.user_id);
+
+    if (!existing) {
+      const access: CompanyAccess = {
+        id: crypto.randomUUID(),
+        user_id: member.user_id,
+        company_id: companyId,
+        role,
+        created_at: createdAt,
+      };
+      rows.push(access);
+      entries.push({
+        companyId,
+        userId: actingUserId,
+        entityType: 'company_access',
+        entityId: access.id,
+        action: 'create',
+        changes: { created: access },
+      });
+      result.created++;
+    } else if (existing.role !== role) {
+      rows.push({ ...existing, role });
+      entries.push({
+        companyId,
+        userId: actingUserId,
+        entityType: 'company_access',
+        entityId: existing.id,
+        action: 'update',
+        changes: { role: { from: existing.role, to: role } },
+      });
+      result.updated++;
+    } else {
+      result.unchanged++;
+    }
+  }
+
+  if (rows.length === 0) {
+    return { success: true, result };
+  }
+
+  const statements: D1PreparedStatement[] = [];
+  for (let i = 0; i < rows.length; i += MEMBERSHIP_ROWS_PER_INSERT) {
+    const chunk = rows.slice(i, i + MEMBERSHIP_ROWS_PER_INSERT);
+    statements.push(
+      db
+        .prepare(
+          `INSERT INTO company_access (id, user_id, company_id, role, created_at)
+           VALUES ${chunk.map(() => '(?, ?, ?, ?, ?)').join(', ')}
+           ON CONFLICT(user_id, company_id) DO UPDATE SET role = excluded.role`
+        )
+        .bind(
+          ...chunk.flatMap((row) => [row.id, row.user_id, row.company_id, toDbRole(row.role), row.created_at])
+        )
+    );
+  }
+
+  const audit = prepareAuditLogs(db, entries);
+  await db.batch([...statements, ...audit.statements]);
+  audit.committed();
+
+  for (const row of rows) {
+    invalidateMembership(companyId, row.user_id);
+  }
+
+  return { success: true, result };
+}
+
+// Removes many memberships and writes their audit rows in one db.batch().
+// Nothing is removed when a membership ranks above maxRole.
+export async function bulkRemoveUsersFromCompany(
+  db: D1Database,
+  companyId: string,
+  userIds: string[],
+  actingUserId?: string,
+  maxRole?: AccessRole
+): Promise<{
+  success: boolean;
+  result?: BulkRemoveUsersFromCompanyResult;
+  forbiddenUserIds?: string[];
+}> {
+  const state = await getMembershipState(db, companyId, userIds);
+  const removed = userIds.filter((userId) => state.access.has(userId));
+
+  const forbiddenUserIds = removed.filter(
+    (userId) => !roleAtMost((state.access.get(userId) as CompanyAccess).role, maxRole)
+  );
+  if (forbiddenUserIds.length > 0) {
+    return { success: false, forbiddenUserIds };
+  }
+
+  if (removed.length > 0) {
+    const statements: D1PreparedStatement[] = [];
+    for (let i = 0; i < removed.length; i += MEMBERSHIP_IDS_PER_QUERY) {
+      const chunk = removed.slice(i, i + MEMBERSHIP_IDS_PER_QUERY);
+      statements.push(
+        db
+          .prepare(
+            `DELETE FROM company_access WHERE company_id = ? AND user_id IN (${chunk.map(() => '?').join(', ')})`
+          )
+          .bind(companyId, ...chunk)
+      );
+    }
+
+    const audit = prepareAuditLogs(
+      db,
+      removed.map((userId): AuditEntry => {
+        const existing = state.access.get(userId) as CompanyAccess;
+        return {
+          companyId,
+          userId: actingUserId,
+          entityType: 'company_access',
+          entityId: existing.id,
+          action: 'delete',
+          changes: { deleted: existing },
+        };
+      })
+    );
+    await db.batch([...statements, ...audit.statements]);
+    audit.committed();
+
+    for (const userId of removed) {
+      invalidateMembership(companyId, userId);
+    }
+  }
+
+  return {
+    success: true,
+    result: {
+      removed: removed.length,
+      not_found: userIds.filter((userId) => !state.access.has(userId)),
+    },
+  };
 }
 
 export async function getCompanyAccess(
@@ -114,16 +464,60 @@ export async function getCompanyAccessById(
   return { ...result, role: normalizeRole(result.role) };
 }
 
-export async function getUserCompanies(
-  db: D1Database,
-  userId: string
-): Promise<CompanyAccess[]> {
+export async function getUserCompanyIds(db: D1Database, userId: string): Promise<string[]> {
   const result = await db
-    .prepare(`SELECT * FROM company_access WHERE user_id = ? ORDER BY created_at DESC`)
+    .prepare(`SELECT company_id FROM company_access WHERE user_id = ?`)
     .bind(userId)
-    .all<CompanyAccess & { role: string }>();
+    .all<{ company_id: string }>();
+
+  return (result.results || []).map((row) => row.company_id);
+}
+
+// Memberships in companies that are not pending deletion, newest first,
+// walked on idx_company_access_user_created
+export async function getUserCompanies(
+  db: D1Database,
+  userId: string,
+  options: { limit?: number; offset?: number; excludeCompanyIds?: string[] } = {}
+): Promise<{ memberships: UserMembership[]; total: number }> {
+  const { limit = 50, offset = 0, excludeCompanyIds = [] } = options;
+
+  let whereClause = 'WHERE ca.user_id = ? AND c.deletion_requested_at IS NULL';
+  const params: string[] = [userId];
+  if (excludeCompanyIds.length > 0) {
+    whereClause += ' AND ca.company_id NOT IN (SELECT value FROM json_each(?))';
+    params.push(JSON.stringify(excludeCompanyIds));
+  }
+
+  const countResult = await db
+    .prepare(
+      `SELECT COUNT(*) as count FROM company_access ca
+       JOIN companies c ON c.id = ca.company_id
+       ${whereClause}`
+    )
+    .bind(...params)
+    .first<{ count: number }>();
+
+  const total = countResult?.count || 0;
+
+  const membershipsResult = await db
+    .prepare(
+      `SELECT ca.*, c.name AS company_name, c.status AS company_status
+       FROM company_access ca
+       JOIN companies c ON c.id = ca.company_id
+       ${whereClause}
+       ORDER BY ca.created_at DESC
+       LIMIT ? OFFSET ?`
+    )
+    .bind(...params, limit, offset)
+    .all<UserMembership & { role: string }>();
+
+  const memberships = (membershipsResult.results || []).map((row) => ({
+    ...row,
+    role: normalizeRole(row.role),
+  }));
 
-  return (result.results || []).map((row) => ({ ...row, role: normalizeRole(row.role) }));
+  return { memberships, total };
 }
 
 export async function getCompanyUsers(
@@ -139,7 +533,7 @@ export async function getCompanyUsers(
   if (role) {
     whereClause += ' AND role = ?';
     // Convert uppercase API role to lowercase for DB query
-    params.push(role.toLowerCase());
+    params.push(toDbRole(role));
   }
 
   const countResult = await db
@@ -0,0 +1,121 @@
+// ============================================================================
+// Idempotency Key Database Operations
+// ============================================================================
+
+import type { IdempotencyRecord } from '../types';
+
+export async function getIdempotencyRecord(
+  db: D1Database,
+  scope: string,
+  key: string
+): Promise<IdempotencyRecord | null> {
+  const result = await db
+    .prepare(
+      `SELECT * FROM idempotency_keys
+       WHERE scope = ? AND idempotency_key = ? AND expires_at > ?`
+    )
+    .bind(scope, key, new Date().toISOString())
+    .first<IdempotencyRecord>();
+
+  return result || null;
+}
+
+// Claims a fresh key, or takes over one whose lease or TTL has lapsed.
+// Returns the reservation's created_at, which identifies it to
+// completeIdempotencyKey and releaseIdempotencyKey, or null when the key is
+// held by another request.
+export async function reserveIdempotencyKey(
+  db: D1Database,
+  scope: string,
+  key: string,
+  requestHash: string,
+  leaseSeconds: number
+): Promise<string | null> {
+  const now = new Date();
+  const createdAt = now.toISOString();
+  const expiresAt = new Date(now.getTime() + leaseSeconds * 1000).toISOString();
+
+  const result = await db
+    .prepare(
+      `INSERT INTO idempotency_keys (scope, idempotency_key, request_hash, status, created_at, expires_at)
+       VALUES (?, ?, ?, 'pending', ?, ?)
+       ON CONFLICT(scope, idempotency_key) DO UPDATE SET
+         request_hash = excluded.request_hash,
+         status = 'pending',
+         response_status = NULL,
+         response_body = NULL,
+         response_headers = NULL,
+         created_at = excluded.created_at,
+         expires_at = excluded.expires_at
+       WHERE idempotency_keys.expires_at <= excluded.created_at`
+    )
+    .bind(scope, key, requestHash, createdAt, expiresAt)
+    .run();
+
+  return result.meta.changes > 0 ? createdAt : null;
+}
+
+// Stores the response and extends the key from its lease to the full TTL.
+// A reservation taken over after its lease lapsed is no longer ours and is
+// left alone.
+export async function completeIdempotencyKey(
+  db: D1Database,
+  scope: string,
+  key: string,
+  reservedAt: string,
+  ttlSeconds: number,
+  responseStatus: number,
+  responseBody: string,
+  responseHeaders: Record<string, string>
+): Promise<void> {
+  const expiresAt = new Date(Date.now() + ttlSeconds * 1000).toISOString();
+
+  await db
+    .prepare(
+      `UPDATE idempotency_keys
+       SET status = 'completed', response_status = ?, response_body = ?, response_headers = ?,
+         expires_at = ?
+       WHERE scope = ? AND idempotency_key = ? AND created_at = ? AND status = 'pending'`
+    )
+    .bind(
+      responseStatus,
+      responseBody,
+      JSON.stringify(responseHeaders),
+      expiresAt,
+      scope,
+      key,
+      reservedAt
+    )
+    .run();
+}
+
+export async function releaseIdempotencyKey(
+  db: D1Database,
+  scope: string,
+  key: string,
+  reservedAt: string
+): Promise<void> {
+  await db
+    .prepare(
+      `DELETE FROM idempotency_keys
+       WHERE scope = ? AND idempotency_key = ? AND created_at = ? AND status = 'pending'`
+    )
+    .bind(scope, key, reservedAt)
+    .run();
+}
+
+export async function deleteExpiredIdempotencyKeys(
+  db: D1Database,
+  limit: number
+): Promise<number> {
+  const result = await db
+    .prepare(
+      `DELETE FROM idempotency_keys WHERE rowid IN (
+         SELECT rowid FROM idempotency_keys WHERE expires_at <= ? LIMIT ?
+       )`
+    )
+    .bind(new Date().toISOString(), limit)
+    .run();
+
+  return result.meta.changes;
+}
@@ -7,3 +7,14 @@ export * from './companies';
 export * from './users';
 export * from './company-access';
 export * from './assets';
+export * from './sync';
+export * from './idempotency';
+export * from './versioning';
+export * from './preconditions';
+export * from './jobs';
+export * from './maintenance';
+export * from './stats';
+export * from './audit-archive';
+export * from './lookup';
+export * from './attributes';
+export * from './shards';
@@ -0,0 +1,121 @@
+// ============================================================================
+// Background Jobs Database Operations
+// ============================================================================
+
+import type { Job, JobType, JobStatus } from '../types';
+
+type JobRow = Job & { progress: string };
+
+function parseJobRow(row: JobRow): Job {
+  return {
+    ...row,
+    progress: typeof row.progress === 'string' ? JSON.parse(row.progress) : row.progress,
+  };
+}
+
+export async function createJob(
+  db: D1Database,
+  type: JobType,
+  companyId: string,
+  progress: Record<string, unknown> = {}
+): Promise<Job> {
+  const id = crypto.randomUUID();
+  const createdAt = new Date().toISOString();
+
+  await db
+    .prepare(
+      `INSERT INTO jobs (id, type, status, company_id, progress, created_at, updated_at)
+       VALUES (?, ?, 'pending', ?, ?, ?, ?)`
+    )
+    .bind(id, type, companyId, JSON.stringify(progress), createdAt, createdAt)
+    .run();
+
+  return {
+    id,
+    type,
+    status: 'pending',
+    company_id: companyId,
+    progress,
+    error: null,
+    locked_until: null,
+    created_at: createdAt,
+    updated_at: createdAt,
+  };
+}
+
+export async function getJobById(db: D1Database, id: string): Promise<Job | null> {
+  const result = await db
+    .prepare(`SELECT * FROM jobs WHERE id = ?`)
+    .bind(id)
+    .first<JobRow>();
+
+  return result ? parseJobRow(result) : null;
+}
+
+// Leases the oldest runnable job; an expired lease means its runner died
+export async function claimNextJob(db: D1Database, leaseSeconds: number): Promise<Job | null> {
+  const now = new Date();
+  const lockedUntil = new Date(now.getTime() + leaseSeconds * 1000).toISOString();
+
+  const result = await db
+    .prepare(
+      `UPDATE jobs SET status = 'running', locked_until = ?, updated_at = ?
+       WHERE id = (
+         SELECT id FROM jobs
+         WHERE status IN ('pending', 'running') AND (locked_until IS NULL OR locked_until < ?)
+         ORDER BY created_at ASC LIMIT 1
+       )
+       RETURNING *`
+    )
+    .bind(lockedUntil, now.toISOString(), now.toISOString())
+    .first<JobRow>();
+
+  return result ? parseJobRow(result) : null;
+}
+
+export async function updateJobProgress(
+  db: D1Database,
+  id: string,
+  progress: Record<string, unknown>
+): Promise<void> {
+  await db
+    .prepare(`UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ?`)
+    .bind(JSON.stringify(progress), new Date().toISOString(), id)
+    .run();
+}
+
+export async function releaseJob(
+  db: D1Database,
+  id: string,
+  status: Extract<JobStatus, 'pending' | 'completed' | 'failed'>,
+  progress: Record<string, unknown>,
+  error: string | null = null,
+  // A pending job is not claimed again before this time
+  notBefore: string | null = null
+): Promise<void> {
+  await db
+    .prepare(
+      `UPDATE jobs SET status = ?, progress = ?, error = ?, locked_until = ?, updated_at = ?
+       WHERE id = ?`
+    )
+    .bind(status, JSON.stringify(progress), error, notBefore, new Date().toISOString(), id)
+    .run();
+}
+
+// Queued or running jobs of any type for the company, other than `exceptId`
+export async function hasActiveJobs(
+  db: D1Database,
+  companyId: string,
+  exceptId: string = ''
+): Promise<boolean> {
+  const result = await db
+    .prepare(
+      `SELECT 1 FROM jobs
+       WHERE company_id = ? AND status IN ('pending', 'running') AND id != ?
+       LIMIT 1`
+    )
+    .bind(companyId, exceptId)
+    .first();
+
+  return result !== null;
+}
@@ -0,0 +1,86 @@
+// ============================================================================
+// Typeahead Lookups
+// Case-insensitive prefix matches served as index range scans
+// ============================================================================
+
+import type { LookupItem } from '../types';
+
+export const LOOKUP_MAX_LIMIT = 25;
+export const LOOKUP_MAX_QUERY_LENGTH = 100;
+// Short enough that renames show up while the user is still typing
+export const LOOKUP_CACHE_SECONDS = 30;
+
+// Sorts after every string that starts with the prefix
+const PREFIX_UPPER_BOUND = '\u{10FFFF}';
+
+// companyIds, when given, limits the matches to those companies (the
+// caller's memberships); it is bound as one JSON parameter
+export async function lookupCompanies(
+  db: D1Database,
+  prefix: string,
+  limit: number,
+  companyIds?: string[]
+): Promise<LookupItem[]> {
+  const scope = companyIds ? 'AND id IN (SELECT value FROM json_each(?))' : '';
+  const scopeParams = companyIds ? [JSON.stringify(companyIds)] : [];
+
+  // companies.name is declared COLLATE NOCASE, matching idx_companies_name
+  const result = await db
+    .prepare(
+      `SELECT id, name AS label FROM companies
+       WHERE name >= ? AND name < ? AND deletion_requested_at IS NULL ${scope}
+       ORDER BY name
+       LIMIT ?`
+    )
+    .bind(prefix, prefix + PREFIX_UPPER_BOUND, ...scopeParams, limit)
+    .all<LookupItem>();
+
+  return result.results || [];
+}
+
+// companyIds, when given, limits the matches to users whose primary company
+// or memberships are among them. Memberships are read from this database
+// only, so a sharded caller runs the lookup on every shard.
+export async function lookupUsers(
+  db: D1Database,
+  prefix: string,
+  limit: number,
+  companyIds?: string[]
+): Promise<LookupItem[]> {
+  // Emails are stored lowercased, so the plain email index serves the range
+  const emailPrefix = prefix.toLowerCase();
+
+  const scope = companyIds
+    ? `WHERE id IN (
+         SELECT user_id FROM company_access WHERE company_id IN (SELECT value FROM json_each(?))
+         UNION
+         SELECT id FROM users WHERE primary_company_id IN (SELECT value FROM json_each(?))
+       )`
+    : '';
+  const scopeParams = companyIds ? [JSON.stringify(companyIds), JSON.stringify(companyIds)] : [];
+
+  const result = await db
+    .prepare(
+      `SELECT id, name || ' (' || email || ')' AS label FROM (
+         SELECT id, name, email FROM users
+         WHERE name COLLATE NOCASE >= ? AND name COLLATE NOCASE < ?
+         UNION
+         SELECT id, name, email FROM users
+         WHERE email >= ? AND email < ?
+       )
+       ${scope}
+       ORDER BY name COLLATE NOCASE, email
+       LIMIT ?`
+    )
+    .bind(
+      prefix,
+      prefix + PREFIX_UPPER_BOUND,
+      emailPrefix,
+      emailPrefix + PREFIX_UPPER_BOUND,
+      ...scopeParams,
+      limit
+    )
+    .all<LookupItem>();
+
+  return result.results || [];
+}
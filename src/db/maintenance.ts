@@ -0,0 +1,116 @@
+// ============================================================================
+// Maintenance Task Database Operations
+// ============================================================================
+
+import type { MaintenanceRun } from '../types';
+
+export interface MaintenanceTaskState {
+  task: string;
+  cursor: string | null;
+  last_run_at: string | null;
+  updated_at: string;
+}
+
+export async function getTaskState(
+  db: D1Database,
+  task: string
+): Promise<MaintenanceTaskState | null> {
+  const result = await db
+    .prepare(`SELECT * FROM maintenance_task_state WHERE task = ?`)
+    .bind(task)
+    .first<MaintenanceTaskState>();
+
+  return result || null;
+}
+
+export async function saveTaskState(
+  db: D1Database,
+  task: string,
+  cursor: string | null,
+  lastRunAt: string
+): Promise<void> {
+  await db
+    .prepare(
+      `INSERT INTO maintenance_task_state (task, cursor, last_run_at, updated_at)
+       VALUES (?, ?, ?, ?)
+       ON CONFLICT(task) DO UPDATE SET
+         cursor = excluded.cursor,
+         last_run_at = excluded.last_run_at,
+         updated_at = excluded.updated_at`
+    )
+    .bind(task, cursor, lastRunAt, new Date().toISOString())
+    .run();
+}
+
+export async function recordMaintenanceRun(
+  db: D1Database,
+  run: Omit<MaintenanceRun, 'id'>
+): Promise<MaintenanceRun> {
+  const id = crypto.randomUUID();
+
+  await db
+    .prepare(
+      `INSERT INTO maintenance_runs (id, task, status, processed, error, started_at, finished_at)
+       VALUES (?, ?, ?, ?, ?, ?, ?)`
+    )
+    .bind(
+      id,
+      run.task,
+      run.status,
+      run.processed,
+      run.error,
+      run.started_at,
+      run.finished_at
+    )
+    .run();
+
+  return { id, ...run };
+}
+
+export async function deleteMaintenanceRunsBefore(
+  db: D1Database,
+  before: string,
+  limit: number
+): Promise<number> {
+  const result = await db
+    .prepare(
+      `DELETE FROM maintenance_runs WHERE rowid IN (
+         SELECT rowid FROM maintenance_runs WHERE started_at < ? LIMIT ?
+       )`
+    )
+    .bind(before, limit)
+    .run();
+
+  return result.meta.changes;
+}
+
+export async function getMaintenanceRuns(
+  db: D1Database,
+  options: { task?: string; limit?: number; offset?: number } = {}
+): Promise<{ runs: MaintenanceRun[]; total: number }> {
+  const { task, limit = 50, offset = 0 } = options;
+
+  let whereClause = '';
+  const params: (string | number)[] = [];
+
+  if (task) {
+    whereClause = 'WHERE task = ?';
+    params.push(task);
+  }
+
+  const countResult = await db
+    .prepare(`SELECT COUNT(*) as count FROM maintenance_runs ${whereClause}`)
+    .bind(...params)
+    .first<{ count: number }>();
+
+  const total = countResult?.count || 0;
+
+  const runsResult = await db
+    .prepare(
+      `SELECT * FROM maintenance_runs ${whereClause} ORDER BY started_at DESC LIMIT ? OFFSET ?`
+    )
+    .bind(...params, limit, offset)
+    .all<MaintenanceRun>();
+
+  return { runs: runsResult.results || [], total };
+}
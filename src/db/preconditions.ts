@@ -0,0 +1,65 @@
+// ============================================================================
+// Request Preconditions
+// Resolves every existence check a request needs in a single query
+// ============================================================================
+
+export interface PreconditionChecks {
+  companyId?: string;
+  userId?: string;
+  access?: { companyId: string; userId: string };
+}
+
+export interface PreconditionResult {
+  company: boolean;
+  user: boolean;
+  access: boolean;
+}
+
+export async function checkPreconditions(
+  db: D1Database,
+  checks: PreconditionChecks
+): Promise<PreconditionResult> {
+  const columns: string[] = [];
+  const params: string[] = [];
+
+  if (checks.companyId !== undefined) {
+    columns.push('EXISTS (SELECT 1 FROM companies WHERE id = ? AND deletion_requested_at IS NULL) AS company');
+    params.push(checks.companyId);
+  }
+
+  if (checks.userId !== undefined) {
+    columns.push('EXISTS (SELECT 1 FROM users WHERE id = ?) AS user');
+    params.push(checks.userId);
+  }
+
+  if (checks.access !== undefined) {
+    columns.push(
+      'EXISTS (SELECT 1 FROM company_access WHERE company_id = ? AND user_id = ?) AS access'
+    );
+    params.push(checks.access.companyId, checks.access.userId);
+  }
+
+  // Checks that were not requested pass trivially
+  const result: PreconditionResult = { company: true, user: true, access: true };
+
+  if (columns.length === 0) {
+    return result;
+  }
+
+  const row = await db
+    .prepare(`SELECT ${columns.join(', ')}`)
+    .bind(...params)
+    .first<Partial<Record<keyof PreconditionResult, number>>>();
+
+  if (checks.companyId !== undefined) {
+    result.company = row?.company === 1;
+  }
+  if (checks.userId !== undefined) {
+    result.user = row?.user === 1;
+  }
+  if (checks.access !== undefined) {
+    result.access = row?.access === 1;
+  }
+
+  return result;
+}
@@ -0,0 +1,303 @@
+// ============================================================================
+// Shard Database Operations
+// The tenant directory (read and written on the DB binding only), the
+// companies and users rows replicated to every shard, and the chunked row
+// copies behind tenant moves
+// ============================================================================
+
+import type { Company, TenantShard, User } from '../types';
+
+// The binding that holds the directory and every company without an entry
+export const DIRECTORY_SHARD = 'DB';
+
+// Tables holding a tenant's own rows, in the order a move copies them:
+// promoted keys before assets so the insert triggers rebuild
+// asset_attributes on the target instead of copying it
+export const TENANT_TABLES = [
+  'promoted_attributes',
+  'company_access',
+  'assets',
+  'audit_logs',
+  'audit_archive_segments',
+  'audit_archive_index',
+  'company_stats',
+] as const;
+
+export type TenantTable = (typeof TENANT_TABLES)[number];
+
+// D1 allows 100 bound parameters per statement
+const MAX_PARAMS_PER_STATEMENT = 100;
+
+const USER_COLUMNS = ['id', 'email', 'name', 'primary_company_id', 'status', 'version', 'created_at'];
+const COMPANY_COLUMNS = ['id', 'name', 'status', 'version', 'deletion_requested_at', 'created_at'];
+
+// ============================================================================
+// Tenant Directory
+// ============================================================================
+
+export async function getTenantShard(db: D1Database, companyId: string): Promise<TenantShard | null> {
+  const result = await db
+    .prepare(`SELECT * FROM tenant_shards WHERE company_id = ?`)
+    .bind(companyId)
+    .first<TenantShard>();
+
+  return result || null;
+}
+
+export async function getTenantShards(db: D1Database, companyIds: string[]): Promise<TenantShard[]> {
+  return getRowsByIds<TenantShard>(db, 'tenant_shards', companyIds, 'company_id');
+}
+
+// Live companies after `afterId` with the shard holding each one
+export async function listCompanyPlacements(
+  db: D1Database,
+  afterId: string,
+  limit: number
+): Promise<{ id: string; shard: string }[]> {
+  const result = await db
+    .prepare(
+      `SELECT c.id, COALESCE(t.shard, ?) AS shard
+       FROM companies c
+       LEFT JOIN tenant_shards t ON t.company_id = c.id
+       WHERE c.id > ? AND c.deletion_requested_at IS NULL
+       ORDER BY c.id
+       LIMIT ?`
+    )
+    .bind(DIRECTORY_SHARD, afterId, limit)
+    .all<{ id: string; shard: string }>();
+
+  return result.results || [];
+}
+
+// Fences the company's writes; false when another move already holds it.
+// Re-running for the same target is a no-op so a retried job can resume.
+export async function beginTenantMove(
+  db: D1Database,
+  companyId: string,
+  source: string,
+  target: string
+): Promise<boolean> {
+  const result = await db
+    .prepare(
+      `INSERT INTO tenant_shards (company_id, shard, moving_to, updated_at)
+       VALUES (?, ?, ?, ?)
+       ON CONFLICT(company_id) DO UPDATE SET
+         moving_to = excluded.moving_to,
+         updated_at = excluded.updated_at
+       WHERE tenant_shards.shard = excluded.shard
+         AND (tenant_shards.moving_to IS NULL OR tenant_shards.moving_to = excluded.moving_to)`
+    )
+    .bind(companyId, source, target, new Date().toISOString())
+    .run();
+
+  return result.meta.changes > 0;
+}
+
+// Points the company at its new shard and lifts the write fence
+export async function completeTenantMove(
+  db: D1Database,
+  companyId: string,
+  target: string
+): Promise<void> {
+  if (target === DIRECTORY_SHARD) {
+    await db.prepare(`DELETE FROM tenant_shards WHERE company_id = ?`).bind(companyId).run();
+    return;
+  }
+
+  await db
+    .prepare(
+      `UPDATE tenant_shards SET shard = ?, moving_to = NULL, updated_at = ? WHERE company_id = ?`
+    )
+    .bind(target, new Date().toISOString(), companyId)
+    .run();
+}
+
+// Companies with rows on a shard that does not own them: the target of a
+// fenced or abandoned move, and the source of a move still cleaning up
+export async function getStrayTenants(
+  db: D1Database
+): Promise<{ company_id: string; shard: string }[]> {
+  const result = await db
+    .prepare(
+      `SELECT company_id, moving_to AS shard FROM tenant_shards WHERE moving_to IS NOT NULL
+       UNION
+       SELECT j.company_id, json_extract(j.progress, '$.source') AS shard
+       FROM jobs j
+       LEFT JOIN tenant_shards t ON t.company_id = j.company_id
+       WHERE j.type = 'tenant_move' AND j.status IN ('pending', 'running')
+         AND json_extract(j.progress, '$.source') != COALESCE(t.shard, ?)`
+    )
+    .bind(DIRECTORY_SHARD)
+    .all<{ company_id: string; shard: string }>();
+
+  return result.results || [];
+}
+
+export async function hasTenantMoves(db: D1Database): Promise<boolean> {
+  const result = await db
+    .prepare(`SELECT 1 FROM tenant_shards WHERE moving_to IS NOT NULL LIMIT 1`)
+    .first();
+
+  return result !== null;
+}
+
+// ============================================================================
+// Replicated Reference Rows
+// ============================================================================
+
+export async function getCompaniesByIds(db: D1Database, ids: string[]): Promise<Company[]> {
+  return getRowsByIds<Company>(db, 'companies', ids);
+}
+
+export async function getUsersByIds(db: D1Database, ids: string[]): Promise<User[]> {
+  return getRowsByIds<User>(db, 'users', ids);
+}
+
+export async function listUsersPage(db: D1Database, afterId: string, limit: number): Promise<User[]> {
+  const result = await db
+    .prepare(`SELECT * FROM users WHERE id > ? ORDER BY id LIMIT ?`)
+    .bind(afterId, limit)
+    .all<User>();
+
+  return result.results || [];
+}
+
+// Version-guarded, so a replica never moves backwards when two writers race
+export async function upsertCompanyReplicas(db: D1Database, companies: Company[]): Promise<void> {
+  await upsertReplicas(db, 'companies', COMPANY_COLUMNS, companies as unknown as Record<string, unknown>[]);
+}
+
+export async function upsertUserReplicas(db: D1Database, users: User[]): Promise<void> {
+  await upsertReplicas(db, 'users', USER_COLUMNS, users as unknown as Record<string, unknown>[]);
+}
+
+// Users pointing at the company are detached by the SET NULL foreign key;
+// on DB the tenant_shards entry cascades with it
+export async function deleteCompanyReplica(db: D1Database, companyId: string): Promise<void> {
+  await db.prepare(`DELETE FROM companies WHERE id = ?`).bind(companyId).run();
+}
+
+async function getRowsByIds<T>(
+  db: D1Database,
+  table: string,
+  ids: string[],
+  keyColumn: string = 'id'
+): Promise<T[]> {
+  const rows: T[] = [];
+  for (let i = 0; i < ids.length; i += MAX_PARAMS_PER_STATEMENT) {
+    const chunk = ids.slice(i, i + MAX_PARAMS_PER_STATEMENT);
+    const result = await db
+      .prepare(`SELECT * FROM ${table} WHERE ${keyColumn} IN (${chunk.map(() => '?').join(', ')})`)
+      .bind(...chunk)
+      .all<T>();
+    rows.push(...(result.results || []));
+  }
+  return rows;
+}
+
+async function upsertReplicas(
+  db: D1Database,
+  table: string,
+  columns: string[],
+  rows: Record<string, unknown>[]
+): Promise<void> {
+  if (rows.length === 0) {
+    return;
+  }
+
+  const rowsPerStatement = Math.floor(MAX_PARAMS_PER_STATEMENT / columns.length);
+  const placeholders = `(${columns.map(() => '?').join(', ')})`;
+  const updates = columns
+    .filter((column) => column !== 'id')
+    .map((column) => `${column} = excluded.${column}`)
+    .join(', ');
+
+  const statements: D1PreparedStatement[] = [];
+  for (let i = 0; i < rows.length; i += rowsPerStatement) {
+    const chunk = rows.slice(i, i + rowsPerStatement);
+    statements.push(
+      db
+        .prepare(
+          `INSERT INTO ${table} (${columns.join(', ')})
+           VALUES ${chunk.map(() => placeholders).join(', ')}
+           ON CONFLICT(id) DO UPDATE SET ${updates}
+           WHERE excluded.version >= ${table}.version`
+        )
+        .bind(...chunk.flatMap((row) => columns.map((column) => row[column] ?? null)))
+    );
+  }
+
+  await db.batch(statements);
+}
+
+// ============================================================================
+// Chunked Tenant Copies
+// ============================================================================
+
+// Copies the next `chunkSize` rows after `afterRowid` to the target shard.
+// INSERT OR IGNORE makes a retried chunk harmless.
+export async function copyTenantChunk(
+  source: D1Database,
+  target: D1Database,
+  table: TenantTable,
+  companyId: string,
+  afterRowid: number,
+  chunkSize: number
+): Promise<{ copied: number; lastRowid: number }> {
+  const result = await source
+    .prepare(
+      `SELECT rowid AS _rowid, * FROM ${table}
+       WHERE company_id = ? AND rowid > ?
+       ORDER BY rowid
+       LIMIT ?`
+    )
+    .bind(companyId, afterRowid, chunkSize)
+    .all<Record<string, unknown>>();
+
+  const rows = result.results || [];
+  if (rows.length === 0) {
+    return { copied: 0, lastRowid: afterRowid };
+  }
+
+  const lastRowid = rows[rows.length - 1]._rowid as number;
+  const columns = Object.keys(rows[0]).filter((column) => column !== '_rowid');
+  const rowsPerStatement = Math.floor(MAX_PARAMS_PER_STATEMENT / columns.length);
+  const placeholders = `(${columns.map(() => '?').join(', ')})`;
+
+  const statements: D1PreparedStatement[] = [];
+  for (let i = 0; i < rows.length; i += rowsPerStatement) {
+    const chunk = rows.slice(i, i + rowsPerStatement);
+    statements.push(
+      target
+        .prepare(
+          `INSERT OR IGNORE INTO ${table} (${columns.join(', ')})
+           VALUES ${chunk.map(() => placeholders).join(', ')}`
+        )
+        .bind(...chunk.flatMap((row) => columns.map((column) => row[column] ?? null)))
+    );
+  }
+
+  await target.batch(statements);
+  return { copied: rows.length, lastRowid };
+}
+
+// Removes up to `chunkSize` of the company's rows, all at or below
+// `throughRowid` when given (rows already copied elsewhere)
+export async function deleteTenantChunk(
+  db: D1Database,
+  table: TenantTable,
+  companyId: string,
+  chunkSize: number,
+  throughRowid: number = Number.MAX_SAFE_INTEGER
+): Promise<number> {
+  const result = await db
+    .prepare(
+      `DELETE FROM ${table} WHERE rowid IN (
+         SELECT rowid FROM ${table} WHERE company_id = ? AND rowid <= ? LIMIT ?
+       )`
+    )
+    .bind(companyId, throughRowid, chunkSize)
+    .run();
+
+  return result.meta.changes;
+}
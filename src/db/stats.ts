@@ -0,0 +1,48 @@
+// ============================================================================
+// Company Stats Database Operations
+// Counters rolled up by the refresh-company-stats maintenance task
+// ============================================================================
+
+import type { CompanyStats } from '../types';
+
+export async function getCompanyStats(
+  db: D1Database,
+  companyId: string
+): Promise<CompanyStats | null> {
+  const result = await db
+    .prepare(`SELECT * FROM company_stats WHERE company_id = ?`)
+    .bind(companyId)
+    .first<CompanyStats>();
+
+  return result || null;
+}
+
+// Refreshes the given companies (at most 99 per call) and returns how many
+// rows were written
+export async function refreshCompanyStats(db: D1Database, companyIds: string[]): Promise<number> {
+  if (companyIds.length === 0) {
+    return 0;
+  }
+
+  const result = await db
+    .prepare(
+      `INSERT INTO company_stats (company_id, asset_count, user_count, access_count, refreshed_at)
+       SELECT
+         c.id,
+         (SELECT COUNT(*) FROM assets a WHERE a.company_id = c.id),
+         (SELECT COUNT(*) FROM users u WHERE u.primary_company_id = c.id),
+         (SELECT COUNT(*) FROM company_access ca WHERE ca.company_id = c.id),
+         ?
+       FROM companies c
+       WHERE c.id IN (${companyIds.map(() => '?').join(', ')}) AND c.deletion_requested_at IS NULL
+       ON CONFLICT(company_id) DO UPDATE SET
+         asset_count = excluded.asset_count,
+         user_count = excluded.user_count,
+         access_count = excluded.access_count,
+         refreshed_at = excluded.refreshed_at`
+    )
+    .bind(new Date().toISOString(), ...companyIds)
+    .run();
+
+  return result.meta.changes;
+}
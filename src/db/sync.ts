@@ -0,0 +1,205 @@
+// ============================================================================
+// Delta Sync Database Operations
+// Replays a company's audit trail into upserts and tombstones
+// ============================================================================
+
+import type { EntityType, AuditAction, SyncUpsert, SyncTombstone, SyncResult } from '../types';
+import type { KeysetCursor } from '../utils/cursor';
+import { encodeCursor } from '../utils/cursor';
+import { normalizeRole } from './company-access';
+
+// D1 caps bound parameters per statement at 100
+const ID_CHUNK_SIZE = 90;
+
+// ingested_at is stamped just before the insert commits, so a row can appear
+// slightly behind a newer one already read; rows younger than this are left
+// for the next call so no cursor moves past them
+const SETTLE_MS = 5_000;
+
+export interface ChangeRow {
+  id: string;
+  entity_type: EntityType;
+  entity_id: string;
+  action: AuditAction;
+  created_at: string;
+  ingested_at: string;
+}
+
+export async function getChangesSince(
+  db: D1Database,
+  companyId: string,
+  options: { since?: KeysetCursor; limit?: number } = {}
+): Promise<SyncResult> {
+  const { since, limit = 100 } = options;
+
+  const rows = await getChangeRows(db, companyId, { since, limit: limit + 1 });
+  const hasMore = rows.length > limit;
+
+  return summarizeChanges(db, companyId, hasMore ? rows.slice(0, limit) : rows, hasMore, since);
+}
+
+// Audit rows after `since` in ingestion order, optionally up to and
+// including `until`. Cursors follow ingested_at rather than created_at, so a
+// deferred or queued row written late still lands ahead of them.
+export async function getChangeRows(
+  db: D1Database,
+  companyId: string,
+  options: { since?: KeysetCursor; until?: string; limit: number }
+): Promise<ChangeRow[]> {
+  const { since, until, limit } = options;
+
+  let whereClause = 'WHERE company_id = ? AND ingested_at <= ?';
+  const params: (string | number)[] = [
+    companyId,
+    new Date(Date.now() - SETTLE_MS).toISOString(),
+  ];
+
+  if (since) {
+    whereClause += ' AND (ingested_at, id) > (?, ?)';
+    params.push(since.createdAt, since.id);
+  }
+  if (until) {
+    whereClause += ' AND ingested_at <= ?';
+    params.push(until);
+  }
+
+  const result = await db
+    .prepare(
+      `SELECT id, entity_type, entity_id, action, created_at, ingested_at FROM audit_logs ${whereClause}
+       ORDER BY ingested_at ASC, id ASC LIMIT ?`
+    )
+    .bind(...params, limit)
+    .all<ChangeRow>();
+
+  return result.results || [];
+}
+
+export function compareIngested(a: ChangeRow, b: ChangeRow): number {
+  if (a.ingested_at !== b.ingested_at) {
+    return a.ingested_at < b.ingested_at ? -1 : 1;
+  }
+  return a.id < b.id ? -1 : a.id > b.id ? 1 : 0;
+}
+
+// Turns a page of audit rows, in ingestion order, into upserts and
+// tombstones. Also used for pages read back from the audit archive.
+export async function summarizeChanges(
+  db: D1Database,
+  companyId: string,
+  page: ChangeRow[],
+  hasMore: boolean,
+  since?: KeysetCursor
+): Promise<SyncResult> {
+  // Collapse to the latest change per entity by when it happened; a row
+  // ingested late does not override a newer change read before it
+  const latest = new Map<string, ChangeRow>();
+  for (const row of page) {
+    const key = `${row.entity_type}:${row.entity_id}`;
+    const previous = latest.get(key);
+    if (
+      previous &&
+      (previous.created_at > row.created_at ||
+        (previous.created_at === row.created_at && previous.id > row.id))
+    ) {
+      continue;
+    }
+    latest.delete(key);
+    latest.set(key, row);
+  }
+
+  const pendingIds: Record<EntityType, string[]> = {
+    company: [],
+    user: [],
+    company_access: [],
+    asset: [],
+  };
+  for (const row of latest.values()) {
+    if (row.action !== 'delete') {
+      pendingIds[row.entity_type].push(row.entity_id);
+    }
+  }
+
+  const current = await loadEntities(db, companyId, pendingIds);
+
+  const upserts: SyncUpsert[] = [];
+  const tombstones: SyncTombstone[] = [];
+
+  for (const row of latest.values()) {
+    const data = current.get(`${row.entity_type}:${row.entity_id}`);
+    if (row.action !== 'delete' && data) {
+      upserts.push({ entity_type: row.entity_type, entity_id: row.entity_id, data });
+    } else {
+      // Deleted, or removed without a delete record (e.g. asset cleanup)
+      tombstones.push({
+        entity_type: row.entity_type,
+        entity_id: row.entity_id,
+        deleted_at: row.created_at,
+      });
+    }
+  }
+
+  const last = page[page.length - 1];
+  let cursor: string | null = null;
+  if (last) {
+    cursor = encodeCursor({ createdAt: last.ingested_at, id: last.id });
+  } else if (since) {
+    cursor = encodeCursor(since);
+  }
+
+  return { upserts, tombstones, cursor, has_more: hasMore };
+}
+
+async function loadEntities(
+  db: D1Database,
+  companyId: string,
+  ids: Record<EntityType, string[]>
+): Promise<Map<string, Record<string, unknown>>> {
+  const statements: D1PreparedStatement[] = [];
+  const statementTypes: EntityType[] = [];
+
+  const queries: Record<EntityType, (placeholders: string) => string> = {
+    company: (p) => `SELECT * FROM companies WHERE id IN (${p}) AND id = ?`,
+    user: (p) => `SELECT * FROM users WHERE id IN (${p})`,
+    company_access: (p) => `SELECT * FROM company_access WHERE id IN (${p}) AND company_id = ?`,
+    asset: (p) => `SELECT * FROM assets WHERE id IN (${p}) AND company_id = ?`,
+  };
+
+  for (const entityType of Object.keys(ids) as EntityType[]) {
+    const entityIds = ids[entityType];
+    for (let i = 0; i < entityIds.length; i += ID_CHUNK_SIZE) {
+      const chunk = entityIds.slice(i, i + ID_CHUNK_SIZE);
+      const placeholders = chunk.map(() => '?').join(', ');
+      const bindings: string[] = entityType === 'user' ? chunk : [...chunk, companyId];
+      statements.push(db.prepare(queries[entityType](placeholders)).bind(...bindings));
+      statementTypes.push(entityType);
+    }
+  }
+
+  const entities = new Map<string, Record<string, unknown>>();
+  if (statements.length === 0) {
+    return entities;
+  }
+
+  const results = await db.batch<Record<string, unknown>>(statements);
+  results.forEach((result, index) => {
+    const entityType = statementTypes[index];
+    for (const row of result.results || []) {
+      entities.set(`${entityType}:${row.id as string}`, normalizeEntity(entityType, row));
+    }
+  });
+
+  return entities;
+}
+
+function normalizeEntity(
+  entityType: EntityType,
+  row: Record<string, unknown>
+): Record<string, unknown> {
+  if (entityType === 'asset' && typeof row.metadata === 'string') {
+    return { ...row, metadata: JSON.parse(row.metadata) };
+  }
+  if (entityType === 'company_access' && typeof row.role === 'string') {
+    return { ...row, role: normalizeRole(row.role) };
+  }
+  return row;
+}
@@ -4,6 +4,8 @@
 
 import type { User, CreateUserRequest, UpdateUserRequest } from '../types';
 import { createAuditLog } from './audit';
+import { invalidateMembership } from './company-access';
+import { updateVersionedRow } from './versioning';
 
 export async function createUser(
   db: D1Database,
@@ -35,6 +37,7 @@ export async function createUser(
     name: data.name.trim(),
     primary_company_id: data.primary_company_id || null,
     status,
+    version: 1,
     created_at: createdAt,
   };
 
@@ -84,28 +87,69 @@ export async function getAllUsers(
 ): Promise<{ users: User[]; total: number }> {
   const { limit = 50, offset = 0, status, company_id } = options;
 
+  if (company_id) {
+    return getCompanyMembers(db, company_id, { limit, offset, status });
+  }
+
   let whereClause = '';
-  const conditions: string[] = [];
   const params: (string | number)[] = [];
 
   if (status) {
-    conditions.push('u.status = ?');
+    whereClause = 'WHERE status = ?';
     params.push(status);
   }
 
-  if (company_id) {
-    conditions.push(
-      '(u.primary_company_id = ? OR EXISTS (SELECT 1 FROM company_access ca WHERE ca.user_id = u.id AND ca.company_id = ?))'
-    );
-    params.push(company_id, company_id);
-  }
+  const countResult = await db
+    .prepare(`SELECT COUNT(*) as count FROM users ${whereClause}`)
+    .bind(...params)
+    .first<{ count: number }>();
+
+  const total = countResult?.count || 0;
+
+  const usersResult = await db
+    .prepare(`SELECT * FROM users ${whereClause} ORDER BY created_at DESC LIMIT ? OFFSET ?`)
+    .bind(...params, limit, offset)
+    .all<User>();
 
-  if (conditions.length > 0) {
-    whereClause = 'WHERE ' + conditions.join(' AND ');
+  return {
+    users: usersResult.results || [],
+    total,
+  };
+}
+
+// Users whose primary company is companyId or who have access to it. Each
+// side of the UNION is a seek on its own index (idx_users_primary_company,
+// idx_company_access_company_user); an OR across both tables would scan users.
+const COMPANY_MEMBERS_CTE = `WITH members(user_id) AS (
+  SELECT id FROM users WHERE primary_company_id = ?
+  UNION
+  SELECT user_id FROM company_access WHERE company_id = ?
+)`;
+
+async function getCompanyMembers(
+  db: D1Database,
+  companyId: string,
+  options: { limit: number; offset: number; status?: string }
+): Promise<{ users: User[]; total: number }> {
+  const { limit, offset, status } = options;
+
+  const params: (string | number)[] = [companyId, companyId];
+  let statusClause = '';
+
+  if (status) {
+    statusClause = 'WHERE u.status = ?';
+    params.push(status);
   }
 
+  // Without a status filter the count never has to touch users
   const countResult = await db
-    .prepare(`SELECT COUNT(DISTINCT u.id) as count FROM users u ${whereClause}`)
+    .prepare(
+      status
+        ? `${COMPANY_MEMBERS_CTE}
+           SELECT COUNT(*) as count FROM members m JOIN users u ON u.id = m.user_id ${statusClause}`
+        : `${COMPANY_MEMBERS_CTE}
+           SELECT COUNT(*) as count FROM members`
+    )
     .bind(...params)
     .first<{ count: number }>();
 
@@ -113,7 +157,9 @@ export async function getAllUsers(
 
   const usersResult = await db
     .prepare(
-      `SELECT DISTINCT u.* FROM users u ${whereClause} ORDER BY u.created_at DESC LIMIT ? OFFSET ?`
+      `${COMPANY_MEMBERS_CTE}
+       SELECT u.* FROM members m JOIN users u ON u.id = m.user_id ${statusClause}
+       ORDER BY u.created_at DESC LIMIT ? OFFSET ?`
     )
     .bind(...params, limit, offset)
     .all<User>();
@@ -128,57 +174,76 @@ export async function updateUser(
   db: D1Database,
   id: string,
   data: UpdateUserRequest,
-  actingUserId?: string
-): Promise<User | null> {
-  const existing = await getUserById(db, id);
-  if (!existing) {
-    return null;
-  }
-
+  actingUserId?: string,
+  expectedVersion?: number
+): Promise<{ success: boolean; user?: User; error?: string }> {
   const updates: string[] = [];
   const values: (string | null)[] = [];
-  const changes: Record<string, { from: unknown; to: unknown }> = {};
 
   if (data.email !== undefined) {
     updates.push('email = ?');
     values.push(data.email.toLowerCase().trim());
-    changes.email = { from: existing.email, to: data.email.toLowerCase().trim() };
   }
 
   if (data.name !== undefined) {
     updates.push('name = ?');
     values.push(data.name.trim());
-    changes.name = { from: existing.name, to: data.name.trim() };
   }
 
   if (data.primary_company_id !== undefined) {
     updates.push('primary_company_id = ?');
     values.push(data.primary_company_id);
-    changes.primary_company_id = { from: existing.primary_company_id, to: data.primary_company_id };
   }
 
   if (data.status !== undefined) {
     updates.push('status = ?');
     values.push(data.status);
-    changes.status = { from: existing.status, to: data.status };
   }
 
   if (updates.length === 0) {
-    return existing;
+    const existing = await getUserById(db, id);
+    return existing
+      ? { success: true, user: existing }
+      : { success: false, error: 'User not found' };
   }
 
-  values.push(id);
+  const { before, after } = await updateVersionedRow<User>(
+    db,
+    'users',
+    id,
+    updates,
+    values,
+    expectedVersion
+  );
 
-  await db
-    .prepare(`UPDATE users SET ${updates.join(', ')} WHERE id = ?`)
-    .bind(...values)
-    .run();
+  if (!before) {
+    return { success: false, error: 'User not found' };
+  }
+  if (!after) {
+    return { success: false, error: 'Version mismatch' };
+  }
+
+  const changes: Record<string, { from: unknown; to: unknown }> = {};
 
-  const updated = await getUserById(db, id);
+  if (data.email !== undefined) {
+    changes.email = { from: before.email, to: after.email };
+  }
+
+  if (data.name !== undefined) {
+    changes.name = { from: before.name, to: after.name };
+  }
 
-  if (updated && updated.primary_company_id) {
+  if (data.primary_company_id !== undefined) {
+    changes.primary_company_id = { from: before.primary_company_id, to: after.primary_company_id };
+  }
+
+  if (data.status !== undefined) {
+    changes.status = { from: before.status, to: after.status };
+  }
+
+  if (after.primary_company_id) {
     await createAuditLog(db, {
-      companyId: updated.primary_company_id,
+      companyId: after.primary_company_id,
       userId: actingUserId,
       entityType: 'user',
       entityId: id,
@@ -187,7 +252,7 @@ export async function updateUser(
     });
   }
 
-  return updated;
+  return { success: true, user: after };
 }
 
 export async function userExists(db: D1Database, id: string): Promise<boolean> {
@@ -209,7 +274,17 @@ export async function deleteUser(
     return { success: false, error: 'User not found' };
   }
 
-  // Check if user has any audit logs beyond creation
+  if (await userHasActivity(db, id)) {
+    return { success: false, error: 'Cannot delete user with activity history' };
+  }
+
+  await deleteUserRows(db, id);
+
+  return { success: true };
+}
+
+// Whether the user has any audit logs beyond creation
+export async function userHasActivity(db: D1Database, id: string): Promise<boolean> {
   const auditCount = await db
     .prepare(
       `SELECT COUNT(*) as count FROM audit_logs 
@@ -218,15 +293,20 @@ export async function deleteUser(
     .bind(id)
     .first<{ count: number }>();
 
-  if (auditCount && auditCount.count > 0) {
-    return { success: false, error: 'Cannot delete user with activity history' };
-  }
+  return Boolean(auditCount && auditCount.count > 0);
+}
 
-  // Delete company access records
-  await db
-    .prepare(`DELETE FROM company_access WHERE user_id = ?`)
+// Removes the user with its access records and creation audit row; also
+// used on shards holding a replica of the user
+export async function deleteUserRows(db: D1Database, id: string): Promise<void> {
+  // Delete company access records and drop their cached roles
+  const removed = await db
+    .prepare(`DELETE FROM company_access WHERE user_id = ? RETURNING company_id`)
     .bind(id)
-    .run();
+    .all<{ company_id: string }>();
+  for (const row of removed.results || []) {
+    invalidateMembership(row.company_id, id);
+  }
 
   // Delete audit logs for this user
   await db
@@ -239,6 +319,4 @@ export async function deleteUser(
     .prepare(`DELETE FROM users WHERE id = ?`)
     .bind(id)
     .run();
-
-  return { success: true };
 }
@@ -0,0 +1,45 @@
+// ============================================================================
+// Versioned Row Updates
+// Optimistic concurrency for tables carrying a `version` column
+// ============================================================================
+
+export type VersionedTable = 'companies' | 'users' | 'assets';
+
+export interface VersionedUpdateResult<T> {
+  before: T | null;
+  after: T | null;
+}
+
+// Reads the current row and applies the guarded UPDATE in one batch (a single
+// transaction), so `before` is exactly the row that was replaced. `after` is
+// null when the row is missing or the expected version no longer matches.
+export async function updateVersionedRow<T>(
+  db: D1Database,
+  table: VersionedTable,
+  id: string,
+  assignments: string[],
+  values: (string | number | null)[],
+  expectedVersion?: number
+): Promise<VersionedUpdateResult<T>> {
+  let guard = 'WHERE id = ?';
+  const guardValues: (string | number)[] = [id];
+
+  if (expectedVersion !== undefined) {
+    guard += ' AND version = ?';
+    guardValues.push(expectedVersion);
+  }
+
+  const [beforeResult, afterResult] = await db.batch<T>([
+    db.prepare(`SELECT * FROM ${table} WHERE id = ?`).bind(id),
+    db
+      .prepare(
+        `UPDATE ${table} SET ${[...assignments, 'version = version + 1'].join(', ')} ${guard} RETURNING *`
+      )
+      .bind(...values, ...guardValues),
+  ]);
+
+  return {
+    before: beforeResult.results?.[0] ?? null,
+    after: afterResult.results?.[0] ?? null,
+  };
+}
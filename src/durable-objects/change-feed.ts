@@ -0,0 +1,144 @@
+// ============================================================================
+// Change Feed Durable Object
+// One hub per company; fans audit events out to WebSocket and SSE clients
+// ============================================================================
+
+import type { Env, AuditLog, ChangeEvent } from '../types';
+import { encodeCursor } from '../utils/cursor';
+
+const PUBLISH_URL = 'https://change-feed/publish';
+
+let feedNamespace: DurableObjectNamespace | undefined;
+
+// Called once per isolate; the binding does not change between events
+export function attachChangeFeed(namespace: DurableObjectNamespace | undefined): void {
+  feedNamespace = namespace;
+}
+
+export function getChangeFeedStub(
+  namespace: DurableObjectNamespace,
+  companyId: string
+): DurableObjectStub {
+  return namespace.get(namespace.idFromName(companyId));
+}
+
+export function toChangeEvent(log: AuditLog): ChangeEvent {
+  return {
+    id: log.id,
+    entity_type: log.entity_type,
+    entity_id: log.entity_id,
+    action: log.action,
+    created_at: log.created_at,
+    // /sync cursors follow ingestion order
+    cursor: encodeCursor({ createdAt: log.ingested_at, id: log.id }),
+  };
+}
+
+// One POST per company carrying all of its events, so a bulk write stays
+// within the subrequest limit
+export async function publishChanges(logs: AuditLog[]): Promise<void> {
+  if (!feedNamespace) {
+    return;
+  }
+  const namespace = feedNamespace;
+
+  const byCompany = new Map<string, ChangeEvent[]>();
+  for (const log of logs) {
+    const events = byCompany.get(log.company_id) || [];
+    events.push(toChangeEvent(log));
+    byCompany.set(log.company_id, events);
+  }
+
+  await Promise.all(
+    [...byCompany].map(([companyId, events]) =>
+      getChangeFeedStub(namespace, companyId).fetch(PUBLISH_URL, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(events),
+      })
+    )
+  );
+}
+
+export class ChangeFeedHub implements DurableObject {
+  private readonly streams = new Set<WritableStreamDefaultWriter<Uint8Array>>();
+  private readonly encoder = new TextEncoder();
+
+  constructor(private readonly state: DurableObjectState, env: Env) {}
+
+  async fetch(request: Request): Promise<Response> {
+    const url = new URL(request.url);
+
+    if (request.method === 'POST' && url.pathname === '/publish') {
+      for (const event of await request.json<ChangeEvent[]>()) {
+        this.broadcast(event);
+      }
+      return new Response(null, { status: 204 });
+    }
+
+    if (request.headers.get('Upgrade') === 'websocket') {
+      const pair = new WebSocketPair();
+      const [client, server] = Object.values(pair);
+      // Hibernatable sockets let the hub sleep between events
+      this.state.acceptWebSocket(server);
+      return new Response(null, { status: 101, webSocket: client });
+    }
+
+    return this.openEventStream(request);
+  }
+
+  async webSocketMessage(ws: WebSocket, message: string | ArrayBuffer): Promise<void> {
+    if (message === 'ping') {
+      ws.send('pong');
+    }
+  }
+
+  async webSocketClose(ws: WebSocket, code: number, reason: string): Promise<void> {
+    // 1005 (no status) and 1006 (abnormal) only report how the peer left and
+    // may not be sent, so those are answered with a normal closure
+    const reply = code === 1005 || code === 1006 ? 1000 : code;
+    try {
+      ws.close(reply, reason);
+    } catch {
+      // Already closed on our side
+    }
+  }
+
+  private openEventStream(request: Request): Response {
+    const { readable, writable } = new TransformStream<Uint8Array, Uint8Array>();
+    const writer = writable.getWriter();
+
+    this.streams.add(writer);
+    writer.write(this.encoder.encode(': connected\n\n')).catch(() => this.streams.delete(writer));
+
+    request.signal.addEventListener('abort', () => {
+      this.streams.delete(writer);
+      writer.close().catch(() => {});
+    });
+
+    return new Response(readable, {
+      headers: {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        Connection: 'keep-alive',
+      },
+    });
+  }
+
+  private broadcast(event: ChangeEvent): void {
+    const payload = JSON.stringify(event);
+
+    for (const ws of this.state.getWebSockets()) {
+      try {
+        ws.send(payload);
+      } catch {
+        // Socket already closing; the runtime will deliver webSocketClose
+      }
+    }
+
+    const frame = this.encoder.encode(`id: ${event.cursor}\nevent: change\ndata: ${payload}\n\n`);
+    for (const writer of this.streams) {
+      writer.write(frame).catch(() => this.streams.delete(writer));
+    }
+  }
+}
@@ -0,0 +1,63 @@
+// ============================================================================
+// Rate Limiter Durable Object
+// One hub per tenant; holds the tenant's token buckets so every isolate draws
+// from the same budget. Buckets live in memory only: an evicted hub simply
+// starts the tenant over with full buckets.
+// ============================================================================
+
+import type { Env } from '../types';
+import { TokenBuckets, type BucketPolicy, type BucketDecision } from '../utils/token-bucket';
+
+const TAKE_URL = 'https://rate-limiter/take';
+
+export interface TakeTokenRequest {
+  route_class: string;
+  policy: BucketPolicy;
+  // Tokens the caller may lease at once
+  max: number;
+}
+
+export function getRateLimiterStub(
+  namespace: DurableObjectNamespace,
+  tenant: string
+): DurableObjectStub {
+  return namespace.get(namespace.idFromName(tenant));
+}
+
+export async function takeTenantToken(
+  namespace: DurableObjectNamespace,
+  tenant: string,
+  routeClass: string,
+  policy: BucketPolicy,
+  max: number = 1
+): Promise<BucketDecision> {
+  const body: TakeTokenRequest = { route_class: routeClass, policy, max };
+  const response = await getRateLimiterStub(namespace, tenant).fetch(TAKE_URL, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body),
+  });
+
+  if (!response.ok) {
+    throw new Error(`Rate limiter responded with ${response.status}`);
+  }
+  return response.json<BucketDecision>();
+}
+
+export class RateLimiterHub implements DurableObject {
+  // A hub serves one tenant, so a handful of route classes at most
+  private readonly buckets = new TokenBuckets(16, 60_000);
+
+  constructor(private readonly state: DurableObjectState, env: Env) {}
+
+  async fetch(request: Request): Promise<Response> {
+    const url = new URL(request.url);
+
+    if (request.method === 'POST' && url.pathname === '/take') {
+      const { route_class, policy, max } = await request.json<TakeTokenRequest>();
+      return Response.json(this.buckets.take(route_class, policy, Date.now(), max || 1));
+    }
+
+    return new Response(null, { status: 404 });
+  }
+}
@@ -2,13 +2,18 @@
 // Asset Inventory Management System - Main Worker Entry Point
 // ============================================================================
 
-import type { Env, RequestContext } from './types';
+import type { Env, RequestContext, AuditLog } from './types';
 import {
   handleCompaniesRoutes,
   handleUsersRoutes,
   handleCompanyAccessRoutes,
   handleAssetsRoutes,
   handleAuditLogsRoutes,
+  handleSyncRoutes,
+  handleChangesRoutes,
+  handleJobsRoutes,
+  handleMaintenanceRoutes,
+  handleAttributesRoutes,
 } from './routes';
 import {
   jsonResponse,
@@ -16,77 +21,203 @@ import {
   internalErrorResponse,
   methodNotAllowedResponse,
 } from './utils/response';
+import { defer, runWithBackground } from './utils/background';
+import { withIdempotency } from './utils/idempotency';
+import { onAuditLogsCreated, setAuditMode } from './db/audit';
+import { flushAuditLogs, handleAuditRetryBatch } from './queues/audit-retry';
+import { attachChangeFeed, publishChanges } from './durable-objects/change-feed';
+import { authenticateRequest, authorizeRequest } from './auth';
+import { attachMembershipStore } from './db/company-access';
+import { admitRequest } from './rate-limit';
+import { attachShardRouter } from './sharding';
+import { runMaintenance } from './maintenance';
+import './maintenance/tasks';
 
-export default {
-  async fetch(request: Request, env: Env, ctx: ExecutionContext): Promise<Response> {
-    const url = new URL(request.url);
-    const pathname = url.pathname;
+export { ChangeFeedHub } from './durable-objects/change-feed';
+export { RateLimiterHub } from './durable-objects/rate-limiter';
 
-    // CORS preflight handling
-    if (request.method === 'OPTIONS') {
-      return handleCors();
-    }
+// Wall-clock budget shared by all maintenance tasks in one cron invocation
+const SCHEDULED_MAINTENANCE_BUDGET_MS = 25_000;
 
-    // Build request context (for future auth integration)
-    const requestContext = buildRequestContext(request);
+// Fan persisted audit rows out to their companies' change feeds, one hub
+// request per company however many rows a write produced
+onAuditLogsCreated((logs) => defer(publishChanges(logs)));
 
-    try {
-      // Health check endpoint
-      if (pathname === '/health') {
-        return addCorsHeaders(
-          jsonResponse({ status: 'ok', timestamp: new Date().toISOString() })
-        );
-      }
+// Bindings and vars are the same for every event an isolate handles, so
+// the modules holding them are attached once
+let bindingsAttached = false;
 
-      // API info endpoint
-      if (pathname === '/' || pathname === '') {
-        return addCorsHeaders(
-          jsonResponse({
-            name: 'Asset Inventory Management System API',
-            version: '1.0.0',
-            status: 'operational',
-            endpoints: {
-              companies: '/companies',
-              users: '/users',
-              assets: '/assets',
-              audit_logs: '/audit-logs',
-            },
-          })
-        );
-      }
+function attachBindings(env: Env): void {
+  if (bindingsAttached) {
+    return;
+  }
+  attachChangeFeed(env.CHANGE_FEED);
+  attachMembershipStore(env.AUTH_CACHE);
+  setAuditMode(env.AUDIT_MODE);
+  attachShardRouter(env);
+  bindingsAttached = true;
+}
 
-      // Route to appropriate handler
-      let response: Response;
+export default {
+  async fetch(request: Request, env: Env, ctx: ExecutionContext): Promise<Response> {
+    return runWithBackground(ctx, () => handleFetch(request, env));
+  },
 
-      if (pathname.startsWith('/companies')) {
-        // Check if this is a company access route
-        const pathParts = pathname.split('/').filter(Boolean);
-        if (pathParts.length >= 3 && pathParts[2] === 'users') {
-          response = await handleCompanyAccessRoutes(request, url, env, requestContext);
-        } else {
-          response = await handleCompaniesRoutes(request, url, env, requestContext);
+  async scheduled(controller: ScheduledController, env: Env, ctx: ExecutionContext): Promise<void> {
+    return runWithBackground(ctx, async () => {
+      attachBindings(env);
+      // Retries anything a failed request flush left in this isolate
+      defer(flushAuditLogs(env));
+
+      const runs = await runMaintenance(env, SCHEDULED_MAINTENANCE_BUDGET_MS);
+      for (const run of runs) {
+        if (run.processed > 0 || run.status === 'failed') {
+          console.log(
+            `Maintenance ${run.task} ${run.status} (${run.processed} processed) for cron ${controller.cron}`
+          );
         }
-      } else if (pathname.startsWith('/users')) {
-        response = await handleUsersRoutes(request, url, env, requestContext);
-      } else if (pathname.startsWith('/assets')) {
-        response = await handleAssetsRoutes(request, url, env, requestContext);
-      } else if (pathname.startsWith('/audit-logs')) {
-        response = await handleAuditLogsRoutes(request, url, env, requestContext);
-      } else {
-        response = notFoundResponse('Route');
       }
+    });
+  },
 
-      return addCorsHeaders(response);
-    } catch (error) {
-      console.error('Unhandled error:', error);
-      return addCorsHeaders(internalErrorResponse('An unexpected error occurred'));
-    }
+  async queue(batch: MessageBatch<AuditLog[]>, env: Env, ctx: ExecutionContext): Promise<void> {
+    return runWithBackground(ctx, async () => {
+      // Queued audit rows are written to their company's shard
+      attachBindings(env);
+      await handleAuditRetryBatch(batch, env);
+    });
   },
 };
 
+async function handleFetch(request: Request, env: Env): Promise<Response> {
+  const url = new URL(request.url);
+  const pathname = url.pathname;
+
+  // CORS preflight handling
+  if (request.method === 'OPTIONS') {
+    return handleCors();
+  }
+
+  // Build request context (authentication may replace the caller)
+  const requestContext = buildRequestContext(request);
+  let releaseSlot = () => {};
+
+  try {
+    attachBindings(env);
+
+    // Health check endpoint
+    if (pathname === '/health') {
+      return addCorsHeaders(
+        jsonResponse({ status: 'ok', timestamp: new Date().toISOString() })
+      );
+    }
+
+    // API info endpoint
+    if (pathname === '/' || pathname === '') {
+      return addCorsHeaders(
+        jsonResponse({
+          name: 'Asset Inventory Management System API',
+          version: '1.0.0',
+          status: 'operational',
+          endpoints: {
+            companies: '/companies',
+            users: '/users',
+            assets: '/assets',
+            audit_logs: '/audit-logs',
+            sync: '/sync',
+            changes: '/changes',
+            jobs: '/jobs',
+            maintenance: '/maintenance/runs',
+          },
+        })
+      );
+    }
+
+    // Bearer authentication (when a JWKS is configured), then tenant
+    // authorization (AUTH_MODE=enforce), before any route
+    const denied =
+      (await authenticateRequest(request, env, requestContext)) ||
+      (await authorizeRequest(request, url, env, requestContext));
+    if (denied) {
+      return addCorsHeaders(denied);
+    }
+
+    // Per-tenant token buckets and in-flight cap (RATE_LIMIT_MODE=enforce)
+    const admission = await admitRequest(request, url, env, requestContext);
+    if (!admission.admitted) {
+      return addCorsHeaders(admission.response);
+    }
+    releaseSlot = admission.release;
+
+    // POST retries carrying an Idempotency-Key are answered from storage
+    const response =
+      request.method === 'POST'
+        ? await withIdempotency(request, env, requestContext, () =>
+            routeRequest(request, url, env, requestContext)
+          )
+        : await routeRequest(request, url, env, requestContext);
+
+    // WebSocket upgrades must be returned untouched
+    if (response.status === 101) {
+      return response;
+    }
+
+    return addCorsHeaders(response);
+  } catch (error) {
+    console.error('Unhandled error:', error);
+    return addCorsHeaders(internalErrorResponse('An unexpected error occurred'));
+  } finally {
+    releaseSlot();
+    defer(flushAuditLogs(env));
+  }
+}
+
+async function routeRequest(
+  request: Request,
+  url: URL,
+  env: Env,
+  requestContext: RequestContext
+): Promise<Response> {
+  const pathname = url.pathname;
+
+  if (pathname.startsWith('/companies')) {
+    // Check if this is a company access route
+    const pathParts = pathname.split('/').filter(Boolean);
+    if (pathParts.length >= 3 && (pathParts[2] === 'users' || pathParts[2].startsWith('users:'))) {
+      return handleCompanyAccessRoutes(request, url, env, requestContext);
+    }
+    if (pathParts.length >= 3 && pathParts[2] === 'attributes') {
+      return handleAttributesRoutes(request, url, env, requestContext);
+    }
+    return handleCompaniesRoutes(request, url, env, requestContext);
+  }
+  if (pathname.startsWith('/users')) {
+    return handleUsersRoutes(request, url, env, requestContext);
+  }
+  if (pathname.startsWith('/assets')) {
+    return handleAssetsRoutes(request, url, env, requestContext);
+  }
+  if (pathname.startsWith('/audit-logs')) {
+    return handleAuditLogsRoutes(request, url, env, requestContext);
+  }
+  if (pathname.startsWith('/sync')) {
+    return handleSyncRoutes(request, url, env, requestContext);
+  }
+  if (pathname.startsWith('/changes')) {
+    return handleChangesRoutes(request, url, env, requestContext);
+  }
+  if (pathname.startsWith('/jobs')) {
+    return handleJobsRoutes(request, url, env, requestContext);
+  }
+  if (pathname.startsWith('/maintenance')) {
+    return handleMaintenanceRoutes(request, url, env, requestContext);
+  }
+  return notFoundResponse('Route');
+}
+
 function buildRequestContext(request: Request): RequestContext {
-  // Extract user context from headers (for future auth integration)
-  // These headers would be set by an auth middleware/gateway
+  // Caller and company headers; with a JWKS configured authenticateRequest
+  // replaces userId with the token subject
   const userId = request.headers.get('X-User-Id') || undefined;
   const companyId = request.headers.get('X-Company-Id') || undefined;
 
@@ -104,7 +235,7 @@ function handleCors(): Response {
     headers: {
       'Access-Control-Allow-Origin': '*',
       'Access-Control-Allow-Methods': 'GET, POST, PATCH, DELETE, OPTIONS',
-      'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Company-Id, Authorization',
+      'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Company-Id, Authorization, Idempotency-Key, If-Match',
       'Access-Control-Max-Age': '86400',
     },
   });
@@ -114,7 +245,8 @@ function addCorsHeaders(response: Response): Response {
   const newHeaders = new Headers(response.headers);
   newHeaders.set('Access-Control-Allow-Origin', '*');
   newHeaders.set('Access-Control-Allow-Methods', 'GET, POST, PATCH, DELETE, OPTIONS');
-  newHeaders.set('Access-Control-Allow-Headers', 'Content-Type, X-User-Id, X-Company-Id, Authorization');
+  newHeaders.set('Access-Control-Allow-Headers', 'Content-Type, X-User-Id, X-Company-Id, Authorization, Idempotency-Key, If-Match');
+  newHeaders.set('Access-Control-Expose-Headers', 'ETag, Idempotent-Replayed, Retry-After');
 
   return new Response(response.body, {
     status: response.status,
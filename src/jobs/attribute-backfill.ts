@@ -0,0 +1,54 @@
+// ============================================================================
+// Attribute Backfill Job
+// Indexes existing assets for a newly promoted metadata key, or clears the
+// rows of a demoted one, in bounded chunks across scheduled runs
+// ============================================================================
+
+import type { Job } from '../types';
+import type { JobRunResult } from './index';
+import { backfillAttributeChunk, removeAttributeChunk } from '../db/attributes';
+import { updateJobProgress } from '../db/jobs';
+
+const CHUNK_SIZE = 500;
+
+export async function runAttributeBackfill(
+  db: D1Database,
+  job: Job,
+  deadline: number
+): Promise<JobRunResult> {
+  const key = job.progress.key as string;
+  let processed = (job.progress.processed as number) || 0;
+  let afterRowid = (job.progress.after_rowid as number) || 0;
+  // Existing values left unindexed because they do not have the promoted type
+  let mismatched = (job.progress.mismatched as number) || 0;
+  let done = false;
+
+  const progress = (): Record<string, unknown> =>
+    job.progress.action === 'remove'
+      ? { ...job.progress, processed, after_rowid: afterRowid }
+      : { ...job.progress, processed, after_rowid: afterRowid, mismatched };
+
+  while (!done && Date.now() < deadline) {
+    if (job.progress.action === 'remove') {
+      const removed = await removeAttributeChunk(db, job.company_id, key, CHUNK_SIZE);
+      processed += removed;
+      done = removed < CHUNK_SIZE;
+    } else {
+      const chunk = await backfillAttributeChunk(
+        db,
+        job.company_id,
+        key,
+        afterRowid,
+        CHUNK_SIZE
+      );
+      processed += chunk.scanned;
+      mismatched += chunk.mismatched;
+      afterRowid = chunk.lastRowid;
+      done = chunk.scanned < CHUNK_SIZE;
+    }
+
+    await updateJobProgress(db, job.id, progress());
+  }
+
+  return { done, progress: progress() };
+}
@@ -0,0 +1,73 @@
+// ============================================================================
+// Company Deletion Job
+// Removes a tenant's rows in bounded chunks across scheduled runs
+// ============================================================================
+
+import type { Env, Job } from '../types';
+import type { DeletionPhase } from '../db/companies';
+import type { JobRunResult } from './index';
+import { DELETION_PHASES, deleteCompanyChunk } from '../db/companies';
+import { deleteCompanyReplica } from '../db/shards';
+import { updateJobProgress } from '../db/jobs';
+import { forgetTenantPlacement, getShards } from '../sharding';
+import { isForeignKeyViolation } from '../utils/db-errors';
+
+const CHUNK_SIZE = 500;
+
+// The job runs on the tenant's shard; once its rows there are gone, the
+// copies of the company row on every other shard go too
+type Phase = DeletionPhase | 'replicas';
+const PHASES: Phase[] = [...DELETION_PHASES, 'replicas'];
+
+export async function runCompanyDeletion(
+  db: D1Database,
+  job: Job,
+  deadline: number,
+  env: Env
+): Promise<JobRunResult> {
+  const deleted = { ...((job.progress.deleted as Record<string, number>) || {}) };
+  let phaseIndex = Math.max(PHASES.indexOf(job.progress.phase as Phase), 0);
+
+  const snapshot = (): Record<string, unknown> => ({
+    ...job.progress,
+    phase: PHASES[phaseIndex] ?? 'done',
+    deleted,
+  });
+
+  while (phaseIndex < PHASES.length && Date.now() < deadline) {
+    const phase = PHASES[phaseIndex];
+
+    if (phase === 'replicas') {
+      for (const shard of getShards(env)) {
+        if (shard.db !== db) {
+          await deleteCompanyReplica(shard.db, job.company_id);
+        }
+      }
+      forgetTenantPlacement(job.company_id);
+      phaseIndex++;
+      await updateJobProgress(db, job.id, snapshot());
+      continue;
+    }
+
+    let affected: number;
+    try {
+      affected = await deleteCompanyChunk(db, job.company_id, phase, CHUNK_SIZE);
+    } catch (error) {
+      // An audit row written mid-deletion blocks the company row; sweep again
+      if (phase === 'company' && isForeignKeyViolation(error)) {
+        phaseIndex = DELETION_PHASES.indexOf('audit_logs');
+        continue;
+      }
+      throw error;
+    }
+
+    deleted[phase] = (deleted[phase] || 0) + affected;
+    if (phase === 'company' || affected < CHUNK_SIZE) {
+      phaseIndex++;
+    }
+
+    await updateJobProgress(db, job.id, snapshot());
+  }
+
+  return { done: phaseIndex >= PHASES.length, progress: snapshot() };
+}
@@ -0,0 +1,69 @@
+// ============================================================================
+// Background Job Runner
+// Drains the jobs table from the scheduled() handler within a time budget
+// ============================================================================
+
+import type { Env, Job, JobType } from '../types';
+import { claimNextJob, getJobById, releaseJob } from '../db/jobs';
+import { runCompanyDeletion } from './company-deletion';
+import { runAttributeBackfill } from './attribute-backfill';
+import { runTenantMove } from './tenant-move';
+
+export interface JobRunResult {
+  done: boolean;
+  progress: Record<string, unknown>;
+  // Epoch ms before which an unfinished job should not run again
+  resumeAt?: number;
+}
+
+type JobHandler = (db: D1Database, job: Job, deadline: number, env: Env) => Promise<JobRunResult>;
+
+const JOB_HANDLERS: Record<JobType, JobHandler> = {
+  company_deletion: runCompanyDeletion,
+  attribute_backfill: runAttributeBackfill,
+  tenant_move: runTenantMove,
+};
+
+const LEASE_SECONDS = 120;
+const MAX_FAILURES = 5;
+
+// Drains one shard's jobs table; env lets handlers reach the other shards
+export async function processJobs(db: D1Database, env: Env, budgetMs: number): Promise<number> {
+  const deadline = Date.now() + budgetMs;
+  let processed = 0;
+
+  while (Date.now() < deadline) {
+    const job = await claimNextJob(db, LEASE_SECONDS);
+    if (!job) {
+      break;
+    }
+    processed++;
+
+    try {
+      const { done, progress, resumeAt } = await JOB_HANDLERS[job.type](db, job, deadline, env);
+      await releaseJob(
+        db,
+        job.id,
+        done ? 'completed' : 'pending',
+        { ...progress, failures: 0 },
+        null,
+        resumeAt ? new Date(resumeAt).toISOString() : null
+      );
+    } catch (error) {
+      // Transient D1 errors are retried on the next run before giving up
+      const message = error instanceof Error ? error.message : String(error);
+      const latest = (await getJobById(db, job.id)) || job;
+      const failures = ((latest.progress.failures as number) || 0) + 1;
+      console.error(`Job ${job.id} failed (attempt ${failures}):`, error);
+      await releaseJob(
+        db,
+        job.id,
+        failures >= MAX_FAILURES ? 'failed' : 'pending',
+        { ...latest.progress, failures },
+        message
+      );
+    }
+  }
+
+  return processed;
+}
@@ -0,0 +1,198 @@
+// ============================================================================
+// Tenant Move Job
+// Copies a company's rows to another shard in bounded chunks, points the
+// directory at the new shard and then removes the source rows. Runs on DB
+// next to the directory. The company's writes are refused from the fence to
+// the cutover, and each directory change is followed by a pause of one cache
+// TTL so no isolate still routes by the previous entry.
+// ============================================================================
+
+import type { Env, Job } from '../types';
+import type { JobRunResult } from './index';
+import type { TenantTable } from '../db/shards';
+import {
+  DIRECTORY_SHARD,
+  TENANT_TABLES,
+  getTenantShard,
+  beginTenantMove,
+  completeTenantMove,
+  copyTenantChunk,
+  deleteTenantChunk,
+} from '../db/shards';
+import { getCompanyById } from '../db/companies';
+import { forgetCompanyIdentifiers } from '../db/assets';
+import { hasActiveJobs, updateJobProgress } from '../db/jobs';
+import { DIRECTORY_CACHE_TTL_MS, forgetTenantPlacement, getShard } from '../sharding';
+
+const CHUNK_SIZE = 500;
+
+// prepare: clear leftovers of an earlier, abandoned move from the target
+// fence:   refuse writes; copy: source -> target, table by table
+// cutover: switch the directory; cleanup: delete the source rows
+type MovePhase = 'prepare' | 'fence' | 'copy' | 'cutover' | 'cleanup' | 'done';
+
+// Dependents first, so nothing is left pointing at a removed row
+const REMOVAL_ORDER: TenantTable[] = [...TENANT_TABLES].reverse();
+
+export async function runTenantMove(
+  db: D1Database,
+  job: Job,
+  deadline: number,
+  env: Env
+): Promise<JobRunResult> {
+  const companyId = job.company_id;
+  const sourceName = job.progress.source as string;
+  const targetName = job.progress.target as string;
+  const source = getShard(env, sourceName);
+  const target = getShard(env, targetName);
+  if (!source || !target) {
+    throw new Error(`Shard ${source ? targetName : sourceName} is not configured`);
+  }
+
+  const copied = { ...((job.progress.copied as Record<string, number>) || {}) };
+  const removed = { ...((job.progress.removed as Record<string, number>) || {}) };
+  let phase = (job.progress.phase as MovePhase) || 'prepare';
+  let tableIndex = (job.progress.table_index as number) || 0;
+  let afterRowid = (job.progress.after_rowid as number) || 0;
+
+  const snapshot = (): Record<string, unknown> => ({
+    ...job.progress,
+    phase,
+    table_index: tableIndex,
+    after_rowid: afterRowid,
+    copied,
+    removed,
+  });
+
+  const nextPhase = (next: MovePhase): void => {
+    phase = next;
+    tableIndex = 0;
+    afterRowid = 0;
+  };
+
+  // Leaves the job pending until every cached directory entry has expired
+  const waitForCaches = (): JobRunResult => ({
+    done: false,
+    progress: snapshot(),
+    resumeAt: Date.now() + DIRECTORY_CACHE_TTL_MS,
+  });
+
+  while (phase !== 'done' && Date.now() < deadline) {
+    switch (phase) {
+      case 'prepare': {
+        // The request was checked when queued; jobs may have been queued since
+        await assertMovable(env, db, job, sourceName, targetName, source.db);
+
+        const table = REMOVAL_ORDER[tableIndex];
+        const affected = await deleteTenantChunk(target.db, table, companyId, CHUNK_SIZE);
+        if (affected < CHUNK_SIZE) {
+          tableIndex++;
+        }
+        if (tableIndex >= REMOVAL_ORDER.length) {
+          nextPhase('fence');
+        }
+        break;
+      }
+
+      case 'fence': {
+        if (!(await beginTenantMove(env.DB, companyId, sourceName, targetName))) {
+          throw new Error(`Company ${companyId} is already being moved`);
+        }
+        forgetTenantPlacement(companyId);
+        nextPhase('copy');
+        return waitForCaches();
+      }
+
+      case 'copy': {
+        const table = TENANT_TABLES[tableIndex];
+        const chunk = await copyTenantChunk(
+          source.db,
+          target.db,
+          table,
+          companyId,
+          afterRowid,
+          CHUNK_SIZE
+        );
+        copied[table] = (copied[table] || 0) + chunk.copied;
+        afterRowid = chunk.lastRowid;
+        if (chunk.copied < CHUNK_SIZE) {
+          tableIndex++;
+          afterRowid = 0;
+        }
+        if (tableIndex >= TENANT_TABLES.length) {
+          nextPhase('cutover');
+        }
+        break;
+      }
+
+      case 'cutover': {
+        await completeTenantMove(env.DB, companyId, targetName);
+        forgetTenantPlacement(companyId);
+        nextPhase('cleanup');
+        return waitForCaches();
+      }
+
+      case 'cleanup': {
+        const table = REMOVAL_ORDER[tableIndex];
+        let affected: number;
+
+        if (table === 'audit_logs') {
+          // Deferred and queued audit rows could still reach the source
+          // until the cutover settled; carry them over before deleting
+          const chunk = await copyTenantChunk(source.db, target.db, table, companyId, 0, CHUNK_SIZE);
+          affected =
+            chunk.copied > 0
+              ? await deleteTenantChunk(source.db, table, companyId, CHUNK_SIZE, chunk.lastRowid)
+              : 0;
+        } else {
+          affected = await deleteTenantChunk(source.db, table, companyId, CHUNK_SIZE);
+        }
+
+        if (table === 'assets' && affected > 0) {
+          // Cached lookups would still return the removed source rows
+          forgetCompanyIdentifiers(companyId);
+        }
+
+        removed[table] = (removed[table] || 0) + affected;
+        if (affected < CHUNK_SIZE) {
+          tableIndex++;
+        }
+        if (tableIndex >= REMOVAL_ORDER.length) {
+          nextPhase('done');
+        }
+        break;
+      }
+    }
+
+    await updateJobProgress(db, job.id, snapshot());
+  }
+
+  return { done: phase === 'done', progress: snapshot() };
+}
+
+async function assertMovable(
+  env: Env,
+  db: D1Database,
+  job: Job,
+  sourceName: string,
+  targetName: string,
+  source: D1Database
+): Promise<void> {
+  // A fence left by a failed move to the same target is picked up again
+  const placement = await getTenantShard(env.DB, job.company_id);
+  const current = placement?.shard ?? DIRECTORY_SHARD;
+  if (current !== sourceName || (placement?.moving_to && placement.moving_to !== targetName)) {
+    throw new Error(`Company ${job.company_id} is no longer placed on ${sourceName} alone`);
+  }
+
+  if (!(await getCompanyById(source, job.company_id))) {
+    throw new Error(`Company ${job.company_id} not found or pending deletion`);
+  }
+
+  if (
+    (await hasActiveJobs(source, job.company_id, job.id)) ||
+    (await hasActiveJobs(db, job.company_id, job.id))
+  ) {
+    throw new Error(`Company ${job.company_id} has queued jobs; the move will retry`);
+  }
+}
@@ -0,0 +1,106 @@
+// ============================================================================
+// Scheduled Maintenance
+// Runs registered tasks from the scheduled() handler, each within its own
+// time budget, resuming from the cursor the previous run left behind
+// ============================================================================
+
+import type { Env, MaintenanceRun } from '../types';
+import { getTaskState, saveTaskState, recordMaintenanceRun } from '../db/maintenance';
+
+export interface MaintenanceContext {
+  db: D1Database;
+  env: Env;
+  cursor: string | null;
+  deadline: number;
+}
+
+export interface MaintenanceTaskResult {
+  processed: number;
+  // Where the next run should pick up; null once the task has caught up
+  cursor: string | null;
+}
+
+export interface MaintenanceTask {
+  name: string;
+  budgetMs: number;
+  // Minimum gap between runs once the task has caught up
+  intervalSeconds: number;
+  run(ctx: MaintenanceContext): Promise<MaintenanceTaskResult>;
+}
+
+const tasks: MaintenanceTask[] = [];
+
+export function registerTask(task: MaintenanceTask): void {
+  if (tasks.some((existing) => existing.name === task.name)) {
+    throw new Error(`Maintenance task ${task.name} is already registered`);
+  }
+  tasks.push(task);
+}
+
+export function getRegisteredTasks(): readonly MaintenanceTask[] {
+  return tasks;
+}
+
+// Runs due tasks in registration order; tasks that do not fit in the overall
+// budget are left for the next cron tick. Returns the runs it recorded.
+export async function runMaintenance(env: Env, budgetMs: number): Promise<MaintenanceRun[]> {
+  const deadline = Date.now() + budgetMs;
+  const runs: MaintenanceRun[] = [];
+
+  for (const task of tasks) {
+    if (Date.now() >= deadline) {
+      break;
+    }
+
+    const state = await getTaskState(env.DB, task.name);
+    if (!isDue(task, state?.cursor ?? null, state?.last_run_at ?? null)) {
+      continue;
+    }
+
+    const startedAt = new Date().toISOString();
+    const taskDeadline = Math.min(Date.now() + task.budgetMs, deadline);
+    const cursor = state?.cursor ?? null;
+
+    let run: Omit<MaintenanceRun, 'id'>;
+    try {
+      const result = await task.run({ db: env.DB, env, cursor, deadline: taskDeadline });
+      await saveTaskState(env.DB, task.name, result.cursor, startedAt);
+      run = {
+        task: task.name,
+        status: result.cursor === null ? 'completed' : 'partial',
+        processed: result.processed,
+        error: null,
+        started_at: startedAt,
+        finished_at: new Date().toISOString(),
+      };
+    } catch (error) {
+      // Keep the previous cursor so the next run retries the same page
+      console.error(`Maintenance task ${task.name} failed:`, error);
+      await saveTaskState(env.DB, task.name, cursor, startedAt);
+      run = {
+        task: task.name,
+        status: 'failed',
+        processed: 0,
+        error: error instanceof Error ? error.message : String(error),
+        started_at: startedAt,
+        finished_at: new Date().toISOString(),
+      };
+    }
+
+    // An idle pass (e.g. background-jobs with an empty queue every tick) is
+    // not worth a history row; saveTaskState above already tracks it
+    if (run.processed > 0 || run.status !== 'completed') {
+      runs.push(await recordMaintenanceRun(env.DB, run));
+    }
+  }
+
+  return runs;
+}
+
+function isDue(task: MaintenanceTask, cursor: string | null, lastRunAt: string | null): boolean {
+  // A task with a cursor is mid-way through and always continues
+  if (cursor !== null || lastRunAt === null) {
+    return true;
+  }
+  return Date.now() - new Date(lastRunAt).getTime() >= task.intervalSeconds * 1000;
+}
@@ -0,0 +1,249 @@
+// ============================================================================
+// Maintenance Task Registry
+// ============================================================================
+
+import { registerTask } from './index';
+import { processJobs } from '../jobs';
+import { deleteExpiredIdempotencyKeys } from '../db/idempotency';
+import { deleteMaintenanceRunsBefore } from '../db/maintenance';
+import { refreshCompanyStats } from '../db/stats';
+import { hasTenantMoves, listCompanyPlacements, listUsersPage } from '../db/shards';
+import { getShard, getShards, isSharded, replicateCompanies, replicateUsers } from '../sharding';
+import {
+  archiveCutoff,
+  archiveNextSegment,
+  indexNextSegment,
+  purgeOrphanedSegments,
+} from '../archive/audit-archive';
+
+const IDEMPOTENCY_DELETE_CHUNK = 500;
+const STATS_PAGE_SIZE = 50;
+const ARCHIVE_PURGE_CHUNK = 50;
+const REPLICATION_PAGE_SIZE = 100;
+const MAINTENANCE_RUN_DELETE_CHUNK = 500;
+const MAINTENANCE_RUN_RETENTION_DAYS = 30;
+
+// Queued jobs (e.g. company deletion) run every tick, each shard draining
+// its own jobs table with an equal share of what is left of the budget
+registerTask({
+  name: 'background-jobs',
+  budgetMs: 15_000,
+  intervalSeconds: 0,
+  async run({ env, deadline }) {
+    const shards = getShards(env);
+    let processed = 0;
+
+    for (let i = 0; i < shards.length; i++) {
+      const share = Math.max(deadline - Date.now(), 0) / (shards.length - i);
+      processed += await processJobs(shards[i].db, env, share);
+    }
+
+    return { processed, cursor: null };
+  },
+});
+
+registerTask({
+  name: 'expire-idempotency-keys',
+  budgetMs: 2_000,
+  intervalSeconds: 60 * 60,
+  async run({ db, deadline }) {
+    let processed = 0;
+
+    while (Date.now() < deadline) {
+      const deleted = await deleteExpiredIdempotencyKeys(db, IDEMPOTENCY_DELETE_CHUNK);
+      processed += deleted;
+      if (deleted < IDEMPOTENCY_DELETE_CHUNK) {
+        return { processed, cursor: null };
+      }
+    }
+
+    // Out of time with rows left; the non-null cursor keeps the task due
+    return { processed, cursor: 'pending' };
+  },
+});
+
+// Run history older than the retention window is dropped
+registerTask({
+  name: 'prune-maintenance-runs',
+  budgetMs: 2_000,
+  intervalSeconds: 24 * 60 * 60,
+  async run({ db, deadline }) {
+    const before = new Date(
+      Date.now() - MAINTENANCE_RUN_RETENTION_DAYS * 24 * 60 * 60 * 1000
+    ).toISOString();
+    let processed = 0;
+
+    while (Date.now() < deadline) {
+      const deleted = await deleteMaintenanceRunsBefore(db, before, MAINTENANCE_RUN_DELETE_CHUNK);
+      processed += deleted;
+      if (deleted < MAINTENANCE_RUN_DELETE_CHUNK) {
+        return { processed, cursor: null };
+      }
+    }
+
+    return { processed, cursor: 'pending' };
+  },
+});
+
+// Walks companies in id order, resuming after the last page; each company's
+// counters are computed on the shard that holds it
+registerTask({
+  name: 'refresh-company-stats',
+  budgetMs: 5_000,
+  intervalSeconds: 15 * 60,
+  async run({ db, env, cursor, deadline }) {
+    let afterId = cursor ?? '';
+    let processed = 0;
+
+    while (Date.now() < deadline) {
+      const page = await listCompanyPlacements(db, afterId, STATS_PAGE_SIZE);
+
+      for (const [shardName, ids] of groupByShard(page)) {
+        const shard = getShard(env, shardName);
+        if (shard) {
+          processed += await refreshCompanyStats(shard.db, ids);
+        }
+      }
+
+      if (page.length < STATS_PAGE_SIZE) {
+        return { processed, cursor: null };
+      }
+      afterId = page[page.length - 1].id;
+    }
+
+    return { processed, cursor: afterId };
+  },
+});
+
+// Moves audit rows older than AUDIT_ARCHIVE_AFTER_DAYS to R2 segments.
+// Paused while a tenant move runs, since the move copies audit rows too.
+registerTask({
+  name: 'archive-audit-logs',
+  budgetMs: 10_000,
+  intervalSeconds: 60 * 60,
+  async run({ db, env, deadline }) {
+    if (!env.AUDIT_ARCHIVE) {
+      return { processed: 0, cursor: null };
+    }
+    if (isSharded(env) && (await hasTenantMoves(db))) {
+      return { processed: 0, cursor: 'pending' };
+    }
+
+    const cutoff = archiveCutoff(env.AUDIT_ARCHIVE_AFTER_DAYS);
+    let processed = 0;
+
+    for (const shard of getShards(env)) {
+      // Segments archived before the index existed are indexed first
+      while (true) {
+        if (Date.now() >= deadline) {
+          return { processed, cursor: 'pending' };
+        }
+        if (!(await indexNextSegment(shard.db, env.AUDIT_ARCHIVE))) {
+          break;
+        }
+      }
+
+      while (true) {
+        if (Date.now() >= deadline) {
+          return { processed, cursor: 'pending' };
+        }
+        const archived = await archiveNextSegment(shard.db, env.AUDIT_ARCHIVE, cutoff);
+        if (archived === 0) {
+          break;
+        }
+        processed += archived;
+      }
+    }
+
+    return { processed, cursor: null };
+  },
+});
+
+// Deleted companies leave their archived segments behind
+registerTask({
+  name: 'purge-audit-archive',
+  budgetMs: 2_000,
+  intervalSeconds: 24 * 60 * 60,
+  async run({ db, env, deadline }) {
+    if (!env.AUDIT_ARCHIVE) {
+      return { processed: 0, cursor: null };
+    }
+
+    let processed = 0;
+
+    for (const shard of getShards(env)) {
+      while (true) {
+        if (Date.now() >= deadline) {
+          return { processed, cursor: 'pending' };
+        }
+        const purged = await purgeOrphanedSegments(shard.db, env.AUDIT_ARCHIVE, ARCHIVE_PURGE_CHUNK);
+        processed += purged;
+        if (purged < ARCHIVE_PURGE_CHUNK) {
+          break;
+        }
+      }
+    }
+
+    return { processed, cursor: null };
+  },
+});
+
+// Re-pushes companies (from the shard holding each) and then users (from
+// DB) to every other shard, repairing copies a failed push left stale.
+// Cursor: "companies:<after id>" or "users:<after id>".
+registerTask({
+  name: 'replicate-reference-rows',
+  budgetMs: 5_000,
+  intervalSeconds: 60 * 60,
+  async run({ db, env, cursor, deadline }) {
+    if (!isSharded(env)) {
+      return { processed: 0, cursor: null };
+    }
+
+    let [table, afterId] = cursor ? splitCursor(cursor) : ['companies', ''];
+    let processed = 0;
+
+    while (Date.now() < deadline) {
+      if (table === 'companies') {
+        const page = await listCompanyPlacements(db, afterId, REPLICATION_PAGE_SIZE);
+        for (const [shardName, ids] of groupByShard(page)) {
+          const shard = getShard(env, shardName);
+          if (shard) {
+            await replicateCompanies(env, shard.db, ids);
+          }
+        }
+        processed += page.length;
+
+        if (page.length < REPLICATION_PAGE_SIZE) {
+          [table, afterId] = ['users', ''];
+        } else {
+          afterId = page[page.length - 1].id;
+        }
+      } else {
+        const page = await listUsersPage(db, afterId, REPLICATION_PAGE_SIZE);
+        await replicateUsers(env, page.map((user) => user.id));
+        processed += page.length;
+
+        if (page.length < REPLICATION_PAGE_SIZE) {
+          return { processed, cursor: null };
+        }
+        afterId = page[page.length - 1].id;
+      }
+    }
+
+    return { processed, cursor: `${table}:${afterId}` };
+  },
+});
+
+function splitCursor(cursor: string): [string, string] {
+  const separator = cursor.indexOf(':');
+  return [cursor.slice(0, separator), cursor.slice(separator + 1)];
+}
+
+function groupByShard(placements: { id: string; shard: string }[]): Map<string, string[]> {
+  const groups = new Map<string, string[]>();
+  for (const { id, shard } of placements) {
+    groups.set(shard, [...(groups.get(shard) || []), id]);
+  }
+  return groups;
+}
@@ -0,0 +1,75 @@
+// ============================================================================
+// Deferred Audit Flushing
+// Writes buffered audit logs after the response, falling back to a retry
+// queue (or the in-isolate buffer when no queue is bound) on failure.
+// Rows that can never be written are quarantined rather than retried.
+// ============================================================================
+
+import type { Env, AuditLog } from '../types';
+import {
+  insertAuditLogsIsolated,
+  stampAuditLogs,
+  takeBufferedAuditLogs,
+  restoreBufferedAuditLogs,
+  publishAuditLogs,
+} from '../db/audit';
+
+// Keeps each queue message well under the 128 KB message limit
+const LOGS_PER_MESSAGE = 50;
+
+export async function flushAuditLogs(env: Env): Promise<void> {
+  const buffered = takeBufferedAuditLogs();
+  if (buffered.length === 0) {
+    return;
+  }
+
+  const logs = stampAuditLogs(buffered);
+  let stored: AuditLog[];
+  try {
+    stored = await insertAuditLogsIsolated(env.DB, logs);
+  } catch (error) {
+    console.error(`Failed to flush ${logs.length} audit log(s):`, error);
+    await enqueueAuditLogs(env, logs);
+    return;
+  }
+
+  publishAuditLogs(stored);
+}
+
+async function enqueueAuditLogs(env: Env, logs: AuditLog[]): Promise<void> {
+  if (!env.AUDIT_QUEUE) {
+    restoreBufferedAuditLogs(logs);
+    return;
+  }
+
+  const messages: MessageSendRequest<AuditLog[]>[] = [];
+  for (let i = 0; i < logs.length; i += LOGS_PER_MESSAGE) {
+    messages.push({ body: logs.slice(i, i + LOGS_PER_MESSAGE) });
+  }
+
+  try {
+    await env.AUDIT_QUEUE.sendBatch(messages);
+  } catch (error) {
+    console.error('Failed to enqueue audit logs for retry:', error);
+    restoreBufferedAuditLogs(logs);
+  }
+}
+
+// Queue consumer; failed messages are redelivered by the Queues runtime
+export async function handleAuditRetryBatch(
+  batch: MessageBatch<AuditLog[]>,
+  env: Env
+): Promise<void> {
+  for (const message of batch.messages) {
+    try {
+      // ingested_at is re-stamped on every attempt, since the rows reach D1
+      // now; created_at keeps the time of the change
+      const stored = await insertAuditLogsIsolated(env.DB, stampAuditLogs(message.body));
+      publishAuditLogs(stored);
+      message.ack();
+    } catch (error) {
+      console.error(`Failed to write queued audit logs (attempt ${message.attempts}):`, error);
+      message.retry();
+    }
+  }
+}
@@ -0,0 +1,188 @@
+// ============================================================================
+// Per-Tenant Rate Limiting
+// Token buckets keyed by tenant and route class, plus a cap on each tenant's
+// in-flight requests. Buckets are checked in this isolate first and, when the
+// RATE_LIMITER Durable Object is bound, in the tenant's hub as well. Hub
+// tokens are leased a few at a time, so most requests skip the round trip.
+// ============================================================================
+
+import type { Env, RequestContext, RateLimitMode } from '../types';
+import { TokenBuckets, type BucketPolicy, type BucketDecision } from '../utils/token-bucket';
+import { takeTenantToken } from '../durable-objects/rate-limiter';
+import { isJwtAuthEnabled } from '../auth/jwt';
+import { TtlCache } from '../utils/cache';
+import { tooManyRequestsResponse } from '../utils/response';
+
+type RouteClass = 'default' | 'bulk' | 'export';
+
+// Bulk writes and export-style reads get their own, smaller budgets so they
+// cannot starve a tenant's ordinary traffic
+const ROUTE_CLASS_POLICIES: Record<RouteClass, BucketPolicy> = {
+  default: { ratePerSecond: 20, burst: 60 },
+  bulk: { ratePerSecond: 0.5, burst: 5 },
+  export: { ratePerSecond: 2, burst: 10 },
+};
+
+// Requests one tenant may have running at once in a single isolate
+const MAX_IN_FLIGHT_PER_TENANT = 16;
+const SHED_RETRY_AFTER_SECONDS = 1;
+
+// Hub tokens this isolate may hold at once: a tenth of the burst, so the
+// isolates together can overshoot the shared budget by little. Unused tokens
+// lapse after a second rather than carrying old budget forward.
+const LEASE_BURST_FRACTION = 0.1;
+const LEASE_TTL_MS = 1_000;
+
+// Every policy refills completely well within a minute
+const localBuckets = new TokenBuckets(10_000, 60_000);
+const leases = new TtlCache<string, { tokens: number }>(10_000, LEASE_TTL_MS);
+const inFlight = new Map<string, number>();
+
+export type Admission =
+  | { admitted: true; release: () => void }
+  | { admitted: false; response: Response };
+
+const ADMITTED: Admission = { admitted: true, release: () => {} };
+
+export function getRateLimitMode(env: Env): RateLimitMode {
+  return env.RATE_LIMIT_MODE === 'enforce' ? 'enforce' : 'off';
+}
+
+// Runs after authentication and authorization, so the tenant is the company
+// they settled on. The caller must invoke release() once the response is ready.
+export async function admitRequest(
+  request: Request,
+  url: URL,
+  env: Env,
+  ctx: RequestContext
+): Promise<Admission> {
+  if (getRateLimitMode(env) === 'off') {
+    return ADMITTED;
+  }
+
+  const pathParts = url.pathname.split('/').filter(Boolean);
+  const tenant = tenantKey(request, env, ctx);
+  const routeClass = classifyRoute(request.method, pathParts);
+  const policy = ROUTE_CLASS_POLICIES[routeClass];
+
+  // This isolate's share of the traffic can only undercount the tenant's
+  // total, so a local denial never needs the hub
+  let decision = localBuckets.take(`${tenant}|${routeClass}`, policy);
+  if (decision.allowed && env.RATE_LIMITER) {
+    decision = await takeFromHub(env.RATE_LIMITER, tenant, routeClass, policy, decision);
+  }
+
+  if (!decision.allowed) {
+    return {
+      admitted: false,
+      response: tooManyRequestsResponse(
+        Math.ceil(decision.retryAfterMs / 1000),
+        `Rate limit exceeded for ${routeClass} requests`
+      ),
+    };
+  }
+
+  // Change streams stay open indefinitely and do no work while idle
+  if (pathParts[0] === 'changes') {
+    return ADMITTED;
+  }
+
+  const running = inFlight.get(tenant) || 0;
+  if (running >= MAX_IN_FLIGHT_PER_TENANT) {
+    return {
+      admitted: false,
+      response: tooManyRequestsResponse(
+        SHED_RETRY_AFTER_SECONDS,
+        'Too many concurrent requests for this tenant'
+      ),
+    };
+  }
+
+  inFlight.set(tenant, running + 1);
+  let released = false;
+
+  return {
+    admitted: true,
+    release: () => {
+      if (released) {
+        return;
+      }
+      released = true;
+      const remaining = (inFlight.get(tenant) || 1) - 1;
+      if (remaining > 0) {
+        inFlight.set(tenant, remaining);
+      } else {
+        inFlight.delete(tenant);
+      }
+    },
+  };
+}
+
+// Spends a token leased earlier when there is one; otherwise asks the hub,
+// leasing the extra tokens it grants. A hub that cannot be reached falls back
+// to the local decision rather than failing the request.
+async function takeFromHub(
+  namespace: DurableObjectNamespace,
+  tenant: string,
+  routeClass: RouteClass,
+  policy: BucketPolicy,
+  localDecision: BucketDecision
+): Promise<BucketDecision> {
+  const leaseKey = `${tenant}|${routeClass}`;
+  const lease = leases.get(leaseKey);
+  if (lease && lease.tokens > 0) {
+    lease.tokens--;
+    return localDecision;
+  }
+
+  const leaseSize = Math.max(1, Math.floor(policy.burst * LEASE_BURST_FRACTION));
+  try {
+    const decision = await takeTenantToken(namespace, tenant, routeClass, policy, leaseSize);
+    if (decision.allowed && decision.granted > 1) {
+      leases.set(leaseKey, { tokens: decision.granted - 1 });
+    }
+    return decision;
+  } catch (error) {
+    console.error('Rate limiter hub unavailable, using local buckets:', error);
+    return localDecision;
+  }
+}
+
+// Only identities that were verified key a bucket: the company once
+// authorization has checked the caller's role in it, else a bearer token's
+// subject, else the client address. Unverified headers and query parameters
+// would let a client spend another tenant's budget, or dodge its own with a
+// fresh id per request.
+function tenantKey(request: Request, env: Env, ctx: RequestContext): string {
+  if (ctx.companyId && ctx.role) {
+    return `company:${ctx.companyId}`;
+  }
+  if (ctx.userId && isJwtAuthEnabled(env)) {
+    return `user:${ctx.userId}`;
+  }
+  return `ip:${request.headers.get('CF-Connecting-IP') || 'unknown'}`;
+}
+
+// Bulk: the multi-row write endpoints. Export: reads that walk a tenant's
+// history or full data set (sync pulls and audit logs, which may read R2).
+function classifyRoute(method: string, pathParts: string[]): RouteClass {
+  if (method === 'POST') {
+    if (pathParts[0] === 'assets' && pathParts[1] === 'bulk-update') {
+      return 'bulk';
+    }
+    if (pathParts[0] === 'companies' && pathParts[2]?.startsWith('users:')) {
+      return 'bulk';
+    }
+  }
+
+  if (method === 'GET') {
+    if (pathParts[0] === 'sync' || pathParts[0] === 'audit-logs') {
+      return 'export';
+    }
+    if (pathParts[pathParts.length - 1] === 'audit-logs') {
+      return 'export';
+    }
+  }
+
+  return 'default';
+}
@@ -11,22 +11,50 @@ import {
   badRequestResponse,
   methodNotAllowedResponse,
   internalErrorResponse,
+  preconditionFailedResponse,
+  tenantMovingResponse,
+  withETag,
 } from '../utils/response';
 import {
   validateCreateAsset,
   validateUpdateAsset,
   validateUUID,
+  validateOptionalUUID,
+  parseIfMatch,
+  parseMetaFilters,
+  validateBulkUpdateAssets,
   asCreateAssetRequest,
   asUpdateAssetRequest,
+  asBulkUpdateAssetsRequest,
 } from '../utils/validation';
 import {
   createAsset,
   getAssetById,
+  getAssetCompanyId,
   getAllAssets,
   updateAsset,
   deleteAsset,
+  searchAssets,
+  buildAssetSearchQuery,
+  getAssetsByIdentifiers,
+  bulkUpdateAssets,
+  BULK_UPDATE_MAX_ASSETS,
 } from '../db/assets';
-import { companyExists } from '../db/companies';
+import { checkPreconditions } from '../db/preconditions';
+import { getPromotedAttributes, getPromotedAttributesForAsset } from '../db/attributes';
+import { encodeSearchCursor, decodeSearchCursor } from '../utils/cursor';
+import { isUniqueViolation } from '../utils/db-errors';
+import {
+  FanOutOffsetError,
+  TenantMovingError,
+  type PageWindow,
+  fanOutPage,
+  resolveDb,
+  resolveDbForEntity,
+  resolveWritableDb,
+} from '../sharding';
+
+const MAX_IDENTIFIERS_PER_LOOKUP = 100;
 
 export async function handleAssetsRoutes(
   request: Request,
@@ -49,18 +77,54 @@ export async function handleAssetsRoutes(
     return methodNotAllowedResponse(['GET', 'POST']);
   }
 
+  // GET /assets/search?q=&company_id= - Full-text search within a company
+  if (pathParts.length === 2 && pathParts[0] === 'assets' && pathParts[1] === 'search') {
+    if (method === 'GET') {
+      return handleSearchAssets(url, env);
+    }
+    return methodNotAllowedResponse(['GET']);
+  }
+
+  // POST /assets/bulk-update - Apply one status/assignment patch to many assets
+  if (pathParts.length === 2 && pathParts[0] === 'assets' && pathParts[1] === 'bulk-update') {
+    if (method === 'POST') {
+      return handleBulkUpdateAssets(request, env, ctx);
+    }
+    return methodNotAllowedResponse(['POST']);
+  }
+
+  // GET /assets/by-identifier?company_id=&identifier= - Batch identifier lookup
+  if (pathParts.length === 2 && pathParts[0] === 'assets' && pathParts[1] === 'by-identifier') {
+    if (method === 'GET') {
+      return handleLookupIdentifiers(url.searchParams.getAll('identifier'), url, env, true);
+    }
+    return methodNotAllowedResponse(['GET']);
+  }
+
+  // GET /assets/by-identifier/:identifier?company_id= - Single identifier lookup
+  if (pathParts.length === 3 && pathParts[0] === 'assets' && pathParts[1] === 'by-identifier') {
+    if (method === 'GET') {
+      return handleLookupIdentifiers([decodeURIComponent(pathParts[2])], url, env, false);
+    }
+    return methodNotAllowedResponse(['GET']);
+  }
+
+  // GET /assets/:id - Get asset by ID
   // PATCH /assets/:id - Update asset
   // DELETE /assets/:id - Delete asset
   if (pathParts.length === 2 && pathParts[0] === 'assets') {
     const assetId = pathParts[1];
 
+    if (method === 'GET') {
+      return handleGetAsset(assetId, env);
+    }
     if (method === 'PATCH') {
       return handleUpdateAsset(assetId, request, env, ctx);
     }
     if (method === 'DELETE') {
       return handleDeleteAsset(assetId, env, ctx);
     }
-    return methodNotAllowedResponse(['PATCH', 'DELETE']);
+    return methodNotAllowedResponse(['GET', 'PATCH', 'DELETE']);
   }
 
   return notFoundResponse('Route');
@@ -73,22 +137,157 @@ async function handleListAssets(url: URL, env: Env): Promise<Response> {
     const company_id = url.searchParams.get('company_id') || undefined;
     const type = url.searchParams.get('type') || undefined;
     const status = url.searchParams.get('status') || undefined;
+    const assigned_to = url.searchParams.get('assigned_to') || undefined;
 
-    const { assets, total } = await getAllAssets(env.DB, {
-      limit,
-      offset,
-      company_id,
-      type,
-      status,
-    });
+    const assigneeValidation = validateOptionalUUID(assigned_to || null, 'assigned_to');
+    if (!assigneeValidation.valid) {
+      return validationErrorResponse(assigneeValidation.errors);
+    }
+
+    const db = company_id ? await resolveDb(env, company_id) : env.DB;
+
+    let attributes: { key: string; value: string | number }[] = [];
+    const hasMetaFilters = [...url.searchParams.keys()].some((name) => name.startsWith('meta.'));
+    if (hasMetaFilters) {
+      // Promoted attributes are per company, so meta filters need one
+      if (!company_id) {
+        return badRequestResponse('company_id query parameter is required for meta filters');
+      }
+      const parsed = parseMetaFilters(url.searchParams, await getPromotedAttributes(db, company_id));
+      if (Object.keys(parsed.errors).length > 0) {
+        return validationErrorResponse(parsed.errors);
+      }
+      attributes = parsed.filters;
+    }
+
+    const listPage = async (shardDb: D1Database, window: PageWindow) => {
+      const page = await getAllAssets(shardDb, {
+        ...window,
+        company_id,
+        type,
+        status,
+        assigned_to,
+        attributes,
+      });
+      return { rows: page.assets, total: page.total };
+    };
+
+    // One company's assets are on its shard; an unscoped list spans them all
+    const { rows: assets, total } = company_id
+      ? await listPage(db, { limit, offset })
+      : await fanOutPage(env, { limit, offset }, listPage);
 
     return jsonResponse(assets, 200, { total, limit, page: Math.floor(offset / limit) + 1 });
   } catch (error) {
+    if (error instanceof FanOutOffsetError) {
+      return validationErrorResponse({ offset: [error.message] });
+    }
     console.error('Error listing assets:', error);
     return internalErrorResponse('Failed to list assets');
   }
 }
 
+async function handleSearchAssets(url: URL, env: Env): Promise<Response> {
+  try {
+    const companyId = url.searchParams.get('company_id');
+
+    if (!companyId) {
+      return badRequestResponse('company_id query parameter is required');
+    }
+
+    const idValidation = validateUUID(companyId, 'company_id');
+    if (!idValidation.valid) {
+      return validationErrorResponse(idValidation.errors);
+    }
+
+    const query = buildAssetSearchQuery(url.searchParams.get('q') || '', companyId);
+    if (!query) {
+      return validationErrorResponse({ q: ['q must contain at least one letter or digit'] });
+    }
+
+    const cursorParam = url.searchParams.get('cursor');
+    const after = cursorParam ? decodeSearchCursor(cursorParam) : null;
+    if (cursorParam && !after) {
+      return validationErrorResponse({ cursor: ['cursor must be a cursor returned by /assets/search'] });
+    }
+
+    const db = await resolveDb(env, companyId);
+    const preconditions = await checkPreconditions(db, { companyId });
+    if (!preconditions.company) {
+      return notFoundResponse('Company');
+    }
+
+    const limit = Math.min(parseInt(url.searchParams.get('limit') || '20'), 100);
+
+    const result = await searchAssets(db, companyId, query, {
+      limit,
+      after: after || undefined,
+    });
+
+    return jsonResponse({
+      assets: result.assets,
+      cursor: result.cursor ? encodeSearchCursor(result.cursor) : null,
+      has_more: result.has_more,
+    });
+  } catch (error) {
+    console.error('Error searching assets:', error);
+    return internalErrorResponse('Failed to search assets');
+  }
+}
+
+async function handleLookupIdentifiers(
+  identifiers: string[],
+  url: URL,
+  env: Env,
+  batch: boolean
+): Promise<Response> {
+  try {
+    const companyId = url.searchParams.get('company_id');
+
+    if (!companyId) {
+      return badRequestResponse('company_id query parameter is required');
+    }
+
+    const idValidation = validateUUID(companyId, 'company_id');
+    if (!idValidation.valid) {
+      return validationErrorResponse(idValidation.errors);
+    }
+
+    if (identifiers.length === 0 || identifiers.some((identifier) => identifier === '')) {
+      return validationErrorResponse({ identifier: ['At least one non-empty identifier is required'] });
+    }
+    if (identifiers.length > MAX_IDENTIFIERS_PER_LOOKUP) {
+      return validationErrorResponse({
+        identifier: [`At most ${MAX_IDENTIFIERS_PER_LOOKUP} identifiers can be looked up at once`],
+      });
+    }
+
+    const db = await resolveDb(env, companyId);
+    const preconditions = await checkPreconditions(db, { companyId });
+    if (!preconditions.company) {
+      return notFoundResponse('Company');
+    }
+
+    const found = await getAssetsByIdentifiers(db, companyId, identifiers);
+
+    if (!batch) {
+      const asset = found.get(identifiers[0]);
+      if (!asset) {
+        return notFoundResponse('Asset');
+      }
+      return withETag(jsonResponse(asset), asset.version);
+    }
+
+    return jsonResponse({
+      assets: [...found.values()],
+      missing: [...new Set(identifiers)].filter((identifier) => !found.has(identifier)),
+    });
+  } catch (error) {
+    console.error('Error looking up asset identifiers:', error);
+    return internalErrorResponse('Failed to look up asset identifiers');
+  }
+}
+
 async function handleCreateAsset(
   request: Request,
   env: Env,
@@ -102,27 +301,114 @@ async function handleCreateAsset(
       return badRequestResponse('Invalid JSON body');
     }
 
-    const validation = validateCreateAsset(body);
+    // Typed promoted keys of the target company are checked with the body
+    const companyId = (body as Record<string, unknown> | null)?.company_id;
+    const promoted =
+      typeof companyId === 'string' && validateUUID(companyId, 'company_id').valid
+        ? await getPromotedAttributes(await resolveDb(env, companyId), companyId)
+        : [];
+
+    const validation = validateCreateAsset(body, promoted);
     if (!validation.valid) {
       return validationErrorResponse(validation.errors);
     }
 
     const data = asCreateAssetRequest(body);
 
-    const companyExistsResult = await companyExists(env.DB, data.company_id);
-    if (!companyExistsResult) {
+    const db = await resolveWritableDb(env, data.company_id);
+    const preconditions = await checkPreconditions(db, {
+      companyId: data.company_id,
+      userId: data.assigned_to || undefined,
+    });
+    if (!preconditions.company) {
       return badRequestResponse('Company does not exist');
     }
+    if (!preconditions.user) {
+      return badRequestResponse('Assigned user does not exist');
+    }
 
-    const asset = await createAsset(env.DB, data, ctx.userId);
+    const asset = await createAsset(db, data, ctx.userId);
 
-    return createdResponse(asset);
+    return withETag(createdResponse(asset), asset.version);
   } catch (error) {
+    if (error instanceof TenantMovingError) {
+      return tenantMovingResponse();
+    }
+    if (isUniqueViolation(error, 'assets.identifier')) {
+      return badRequestResponse('An asset with this identifier already exists in this company');
+    }
     console.error('Error creating asset:', error);
     return internalErrorResponse('Failed to create asset');
   }
 }
 
+async function handleBulkUpdateAssets(
+  request: Request,
+  env: Env,
+  ctx: RequestContext
+): Promise<Response> {
+  try {
+    let body: unknown;
+    try {
+      body = await request.json();
+    } catch {
+      return badRequestResponse('Invalid JSON body');
+    }
+
+    const validation = validateBulkUpdateAssets(body, BULK_UPDATE_MAX_ASSETS);
+    if (!validation.valid) {
+      return validationErrorResponse(validation.errors);
+    }
+
+    const data = asBulkUpdateAssetsRequest(body);
+
+    const db = await resolveWritableDb(env, data.company_id);
+    const preconditions = await checkPreconditions(db, {
+      companyId: data.company_id,
+      userId: data.patch.assigned_to || undefined,
+    });
+    if (!preconditions.company) {
+      return notFoundResponse('Company');
+    }
+    if (!preconditions.user) {
+      return badRequestResponse('Assigned user does not exist');
+    }
+
+    const result = await bulkUpdateAssets(db, data, ctx.userId);
+    if (!result.success || !result.result) {
+      return badRequestResponse(result.error || 'Failed to update assets');
+    }
+
+    return jsonResponse(result.result);
+  } catch (error) {
+    if (error instanceof TenantMovingError) {
+      return tenantMovingResponse();
+    }
+    console.error('Error bulk updating assets:', error);
+    return internalErrorResponse('Failed to update assets');
+  }
+}
+
+async function handleGetAsset(assetId: string, env: Env): Promise<Response> {
+  try {
+    const validation = validateUUID(assetId, 'id');
+    if (!validation.valid) {
+      return validationErrorResponse(validation.errors);
+    }
+
+    const db = await resolveDbForEntity(env, (shardDb) => getAssetCompanyId(shardDb, assetId));
+    const asset = await getAssetById(db, assetId);
+    if (!asset) {
+      return notFoundResponse('Asset');
+    }
+
+    return withETag(jsonResponse(asset), asset.version);
+  } catch (error) {
+    console.error('Error getting asset:', error);
+    return internalErrorResponse('Failed to get asset');
+  }
+}
+
 async function handleDeleteAsset(
   assetId: string,
   env: Env,
@@ -134,7 +420,10 @@ async function handleDeleteAsset(
       return validationErrorResponse(idValidation.errors);
     }
 
-    const result = await deleteAsset(env.DB, assetId, ctx.userId);
+    const db = await resolveDbForEntity(env, (shardDb) => getAssetCompanyId(shardDb, assetId), {
+      writable: true,
+    });
+    const result = await deleteAsset(db, assetId, ctx.userId);
     if (!result.success) {
       if (result.error === 'Asset not found') {
         return notFoundResponse('Asset');
@@ -144,6 +433,9 @@ async function handleDeleteAsset(
 
     return jsonResponse({ success: true, message: 'Asset deleted successfully' });
   } catch (error) {
+    if (error instanceof TenantMovingError) {
+      return tenantMovingResponse();
+    }
     console.error('Error deleting asset:', error);
     return internalErrorResponse('Failed to delete asset');
   }
@@ -161,6 +453,11 @@ async function handleUpdateAsset(
       return validationErrorResponse(idValidation.errors);
     }
 
+    const ifMatch = parseIfMatch(request.headers.get('If-Match'));
+    if (!ifMatch.valid) {
+      return validationErrorResponse({ 'If-Match': ['If-Match must be an ETag returned by this API'] });
+    }
+
     let body: unknown;
     try {
       body = await request.json();
@@ -168,20 +465,44 @@ async function handleUpdateAsset(
       return badRequestResponse('Invalid JSON body');
     }
 
-    const validation = validateUpdateAsset(body);
+    const db = await resolveDbForEntity(env, (shardDb) => getAssetCompanyId(shardDb, assetId), {
+      writable: true,
+    });
+
+    const hasMetadata = (body as Record<string, unknown> | null)?.metadata !== undefined;
+    const promoted = hasMetadata ? await getPromotedAttributesForAsset(db, assetId) : [];
+    const current = promoted.length > 0 ? await getAssetById(db, assetId) : null;
+
+    const validation = validateUpdateAsset(body, promoted, current?.metadata);
     if (!validation.valid) {
       return validationErrorResponse(validation.errors);
     }
 
     const data = asUpdateAssetRequest(body);
 
-    const asset = await updateAsset(env.DB, assetId, data, ctx.userId);
-    if (!asset) {
+    const preconditions = await checkPreconditions(db, {
+      userId: data.assigned_to || undefined,
+    });
+    if (!preconditions.user) {
+      return badRequestResponse('Assigned user does not exist');
+    }
+
+    const result = await updateAsset(db, assetId, data, ctx.userId, ifMatch.version);
+    if (!result.success || !result.asset) {
+      if (result.error === 'Version mismatch') {
+        return preconditionFailedResponse();
+      }
       return notFoundResponse('Asset');
     }
 
-    return jsonResponse(asset);
+    return withETag(jsonResponse(result.asset), result.asset.version);
   } catch (error) {
+    if (error instanceof TenantMovingError) {
+      return tenantMovingResponse();
+    }
+    if (isUniqueViolation(error, 'assets.identifier')) {
+      return badRequestResponse('An asset with this identifier already exists in this company');
+    }
     console.error('Error updating asset:', error);
     return internalErrorResponse('Failed to update asset');
   }
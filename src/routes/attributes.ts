@@ -0,0 +1,174 @@
+// ============================================================================
+// Promoted Attributes API Routes
+// ============================================================================
+
+import type { Env, RequestContext } from '../types';
+import {
+  jsonResponse,
+  createdResponse,
+  acceptedResponse,
+  notFoundResponse,
+  validationErrorResponse,
+  badRequestResponse,
+  methodNotAllowedResponse,
+  internalErrorResponse,
+  tenantMovingResponse,
+} from '../utils/response';
+import {
+  validatePromoteAttribute,
+  validateUUID,
+  asPromoteAttributeRequest,
+} from '../utils/validation';
+import {
+  getPromotedAttributes,
+  promoteAttribute,
+  demoteAttribute,
+} from '../db/attributes';
+import { checkPreconditions } from '../db/preconditions';
+import { isUniqueViolation } from '../utils/db-errors';
+import { TenantMovingError, resolveDb, resolveWritableDb } from '../sharding';
+
+// Every promoted key adds an index entry per asset write
+const MAX_PROMOTED_ATTRIBUTES = 20;
+
+export async function handleAttributesRoutes(
+  request: Request,
+  url: URL,
+  env: Env,
+  ctx: RequestContext
+): Promise<Response> {
+  const method = request.method;
+  const pathParts = url.pathname.split('/').filter(Boolean);
+
+  // GET /companies/:id/attributes - List promoted metadata keys
+  // POST /companies/:id/attributes - Promote a metadata key
+  if (
+    pathParts.length === 3 &&
+    pathParts[0] === 'companies' &&
+    pathParts[2] === 'attributes'
+  ) {
+    const companyId = pathParts[1];
+
+    if (method === 'GET') {
+      return handleListAttributes(companyId, env);
+    }
+    if (method === 'POST') {
+      return handlePromoteAttribute(companyId, request, env);
+    }
+    return methodNotAllowedResponse(['GET', 'POST']);
+  }
+
+  // DELETE /companies/:id/attributes/:key - Stop indexing a metadata key
+  if (
+    pathParts.length === 4 &&
+    pathParts[0] === 'companies' &&
+    pathParts[2] === 'attributes'
+  ) {
+    if (method === 'DELETE') {
+      return handleDemoteAttribute(pathParts[1], decodeURIComponent(pathParts[3]), env);
+    }
+    return methodNotAllowedResponse(['DELETE']);
+  }
+
+  return notFoundResponse('Route');
+}
+
+async function handleListAttributes(companyId: string, env: Env): Promise<Response> {
+  try {
+    const idValidation = validateUUID(companyId, 'company_id');
+    if (!idValidation.valid) {
+      return validationErrorResponse(idValidation.errors);
+    }
+
+    const db = await resolveDb(env, companyId);
+    const preconditions = await checkPreconditions(db, { companyId });
+    if (!preconditions.company) {
+      return notFoundResponse('Company');
+    }
+
+    const attributes = await getPromotedAttributes(db, companyId);
+    return jsonResponse(attributes);
+  } catch (error) {
+    console.error('Error listing promoted attributes:', error);
+    return internalErrorResponse('Failed to list promoted attributes');
+  }
+}
+
+async function handlePromoteAttribute(
+  companyId: string,
+  request: Request,
+  env: Env
+): Promise<Response> {
+  try {
+    const idValidation = validateUUID(companyId, 'company_id');
+    if (!idValidation.valid) {
+      return validationErrorResponse(idValidation.errors);
+    }
+
+    let body: unknown;
+    try {
+      body = await request.json();
+    } catch {
+      return badRequestResponse('Invalid JSON body');
+    }
+
+    const validation = validatePromoteAttribute(body);
+    if (!validation.valid) {
+      return validationErrorResponse(validation.errors);
+    }
+
+    const data = asPromoteAttributeRequest(body);
+
+    const db = await resolveWritableDb(env, companyId);
+    const preconditions = await checkPreconditions(db, { companyId });
+    if (!preconditions.company) {
+      return notFoundResponse('Company');
+    }
+
+    const existing = await getPromotedAttributes(db, companyId);
+    if (existing.length >= MAX_PROMOTED_ATTRIBUTES) {
+      return badRequestResponse(
+        `A company can promote at most ${MAX_PROMOTED_ATTRIBUTES} metadata attributes`
+      );
+    }
+
+    const { attribute, job } = await promoteAttribute(db, companyId, data.key, data.type);
+
+    return createdResponse({ ...attribute, backfill_job_id: job?.id ?? null });
+  } catch (error) {
+    if (error instanceof TenantMovingError) {
+      return tenantMovingResponse();
+    }
+    if (isUniqueViolation(error, 'promoted_attributes.')) {
+      return badRequestResponse('This metadata attribute is already promoted');
+    }
+    console.error('Error promoting attribute:', error);
+    return internalErrorResponse('Failed to promote attribute');
+  }
+}
+
+async function handleDemoteAttribute(companyId: string, key: string, env: Env): Promise<Response> {
+  try {
+    const idValidation = validateUUID(companyId, 'company_id');
+    if (!idValidation.valid) {
+      return validationErrorResponse(idValidation.errors);
+    }
+
+    const db = await resolveWritableDb(env, companyId);
+    const result = await demoteAttribute(db, companyId, key);
+    if (!result.success || !result.job) {
+      return notFoundResponse('Attribute');
+    }
+
+    return acceptedResponse(
+      { job_id: result.job.id, status: result.job.status, message: 'Attribute removal scheduled' },
+      `/jobs/${result.job.id}`
+    );
+  } catch (error) {
+    if (error instanceof TenantMovingError) {
+      return tenantMovingResponse();
+    }
+    console.error('Error demoting attribute:', error);
+    return internalErrorResponse('Failed to demote attribute');
+  }
+}
@@ -11,9 +11,16 @@ import {
   internalErrorResponse,
   notFoundResponse,
 } from '../utils/response';
-import { validateUUID } from '../utils/validation';
+import {
+  validateUUID,
+  validateOptionalUUID,
+  validateTimeRange,
+  parseAuditLogFilters,
+} from '../utils/validation';
 import { getAuditLogsByCompany } from '../db/audit';
 import { companyExists } from '../db/companies';
+import { getArchivedAuditLogs } from '../archive/audit-archive';
+import { resolveDb } from '../sharding';
 
 export async function handleAuditLogsRoutes(
   request: Request,
@@ -48,22 +55,42 @@ async function handleListAuditLogs(url: URL, env: Env): Promise<Response> {
       return validationErrorResponse(idValidation.errors);
     }
 
-    const companyExistsResult = await companyExists(env.DB, companyId);
+    const filterErrors = {
+      ...validateOptionalUUID(url.searchParams.get('user_id'), 'user_id').errors,
+      ...validateOptionalUUID(url.searchParams.get('entity_id'), 'entity_id').errors,
+      ...validateTimeRange(url.searchParams.get('from'), url.searchParams.get('to')).errors,
+    };
+    if (Object.keys(filterErrors).length > 0) {
+      return validationErrorResponse(filterErrors);
+    }
+
+    const db = await resolveDb(env, companyId);
+    const companyExistsResult = await companyExists(db, companyId);
     if (!companyExistsResult) {
       return notFoundResponse('Company');
     }
 
     const limit = Math.min(parseInt(url.searchParams.get('limit') || '50'), 100);
     const offset = parseInt(url.searchParams.get('offset') || '0');
-    const entityType = url.searchParams.get('entity_type') as any || undefined;
-    const action = url.searchParams.get('action') as any || undefined;
+    const filters = parseAuditLogFilters(url.searchParams);
 
-    const { logs, total } = await getAuditLogsByCompany(env.DB, companyId, {
+    const { logs, total: hotTotal } = await getAuditLogsByCompany(db, companyId, {
       limit,
       offset,
-      entityType,
-      action,
+      ...filters,
     });
+    let total = hotTotal;
+
+    // Pages reaching past the rows still in D1 continue into the archive
+    if (env.AUDIT_ARCHIVE) {
+      const archived = await getArchivedAuditLogs(db, env.AUDIT_ARCHIVE, companyId, {
+        limit: limit - logs.length,
+        offset: Math.max(offset - hotTotal, 0),
+        ...filters,
+      });
+      logs.push(...archived.logs);
+      total += archived.total;
+    }
 
     return jsonResponse(logs, 200, { total, limit, page: Math.floor(offset / limit) + 1 });
   } catch (error) {
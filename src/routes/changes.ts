@@ -0,0 +1,62 @@
+// ============================================================================
+// Change Feed API Routes
+// ============================================================================
+
+import type { Env, RequestContext } from '../types';
+import {
+  notFoundResponse,
+  validationErrorResponse,
+  badRequestResponse,
+  methodNotAllowedResponse,
+  internalErrorResponse,
+} from '../utils/response';
+import { validateUUID } from '../utils/validation';
+import { companyExists } from '../db/companies';
+import { getChangeFeedStub } from '../durable-objects/change-feed';
+import { resolveDb } from '../sharding';
+
+export async function handleChangesRoutes(
+  request: Request,
+  url: URL,
+  env: Env,
+  ctx: RequestContext
+): Promise<Response> {
+  const method = request.method;
+  const pathParts = url.pathname.split('/').filter(Boolean);
+
+  // GET /changes?company_id= - Subscribe via WebSocket upgrade or SSE
+  if (pathParts.length === 1 && pathParts[0] === 'changes') {
+    if (method === 'GET') {
+      return handleSubscribe(request, url, env);
+    }
+    return methodNotAllowedResponse(['GET']);
+  }
+
+  return notFoundResponse('Route');
+}
+
+async function handleSubscribe(request: Request, url: URL, env: Env): Promise<Response> {
+  try {
+    const companyId = url.searchParams.get('company_id');
+
+    if (!companyId) {
+      return badRequestResponse('company_id query parameter is required');
+    }
+
+    const idValidation = validateUUID(companyId, 'company_id');
+    if (!idValidation.valid) {
+      return validationErrorResponse(idValidation.errors);
+    }
+
+    const db = await resolveDb(env, companyId);
+    const companyExistsResult = await companyExists(db, companyId);
+    if (!companyExistsResult) {
+      return notFoundResponse('Company');
+    }
+
+    return getChangeFeedStub(env.CHANGE_FEED, companyId).fetch(request);
+  } catch (error) {
+    console.error('Error subscribing to changes:', error);
+    return internalErrorResponse('Failed to subscribe to changes');
+  }
+}
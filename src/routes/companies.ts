@@ -6,27 +6,57 @@ import type { Env, RequestContext } from '../types';
 import {
   jsonResponse,
   createdResponse,
+  acceptedResponse,
   notFoundResponse,
   validationErrorResponse,
   badRequestResponse,
   methodNotAllowedResponse,
   internalErrorResponse,
+  preconditionFailedResponse,
+  conflictResponse,
+  tenantMovingResponse,
+  forbiddenResponse,
+  withETag,
+  withCacheControl,
 } from '../utils/response';
 import {
   validateCreateCompany,
   validateUpdateCompany,
+  validateMoveTenant,
   validateUUID,
+  parseIfMatch,
   asCreateCompanyRequest,
   asUpdateCompanyRequest,
+  asMoveTenantRequest,
 } from '../utils/validation';
 import {
   createCompany,
   getCompanyById,
-  getCompanyByName,
   getAllCompanies,
   updateCompany,
-  deleteCompany,
+  requestCompanyDeletion,
 } from '../db/companies';
+import { getCompanyStats } from '../db/stats';
+import { createJob, hasActiveJobs } from '../db/jobs';
+import { DIRECTORY_SHARD, getTenantShard } from '../db/shards';
+import { checkPreconditions } from '../db/preconditions';
+import {
+  lookupCompanies,
+  LOOKUP_MAX_LIMIT,
+  LOOKUP_MAX_QUERY_LENGTH,
+  LOOKUP_CACHE_SECONDS,
+} from '../db/lookup';
+import { isUniqueViolation, isForeignKeyViolation } from '../utils/db-errors';
+import { getAuthMode, getVisibleCompanyIds } from '../auth';
+import {
+  TenantMovingError,
+  getShard,
+  getShards,
+  replicateCompanies,
+  resolveDb,
+  resolveWritableDb,
+  withOwnerCompanyRows,
+} from '../sharding';
 
 export async function handleCompaniesRoutes(
   request: Request,
@@ -41,7 +71,7 @@ export async function handleCompaniesRoutes(
   // GET /companies - List companies
   if (pathParts.length === 1 && pathParts[0] === 'companies') {
     if (method === 'GET') {
-      return handleListCompanies(url, env);
+      return handleListCompanies(url, env, ctx);
     }
     if (method === 'POST') {
       return handleCreateCompany(request, env, ctx);
@@ -49,9 +79,17 @@ export async function handleCompaniesRoutes(
     return methodNotAllowedResponse(['GET', 'POST']);
   }
 
+  // GET /companies/lookup?q= - Typeahead prefix lookup
+  if (pathParts.length === 2 && pathParts[0] === 'companies' && pathParts[1] === 'lookup') {
+    if (method === 'GET') {
+      return handleLookupCompanies(url, env, ctx);
+    }
+    return methodNotAllowedResponse(['GET']);
+  }
+
   // GET /companies/:id - Get company by ID
   // PATCH /companies/:id - Update company
-  // DELETE /companies/:id - Delete company
+  // DELETE /companies/:id - Delete company (asynchronously)
   if (pathParts.length === 2 && pathParts[0] === 'companies') {
     const companyId = pathParts[1];
 
@@ -67,16 +105,38 @@ export async function handleCompaniesRoutes(
     return methodNotAllowedResponse(['GET', 'PATCH', 'DELETE']);
   }
 
+  // GET /companies/:id/stats - Get rolled-up company counters
+  if (pathParts.length === 3 && pathParts[0] === 'companies' && pathParts[2] === 'stats') {
+    if (method === 'GET') {
+      return handleGetCompanyStats(pathParts[1], env);
+    }
+    return methodNotAllowedResponse(['GET']);
+  }
+
+  // POST /companies/:id/move - Move the company's rows to another shard
+  if (pathParts.length === 3 && pathParts[0] === 'companies' && pathParts[2] === 'move') {
+    if (method === 'POST') {
+      return handleMoveCompany(pathParts[1], request, env, ctx);
+    }
+    return methodNotAllowedResponse(['POST']);
+  }
+
   return notFoundResponse('Route');
 }
 
-async function handleListCompanies(url: URL, env: Env): Promise<Response> {
+// Every shard holds a copy of every company row, so the list is paged on DB
+// and only the rows of tenants placed elsewhere are read from their shards.
+// With authorization enforced it lists the caller's companies only.
+async function handleListCompanies(url: URL, env: Env, ctx: RequestContext): Promise<Response> {
   try {
     const limit = Math.min(parseInt(url.searchParams.get('limit') || '50'), 100);
     const offset = parseInt(url.searchParams.get('offset') || '0');
     const status = url.searchParams.get('status') || undefined;
+    const ids = (await getVisibleCompanyIds(env, ctx)) ?? undefined;
 
-    const { companies, total } = await getAllCompanies(env.DB, { limit, offset, status });
+    const listed = await getAllCompanies(env.DB, { limit, offset, status, ids });
+    const companies = await withOwnerCompanyRows(env, listed.companies);
+    const total = listed.total;
 
     return jsonResponse(companies, 200, { total, limit, page: Math.floor(offset / limit) + 1 });
   } catch (error) {
@@ -85,6 +145,27 @@ async function handleListCompanies(url: URL, env: Env): Promise<Response> {
   }
 }
 
+async function handleLookupCompanies(url: URL, env: Env, ctx: RequestContext): Promise<Response> {
+  try {
+    const q = (url.searchParams.get('q') || '').trim();
+    if (q.length > LOOKUP_MAX_QUERY_LENGTH) {
+      return validationErrorResponse({
+        q: [`q must be ${LOOKUP_MAX_QUERY_LENGTH} characters or less`],
+      });
+    }
+
+    const limit = Math.min(parseInt(url.searchParams.get('limit') || '10'), LOOKUP_MAX_LIMIT);
+
+    const companyIds = (await getVisibleCompanyIds(env, ctx)) ?? undefined;
+    const items = await lookupCompanies(env.DB, q, limit, companyIds);
+
+    return withCacheControl(jsonResponse(items), LOOKUP_CACHE_SECONDS);
+  } catch (error) {
+    console.error('Error looking up companies:', error);
+    return internalErrorResponse('Failed to look up companies');
+  }
+}
+
 async function handleCreateCompany(
   request: Request,
   env: Env,
@@ -105,15 +186,26 @@ async function handleCreateCompany(
 
     const data = asCreateCompanyRequest(body);
 
-    const existing = await getCompanyByName(env.DB, data.name);
-    if (existing) {
-      return badRequestResponse('A company with this name already exists');
+    // The caller becomes OWNER when they have a user record; with
+    // authorization enforced a company nobody could reach is refused
+    const caller = await checkPreconditions(env.DB, { userId: ctx.userId });
+    const ownerId = ctx.userId && caller.user ? ctx.userId : undefined;
+    if (!ownerId && getAuthMode(env) === 'enforce') {
+      return forbiddenResponse('Create your user record before creating a company');
     }
 
-    const company = await createCompany(env.DB, data, ctx.userId);
+    // New companies start on DB; move them with POST /companies/:id/move
+    const company = await createCompany(env.DB, data, ctx.userId, ownerId);
+    await replicateCompanies(env, env.DB, [company.id]);
 
-    return createdResponse(company);
+    return withETag(createdResponse(company), company.version);
   } catch (error) {
+    if (isUniqueViolation(error, 'companies.name')) {
+      return badRequestResponse('A company with this name already exists');
+    }
+    if (isForeignKeyViolation(error)) {
+      return badRequestResponse('User does not exist');
+    }
     console.error('Error creating company:', error);
     return internalErrorResponse('Failed to create company');
   }
@@ -126,18 +218,44 @@ async function handleGetCompany(companyId: string, env: Env): Promise<Response>
       return validationErrorResponse(validation.errors);
     }
 
-    const company = await getCompanyById(env.DB, companyId);
+    const company = await getCompanyById(await resolveDb(env, companyId), companyId);
     if (!company) {
       return notFoundResponse('Company');
     }
 
-    return jsonResponse(company);
+    return withETag(jsonResponse(company), company.version);
   } catch (error) {
     console.error('Error getting company:', error);
     return internalErrorResponse('Failed to get company');
   }
 }
 
+async function handleGetCompanyStats(companyId: string, env: Env): Promise<Response> {
+  try {
+    const validation = validateUUID(companyId, 'id');
+    if (!validation.valid) {
+      return validationErrorResponse(validation.errors);
+    }
+
+    const db = await resolveDb(env, companyId);
+    const preconditions = await checkPreconditions(db, { companyId });
+    if (!preconditions.company) {
+      return notFoundResponse('Company');
+    }
+
+    // Stats appear once the refresh-company-stats task has reached this company
+    const stats = await getCompanyStats(db, companyId);
+    if (!stats) {
+      return notFoundResponse('Company stats');
+    }
+
+    return jsonResponse(stats);
+  } catch (error) {
+    console.error('Error getting company stats:', error);
+    return internalErrorResponse('Failed to get company stats');
+  }
+}
+
 async function handleDeleteCompany(
   companyId: string,
   env: Env,
@@ -149,16 +267,26 @@ async function handleDeleteCompany(
       return validationErrorResponse(idValidation.errors);
     }
 
-    const result = await deleteCompany(env.DB, companyId, ctx.userId);
-    if (!result.success) {
+    const db = await resolveWritableDb(env, companyId);
+    const result = await requestCompanyDeletion(db, companyId, ctx.userId);
+    if (!result.success || !result.job) {
       if (result.error === 'Company not found') {
         return notFoundResponse('Company');
       }
       return badRequestResponse(result.error || 'Failed to delete company');
     }
 
-    return jsonResponse({ success: true, message: 'Company deleted successfully' });
+    // Hides the company from the lists served by the copies elsewhere
+    await replicateCompanies(env, db, [companyId]);
+
+    return acceptedResponse(
+      { job_id: result.job.id, status: result.job.status, message: 'Company deletion scheduled' },
+      `/jobs/${result.job.id}`
+    );
   } catch (error) {
+    if (error instanceof TenantMovingError) {
+      return tenantMovingResponse();
+    }
     console.error('Error deleting company:', error);
     return internalErrorResponse('Failed to delete company');
   }
@@ -176,6 +304,11 @@ async function handleUpdateCompany(
       return validationErrorResponse(idValidation.errors);
     }
 
+    const ifMatch = parseIfMatch(request.headers.get('If-Match'));
+    if (!ifMatch.valid) {
+      return validationErrorResponse({ 'If-Match': ['If-Match must be an ETag returned by this API'] });
+    }
+
     let body: unknown;
     try {
       body = await request.json();
@@ -190,21 +323,98 @@ async function handleUpdateCompany(
 
     const data = asUpdateCompanyRequest(body);
 
-    if (data.name) {
-      const existing = await getCompanyByName(env.DB, data.name);
-      if (existing && existing.id !== companyId) {
-        return badRequestResponse('A company with this name already exists');
+    const db = await resolveWritableDb(env, companyId);
+    const result = await updateCompany(db, companyId, data, ctx.userId, ifMatch.version);
+    if (!result.success || !result.company) {
+      if (result.error === 'Version mismatch') {
+        return preconditionFailedResponse();
       }
+      return notFoundResponse('Company');
+    }
+
+    await replicateCompanies(env, db, [companyId]);
+
+    return withETag(jsonResponse(result.company), result.company.version);
+  } catch (error) {
+    if (error instanceof TenantMovingError) {
+      return tenantMovingResponse();
+    }
+    if (isUniqueViolation(error, 'companies.name')) {
+      return badRequestResponse('A company with this name already exists');
     }
+    console.error('Error updating company:', error);
+    return internalErrorResponse('Failed to update company');
+  }
+}
 
-    const company = await updateCompany(env.DB, companyId, data, ctx.userId);
+async function handleMoveCompany(
+  companyId: string,
+  request: Request,
+  env: Env,
+  ctx: RequestContext
+): Promise<Response> {
+  try {
+    const idValidation = validateUUID(companyId, 'id');
+    if (!idValidation.valid) {
+      return validationErrorResponse(idValidation.errors);
+    }
+
+    let body: unknown;
+    try {
+      body = await request.json();
+    } catch {
+      return badRequestResponse('Invalid JSON body');
+    }
+
+    const validation = validateMoveTenant(body);
+    if (!validation.valid) {
+      return validationErrorResponse(validation.errors);
+    }
+
+    const data = asMoveTenantRequest(body);
+    const target = getShard(env, data.shard);
+    if (!target) {
+      const names = getShards(env).map((shard) => shard.name);
+      return validationErrorResponse({ shard: [`Shard must be one of: ${names.join(', ')}`] });
+    }
+
+    // Read past the directory cache; the job re-checks all of this anyway
+    const placement = await getTenantShard(env.DB, companyId);
+    const source = getShard(env, placement?.shard ?? DIRECTORY_SHARD);
+    if (!source) {
+      return internalErrorResponse(`Company is placed on unknown shard ${placement?.shard}`);
+    }
+
+    const company = await getCompanyById(source.db, companyId);
     if (!company) {
       return notFoundResponse('Company');
     }
 
-    return jsonResponse(company);
+    // A fence left by a failed move can only be resumed towards its target
+    if (placement?.moving_to && placement.moving_to !== target.name) {
+      return conflictResponse(`Company is being moved to ${placement.moving_to}`);
+    }
+    if (!placement?.moving_to && source.name === target.name) {
+      return badRequestResponse(`Company already lives on ${target.name}`);
+    }
+
+    if ((await hasActiveJobs(env.DB, companyId)) || (await hasActiveJobs(source.db, companyId))) {
+      return conflictResponse('Company has queued jobs; retry once they finish');
+    }
+
+    const job = await createJob(env.DB, 'tenant_move', companyId, {
+      phase: 'prepare',
+      source: source.name,
+      target: target.name,
+      requested_by: ctx.userId || null,
+    });
+
+    return acceptedResponse(
+      { job_id: job.id, status: job.status, message: `Company move to ${target.name} scheduled` },
+      `/jobs/${job.id}`
+    );
   } catch (error) {
-    console.error('Error updating company:', error);
-    return internalErrorResponse('Failed to update company');
+    console.error('Error moving company:', error);
+    return internalErrorResponse('Failed to move company');
   }
 }
@@ -12,20 +12,30 @@ import {
   methodNotAllowedResponse,
   internalErrorResponse,
   noContentResponse,
+  tenantMovingResponse,
+  forbiddenResponse,
 } from '../utils/response';
 import {
   validateAddUserToCompany,
+  validateBulkAddUsersToCompany,
+  validateBulkRemoveUsersFromCompany,
   validateUUID,
   asAddUserToCompanyRequest,
+  asBulkAddUsersToCompanyRequest,
+  asBulkRemoveUsersFromCompanyRequest,
 } from '../utils/validation';
 import {
   addUserToCompany,
   removeUserFromCompany,
-  companyAccessExists,
   getCompanyUsers,
+  bulkAddUsersToCompany,
+  bulkRemoveUsersFromCompany,
+  BULK_MEMBERSHIP_MAX_USERS,
+  roleAtMost,
 } from '../db/company-access';
-import { companyExists } from '../db/companies';
-import { userExists } from '../db/users';
+import { checkPreconditions } from '../db/preconditions';
+import { isUniqueViolation, isForeignKeyViolation } from '../utils/db-errors';
+import { TenantMovingError, resolveDb, resolveWritableDb } from '../sharding';
 
 export async function handleCompanyAccessRoutes(
   request: Request,
@@ -54,6 +64,23 @@ export async function handleCompanyAccessRoutes(
     return methodNotAllowedResponse(['GET', 'POST']);
   }
 
+  // POST /companies/:id/users:bulk - Add or re-role many users
+  // POST /companies/:id/users:bulk-remove - Remove many users
+  if (
+    pathParts.length === 3 &&
+    pathParts[0] === 'companies' &&
+    (pathParts[2] === 'users:bulk' || pathParts[2] === 'users:bulk-remove')
+  ) {
+    const companyId = pathParts[1];
+
+    if (method === 'POST') {
+      return pathParts[2] === 'users:bulk'
+        ? handleBulkAddUsersToCompany(companyId, request, env, ctx)
+        : handleBulkRemoveUsersFromCompany(companyId, request, env, ctx);
+    }
+    return methodNotAllowedResponse(['POST']);
+  }
+
   // DELETE /companies/:id/users/:userId - Remove user from company
   if (
     pathParts.length === 4 &&
@@ -83,15 +110,16 @@ async function handleListCompanyUsers(
       return validationErrorResponse(idValidation.errors);
     }
 
-    const companyExistsResult = await companyExists(env.DB, companyId);
-    if (!companyExistsResult) {
+    const db = await resolveDb(env, companyId);
+    const preconditions = await checkPreconditions(db, { companyId });
+    if (!preconditions.company) {
       return notFoundResponse('Company');
     }
 
     const limit = Math.min(parseInt(url.searchParams.get('limit') || '50'), 100);
     const offset = parseInt(url.searchParams.get('offset') || '0');
 
-    const { access, total } = await getCompanyUsers(env.DB, companyId, { limit, offset });
+    const { access, total } = await getCompanyUsers(db, companyId, { limit, offset });
 
     return jsonResponse(access, 200, { total, limit, page: Math.floor(offset / limit) + 1 });
   } catch (error) {
@@ -126,30 +154,147 @@ async function handleAddUserToCompany(
 
     const data = asAddUserToCompanyRequest(body);
 
-    const companyExistsResult = await companyExists(env.DB, companyId);
-    if (!companyExistsResult) {
+    const db = await resolveWritableDb(env, companyId);
+    const preconditions = await checkPreconditions(db, {
+      companyId,
+      userId: data.user_id,
+    });
+    if (!preconditions.company) {
       return notFoundResponse('Company');
     }
-
-    const userExistsResult = await userExists(env.DB, data.user_id);
-    if (!userExistsResult) {
+    if (!preconditions.user) {
       return badRequestResponse('User does not exist');
     }
 
-    const accessExists = await companyAccessExists(env.DB, companyId, data.user_id);
-    if (accessExists) {
-      return badRequestResponse('User already has access to this company');
+    const role = data.role || 'MEMBER';
+    if (!roleAtMost(role, ctx.role)) {
+      return forbiddenResponse(`Granting the ${role} role requires that role`);
     }
 
-    const access = await addUserToCompany(env.DB, companyId, data, ctx.userId);
+    const access = await addUserToCompany(db, companyId, data, ctx.userId);
 
     return createdResponse(access);
   } catch (error) {
+    if (error instanceof TenantMovingError) {
+      return tenantMovingResponse();
+    }
+    if (isUniqueViolation(error, 'company_access.')) {
+      return badRequestResponse('User already has access to this company');
+    }
+    if (isForeignKeyViolation(error)) {
+      return badRequestResponse('User does not exist');
+    }
     console.error('Error adding user to company:', error);
     return internalErrorResponse('Failed to add user to company');
   }
 }
 
+async function handleBulkAddUsersToCompany(
+  companyId: string,
+  request: Request,
+  env: Env,
+  ctx: RequestContext
+): Promise<Response> {
+  try {
+    const idValidation = validateUUID(companyId, 'company_id');
+    if (!idValidation.valid) {
+      return validationErrorResponse(idValidation.errors);
+    }
+
+    let body: unknown;
+    try {
+      body = await request.json();
+    } catch {
+      return badRequestResponse('Invalid JSON body');
+    }
+
+    const validation = validateBulkAddUsersToCompany(body, BULK_MEMBERSHIP_MAX_USERS);
+    if (!validation.valid) {
+      return validationErrorResponse(validation.errors);
+    }
+
+    const data = asBulkAddUsersToCompanyRequest(body);
+
+    const db = await resolveWritableDb(env, companyId);
+    const preconditions = await checkPreconditions(db, { companyId });
+    if (!preconditions.company) {
+      return notFoundResponse('Company');
+    }
+
+    const result = await bulkAddUsersToCompany(db, companyId, data.members, ctx.userId, ctx.role);
+    if (result.forbiddenUserIds) {
+      return forbiddenResponse(
+        `Only roles up to ${ctx.role} can be granted or changed: ${result.forbiddenUserIds.join(', ')}`
+      );
+    }
+    if (!result.success || !result.result) {
+      return validationErrorResponse({
+        members: [`Users do not exist: ${(result.missingUserIds || []).join(', ')}`],
+      });
+    }
+
+    return jsonResponse(result.result);
+  } catch (error) {
+    if (error instanceof TenantMovingError) {
+      return tenantMovingResponse();
+    }
+    if (isForeignKeyViolation(error)) {
+      return badRequestResponse('User does not exist');
+    }
+    console.error('Error bulk adding users to company:', error);
+    return internalErrorResponse('Failed to add users to company');
+  }
+}
+
+async function handleBulkRemoveUsersFromCompany(
+  companyId: string,
+  request: Request,
+  env: Env,
+  ctx: RequestContext
+): Promise<Response> {
+  try {
+    const idValidation = validateUUID(companyId, 'company_id');
+    if (!idValidation.valid) {
+      return validationErrorResponse(idValidation.errors);
+    }
+
+    let body: unknown;
+    try {
+      body = await request.json();
+    } catch {
+      return badRequestResponse('Invalid JSON body');
+    }
+
+    const validation = validateBulkRemoveUsersFromCompany(body, BULK_MEMBERSHIP_MAX_USERS);
+    if (!validation.valid) {
+      return validationErrorResponse(validation.errors);
+    }
+
+    const data = asBulkRemoveUsersFromCompanyRequest(body);
+
+    const db = await resolveWritableDb(env, companyId);
+    const preconditions = await checkPreconditions(db, { companyId });
+    if (!preconditions.company) {
+      return notFoundResponse('Company');
+    }
+
+    const result = await bulkRemoveUsersFromCompany(db, companyId, data.user_ids, ctx.userId, ctx.role);
+    if (!result.success || !result.result) {
+      return forbiddenResponse(
+        `Only roles up to ${ctx.role} can be removed: ${(result.forbiddenUserIds || []).join(', ')}`
+      );
+    }
+
+    return jsonResponse(result.result);
+  } catch (error) {
+    if (error instanceof TenantMovingError) {
+      return tenantMovingResponse();
+    }
+    console.error('Error bulk removing users from company:', error);
+    return internalErrorResponse('Failed to remove users from company');
+  }
+}
+
 async function handleRemoveUserFromCompany(
   companyId: string,
   userId: string,
@@ -167,18 +312,25 @@ async function handleRemoveUserFromCompany(
       return validationErrorResponse(userIdValidation.errors);
     }
 
-    const companyExistsResult = await companyExists(env.DB, companyId);
-    if (!companyExistsResult) {
+    const db = await resolveWritableDb(env, companyId);
+    const preconditions = await checkPreconditions(db, { companyId });
+    if (!preconditions.company) {
       return notFoundResponse('Company');
     }
 
-    const removed = await removeUserFromCompany(env.DB, companyId, userId, ctx.userId);
-    if (!removed) {
+    const removed = await removeUserFromCompany(db, companyId, userId, ctx.userId, ctx.role);
+    if (removed === 'not_found') {
       return notFoundResponse('Company access');
     }
+    if (removed === 'forbidden') {
+      return forbiddenResponse(`Only roles up to ${ctx.role} can be removed`);
+    }
 
     return noContentResponse();
   } catch (error) {
+    if (error instanceof TenantMovingError) {
+      return tenantMovingResponse();
+    }
     console.error('Error removing user from company:', error);
     return internalErrorResponse('Failed to remove user from company');
   }
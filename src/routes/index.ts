@@ -7,3 +7,8 @@ export { handleUsersRoutes } from './users';
 export { handleCompanyAccessRoutes } from './company-access';
 export { handleAssetsRoutes } from './assets';
 export { handleAuditLogsRoutes } from './audit-logs';
+export { handleSyncRoutes } from './sync';
+export { handleChangesRoutes } from './changes';
+export { handleJobsRoutes } from './jobs';
+export { handleMaintenanceRoutes } from './maintenance';
+export { handleAttributesRoutes } from './attributes';
@@ -0,0 +1,55 @@
+// ============================================================================
+// Background Jobs API Routes
+// ============================================================================
+
+import type { Env, RequestContext } from '../types';
+import {
+  jsonResponse,
+  notFoundResponse,
+  validationErrorResponse,
+  methodNotAllowedResponse,
+  internalErrorResponse,
+} from '../utils/response';
+import { validateUUID } from '../utils/validation';
+import { getJobById } from '../db/jobs';
+import { fanOut } from '../sharding';
+
+export async function handleJobsRoutes(
+  request: Request,
+  url: URL,
+  env: Env,
+  ctx: RequestContext
+): Promise<Response> {
+  const method = request.method;
+  const pathParts = url.pathname.split('/').filter(Boolean);
+
+  // GET /jobs/:id - Get background job progress
+  if (pathParts.length === 2 && pathParts[0] === 'jobs') {
+    if (method === 'GET') {
+      return handleGetJob(pathParts[1], env);
+    }
+    return methodNotAllowedResponse(['GET']);
+  }
+
+  return notFoundResponse('Route');
+}
+
+async function handleGetJob(jobId: string, env: Env): Promise<Response> {
+  try {
+    const validation = validateUUID(jobId, 'id');
+    if (!validation.valid) {
+      return validationErrorResponse(validation.errors);
+    }
+
+    // Jobs run on the shard holding their company at the time they were queued
+    const job = (await fanOut(env, (db) => getJobById(db, jobId))).find(Boolean);
+    if (!job) {
+      return notFoundResponse('Job');
+    }
+
+    return jsonResponse(job);
+  } catch (error) {
+    console.error('Error getting job:', error);
+    return internalErrorResponse('Failed to get job');
+  }
+}
@@ -0,0 +1,47 @@
+// ============================================================================
+// Maintenance API Routes
+// ============================================================================
+
+import type { Env, RequestContext } from '../types';
+import {
+  jsonResponse,
+  notFoundResponse,
+  methodNotAllowedResponse,
+  internalErrorResponse,
+} from '../utils/response';
+import { getMaintenanceRuns } from '../db/maintenance';
+
+export async function handleMaintenanceRoutes(
+  request: Request,
+  url: URL,
+  env: Env,
+  ctx: RequestContext
+): Promise<Response> {
+  const method = request.method;
+  const pathParts = url.pathname.split('/').filter(Boolean);
+
+  // GET /maintenance/runs - List scheduled maintenance run history
+  if (pathParts.length === 2 && pathParts[0] === 'maintenance' && pathParts[1] === 'runs') {
+    if (method === 'GET') {
+      return handleListRuns(url, env);
+    }
+    return methodNotAllowedResponse(['GET']);
+  }
+
+  return notFoundResponse('Route');
+}
+
+async function handleListRuns(url: URL, env: Env): Promise<Response> {
+  try {
+    const limit = Math.min(parseInt(url.searchParams.get('limit') || '50'), 100);
+    const offset = parseInt(url.searchParams.get('offset') || '0');
+    const task = url.searchParams.get('task') || undefined;
+
+    const { runs, total } = await getMaintenanceRuns(env.DB, { task, limit, offset });
+
+    return jsonResponse(runs, 200, { total, limit, page: Math.floor(offset / limit) + 1 });
+  } catch (error) {
+    console.error('Error listing maintenance runs:', error);
+    return internalErrorResponse('Failed to list maintenance runs');
+  }
+}
@@ -0,0 +1,104 @@
+// ============================================================================
+// Delta Sync API Routes
+// ============================================================================
+
+import type { Env, RequestContext } from '../types';
+import {
+  jsonResponse,
+  notFoundResponse,
+  validationErrorResponse,
+  badRequestResponse,
+  methodNotAllowedResponse,
+  internalErrorResponse,
+} from '../utils/response';
+import { validateUUID } from '../utils/validation';
+import { decodeCursor } from '../utils/cursor';
+import { getChangesSince, getChangeRows, summarizeChanges, compareIngested } from '../db/sync';
+import { companyExists } from '../db/companies';
+import { getArchivedChanges } from '../archive/audit-archive';
+import { resolveDb } from '../sharding';
+
+export async function handleSyncRoutes(
+  request: Request,
+  url: URL,
+  env: Env,
+  ctx: RequestContext
+): Promise<Response> {
+  const method = request.method;
+  const pathParts = url.pathname.split('/').filter(Boolean);
+
+  // GET /sync?company_id=&since= - Changes since a cursor
+  if (pathParts.length === 1 && pathParts[0] === 'sync') {
+    if (method === 'GET') {
+      return handleSync(url, env);
+    }
+    return methodNotAllowedResponse(['GET']);
+  }
+
+  return notFoundResponse('Route');
+}
+
+async function handleSync(url: URL, env: Env): Promise<Response> {
+  try {
+    const companyId = url.searchParams.get('company_id');
+
+    if (!companyId) {
+      return badRequestResponse('company_id query parameter is required');
+    }
+
+    const idValidation = validateUUID(companyId, 'company_id');
+    if (!idValidation.valid) {
+      return validationErrorResponse(idValidation.errors);
+    }
+
+    const sinceParam = url.searchParams.get('since');
+    const since = sinceParam ? decodeCursor(sinceParam) : null;
+    if (sinceParam && !since) {
+      return validationErrorResponse({ since: ['since must be a cursor returned by /sync'] });
+    }
+
+    const db = await resolveDb(env, companyId);
+    const companyExistsResult = await companyExists(db, companyId);
+    if (!companyExistsResult) {
+      return notFoundResponse('Company');
+    }
+
+    // A zero limit would return the same cursor with has_more forever, and a
+    // negative one is unlimited in SQLite
+    const requestedLimit = parseInt(url.searchParams.get('limit') || '100');
+    const limit = Math.min(Math.max(1, isNaN(requestedLimit) ? 100 : requestedLimit), 500);
+
+    // A cursor from before the archive cutoff (or none) replays the archived
+    // changes first, one window per call, merged with any hot rows ingested
+    // within the same window so no change is skipped
+    if (env.AUDIT_ARCHIVE) {
+      const archived = await getArchivedChanges(
+        db,
+        env.AUDIT_ARCHIVE,
+        companyId,
+        since || undefined
+      );
+      if (archived) {
+        const hot = await getChangeRows(db, companyId, {
+          since: since || undefined,
+          until: archived.until,
+          limit,
+        });
+        const page = [...archived.rows, ...hot].sort(compareIngested).slice(0, limit);
+        return jsonResponse(
+          await summarizeChanges(db, companyId, page, true, since || undefined)
+        );
+      }
+    }
+
+    const result = await getChangesSince(db, companyId, {
+      since: since || undefined,
+      limit,
+    });
+
+    return jsonResponse(result);
+  } catch (error) {
+    console.error('Error syncing changes:', error);
+    return internalErrorResponse('Failed to sync changes');
+  }
+}
@@ -2,7 +2,7 @@
 // Users API Routes
 // ============================================================================
 
-import type { Env, RequestContext } from '../types';
+import type { Env, LookupItem, RequestContext } from '../types';
 import {
   jsonResponse,
   createdResponse,
@@ -11,26 +11,54 @@ import {
   badRequestResponse,
   methodNotAllowedResponse,
   internalErrorResponse,
+  preconditionFailedResponse,
+  withETag,
+  withCacheControl,
 } from '../utils/response';
 import {
   validateCreateUser,
   validateUpdateUser,
   validateUUID,
+  validateTimeRange,
+  parseIfMatch,
+  parseAuditLogFilters,
   asCreateUserRequest,
   asUpdateUserRequest,
 } from '../utils/validation';
 import {
   createUser,
   getUserById,
-  getUserByEmail,
   getAllUsers,
   updateUser,
   deleteUser,
-  userExists,
+  deleteUserRows,
+  userHasActivity,
 } from '../db/users';
-import { companyExists } from '../db/companies';
+import { checkPreconditions } from '../db/preconditions';
+import {
+  lookupUsers,
+  LOOKUP_MAX_LIMIT,
+  LOOKUP_MAX_QUERY_LENGTH,
+  LOOKUP_CACHE_SECONDS,
+} from '../db/lookup';
 import { getUserCompanies } from '../db/company-access';
+import { getVisibleCompanyIds } from '../auth';
+import { getAssetsByAssignee, countAssetsByAssignees, ASSET_COUNTS_MAX_USERS } from '../db/assets';
+import { encodeCursor, decodeCursor } from '../utils/cursor';
 import { getAuditLogsByEntity } from '../db/audit';
+import { getArchivedEntityAuditLogs } from '../archive/audit-archive';
+import { isUniqueViolation, isForeignKeyViolation } from '../utils/db-errors';
+import {
+  FanOutOffsetError,
+  fanOut,
+  fanOutPage,
+  getShards,
+  isSharded,
+  mergePages,
+  newestFirst,
+  replicateUsers,
+  resolveDb,
+} from '../sharding';
 
 export async function handleUsersRoutes(
   request: Request,
@@ -53,25 +81,54 @@ export async function handleUsersRoutes(
     return methodNotAllowedResponse(['GET', 'POST']);
   }
 
+  // GET /users/lookup?q= - Typeahead prefix lookup
+  if (pathParts.length === 2 && pathParts[0] === 'users' && pathParts[1] === 'lookup') {
+    if (method === 'GET') {
+      return handleLookupUsers(url, env, ctx);
+    }
+    return methodNotAllowedResponse(['GET']);
+  }
+
+  // GET /users/asset-counts?user_id=&user_id= - Assigned asset counts per user
+  if (pathParts.length === 2 && pathParts[0] === 'users' && pathParts[1] === 'asset-counts') {
+    if (method === 'GET') {
+      return handleGetAssetCounts(url, env);
+    }
+    return methodNotAllowedResponse(['GET']);
+  }
+
+  // GET /users/:id - Get user by ID
   // PATCH /users/:id - Update user
   // DELETE /users/:id - Delete user
   if (pathParts.length === 2 && pathParts[0] === 'users') {
     const userId = pathParts[1];
 
+    if (method === 'GET') {
+      return handleGetUser(userId, env);
+    }
     if (method === 'PATCH') {
       return handleUpdateUser(userId, request, env, ctx);
     }
     if (method === 'DELETE') {
       return handleDeleteUser(userId, env, ctx);
     }
-    return methodNotAllowedResponse(['PATCH', 'DELETE']);
+    return methodNotAllowedResponse(['GET', 'PATCH', 'DELETE']);
   }
 
   // GET /users/:id/companies - Get user's company assignments
   if (pathParts.length === 3 && pathParts[0] === 'users' && pathParts[2] === 'companies') {
     const userId = pathParts[1];
     if (method === 'GET') {
-      return handleGetUserCompanies(userId, env);
+      return handleGetUserCompanies(userId, url, env);
+    }
+    return methodNotAllowedResponse(['GET']);
+  }
+
+  // GET /users/:id/assets - Get assets assigned to the user
+  if (pathParts.length === 3 && pathParts[0] === 'users' && pathParts[2] === 'assets') {
+    const userId = pathParts[1];
+    if (method === 'GET') {
+      return handleGetUserAssets(userId, url, env);
     }
     return methodNotAllowedResponse(['GET']);
   }
@@ -95,7 +152,10 @@ async function handleListUsers(url: URL, env: Env): Promise<Response> {
     const status = url.searchParams.get('status') || undefined;
     const company_id = url.searchParams.get('company_id') || undefined;
 
-    const { users, total } = await getAllUsers(env.DB, { limit, offset, status, company_id });
+    // Users are copied to every shard; a company filter reads the one that
+    // holds the company's memberships
+    const db = company_id ? await resolveDb(env, company_id) : env.DB;
+    const { users, total } = await getAllUsers(db, { limit, offset, status, company_id });
 
     return jsonResponse(users, 200, { total, limit, page: Math.floor(offset / limit) + 1 });
   } catch (error) {
@@ -104,6 +164,90 @@ async function handleListUsers(url: URL, env: Env): Promise<Response> {
   }
 }
 
+// With authorization enforced only users sharing a company with the caller
+// match. Memberships live on their company's shard, so a sharded lookup runs
+// on every shard and the matches are merged in label order.
+async function handleLookupUsers(url: URL, env: Env, ctx: RequestContext): Promise<Response> {
+  try {
+    const q = (url.searchParams.get('q') || '').trim();
+    if (q.length > LOOKUP_MAX_QUERY_LENGTH) {
+      return validationErrorResponse({
+        q: [`q must be ${LOOKUP_MAX_QUERY_LENGTH} characters or less`],
+      });
+    }
+
+    const limit = Math.min(parseInt(url.searchParams.get('limit') || '10'), LOOKUP_MAX_LIMIT);
+
+    const companyIds = (await getVisibleCompanyIds(env, ctx)) ?? undefined;
+    const items =
+      companyIds && isSharded(env)
+        ? mergeLookupItems(await fanOut(env, (db) => lookupUsers(db, q, limit, companyIds)), limit)
+        : await lookupUsers(env.DB, q, limit, companyIds);
+
+    return withCacheControl(jsonResponse(items), LOOKUP_CACHE_SECONDS);
+  } catch (error) {
+    console.error('Error looking up users:', error);
+    return internalErrorResponse('Failed to look up users');
+  }
+}
+
+function mergeLookupItems(pages: LookupItem[][], limit: number): LookupItem[] {
+  const byId = new Map<string, LookupItem>();
+  for (const item of pages.flat()) {
+    byId.set(item.id, item);
+  }
+  return [...byId.values()]
+    .sort((a, b) => a.label.toLowerCase().localeCompare(b.label.toLowerCase()))
+    .slice(0, limit);
+}
+
+async function handleGetAssetCounts(url: URL, env: Env): Promise<Response> {
+  try {
+    const userIds = url.searchParams.getAll('user_id');
+
+    if (userIds.length === 0) {
+      return badRequestResponse('user_id query parameter is required');
+    }
+    if (userIds.length > ASSET_COUNTS_MAX_USERS) {
+      return validationErrorResponse({
+        user_id: [`At most ${ASSET_COUNTS_MAX_USERS} users can be counted at once`],
+      });
+    }
+
+    for (const userId of userIds) {
+      const validation = validateUUID(userId, 'user_id');
+      if (!validation.valid) {
+        return validationErrorResponse(validation.errors);
+      }
+    }
+
+    // Optional; required when authorization is enforced
+    const companyId = url.searchParams.get('company_id');
+    if (companyId) {
+      const companyValidation = validateUUID(companyId, 'company_id');
+      if (!companyValidation.valid) {
+        return validationErrorResponse(companyValidation.errors);
+      }
+      return jsonResponse(
+        await countAssetsByAssignees(await resolveDb(env, companyId), userIds, companyId)
+      );
+    }
+
+    // A user can hold assets in companies on any shard
+    const counts: Record<string, number> = {};
+    for (const shardCounts of await fanOut(env, (db) => countAssetsByAssignees(db, userIds))) {
+      for (const [userId, count] of Object.entries(shardCounts)) {
+        counts[userId] = (counts[userId] || 0) + count;
+      }
+    }
+
+    return jsonResponse(counts);
+  } catch (error) {
+    console.error('Error counting user assets:', error);
+    return internalErrorResponse('Failed to count user assets');
+  }
+}
+
 async function handleCreateUser(
   request: Request,
   env: Env,
@@ -124,27 +268,48 @@ async function handleCreateUser(
 
     const data = asCreateUserRequest(body);
 
-    const existingEmail = await getUserByEmail(env.DB, data.email);
-    if (existingEmail) {
-      return badRequestResponse('A user with this email already exists');
-    }
-
-    if (data.primary_company_id) {
-      const companyExistsResult = await companyExists(env.DB, data.primary_company_id);
-      if (!companyExistsResult) {
-        return badRequestResponse('Primary company does not exist');
-      }
+    const preconditions = await checkPreconditions(env.DB, {
+      companyId: data.primary_company_id || undefined,
+    });
+    if (!preconditions.company) {
+      return badRequestResponse('Primary company does not exist');
     }
 
     const user = await createUser(env.DB, data, ctx.userId);
+    await replicateUsers(env, [user.id]);
 
-    return createdResponse(user);
+    return withETag(createdResponse(user), user.version);
   } catch (error) {
+    if (isUniqueViolation(error, 'users.email')) {
+      return badRequestResponse('A user with this email already exists');
+    }
+    if (isForeignKeyViolation(error)) {
+      return badRequestResponse('Primary company does not exist');
+    }
     console.error('Error creating user:', error);
     return internalErrorResponse('Failed to create user');
   }
 }
 
+async function handleGetUser(userId: string, env: Env): Promise<Response> {
+  try {
+    const validation = validateUUID(userId, 'id');
+    if (!validation.valid) {
+      return validationErrorResponse(validation.errors);
+    }
+
+    const user = await getUserById(env.DB, userId);
+    if (!user) {
+      return notFoundResponse('User');
+    }
+
+    return withETag(jsonResponse(user), user.version);
+  } catch (error) {
+    console.error('Error getting user:', error);
+    return internalErrorResponse('Failed to get user');
+  }
+}
+
 async function handleDeleteUser(
   userId: string,
   env: Env,
@@ -156,6 +321,20 @@ async function handleDeleteUser(
       return validationErrorResponse(idValidation.errors);
     }
 
+    // Activity may be recorded on any shard; copies go before the DB row so a
+    // failure part way leaves the authoritative row to retry from
+    if (isSharded(env)) {
+      if (!(await getUserById(env.DB, userId))) {
+        return notFoundResponse('User');
+      }
+      if ((await fanOut(env, (db) => userHasActivity(db, userId))).some(Boolean)) {
+        return badRequestResponse('Cannot delete user with activity history');
+      }
+      for (const shard of getShards(env).slice(1)) {
+        await deleteUserRows(shard.db, userId);
+      }
+    }
+
     const result = await deleteUser(env.DB, userId, ctx.userId);
     if (!result.success) {
       if (result.error === 'User not found') {
@@ -183,6 +362,11 @@ async function handleUpdateUser(
       return validationErrorResponse(idValidation.errors);
     }
 
+    const ifMatch = parseIfMatch(request.headers.get('If-Match'));
+    if (!ifMatch.valid) {
+      return validationErrorResponse({ 'If-Match': ['If-Match must be an ETag returned by this API'] });
+    }
+
     let body: unknown;
     try {
       body = await request.json();
@@ -197,52 +381,107 @@ async function handleUpdateUser(
 
     const data = asUpdateUserRequest(body);
 
-    if (data.email) {
-      const existingEmail = await getUserByEmail(env.DB, data.email);
-      if (existingEmail && existingEmail.id !== userId) {
-        return badRequestResponse('A user with this email already exists');
-      }
+    const preconditions = await checkPreconditions(env.DB, {
+      companyId: data.primary_company_id || undefined,
+    });
+    if (!preconditions.company) {
+      return badRequestResponse('Primary company does not exist');
     }
 
-    if (data.primary_company_id) {
-      const companyExistsResult = await companyExists(env.DB, data.primary_company_id);
-      if (!companyExistsResult) {
-        return badRequestResponse('Primary company does not exist');
+    const result = await updateUser(env.DB, userId, data, ctx.userId, ifMatch.version);
+    if (!result.success || !result.user) {
+      if (result.error === 'Version mismatch') {
+        return preconditionFailedResponse();
       }
-    }
-
-    const user = await updateUser(env.DB, userId, data, ctx.userId);
-    if (!user) {
       return notFoundResponse('User');
     }
 
-    return jsonResponse(user);
+    await replicateUsers(env, [userId]);
+
+    return withETag(jsonResponse(result.user), result.user.version);
   } catch (error) {
+    if (isUniqueViolation(error, 'users.email')) {
+      return badRequestResponse('A user with this email already exists');
+    }
+    if (isForeignKeyViolation(error)) {
+      return badRequestResponse('Primary company does not exist');
+    }
     console.error('Error updating user:', error);
     return internalErrorResponse('Failed to update user');
   }
 }
 
-async function handleGetUserCompanies(userId: string, env: Env): Promise<Response> {
+async function handleGetUserCompanies(userId: string, url: URL, env: Env): Promise<Response> {
   try {
     const idValidation = validateUUID(userId, 'id');
     if (!idValidation.valid) {
       return validationErrorResponse(idValidation.errors);
     }
 
-    const exists = await userExists(env.DB, userId);
-    if (!exists) {
+    const preconditions = await checkPreconditions(env.DB, { userId });
+    if (!preconditions.user) {
       return notFoundResponse('User');
     }
 
-    const companies = await getUserCompanies(env.DB, userId);
-    return jsonResponse(companies);
+    const limit = Math.min(parseInt(url.searchParams.get('limit') || '50'), 100);
+    const offset = parseInt(url.searchParams.get('offset') || '0');
+
+    const { rows: memberships, total } = await fanOutPage(env, { limit, offset }, async (db, window) => {
+      const page = await getUserCompanies(db, userId, window);
+      return { rows: page.memberships, total: page.total };
+    });
+
+    return jsonResponse(memberships, 200, { total, limit, page: Math.floor(offset / limit) + 1 });
   } catch (error) {
+    if (error instanceof FanOutOffsetError) {
+      return validationErrorResponse({ offset: [error.message] });
+    }
     console.error('Error getting user companies:', error);
     return internalErrorResponse('Failed to get user companies');
   }
 }
 
+async function handleGetUserAssets(userId: string, url: URL, env: Env): Promise<Response> {
+  try {
+    const validation = validateUUID(userId, 'id');
+    if (!validation.valid) {
+      return validationErrorResponse(validation.errors);
+    }
+
+    const cursorParam = url.searchParams.get('cursor');
+    const after = cursorParam ? decodeCursor(cursorParam) : null;
+    if (cursorParam && !after) {
+      return validationErrorResponse({ cursor: ['cursor must be a cursor returned by /users/:id/assets'] });
+    }
+
+    const preconditions = await checkPreconditions(env.DB, { userId });
+    if (!preconditions.user) {
+      return notFoundResponse('User');
+    }
+
+    const limit = Math.min(parseInt(url.searchParams.get('limit') || '50'), 100);
+
+    // Every shard continues from the same keyset position; the merged page
+    // ends wherever the newest `limit` rows across shards end
+    const pages = await fanOut(env, (db) =>
+      getAssetsByAssignee(db, userId, { limit, after: after || undefined })
+    );
+    const merged = mergePages(pages.map((page) => page.assets), newestFirst, 0, limit + 1);
+    const assets = merged.slice(0, limit);
+    const hasMore = merged.length > limit || pages.some((page) => page.has_more);
+    const last = assets[assets.length - 1];
+
+    return jsonResponse({
+      assets,
+      cursor: hasMore && last ? encodeCursor({ createdAt: last.created_at, id: last.id }) : null,
+      has_more: hasMore,
+    });
+  } catch (error) {
+    console.error('Error getting user assets:', error);
+    return internalErrorResponse('Failed to get user assets');
+  }
+}
+
 async function handleGetUserAuditLogs(userId: string, url: URL, env: Env): Promise<Response> {
   try {
     const idValidation = validateUUID(userId, 'id');
@@ -250,17 +489,43 @@ async function handleGetUserAuditLogs(userId: string, url: URL, env: Env): Promi
       return validationErrorResponse(idValidation.errors);
     }
 
-    const exists = await userExists(env.DB, userId);
-    if (!exists) {
+    const preconditions = await checkPreconditions(env.DB, { userId });
+    if (!preconditions.user) {
       return notFoundResponse('User');
     }
 
+    const rangeValidation = validateTimeRange(url.searchParams.get('from'), url.searchParams.get('to'));
+    if (!rangeValidation.valid) {
+      return validationErrorResponse(rangeValidation.errors);
+    }
+
     const limit = Math.min(parseInt(url.searchParams.get('limit') || '50'), 100);
     const offset = parseInt(url.searchParams.get('offset') || '0');
+    const { action, from, to } = parseAuditLogFilters(url.searchParams);
+
+    // User audit rows land on the shard of the primary company at the time.
+    // On each shard, pages past the rows still in D1 continue into the archive.
+    const { rows: logs, total } = await fanOutPage(env, { limit, offset }, async (db, window) => {
+      const page = await getAuditLogsByEntity(db, 'user', userId, { ...window, action, from, to });
+      if (!env.AUDIT_ARCHIVE) {
+        return { rows: page.logs, total: page.total };
+      }
 
-    const { logs, total } = await getAuditLogsByEntity(env.DB, 'user', userId, { limit, offset });
+      const archived = await getArchivedEntityAuditLogs(db, env.AUDIT_ARCHIVE, 'user', userId, {
+        limit: window.limit - page.logs.length,
+        offset: Math.max(window.offset - page.total, 0),
+        action,
+        from,
+        to,
+        excludeCompanyIds: window.excludeCompanyIds,
+      });
+      return { rows: [...page.logs, ...archived.logs], total: page.total + archived.total };
+    });
     return jsonResponse(logs, 200, { total, limit, page: Math.floor(offset / limit) + 1 });
   } catch (error) {
+    if (error instanceof FanOutOffsetError) {
+      return validationErrorResponse({ offset: [error.message] });
+    }
     console.error('Error getting user audit logs:', error);
     return internalErrorResponse('Failed to get user audit logs');
   }
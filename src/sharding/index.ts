@@ -0,0 +1,314 @@
+// ============================================================================
+// Tenant Shard Router
+// Resolves the D1 database holding a company's rows. DB is both the tenant
+// directory and the default shard; the bindings named in DB_SHARDS hold
+// tenants moved off it. companies and users rows are replicated to every
+// shard so foreign keys, joins and preconditions stay local to one database.
+// ============================================================================
+
+import type { Company, Env, TenantShard } from '../types';
+import { TtlCache } from '../utils/cache';
+import { setAuditDbResolver } from '../db/audit';
+import {
+  DIRECTORY_SHARD,
+  getTenantShard,
+  getTenantShards,
+  getStrayTenants,
+  getCompaniesByIds,
+  getUsersByIds,
+  upsertCompanyReplicas,
+  upsertUserReplicas,
+} from '../db/shards';
+
+export interface Shard {
+  name: string;
+  db: D1Database;
+}
+
+// How long an isolate may act on a stale directory entry; tenant moves wait
+// this long after every directory change before relying on it
+export const DIRECTORY_CACHE_TTL_MS = 30_000;
+
+const directoryCache = new TtlCache<string, TenantShard | null>(10_000, DIRECTORY_CACHE_TTL_MS);
+
+// Thrown when a write targets a company whose rows are being copied
+export class TenantMovingError extends Error {
+  constructor(companyId: string) {
+    super(`Company ${companyId} is being moved to another shard`);
+    this.name = 'TenantMovingError';
+  }
+}
+
+// DB first, then DB_SHARDS in the order listed
+export function getShards(env: Env): Shard[] {
+  const shards: Shard[] = [{ name: DIRECTORY_SHARD, db: env.DB }];
+
+  for (const name of (env.DB_SHARDS || '').split(',').map((part) => part.trim())) {
+    if (!name || name === DIRECTORY_SHARD) {
+      continue;
+    }
+    const db = (env as unknown as Record<string, D1Database | undefined>)[name];
+    if (!db) {
+      throw new Error(`DB_SHARDS names ${name}, which is not a bound D1 database`);
+    }
+    shards.push({ name, db });
+  }
+
+  return shards;
+}
+
+export function isSharded(env: Env): boolean {
+  return getShards(env).length > 1;
+}
+
+export function getShard(env: Env, name: string): Shard | null {
+  return getShards(env).find((shard) => shard.name === name) || null;
+}
+
+// Audit rows follow their company to its shard, whichever handle wrote them.
+// A DB_SHARDS naming an unbound database is logged here and then fails only
+// the requests that resolve a shard, so /health keeps answering.
+export function attachShardRouter(env: Env): void {
+  let sharded = false;
+  try {
+    sharded = isSharded(env);
+  } catch (error) {
+    console.error('Invalid DB_SHARDS configuration:', error);
+  }
+  setAuditDbResolver(sharded ? (companyId) => resolveDb(env, companyId) : null);
+}
+
+// With no DB_SHARDS configured every tenant is on DB and the directory is
+// never read
+export async function getTenantPlacement(env: Env, companyId: string): Promise<TenantShard | null> {
+  if (!isSharded(env)) {
+    return null;
+  }
+
+  let entry = directoryCache.get(companyId);
+  if (entry === undefined) {
+    entry = await getTenantShard(env.DB, companyId);
+    directoryCache.set(companyId, entry);
+  }
+  return entry;
+}
+
+// Reads keep going to the source shard while a move copies the tenant
+export async function resolveDb(env: Env, companyId: string): Promise<D1Database> {
+  const entry = await getTenantPlacement(env, companyId);
+  if (!entry) {
+    return env.DB;
+  }
+
+  const shard = getShard(env, entry.shard);
+  if (!shard) {
+    throw new Error(`Company ${companyId} is placed on unknown shard ${entry.shard}`);
+  }
+  return shard.db;
+}
+
+export async function resolveWritableDb(env: Env, companyId: string): Promise<D1Database> {
+  const entry = await getTenantPlacement(env, companyId);
+  if (entry?.moving_to) {
+    throw new TenantMovingError(companyId);
+  }
+  return resolveDb(env, companyId);
+}
+
+// The company owning an entity addressed by id, from whichever shard has
+// the row; null when no shard has it
+export async function findEntityCompanyId(
+  env: Env,
+  findCompanyId: (db: D1Database) => Promise<string | null>
+): Promise<string | null> {
+  const companyIds = await fanOut(env, findCompanyId);
+  return companyIds.find((id) => id !== null) ?? null;
+}
+
+// For routes addressed by an entity id rather than a company: finds the
+// owning company on whichever shard has the row, then resolves it as usual.
+// Falls back to DB when no shard has it, so the caller's own lookup 404s.
+export async function resolveDbForEntity(
+  env: Env,
+  findCompanyId: (db: D1Database) => Promise<string | null>,
+  options: { writable?: boolean } = {}
+): Promise<D1Database> {
+  if (!isSharded(env)) {
+    return env.DB;
+  }
+
+  const companyId = await findEntityCompanyId(env, findCompanyId);
+  if (!companyId) {
+    return env.DB;
+  }
+
+  return options.writable ? resolveWritableDb(env, companyId) : resolveDb(env, companyId);
+}
+
+export function forgetTenantPlacement(companyId: string): void {
+  directoryCache.delete(companyId);
+}
+
+export async function fanOut<T>(
+  env: Env,
+  query: (db: D1Database, shard: string) => Promise<T>
+): Promise<T[]> {
+  return Promise.all(getShards(env).map((shard) => query(shard.db, shard.name)));
+}
+
+export interface PageWindow {
+  limit: number;
+  offset: number;
+  // Companies whose rows on the queried shard are copies left by a tenant
+  // move; the query leaves them out so totals count each row once
+  excludeCompanyIds?: string[];
+}
+
+// Every shard reads offset + limit rows for a cross-shard page, so deeper
+// pages are refused rather than pulled into the isolate
+export const MAX_FAN_OUT_OFFSET = 5_000;
+
+export class FanOutOffsetError extends Error {
+  constructor() {
+    super(`offset must be at most ${MAX_FAN_OUT_OFFSET} for lists spanning shards`);
+    this.name = 'FanOutOffsetError';
+  }
+}
+
+// Offset pagination across shards: every shard returns its first
+// offset + limit rows, newest first, and the merge is cut down to the page.
+// Without DB_SHARDS the query runs once with the caller's window.
+export async function fanOutPage<T extends { id: string; created_at: string }>(
+  env: Env,
+  window: PageWindow,
+  query: (db: D1Database, window: PageWindow) => Promise<{ rows: T[]; total: number }>
+): Promise<{ rows: T[]; total: number }> {
+  if (!isSharded(env)) {
+    return query(env.DB, window);
+  }
+  if (window.offset > MAX_FAN_OUT_OFFSET) {
+    throw new FanOutOffsetError();
+  }
+
+  const stray = new Map<string, string[]>();
+  for (const entry of await getStrayTenants(env.DB)) {
+    stray.set(entry.shard, [...(stray.get(entry.shard) || []), entry.company_id]);
+  }
+
+  const pages = await fanOut(env, (db, shard) =>
+    query(db, {
+      limit: window.offset + window.limit,
+      offset: 0,
+      excludeCompanyIds: stray.get(shard),
+    })
+  );
+  return {
+    rows: mergePages(pages.map((page) => page.rows), newestFirst, window.offset, window.limit),
+    total: pages.reduce((sum, page) => sum + page.total, 0),
+  };
+}
+
+// Merges per-shard pages that were each read from offset 0. A tenant being
+// moved has its rows on two shards until cleanup, so duplicates that reach
+// the merge are dropped.
+export function mergePages<T extends { id: string }>(
+  pages: T[][],
+  compare: (a: T, b: T) => number,
+  offset: number,
+  limit: number
+): T[] {
+  const seen = new Set<string>();
+  const merged: T[] = [];
+
+  for (const row of pages.flat().sort(compare)) {
+    if (!seen.has(row.id)) {
+      seen.add(row.id);
+      merged.push(row);
+    }
+  }
+
+  return merged.slice(offset, offset + limit);
+}
+
+// The order every cross-shard list is returned in
+export function newestFirst(
+  a: { created_at: string; id: string },
+  b: { created_at: string; id: string }
+): number {
+  if (a.created_at !== b.created_at) {
+    return a.created_at < b.created_at ? 1 : -1;
+  }
+  return a.id < b.id ? 1 : a.id > b.id ? -1 : 0;
+}
+
+// ============================================================================
+// Reference Row Replication
+// A company's row is authoritative on its shard and a user's on DB; every
+// other shard holds a copy. Copies are pushed after each write and swept by
+// the replicate-reference-rows task, so a failed push is logged, not fatal.
+// ============================================================================
+
+// Swaps DB's copies in a company list for the rows on each company's own
+// shard, so a list paged on DB never shows a replica that is lagging behind
+export async function withOwnerCompanyRows(env: Env, companies: Company[]): Promise<Company[]> {
+  if (!isSharded(env) || companies.length === 0) {
+    return companies;
+  }
+
+  const idsByShard = new Map<string, string[]>();
+  for (const placement of await getTenantShards(env.DB, companies.map((company) => company.id))) {
+    idsByShard.set(placement.shard, [...(idsByShard.get(placement.shard) || []), placement.company_id]);
+  }
+  idsByShard.delete(DIRECTORY_SHARD);
+
+  const owned = new Map<string, Company>();
+  await Promise.all(
+    [...idsByShard].map(async ([name, ids]) => {
+      const shard = getShard(env, name);
+      if (!shard) {
+        throw new Error(`Companies are placed on unknown shard ${name}`);
+      }
+      for (const company of await getCompaniesByIds(shard.db, ids)) {
+        owned.set(company.id, company);
+      }
+    })
+  );
+
+  return companies.map((company) => owned.get(company.id) || company);
+}
+
+export async function replicateCompanies(env: Env, source: D1Database, ids: string[]): Promise<void> {
+  const replicas = getShards(env).filter((shard) => shard.db !== source);
+  if (replicas.length === 0 || ids.length === 0) {
+    return;
+  }
+
+  const companies = await getCompaniesByIds(source, ids);
+  await Promise.all(
+    replicas.map(async (shard) => {
+      try {
+        await upsertCompanyReplicas(shard.db, companies);
+      } catch (error) {
+        console.error(`Failed to replicate ${companies.length} company row(s) to ${shard.name}:`, error);
+      }
+    })
+  );
+}
+
+export async function replicateUsers(env: Env, ids: string[]): Promise<void> {
+  const replicas = getShards(env).filter((shard) => shard.name !== DIRECTORY_SHARD);
+  if (replicas.length === 0 || ids.length === 0) {
+    return;
+  }
+
+  const users = await getUsersByIds(env.DB, ids);
+  await Promise.all(
+    replicas.map(async (shard) => {
+      try {
+        await upsertUserReplicas(shard.db, users);
+      } catch (error) {
+        console.error(`Failed to replicate ${users.length} user row(s) to ${shard.name}:`, error);
+      }
+    })
+  );
+}
@@ -0,0 +1,8 @@
+// node:async_hooks as enabled by the nodejs_als compatibility flag;
+// @cloudflare/workers-types does not declare Node built-ins
+declare module 'node:async_hooks' {
+  export class AsyncLocalStorage<T> {
+    getStore(): T | undefined;
+    run<R>(store: T, callback: () => R): R;
+  }
+}
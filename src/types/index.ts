@@ -5,6 +5,22 @@
 // Environment bindings for Cloudflare Worker
 export interface Env {
   DB: D1Database;
+  CHANGE_FEED: DurableObjectNamespace;
+  AUDIT_MODE?: string;
+  AUDIT_QUEUE?: Queue<AuditLog[]>;
+  AUDIT_ARCHIVE?: R2Bucket;
+  AUDIT_ARCHIVE_AFTER_DAYS?: string;
+  AUTH_MODE?: string;
+  AUTH_CACHE?: KVNamespace;
+  JWKS_URL?: string;
+  JWKS_JSON?: string;
+  JWT_ISSUER?: string;
+  JWT_AUDIENCE?: string;
+  RATE_LIMIT_MODE?: string;
+  RATE_LIMITER?: DurableObjectNamespace;
+  DB_SHARDS?: string;
+  // Comma-separated user ids allowed to read /maintenance with AUTH_MODE=enforce
+  OPERATOR_USER_IDS?: string;
 }
 
 // ============================================================================
@@ -18,6 +34,9 @@ export type AssetType = 'hardware' | 'software' | 'license' | 'other';
 export type AccessRole = 'OWNER' | 'ADMIN' | 'MEMBER' | 'READ_ONLY';
 export type EntityType = 'company' | 'user' | 'company_access' | 'asset';
 export type AuditAction = 'create' | 'update' | 'delete';
+export type JobType = 'company_deletion' | 'attribute_backfill' | 'tenant_move';
+export type PromotedAttributeType = 'string' | 'number' | 'boolean' | 'date';
+export type JobStatus = 'pending' | 'running' | 'completed' | 'failed';
 
 // ============================================================================
 // Database Entity Interfaces
@@ -27,6 +46,8 @@ export interface Company {
   id: string;
   name: string;
   status: CompanyStatus;
+  version: number;
+  deletion_requested_at: string | null;
   created_at: string;
 }
 
@@ -36,6 +57,7 @@ export interface User {
   name: string;
   primary_company_id: string | null;
   status: UserStatus;
+  version: number;
   created_at: string;
 }
 
@@ -47,6 +69,12 @@ export interface CompanyAccess {
   created_at: string;
 }
 
+// A user's membership joined with the company it grants access to
+export interface UserMembership extends CompanyAccess {
+  company_name: string;
+  company_status: CompanyStatus;
+}
+
 export interface Asset {
   id: string;
   company_id: string;
@@ -56,6 +84,7 @@ export interface Asset {
   status: AssetStatus;
   metadata: Record<string, unknown>;
   assigned_to: string | null;
+  version: number;
   created_at: string;
 }
 
@@ -67,9 +96,100 @@ export interface AuditLog {
   entity_id: string;
   action: AuditAction;
   changes: Record<string, unknown>;
+  // When the change happened
+  created_at: string;
+  // When the row reached D1; later than created_at for deferred and queued
+  // rows. /sync and change feed cursors follow this order.
+  ingested_at: string;
+}
+
+export interface Job {
+  id: string;
+  type: JobType;
+  status: JobStatus;
+  company_id: string;
+  progress: Record<string, unknown>;
+  error: string | null;
+  locked_until: string | null;
+  created_at: string;
+  updated_at: string;
+}
+
+export interface AuditLogFilters {
+  entityType?: EntityType;
+  action?: AuditAction;
+  userId?: string;
+  entityId?: string;
+  // Inclusive lower and exclusive upper bound on created_at
+  from?: string;
+  to?: string;
+  // Companies whose rows on this shard are copies left by a tenant move
+  excludeCompanyIds?: string[];
+}
+
+export interface AuditArchiveSegment {
+  id: string;
+  company_id: string;
+  month: string;
+  object_key: string;
+  row_count: number;
+  counts: Record<string, number>;
+  first_created_at: string;
+  last_created_at: string;
+  last_ingested_at: string;
+  bytes: number;
+  // 1 once the segment's rows are in audit_archive_index
+  indexed: number;
+  created_at: string;
+}
+
+// Rows of one archived segment sharing an entity, user and action
+export interface AuditArchiveIndexEntry {
+  entity_type: string;
+  entity_id: string;
+  user_id: string | null;
+  action: string;
+  row_count: number;
+}
+
+export interface PromotedAttribute {
+  company_id: string;
+  key: string;
+  type: PromotedAttributeType;
   created_at: string;
 }
 
+export interface LookupItem {
+  id: string;
+  label: string;
+}
+
+export interface MaintenanceRun {
+  id: string;
+  task: string;
+  status: 'completed' | 'partial' | 'failed';
+  processed: number;
+  error: string | null;
+  started_at: string;
+  finished_at: string;
+}
+
+export interface CompanyStats {
+  company_id: string;
+  asset_count: number;
+  user_count: number;
+  access_count: number;
+  refreshed_at: string;
+}
+
+// Directory entry for a company that lives (or is moving) off the DB binding
+export interface TenantShard {
+  company_id: string;
+  shard: string;
+  moving_to: string | null;
+  updated_at: string;
+}
+
 // ============================================================================
 // API Request DTOs (Data Transfer Objects)
 // ============================================================================
@@ -103,6 +223,25 @@ export interface AddUserToCompanyRequest {
   role?: AccessRole;
 }
 
+export interface BulkAddUsersToCompanyRequest {
+  members: AddUserToCompanyRequest[];
+}
+
+export interface BulkAddUsersToCompanyResult {
+  created: number;
+  updated: number;
+  unchanged: number;
+}
+
+export interface BulkRemoveUsersFromCompanyRequest {
+  user_ids: string[];
+}
+
+export interface BulkRemoveUsersFromCompanyResult {
+  removed: number;
+  not_found: string[];
+}
+
 export interface CreateAssetRequest {
   company_id: string;
   type: AssetType;
@@ -122,6 +261,37 @@ export interface UpdateAssetRequest {
   assigned_to?: string | null;
 }
 
+// Exactly one of ids / filter selects the assets in company_id
+export interface BulkUpdateAssetsRequest {
+  company_id: string;
+  ids?: string[];
+  filter?: {
+    type?: AssetType;
+    status?: AssetStatus;
+    assigned_to?: string;
+  };
+  patch: {
+    status?: AssetStatus;
+    assigned_to?: string | null;
+  };
+}
+
+export interface BulkUpdateAssetsResult {
+  matched: number;
+  updated: number;
+  unchanged: number;
+  not_found: string[];
+}
+
+export interface PromoteAttributeRequest {
+  key: string;
+  type: PromotedAttributeType;
+}
+
+export interface MoveTenantRequest {
+  shard: string;
+}
+
 // ============================================================================
 // API Response Types
 // ============================================================================
@@ -146,12 +316,81 @@ export interface ResponseMeta {
 }
 
 // ============================================================================
-// Request Context (for future auth integration)
+// Delta Sync Types
+// ============================================================================
+
+export interface SyncUpsert {
+  entity_type: EntityType;
+  entity_id: string;
+  data: Record<string, unknown>;
+}
+
+export interface SyncTombstone {
+  entity_type: EntityType;
+  entity_id: string;
+  deleted_at: string;
+}
+
+export interface SyncResult {
+  upserts: SyncUpsert[];
+  tombstones: SyncTombstone[];
+  cursor: string | null;
+  has_more: boolean;
+}
+
+// ============================================================================
+// Change Feed Types
+// ============================================================================
+
+export interface ChangeEvent {
+  id: string;
+  entity_type: EntityType;
+  entity_id: string;
+  action: AuditAction;
+  created_at: string;
+  cursor: string;
+}
+
+// ============================================================================
+// Idempotency Types
+// ============================================================================
+
+export interface IdempotencyRecord {
+  scope: string;
+  idempotency_key: string;
+  request_hash: string;
+  status: 'pending' | 'completed';
+  response_status: number | null;
+  response_body: string | null;
+  // JSON object of the headers restored on replay
+  response_headers: string | null;
+  created_at: string;
+  expires_at: string;
+}
+
+// ============================================================================
+// Authentication Types
+// ============================================================================
+
+export interface JwtClaims {
+  sub: string;
+  exp: number;
+  nbf?: number;
+  iat?: number;
+  iss?: string;
+  aud?: string | string[];
+  [claim: string]: unknown;
+}
+
+// ============================================================================
+// Request Context
 // ============================================================================
 
 export interface RequestContext {
   userId?: string;
   companyId?: string;
+  // Caller's role in companyId, set once authorization has checked it
+  role?: AccessRole;
   requestId: string;
   timestamp: string;
 }
@@ -169,6 +408,14 @@ export interface ValidationResult {
 // Audit Log Entry (for creating audit records)
 // ============================================================================
 
+export type AuditMode = 'strict' | 'deferred';
+
+// 'off' keeps the header-trusting behaviour; 'enforce' checks company roles
+export type AuthMode = 'off' | 'enforce';
+
+// 'enforce' applies per-tenant token buckets and the in-flight cap
+export type RateLimitMode = 'off' | 'enforce';
+
 export interface AuditEntry {
   companyId: string;
   userId?: string;
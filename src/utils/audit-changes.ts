@@ -0,0 +1,163 @@
+// ============================================================================
+// Compact Audit Changes Encoding
+// Stores audit `changes` as field-level diffs and expands them back into the
+// { created } / { deleted } / { field: { from, to } } shape the API returns
+// ============================================================================
+//
+// Stored (v2) format:
+//   { v: 2, c: snapshot }               - created; `id` omitted when it is the entity id
+//   { v: 2, d: snapshot }               - deleted; same as above
+//   { v: 2, u: { field: [from, to] } }  - updated scalar fields that actually changed
+//   { v: 2, p: { field: [op, ...] } }   - updated object fields as JSON-Patch-style ops:
+//       ["add", path, value] | ["remove", path, from] | ["replace", path, from, to]
+// Rows without `v` are the original verbose format and are returned as-is.
+
+type PatchOp =
+  | ['add', string, unknown]
+  | ['remove', string, unknown]
+  | ['replace', string, unknown, unknown];
+
+interface CompactChanges {
+  v: 2;
+  c?: Record<string, unknown>;
+  d?: Record<string, unknown>;
+  u?: Record<string, [unknown, unknown]>;
+  p?: Record<string, PatchOp[]>;
+}
+
+const COMPACT_VERSION = 2;
+
+export function encodeChanges(changes: Record<string, unknown>, entityId: string): string {
+  const keys = Object.keys(changes);
+
+  if (keys.length === 1 && (keys[0] === 'created' || keys[0] === 'deleted') && isPlainObject(changes[keys[0]])) {
+    const snapshot = { ...(changes[keys[0]] as Record<string, unknown>) };
+    if (snapshot.id === entityId) {
+      delete snapshot.id;
+    }
+    const compact: CompactChanges = { v: COMPACT_VERSION };
+    compact[keys[0] === 'created' ? 'c' : 'd'] = snapshot;
+    return JSON.stringify(compact);
+  }
+
+  if (keys.length > 0 && keys.every((key) => isFromTo(changes[key]))) {
+    const compact: CompactChanges = { v: COMPACT_VERSION };
+
+    for (const key of keys) {
+      const { from, to } = changes[key] as { from: unknown; to: unknown };
+
+      if (isPlainObject(from) && isPlainObject(to)) {
+        const ops = diffObjects(from, to, '');
+        if (ops.length > 0) {
+          (compact.p ||= {})[key] = ops;
+        }
+      } else if (!deepEqual(from, to)) {
+        (compact.u ||= {})[key] = [from, to];
+      }
+    }
+
+    return JSON.stringify(compact);
+  }
+
+  return JSON.stringify(changes);
+}
+
+export function decodeChanges(stored: unknown, entityId: string): Record<string, unknown> {
+  const value = typeof stored === 'string' ? JSON.parse(stored || '{}') : stored;
+  if (!isPlainObject(value) || value.v !== COMPACT_VERSION) {
+    return (value as Record<string, unknown>) || {};
+  }
+
+  const compact = value as unknown as CompactChanges;
+
+  if (compact.c) {
+    return { created: { id: entityId, ...compact.c } };
+  }
+  if (compact.d) {
+    return { deleted: { id: entityId, ...compact.d } };
+  }
+
+  const changes: Record<string, { from: unknown; to: unknown }> = {};
+
+  for (const [key, [from, to]] of Object.entries(compact.u || {})) {
+    changes[key] = { from, to };
+  }
+
+  // Object fields come back holding only the keys that changed
+  for (const [key, ops] of Object.entries(compact.p || {})) {
+    const from: Record<string, unknown> = {};
+    const to: Record<string, unknown> = {};
+    for (const op of ops) {
+      if (op[0] === 'add') {
+        setPath(to, op[1], op[2]);
+      } else if (op[0] === 'remove') {
+        setPath(from, op[1], op[2]);
+      } else {
+        setPath(from, op[1], op[2]);
+        setPath(to, op[1], op[3]);
+      }
+    }
+    changes[key] = { from, to };
+  }
+
+  return changes;
+}
+
+function diffObjects(
+  from: Record<string, unknown>,
+  to: Record<string, unknown>,
+  basePath: string
+): PatchOp[] {
+  const ops: PatchOp[] = [];
+
+  for (const key of Object.keys(from)) {
+    const path = `${basePath}/${escapePointer(key)}`;
+    if (!(key in to)) {
+      ops.push(['remove', path, from[key]]);
+    } else if (isPlainObject(from[key]) && isPlainObject(to[key])) {
+      ops.push(...diffObjects(from[key] as Record<string, unknown>, to[key] as Record<string, unknown>, path));
+    } else if (!deepEqual(from[key], to[key])) {
+      ops.push(['replace', path, from[key], to[key]]);
+    }
+  }
+
+  for (const key of Object.keys(to)) {
+    if (!(key in from)) {
+      ops.push(['add', `${basePath}/${escapePointer(key)}`, to[key]]);
+    }
+  }
+
+  return ops;
+}
+
+function setPath(target: Record<string, unknown>, path: string, value: unknown): void {
+  const segments = path.split('/').slice(1).map(unescapePointer);
+  let node = target;
+  for (const segment of segments.slice(0, -1)) {
+    if (!isPlainObject(node[segment])) {
+      node[segment] = {};
+    }
+    node = node[segment] as Record<string, unknown>;
+  }
+  node[segments[segments.length - 1]] = value;
+}
+
+function escapePointer(key: string): string {
+  return key.replace(/~/g, '~0').replace(/\//g, '~1');
+}
+
+function unescapePointer(segment: string): string {
+  return segment.replace(/~1/g, '/').replace(/~0/g, '~');
+}
+
+function isFromTo(value: unknown): boolean {
+  return isPlainObject(value) && 'from' in value && 'to' in value && Object.keys(value).length === 2;
+}
+
+function isPlainObject(value: unknown): value is Record<string, unknown> {
+  return typeof value === 'object' && value !== null && !Array.isArray(value);
+}
+
+function deepEqual(a: unknown, b: unknown): boolean {
+  return JSON.stringify(a) === JSON.stringify(b);
+}
@@ -0,0 +1,28 @@
+// ============================================================================
+// Background Work Tracking
+// Hands fire-and-forget promises to the waitUntil of the event (request,
+// cron tick or queue batch) that started them, so one request never waits
+// on, or keeps alive, another request's work
+// ============================================================================
+
+import { AsyncLocalStorage } from 'node:async_hooks';
+
+const eventScope = new AsyncLocalStorage<ExecutionContext>();
+
+// Runs an event handler; work deferred anywhere below it, including from
+// other deferred work (e.g. an audit flush publishing changes), is kept
+// alive by this event's ctx
+export function runWithBackground<T>(ctx: ExecutionContext, handler: () => Promise<T>): Promise<T> {
+  return eventScope.run(ctx, handler);
+}
+
+export function defer(task: Promise<unknown>): void {
+  const tracked = task.catch((error) => {
+    console.error('Background task failed:', error);
+  });
+
+  const ctx = eventScope.getStore();
+  if (ctx) {
+    ctx.waitUntil(tracked);
+  }
+}
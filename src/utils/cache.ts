@@ -0,0 +1,66 @@
+// ============================================================================
+// In-Isolate Cache
+// Bounded LRU with per-entry TTL. Each Worker isolate has its own copy, so
+// entries written elsewhere are only seen once the TTL expires.
+// ============================================================================
+
+interface CacheEntry<V> {
+  value: V;
+  expiresAt: number;
+}
+
+export class TtlCache<K, V> {
+  private readonly entries = new Map<K, CacheEntry<V>>();
+
+  constructor(
+    private readonly maxEntries: number,
+    private readonly ttlMs: number
+  ) {}
+
+  get(key: K): V | undefined {
+    const entry = this.entries.get(key);
+    if (!entry) {
+      return undefined;
+    }
+    if (entry.expiresAt <= Date.now()) {
+      this.entries.delete(key);
+      return undefined;
+    }
+
+    // Map iteration order doubles as recency order
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+    return entry.value;
+  }
+
+  has(key: K): boolean {
+    return this.get(key) !== undefined;
+  }
+
+  set(key: K, value: V, ttlMs: number = this.ttlMs): void {
+    this.entries.delete(key);
+    this.entries.set(key, { value, expiresAt: Date.now() + ttlMs });
+
+    while (this.entries.size > this.maxEntries) {
+      const oldest = this.entries.keys().next().value as K;
+      this.entries.delete(oldest);
+    }
+  }
+
+  delete(key: K): void {
+    this.entries.delete(key);
+  }
+
+  // Drops every entry whose key matches, e.g. all of one tenant's
+  deleteMatching(predicate: (key: K) => boolean): void {
+    for (const key of [...this.entries.keys()]) {
+      if (predicate(key)) {
+        this.entries.delete(key);
+      }
+    }
+  }
+
+  clear(): void {
+    this.entries.clear();
+  }
+}
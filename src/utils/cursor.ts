@@ -0,0 +1,64 @@
+// ============================================================================
+// Keyset Pagination Cursors
+// Opaque, URL-safe cursors over (created_at, id) ordering and search result
+// offsets
+// ============================================================================
+
+export interface KeysetCursor {
+  // created_at, or ingested_at for /sync and change feed cursors
+  createdAt: string;
+  id: string;
+}
+
+export interface SearchCursor {
+  offset: number;
+}
+
+export function encodeCursor(cursor: KeysetCursor): string {
+  return toBase64Url(`${cursor.createdAt}|${cursor.id}`);
+}
+
+export function decodeCursor(value: string): KeysetCursor | null {
+  const decoded = fromBase64Url(value);
+  if (decoded === null) {
+    return null;
+  }
+  const separator = decoded.lastIndexOf('|');
+  if (separator <= 0 || separator === decoded.length - 1) {
+    return null;
+  }
+  return {
+    createdAt: decoded.slice(0, separator),
+    id: decoded.slice(separator + 1),
+  };
+}
+
+export function encodeSearchCursor(cursor: SearchCursor): string {
+  return toBase64Url(`search|${cursor.offset}`);
+}
+
+export function decodeSearchCursor(value: string): SearchCursor | null {
+  const decoded = fromBase64Url(value);
+  if (decoded === null) {
+    return null;
+  }
+  const [prefix, offsetPart] = decoded.split('|');
+  const offset = Number(offsetPart);
+  if (prefix !== 'search' || !Number.isInteger(offset) || offset < 0) {
+    return null;
+  }
+  return { offset };
+}
+
+function toBase64Url(value: string): string {
+  return btoa(value).replace(/\+/g, '-').replace(/\//g, '_').replace(/=+$/, '');
+}
+
+function fromBase64Url(value: string): string | null {
+  try {
+    const base64 = value.replace(/-/g, '+').replace(/_/g, '/');
+    return atob(base64 + '='.repeat((4 - (base64.length % 4)) % 4));
+  } catch {
+    return null;
+  }
+}
@@ -0,0 +1,38 @@
+// ============================================================================
+// D1 Constraint Error Detection
+// Lets routes rely on schema constraints instead of pre-check queries
+// ============================================================================
+
+function errorMessage(error: unknown): string {
+  if (!(error instanceof Error)) {
+    return String(error);
+  }
+  // D1 sometimes wraps the SQLite error as the cause
+  return error.cause instanceof Error ? `${error.message} ${error.cause.message}` : error.message;
+}
+
+export function isUniqueViolation(error: unknown, column?: string): boolean {
+  const message = errorMessage(error);
+  return (
+    message.includes('UNIQUE constraint failed') &&
+    (column === undefined || message.includes(column))
+  );
+}
+
+export function isNotNullViolation(error: unknown, column?: string): boolean {
+  const message = errorMessage(error);
+  return (
+    message.includes('NOT NULL constraint failed') &&
+    (column === undefined || message.includes(column))
+  );
+}
+
+export function isForeignKeyViolation(error: unknown): boolean {
+  return errorMessage(error).includes('FOREIGN KEY constraint failed');
+}
+
+// Any SQLite constraint (UNIQUE, FOREIGN KEY, NOT NULL, CHECK); retrying the
+// same statement cannot succeed
+export function isConstraintViolation(error: unknown): boolean {
+  return errorMessage(error).includes('constraint failed');
+}
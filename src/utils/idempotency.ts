@@ -0,0 +1,135 @@
+// ============================================================================
+// Idempotency-Key Handling
+// Replays stored responses for retried POST requests
+// ============================================================================
+
+import type { Env, RequestContext } from '../types';
+import {
+  errorResponse,
+  replayedResponse,
+  validationErrorResponse,
+} from './response';
+import { sha256Hex } from './hash';
+import {
+  getIdempotencyRecord,
+  reserveIdempotencyKey,
+  completeIdempotencyKey,
+  releaseIdempotencyKey,
+} from '../db/idempotency';
+
+export const IDEMPOTENCY_HEADER = 'Idempotency-Key';
+
+const IDEMPOTENCY_TTL_SECONDS = 24 * 60 * 60;
+// How long a running request holds its key. A request that dies without
+// completing or releasing it (CPU limit, eviction) only blocks retries
+// until the lease lapses, then the next retry takes the key over.
+const IDEMPOTENCY_LEASE_SECONDS = 60;
+const MAX_KEY_LENGTH = 255;
+// Headers of the original response a replay has to repeat
+const REPLAYED_HEADERS = ['ETag', 'Location', 'Retry-After'];
+
+export async function withIdempotency(
+  request: Request,
+  env: Env,
+  ctx: RequestContext,
+  handler: () => Promise<Response>
+): Promise<Response> {
+  const key = request.headers.get(IDEMPOTENCY_HEADER);
+  if (!key) {
+    return handler();
+  }
+
+  if (key.length > MAX_KEY_LENGTH) {
+    return validationErrorResponse({
+      [IDEMPOTENCY_HEADER]: [`${IDEMPOTENCY_HEADER} must be ${MAX_KEY_LENGTH} characters or less`],
+    });
+  }
+
+  // Keys are only unique per caller and endpoint
+  const url = new URL(request.url);
+  const scope = `${ctx.userId || 'anonymous'}:${request.method} ${url.pathname}`;
+  const requestHash = await sha256Hex(await request.clone().text());
+
+  const existing = await getIdempotencyRecord(env.DB, scope, key);
+  if (existing) {
+    if (existing.request_hash !== requestHash) {
+      return errorResponse(
+        'IDEMPOTENCY_KEY_REUSED',
+        `${IDEMPOTENCY_HEADER} was already used with a different request body`,
+        422
+      );
+    }
+    if (existing.status === 'completed' && existing.response_status !== null) {
+      return replayedResponse(
+        existing.response_body || '',
+        existing.response_status,
+        existing.response_headers ? JSON.parse(existing.response_headers) : {}
+      );
+    }
+    return inProgressResponse();
+  }
+
+  const reservedAt = await reserveIdempotencyKey(
+    env.DB,
+    scope,
+    key,
+    requestHash,
+    IDEMPOTENCY_LEASE_SECONDS
+  );
+  if (!reservedAt) {
+    return inProgressResponse();
+  }
+
+  let response: Response;
+  try {
+    response = await handler();
+  } catch (error) {
+    await releaseIdempotencyKey(env.DB, scope, key, reservedAt);
+    throw error;
+  }
+
+  // Server errors are not stored so the client can retry them
+  if (response.status >= 500) {
+    await releaseIdempotencyKey(env.DB, scope, key, reservedAt);
+    return response;
+  }
+
+  // The change is already committed, so a failure to store the response
+  // must not turn it into an error; the lease lapses and a retry runs again
+  try {
+    const body = await response.clone().text();
+    await completeIdempotencyKey(
+      env.DB,
+      scope,
+      key,
+      reservedAt,
+      IDEMPOTENCY_TTL_SECONDS,
+      response.status,
+      body,
+      pickReplayedHeaders(response)
+    );
+  } catch (error) {
+    console.error(`Failed to store response for ${IDEMPOTENCY_HEADER} ${key}:`, error);
+  }
+
+  return response;
+}
+
+function pickReplayedHeaders(response: Response): Record<string, string> {
+  const headers: Record<string, string> = {};
+  for (const name of REPLAYED_HEADERS) {
+    const value = response.headers.get(name);
+    if (value !== null) {
+      headers[name] = value;
+    }
+  }
+  return headers;
+}
+
+function inProgressResponse(): Response {
+  return errorResponse(
+    'IDEMPOTENCY_KEY_IN_PROGRESS',
+    `A request with this ${IDEMPOTENCY_HEADER} is still being processed`,
+    409
+  );
+}
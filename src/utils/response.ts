@@ -59,10 +59,59 @@ export function validationErrorResponse(
   return errorResponse('VALIDATION_ERROR', 'Validation failed', 400, errors);
 }
 
+export function unauthorizedResponse(message: string = 'Authentication required'): Response {
+  return errorResponse('UNAUTHORIZED', message, 401);
+}
+
+export function forbiddenResponse(message: string = 'Access denied'): Response {
+  return errorResponse('FORBIDDEN', message, 403);
+}
+
+export function tooManyRequestsResponse(retryAfterSeconds: number, message: string): Response {
+  const response = errorResponse('RATE_LIMITED', message, 429);
+  response.headers.set('Retry-After', String(retryAfterSeconds));
+  return response;
+}
+
 export function internalErrorResponse(message: string = 'Internal server error'): Response {
   return errorResponse('INTERNAL_ERROR', message, 500);
 }
 
+export function preconditionFailedResponse(): Response {
+  return errorResponse(
+    'PRECONDITION_FAILED',
+    'Resource was modified by another request; fetch the latest version and retry',
+    412
+  );
+}
+
+// Writes for a company are refused while a tenant move copies its rows; the
+// move pauses for a directory cache TTL on either side of the copy
+export function tenantMovingResponse(retryAfterSeconds: number = 30): Response {
+  const response = errorResponse(
+    'TENANT_MOVING',
+    'Company is being moved to another shard; retry shortly',
+    503
+  );
+  response.headers.set('Retry-After', String(retryAfterSeconds));
+  return response;
+}
+
+export function conflictResponse(message: string): Response {
+  return errorResponse('CONFLICT', message, 409);
+}
+
+// Row versions double as strong ETags for If-Match
+export function withETag(response: Response, version: number): Response {
+  response.headers.set('ETag', `"${version}"`);
+  return response;
+}
+
+export function withCacheControl(response: Response, maxAgeSeconds: number): Response {
+  response.headers.set('Cache-Control', `private, max-age=${maxAgeSeconds}`);
+  return response;
+}
+
 export function methodNotAllowedResponse(allowed: string[]): Response {
   return new Response(
     JSON.stringify({
@@ -82,10 +131,33 @@ export function methodNotAllowedResponse(allowed: string[]): Response {
   );
 }
 
+export function replayedResponse(
+  body: string,
+  status: number,
+  headers: Record<string, string> = {}
+): Response {
+  return new Response(body, {
+    status,
+    headers: {
+      ...JSON_HEADERS,
+      ...headers,
+      'Idempotent-Replayed': 'true',
+    },
+  });
+}
+
 export function createdResponse<T>(data: T): Response {
   return jsonResponse(data, 201);
 }
 
+export function acceptedResponse<T>(data: T, location?: string): Response {
+  const response = jsonResponse(data, 202);
+  if (location) {
+    response.headers.set('Location', location);
+  }
+  return response;
+}
+
 export function noContentResponse(): Response {
   return new Response(null, { status: 204 });
 }
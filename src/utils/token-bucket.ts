@@ -0,0 +1,51 @@
+// ============================================================================
+// Token Buckets
+// Lazily refilled buckets keyed by string. Idle buckets are evicted once they
+// would have refilled completely, which is the same as starting fresh.
+// ============================================================================
+
+import { TtlCache } from './cache';
+
+export interface BucketPolicy {
+  ratePerSecond: number;
+  burst: number;
+}
+
+// granted is how many tokens were taken; more than one only for a lease
+export type BucketDecision =
+  | { allowed: true; remaining: number; granted: number }
+  | { allowed: false; retryAfterMs: number };
+
+interface Bucket {
+  tokens: number;
+  updatedAt: number;
+}
+
+export class TokenBuckets {
+  private readonly buckets: TtlCache<string, Bucket>;
+
+  constructor(maxBuckets: number, idleMs: number) {
+    this.buckets = new TtlCache(maxBuckets, idleMs);
+  }
+
+  // Takes one token, or up to `max` when the caller hands them out itself
+  take(key: string, policy: BucketPolicy, now: number = Date.now(), max: number = 1): BucketDecision {
+    const bucket = this.buckets.get(key) || { tokens: policy.burst, updatedAt: now };
+    const elapsedSeconds = Math.max(0, now - bucket.updatedAt) / 1000;
+
+    bucket.tokens = Math.min(policy.burst, bucket.tokens + elapsedSeconds * policy.ratePerSecond);
+    bucket.updatedAt = now;
+    this.buckets.set(key, bucket);
+
+    if (bucket.tokens >= 1) {
+      const granted = Math.min(max, Math.floor(bucket.tokens));
+      bucket.tokens -= granted;
+      return { allowed: true, remaining: Math.floor(bucket.tokens), granted };
+    }
+
+    return {
+      allowed: false,
+      retryAfterMs: Math.ceil(((1 - bucket.tokens) / policy.ratePerSecond) * 1000),
+    };
+  }
+}
@@ -9,13 +9,23 @@ import type {
   CreateUserRequest,
   UpdateUserRequest,
   AddUserToCompanyRequest,
+  BulkAddUsersToCompanyRequest,
+  BulkRemoveUsersFromCompanyRequest,
   CreateAssetRequest,
   UpdateAssetRequest,
+  BulkUpdateAssetsRequest,
+  PromoteAttributeRequest,
+  MoveTenantRequest,
   CompanyStatus,
   UserStatus,
   AssetStatus,
   AssetType,
   AccessRole,
+  AuditLogFilters,
+  EntityType,
+  AuditAction,
+  PromotedAttribute,
+  PromotedAttributeType,
 } from '../types';
 
 const COMPANY_STATUSES: CompanyStatus[] = ['active', 'inactive', 'suspended'];
@@ -24,6 +34,10 @@ const ASSET_STATUSES: AssetStatus[] = ['active', 'inactive', 'disposed', 'mainte
 const ASSET_TYPES: AssetType[] = ['hardware', 'software', 'license', 'other'];
 const ACCESS_ROLES: AccessRole[] = ['OWNER', 'ADMIN', 'MEMBER', 'READ_ONLY'];
 
+const PROMOTED_ATTRIBUTE_TYPES: PromotedAttributeType[] = ['string', 'number', 'boolean', 'date'];
+const ATTRIBUTE_KEY_REGEX = /^[A-Za-z_][A-Za-z0-9_]{0,63}$/;
+const ISO_DATE_REGEX = /^\d{4}-\d{2}-\d{2}/;
+
 const EMAIL_REGEX = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
 const UUID_REGEX = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i;
 
@@ -51,6 +65,41 @@ function isValidEmail(value: unknown): boolean {
   return typeof value === 'string' && EMAIL_REGEX.test(value);
 }
 
+function matchesAttributeType(value: unknown, type: PromotedAttributeType): boolean {
+  switch (type) {
+    case 'number':
+      return typeof value === 'number' && Number.isFinite(value);
+    case 'boolean':
+      return typeof value === 'boolean';
+    case 'date':
+      return typeof value === 'string' && ISO_DATE_REGEX.test(value) && !isNaN(Date.parse(value));
+    default:
+      return typeof value === 'string';
+  }
+}
+
+// Promoted keys are indexed by type, so their values must match it. A value
+// the asset already held is let through unchanged: it predates the promotion
+// and stays out of the index.
+function validatePromotedMetadata(
+  result: ValidationResult,
+  metadata: Record<string, unknown>,
+  promoted: PromotedAttribute[],
+  current: Record<string, unknown> = {}
+): void {
+  for (const attribute of promoted) {
+    const value = metadata[attribute.key];
+    if (
+      value !== undefined &&
+      value !== null &&
+      value !== current[attribute.key] &&
+      !matchesAttributeType(value, attribute.type)
+    ) {
+      addError(result, `metadata.${attribute.key}`, `metadata.${attribute.key} must be a ${attribute.type}`);
+    }
+  }
+}
+
 // ============================================================================
 // Company Validation
 // ============================================================================
@@ -229,11 +278,77 @@ export function validateAddUserToCompany(data: unknown): ValidationResult {
   return result;
 }
 
+export function validateBulkAddUsersToCompany(data: unknown, maxUsers: number): ValidationResult {
+  const result = createResult();
+
+  if (!data || typeof data !== 'object') {
+    addError(result, '_root', 'Request body must be an object');
+    return result;
+  }
+
+  const members = (data as Record<string, unknown>).members;
+
+  if (!Array.isArray(members) || members.length === 0) {
+    addError(result, 'members', 'members must be a non-empty array');
+    return result;
+  }
+  if (members.length > maxUsers) {
+    addError(result, 'members', `At most ${maxUsers} members can be added at once`);
+    return result;
+  }
+
+  const seen = new Set<string>();
+  members.forEach((member, index) => {
+    const memberResult = validateAddUserToCompany(member);
+    for (const [field, messages] of Object.entries(memberResult.errors)) {
+      for (const message of messages) {
+        addError(result, `members[${index}].${field}`, message);
+      }
+    }
+
+    const userId = (member as Record<string, unknown> | null)?.user_id;
+    if (typeof userId === 'string') {
+      if (seen.has(userId)) {
+        addError(result, `members[${index}].user_id`, 'Each user may only appear once');
+      }
+      seen.add(userId);
+    }
+  });
+
+  return result;
+}
+
+export function validateBulkRemoveUsersFromCompany(data: unknown, maxUsers: number): ValidationResult {
+  const result = createResult();
+
+  if (!data || typeof data !== 'object') {
+    addError(result, '_root', 'Request body must be an object');
+    return result;
+  }
+
+  const userIds = (data as Record<string, unknown>).user_ids;
+
+  if (!Array.isArray(userIds) || userIds.length === 0) {
+    addError(result, 'user_ids', 'user_ids must be a non-empty array');
+  } else if (userIds.length > maxUsers) {
+    addError(result, 'user_ids', `At most ${maxUsers} users can be removed at once`);
+  } else if (!userIds.every(isValidUUID)) {
+    addError(result, 'user_ids', 'Each user id must be a valid UUID');
+  } else if (new Set(userIds).size !== userIds.length) {
+    addError(result, 'user_ids', 'Each user may only appear once');
+  }
+
+  return result;
+}
+
 // ============================================================================
 // Asset Validation
 // ============================================================================
 
-export function validateCreateAsset(data: unknown): ValidationResult {
+export function validateCreateAsset(
+  data: unknown,
+  promoted: PromotedAttribute[] = []
+): ValidationResult {
   const result = createResult();
 
   if (!data || typeof data !== 'object') {
@@ -274,13 +389,19 @@ export function validateCreateAsset(data: unknown): ValidationResult {
   if (body.metadata !== undefined) {
     if (typeof body.metadata !== 'object' || body.metadata === null || Array.isArray(body.metadata)) {
       addError(result, 'metadata', 'Metadata must be a JSON object');
+    } else {
+      validatePromotedMetadata(result, body.metadata as Record<string, unknown>, promoted);
     }
   }
 
   return result;
 }
 
-export function validateUpdateAsset(data: unknown): ValidationResult {
+export function validateUpdateAsset(
+  data: unknown,
+  promoted: PromotedAttribute[] = [],
+  currentMetadata: Record<string, unknown> = {}
+): ValidationResult {
   const result = createResult();
 
   if (!data || typeof data !== 'object') {
@@ -327,6 +448,13 @@ export function validateUpdateAsset(data: unknown): ValidationResult {
     hasUpdate = true;
     if (typeof body.metadata !== 'object' || body.metadata === null || Array.isArray(body.metadata)) {
       addError(result, 'metadata', 'Metadata must be a JSON object');
+    } else {
+      validatePromotedMetadata(
+        result,
+        body.metadata as Record<string, unknown>,
+        promoted,
+        currentMetadata
+      );
     }
   }
 
@@ -344,10 +472,167 @@ export function validateUpdateAsset(data: unknown): ValidationResult {
   return result;
 }
 
+export function validateBulkUpdateAssets(data: unknown, maxIds: number): ValidationResult {
+  const result = createResult();
+
+  if (!data || typeof data !== 'object') {
+    addError(result, '_root', 'Request body must be an object');
+    return result;
+  }
+
+  const body = data as Record<string, unknown>;
+
+  if (!isValidUUID(body.company_id)) {
+    addError(result, 'company_id', 'Company ID is required and must be a valid UUID');
+  }
+
+  if ((body.ids === undefined) === (body.filter === undefined)) {
+    addError(result, '_root', 'Exactly one of ids or filter must be provided');
+  }
+
+  if (body.ids !== undefined) {
+    if (!Array.isArray(body.ids) || body.ids.length === 0) {
+      addError(result, 'ids', 'ids must be a non-empty array');
+    } else if (body.ids.length > maxIds) {
+      addError(result, 'ids', `At most ${maxIds} ids can be updated at once`);
+    } else if (!body.ids.every(isValidUUID)) {
+      addError(result, 'ids', 'Each id must be a valid UUID');
+    }
+  }
+
+  if (body.filter !== undefined) {
+    const filter = body.filter as Record<string, unknown> | null;
+    if (!filter || typeof filter !== 'object' || Array.isArray(filter)) {
+      addError(result, 'filter', 'filter must be an object');
+    } else {
+      if (filter.type === undefined && filter.status === undefined && filter.assigned_to === undefined) {
+        addError(result, 'filter', 'filter must include type, status or assigned_to');
+      }
+      if (filter.type !== undefined && !ASSET_TYPES.includes(filter.type as AssetType)) {
+        addError(result, 'filter.type', `Type must be one of: ${ASSET_TYPES.join(', ')}`);
+      }
+      if (filter.status !== undefined && !ASSET_STATUSES.includes(filter.status as AssetStatus)) {
+        addError(result, 'filter.status', `Status must be one of: ${ASSET_STATUSES.join(', ')}`);
+      }
+      if (filter.assigned_to !== undefined && !isValidUUID(filter.assigned_to)) {
+        addError(result, 'filter.assigned_to', 'assigned_to must be a valid UUID');
+      }
+    }
+  }
+
+  const patch = body.patch as Record<string, unknown> | null | undefined;
+  if (!patch || typeof patch !== 'object' || Array.isArray(patch)) {
+    addError(result, 'patch', 'patch is required and must be an object');
+  } else {
+    const unsupported = Object.keys(patch).filter((key) => key !== 'status' && key !== 'assigned_to');
+    if (unsupported.length > 0) {
+      addError(result, 'patch', 'Only status and assigned_to can be bulk updated');
+    }
+    if (patch.status === undefined && patch.assigned_to === undefined) {
+      addError(result, 'patch', 'patch must include status or assigned_to');
+    }
+    if (patch.status !== undefined && !ASSET_STATUSES.includes(patch.status as AssetStatus)) {
+      addError(result, 'patch.status', `Status must be one of: ${ASSET_STATUSES.join(', ')}`);
+    }
+    if (patch.assigned_to !== undefined && patch.assigned_to !== null && !isValidUUID(patch.assigned_to)) {
+      addError(result, 'patch.assigned_to', 'assigned_to must be a valid UUID or null');
+    }
+  }
+
+  return result;
+}
+
+export function validatePromoteAttribute(data: unknown): ValidationResult {
+  const result = createResult();
+
+  if (!data || typeof data !== 'object') {
+    addError(result, '_root', 'Request body must be an object');
+    return result;
+  }
+
+  const body = data as Record<string, unknown>;
+
+  if (typeof body.key !== 'string' || !ATTRIBUTE_KEY_REGEX.test(body.key)) {
+    addError(
+      result,
+      'key',
+      'Key must start with a letter or underscore and contain only letters, digits and underscores (max 64)'
+    );
+  }
+
+  if (!PROMOTED_ATTRIBUTE_TYPES.includes(body.type as PromotedAttributeType)) {
+    addError(result, 'type', `Type must be one of: ${PROMOTED_ATTRIBUTE_TYPES.join(', ')}`);
+  }
+
+  return result;
+}
+
+// Shape only; the route checks the name against the configured shards
+export function validateMoveTenant(data: unknown): ValidationResult {
+  const result = createResult();
+
+  if (!data || typeof data !== 'object') {
+    addError(result, '_root', 'Request body must be an object');
+    return result;
+  }
+
+  const body = data as Record<string, unknown>;
+
+  if (typeof body.shard !== 'string' || body.shard.trim() === '') {
+    addError(result, 'shard', 'Shard must be the name of a D1 binding');
+  }
+
+  return result;
+}
+
 // ============================================================================
 // Query Parameter Validation
 // ============================================================================
 
+// Reads meta.<key>= parameters, coercing each value to its promoted type
+export function parseMetaFilters(
+  params: URLSearchParams,
+  promoted: PromotedAttribute[]
+): { filters: { key: string; value: string | number }[]; errors: Record<string, string[]> } {
+  const result = createResult();
+  const filters: { key: string; value: string | number }[] = [];
+
+  for (const [name, raw] of params) {
+    if (!name.startsWith('meta.')) {
+      continue;
+    }
+
+    const key = name.slice('meta.'.length);
+    const attribute = promoted.find((candidate) => candidate.key === key);
+    if (!attribute) {
+      addError(result, name, `${key} is not a promoted attribute for this company`);
+      continue;
+    }
+
+    if (attribute.type === 'number') {
+      const value = Number(raw);
+      if (raw.trim() === '' || !Number.isFinite(value)) {
+        addError(result, name, `${name} must be a number`);
+      } else {
+        filters.push({ key, value });
+      }
+    } else if (attribute.type === 'boolean') {
+      if (raw !== 'true' && raw !== 'false') {
+        addError(result, name, `${name} must be true or false`);
+      } else {
+        // json_extract() stores JSON booleans as 1 and 0
+        filters.push({ key, value: raw === 'true' ? 1 : 0 });
+      }
+    } else if (attribute.type === 'date' && !matchesAttributeType(raw, 'date')) {
+      addError(result, name, `${name} must be an ISO-8601 date`);
+    } else {
+      filters.push({ key, value: raw });
+    }
+  }
+
+  return { filters, errors: result.errors };
+}
+
 export function validateUUID(value: string | null, fieldName: string): ValidationResult {
   const result = createResult();
   if (!value) {
@@ -366,6 +651,58 @@ export function validateOptionalUUID(value: string | null, fieldName: string): V
   return result;
 }
 
+// from is inclusive and to is exclusive; both accept any Date-parsable value
+export function validateTimeRange(from: string | null, to: string | null): ValidationResult {
+  const result = createResult();
+  const fromTime = from !== null ? Date.parse(from) : NaN;
+  const toTime = to !== null ? Date.parse(to) : NaN;
+
+  if (from !== null && isNaN(fromTime)) {
+    addError(result, 'from', 'from must be an ISO-8601 date or timestamp');
+  }
+  if (to !== null && isNaN(toTime)) {
+    addError(result, 'to', 'to must be an ISO-8601 date or timestamp');
+  }
+  if (!isNaN(fromTime) && !isNaN(toTime) && fromTime >= toTime) {
+    addError(result, 'to', 'to must be after from');
+  }
+
+  return result;
+}
+
+// Expects parameters already checked by validateOptionalUUID/validateTimeRange
+export function parseAuditLogFilters(params: URLSearchParams): AuditLogFilters {
+  const from = params.get('from');
+  const to = params.get('to');
+
+  return {
+    entityType: (params.get('entity_type') as EntityType) || undefined,
+    action: (params.get('action') as AuditAction) || undefined,
+    userId: params.get('user_id') || undefined,
+    entityId: params.get('entity_id') || undefined,
+    // Normalized so they compare correctly against stored ISO timestamps
+    from: from ? new Date(from).toISOString() : undefined,
+    to: to ? new Date(to).toISOString() : undefined,
+  };
+}
+
+// ============================================================================
+// Conditional Request Headers
+// ============================================================================
+
+export function parseIfMatch(value: string | null): { valid: boolean; version?: number } {
+  if (value === null || value.trim() === '*') {
+    return { valid: true };
+  }
+
+  const match = /^(?:W\/)?"(\d+)"$/.exec(value.trim());
+  if (!match) {
+    return { valid: false };
+  }
+
+  return { valid: true, version: parseInt(match[1], 10) };
+}
+
 // ============================================================================
 // Type Guards for validated data
 // ============================================================================
@@ -414,6 +751,20 @@ export function asAddUserToCompanyRequest(data: unknown): AddUserToCompanyReques
   };
 }
 
+export function asBulkAddUsersToCompanyRequest(data: unknown): BulkAddUsersToCompanyRequest {
+  const d = data as Record<string, unknown>;
+  return {
+    members: (d.members as unknown[]).map(asAddUserToCompanyRequest),
+  };
+}
+
+export function asBulkRemoveUsersFromCompanyRequest(data: unknown): BulkRemoveUsersFromCompanyRequest {
+  const d = data as Record<string, unknown>;
+  return {
+    user_ids: d.user_ids as string[],
+  };
+}
+
 export function asCreateAssetRequest(data: unknown): CreateAssetRequest {
   const d = data as Record<string, unknown>;
   return {
@@ -427,6 +778,19 @@ export function asCreateAssetRequest(data: unknown): CreateAssetRequest {
   };
 }
 
+export function asPromoteAttributeRequest(data: unknown): PromoteAttributeRequest {
+  const body = data as Record<string, unknown>;
+  return {
+    key: body.key as string,
+    type: body.type as PromotedAttributeType,
+  };
+}
+
+export function asMoveTenantRequest(data: unknown): MoveTenantRequest {
+  const body = data as Record<string, unknown>;
+  return { shard: (body.shard as string).trim() };
+}
+
 export function asUpdateAssetRequest(data: unknown): UpdateAssetRequest {
   const d = data as Record<string, unknown>;
   return {
@@ -438,3 +802,22 @@ export function asUpdateAssetRequest(data: unknown): UpdateAssetRequest {
     assigned_to: d.assigned_to as string | null | undefined,
   };
 }
+
+export function asBulkUpdateAssetsRequest(data: unknown): BulkUpdateAssetsRequest {
+  const d = data as Record<string, unknown>;
+  const filter = d.filter as Record<string, unknown> | undefined;
+  const patch = d.patch as Record<string, unknown>;
+  return {
+    company_id: d.company_id as string,
+    ids: d.ids as string[] | undefined,
+    filter: filter && {
+      type: filter.type as AssetType | undefined,
+      status: filter.status as AssetStatus | undefined,
+      assigned_to: filter.assigned_to as string | undefined,
+    },
+    patch: {
+      status: patch.status as AssetStatus | undefined,
+      assigned_to: patch.assigned_to as string | null | undefined,
+    },
+  };
+}
@@ -0,0 +1,112 @@
+// ============================================================================
+// JWT Verification Tests
+// Tokens come from the local JWKS stand-in (scripts/dev-jwt.mjs) and are
+// verified by src/auth/jwt.ts inside a Miniflare worker. The tests share
+// one isolate and run in order: the key set and token cache carry over.
+// ============================================================================
+
+import { after, before, describe, test } from 'node:test';
+import assert from 'node:assert/strict';
+import { generateSigningKey, signToken, toJwks, encode } from '../scripts/dev-jwt.mjs';
+import { startWorker, postJson } from './support/worker.mjs';
+
+// Past verifyToken's minimum interval between key set reloads
+const RELOAD_INTERVAL_MS = 31_000;
+
+const nowSeconds = () => Math.floor(Date.now() / 1000);
+
+describe('verifyToken', () => {
+  let worker;
+  let keyA;
+  let keyB;
+  let tokenA;
+
+  const verify = (token, keys, advanceMs = 0) =>
+    postJson(worker, '/', { token, jwks: toJwks(keys), advanceMs });
+
+  before(async () => {
+    worker = await startWorker('jwt');
+    keyA = await generateSigningKey('key-a');
+    keyB = await generateSigningKey('key-b');
+    tokenA = await signToken(keyA, { sub: 'user-a', iat: nowSeconds(), exp: nowSeconds() + 3600 });
+  });
+
+  after(async () => {
+    await worker?.stop();
+  });
+
+  test('accepts a valid token', async () => {
+    const result = await verify(tokenA, [keyA]);
+    assert.equal(result.valid, true);
+    assert.equal(result.claims.sub, 'user-a');
+  });
+
+  test('rejects an expired token', async () => {
+    // Beyond the 60 s clock skew allowance
+    const token = await signToken(keyA, { sub: 'user-a', exp: nowSeconds() - 120 });
+    const result = await verify(token, [keyA]);
+    assert.deepEqual(result, { valid: false, error: 'Token has expired' });
+  });
+
+  test('rejects an unknown kid and an unsupported or mismatched alg', async () => {
+    const claims = { sub: 'user-a', exp: nowSeconds() + 3600 };
+
+    const unknownKid = await signToken(keyA, claims, { kid: 'key-unknown' });
+    assert.deepEqual(await verify(unknownKid, [keyA]), {
+      valid: false,
+      error: 'Token is signed with an unknown key',
+    });
+
+    const unsupportedAlg = await signToken(keyA, claims, { alg: 'HS256' });
+    assert.deepEqual(await verify(unsupportedAlg, [keyA]), {
+      valid: false,
+      error: 'Token must be RS256 or ES256 and carry a kid',
+    });
+
+    // The key decides the algorithm: an EC key never verifies as RS256
+    const mismatchedAlg = await signToken(keyA, claims, { alg: 'RS256' });
+    assert.deepEqual(await verify(mismatchedAlg, [keyA]), {
+      valid: false,
+      error: 'Token is signed with an unknown key',
+    });
+  });
+
+  test('rejects a tampered payload although the original token is cached', async () => {
+    const [header, , signature] = tokenA.split('.');
+    const tampered = `${header}.${encode({ sub: 'admin', exp: nowSeconds() + 3600 })}.${signature}`;
+
+    assert.equal((await verify(tokenA, [keyA])).valid, true);
+    assert.deepEqual(await verify(tampered, [keyA]), {
+      valid: false,
+      error: 'Invalid token signature',
+    });
+  });
+
+  test('reloads the key set for an unknown kid, at most every 30 s', async () => {
+    const tokenB = await signToken(keyB, { sub: 'user-b', exp: nowSeconds() + 3600 });
+
+    // The set loaded moments ago is not reloaded yet
+    assert.deepEqual(await verify(tokenB, [keyB]), {
+      valid: false,
+      error: 'Token is signed with an unknown key',
+    });
+
+    const result = await verify(tokenB, [keyB], RELOAD_INTERVAL_MS);
+    assert.equal(result.valid, true);
+    assert.equal(result.claims.sub, 'user-b');
+  });
+
+  test('answers a repeated token from the cache', async () => {
+    // key-a left the key set with the reload above, so only a cache hit
+    // can still accept tokenA; a fresh token from the same key is refused
+    const result = await verify(tokenA, [keyB]);
+    assert.equal(result.valid, true);
+    assert.equal(result.claims.sub, 'user-a');
+
+    const fresh = await signToken(keyA, { sub: 'user-a', exp: nowSeconds() + 3601 });
+    assert.deepEqual(await verify(fresh, [keyB]), {
+      valid: false,
+      error: 'Token is signed with an unknown key',
+    });
+  });
+});
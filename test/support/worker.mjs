@@ -0,0 +1,52 @@
+// ============================================================================
+// Test Worker Helper
+// Runs a worker from test/workers locally in Miniflare through wrangler's
+// unstable_dev, with the bindings of its test/wrangler.*.jsonc config
+// ============================================================================
+
+import { execFileSync } from 'node:child_process';
+import { fileURLToPath } from 'node:url';
+import { unstable_dev } from 'wrangler';
+
+const testDir = (path) => fileURLToPath(new URL(`../${path}`, import.meta.url));
+
+export async function startWorker(name, options = {}) {
+  return unstable_dev(testDir(`workers/${name}.ts`), {
+    config: testDir(`wrangler.${name}.jsonc`),
+    logLevel: 'error',
+    experimental: { disableExperimentalWarning: true },
+    ...options,
+  });
+}
+
+// POSTs a JSON body to the worker and returns the parsed JSON reply
+export async function postJson(worker, path, body) {
+  const response = await worker.fetch(path, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body),
+  });
+  return response.json();
+}
+
+// Applies every migration to a local D1 binding of the worker's config,
+// stored under persistTo so the worker started with it sees the schema
+export function applyMigrations(name, binding, persistTo) {
+  execFileSync(
+    'npx',
+    [
+      'wrangler',
+      'd1',
+      'migrations',
+      'apply',
+      binding,
+      '--local',
+      '--config',
+      testDir(`wrangler.${name}.jsonc`),
+      '--persist-to',
+      persistTo,
+    ],
+    // CI skips wrangler's confirmation prompt
+    { stdio: 'pipe', env: { ...process.env, CI: 'true' } }
+  );
+}
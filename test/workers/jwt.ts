@@ -0,0 +1,29 @@
+// ============================================================================
+// JWT Test Worker
+// Exposes verifyToken to test/jwt.test.mjs. Each request carries the JWKS
+// to verify against, and may move this isolate's clock forward so key set
+// reloads and cache expiry can be reached without waiting.
+// ============================================================================
+
+import type { Env } from '../../src/types';
+import { verifyToken } from '../../src/auth/jwt';
+
+interface VerifyRequest {
+  token: string;
+  jwks: { keys: unknown[] };
+  advanceMs?: number;
+}
+
+const realNow = Date.now;
+let clockOffsetMs = 0;
+Date.now = () => realNow() + clockOffsetMs;
+
+export default {
+  async fetch(request: Request, env: Env): Promise<Response> {
+    const body = (await request.json()) as VerifyRequest;
+    clockOffsetMs += body.advanceMs || 0;
+
+    const result = await verifyToken(body.token, { ...env, JWKS_JSON: JSON.stringify(body.jwks) });
+    return Response.json(result);
+  },
+};
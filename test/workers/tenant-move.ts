@@ -0,0 +1,111 @@
+// ============================================================================
+// Tenant Move Test Worker
+// Seeds a company on DB, runs its tenant_move job to completion (fence ->
+// copy -> cutover -> cleanup) and reports the rows each shard holds
+// afterwards. The 30 s cache waits are skipped: the job is re-run as soon
+// as it returns, in this single isolate.
+// ============================================================================
+
+import type { Env } from '../../src/types';
+import { createCompany } from '../../src/db/companies';
+import { createUser } from '../../src/db/users';
+import { addUserToCompany } from '../../src/db/company-access';
+import { createAsset } from '../../src/db/assets';
+import { createJob, getJobById, updateJobProgress } from '../../src/db/jobs';
+import { TENANT_TABLES, getTenantShard } from '../../src/db/shards';
+import { runTenantMove } from '../../src/jobs/tenant-move';
+import {
+  attachShardRouter,
+  getShard,
+  replicateCompanies,
+  replicateUsers,
+  resolveDb,
+} from '../../src/sharding';
+
+// More than one 500-row copy chunk of assets and of audit rows
+const ASSET_COUNT = 520;
+const MAX_RUNS = 100;
+
+type TableCounts = Record<string, number>;
+
+async function countTenantRows(db: D1Database, companyId: string): Promise<TableCounts> {
+  const counts: TableCounts = {};
+  for (const table of TENANT_TABLES) {
+    const row = await db
+      .prepare(`SELECT COUNT(*) AS count FROM ${table} WHERE company_id = ?`)
+      .bind(companyId)
+      .first<{ count: number }>();
+    counts[table] = row?.count || 0;
+  }
+  return counts;
+}
+
+export default {
+  async fetch(request: Request, env: Env): Promise<Response> {
+    attachShardRouter(env);
+    const target = getShard(env, 'DB_SHARD_1');
+    if (!target) {
+      return Response.json({ error: 'DB_SHARD_1 is not bound' }, { status: 500 });
+    }
+
+    const company = await createCompany(env.DB, { name: 'Tenant Move Test' });
+    await replicateCompanies(env, env.DB, [company.id]);
+
+    const user = await createUser(env.DB, {
+      email: `move-${company.id}@example.com`,
+      name: 'Move Tester',
+      primary_company_id: company.id,
+    });
+    await replicateUsers(env, [user.id]);
+
+    await addUserToCompany(env.DB, company.id, { user_id: user.id, role: 'ADMIN' });
+    for (let i = 0; i < ASSET_COUNT; i++) {
+      await createAsset(env.DB, {
+        company_id: company.id,
+        type: 'hardware',
+        name: `Laptop ${i}`,
+        identifier: `MOVE-${i}`,
+      });
+    }
+
+    const before = await countTenantRows(env.DB, company.id);
+
+    const job = await createJob(env.DB, 'tenant_move', company.id, {
+      phase: 'prepare',
+      source: 'DB',
+      target: target.name,
+    });
+
+    const phases: string[] = [];
+    let cacheWaits = 0;
+    let done = false;
+
+    for (let run = 0; run < MAX_RUNS && !done; run++) {
+      const current = await getJobById(env.DB, job.id);
+      if (!current) {
+        break;
+      }
+      const result = await runTenantMove(env.DB, current, Date.now() + 1_000, env);
+      await updateJobProgress(env.DB, job.id, result.progress);
+
+      phases.push(result.progress.phase as string);
+      if (result.resumeAt) {
+        cacheWaits++;
+      }
+      done = result.done;
+    }
+
+    const placement = await getTenantShard(env.DB, company.id);
+
+    return Response.json({
+      done,
+      phases,
+      cache_waits: cacheWaits,
+      before,
+      source_after: await countTenantRows(env.DB, company.id),
+      target_after: await countTenantRows(target.db, company.id),
+      placement,
+      resolves_to_target: (await resolveDb(env, company.id)) === target.db,
+    });
+  },
+};
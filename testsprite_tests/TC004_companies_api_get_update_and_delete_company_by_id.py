@@ -62,9 +62,12 @@ def test_companies_api_get_update_delete_by_id():
         patch_invalid_resp = requests.patch(f"{BASE_URL}/companies/{invalid_id}", json=patch_payload, headers=HEADERS, timeout=TIMEOUT)
         assert patch_invalid_resp.status_code == 404
 
-        # Test DELETE /companies/{id} with valid id deletes the company
+        # Test DELETE /companies/{id} with valid id schedules the deletion
         delete_resp = requests.delete(f"{BASE_URL}/companies/{company_id}", headers=HEADERS, timeout=TIMEOUT)
-        assert delete_resp.status_code == 200
+        assert delete_resp.status_code == 202
+        job_id = delete_resp.json()["data"]["job_id"]
+        job_resp = requests.get(f"{BASE_URL}/jobs/{job_id}", headers=HEADERS, timeout=TIMEOUT)
+        assert job_resp.status_code == 200
 
         # Confirm company no longer exists
         get_after_delete_resp = requests.get(f"{BASE_URL}/companies/{company_id}", headers=HEADERS, timeout=TIMEOUT)
@@ -8,8 +8,10 @@ import type {
   Company,
   User,
   CompanyAccess,
+  UserMembership,
   Asset,
   AuditLog,
+  LookupItem,
   CreateCompanyRequest,
   UpdateCompanyRequest,
   CreateUserRequest,
@@ -70,6 +72,11 @@ export async function getCompanies(params?: { limit?: number; offset?: number; s
   return apiFetch<Company[]>(`/companies${query ? `?${query}` : ''}`);
 }
 
+export async function lookupCompanies(q: string, limit = 10) {
+  const searchParams = new URLSearchParams({ q, limit: limit.toString() });
+  return apiFetch<LookupItem[]>(`/companies/lookup?${searchParams.toString()}`);
+}
+
 export async function getCompany(id: string) {
   return apiFetch<Company>(`/companies/${id}`);
 }
@@ -89,7 +96,8 @@ export async function updateCompany(id: string, data: UpdateCompanyRequest) {
 }
 
 export async function deleteCompany(id: string) {
-  return apiFetch<void>(`/companies/${id}`, {
+  // Deletion runs in the background; poll /jobs/:id for progress
+  return apiFetch<{ job_id: string; status: string }>(`/companies/${id}`, {
     method: 'DELETE',
   });
 }
@@ -109,6 +117,11 @@ export async function getUsers(params?: { limit?: number; offset?: number; statu
   return apiFetch<User[]>(`/users${query ? `?${query}` : ''}`);
 }
 
+export async function lookupUsers(q: string, limit = 10) {
+  const searchParams = new URLSearchParams({ q, limit: limit.toString() });
+  return apiFetch<LookupItem[]>(`/users/lookup?${searchParams.toString()}`);
+}
+
 export async function createUser(data: CreateUserRequest) {
   return apiFetch<User>('/users', {
     method: 'POST',
@@ -129,8 +142,31 @@ export async function deleteUser(id: string) {
   });
 }
 
-export async function getUserCompanies(userId: string) {
-  return apiFetch<CompanyAccess[]>(`/users/${userId}/companies`);
+export async function getUserCompanies(userId: string, params?: { limit?: number; offset?: number }) {
+  const searchParams = new URLSearchParams();
+  if (params?.limit) searchParams.set('limit', params.limit.toString());
+  if (params?.offset) searchParams.set('offset', params.offset.toString());
+
+  const query = searchParams.toString();
+  return apiFetch<UserMembership[]>(`/users/${userId}/companies${query ? `?${query}` : ''}`);
+}
+
+export async function getUserAssets(userId: string, params?: { limit?: number; cursor?: string }) {
+  const searchParams = new URLSearchParams();
+  if (params?.limit) searchParams.set('limit', params.limit.toString());
+  if (params?.cursor) searchParams.set('cursor', params.cursor);
+
+  const query = searchParams.toString();
+  return apiFetch<{ assets: Asset[]; cursor: string | null; has_more: boolean }>(
+    `/users/${userId}/assets${query ? `?${query}` : ''}`
+  );
+}
+
+export async function getUserAssetCounts(userIds: string[]) {
+  const searchParams = new URLSearchParams();
+  for (const userId of userIds) searchParams.append('user_id', userId);
+
+  return apiFetch<Record<string, number>>(`/users/asset-counts?${searchParams.toString()}`);
 }
 
 export async function getUserAuditLogs(userId: string, params?: { limit?: number; offset?: number }) {
@@ -162,6 +198,20 @@ export async function addUserToCompany(companyId: string, data: AddUserToCompany
   });
 }
 
+export async function bulkAddUsersToCompany(companyId: string, members: AddUserToCompanyRequest[]) {
+  return apiFetch<{ created: number; updated: number; unchanged: number }>(`/companies/${companyId}/users:bulk`, {
+    method: 'POST',
+    body: JSON.stringify({ members }),
+  });
+}
+
+export async function bulkRemoveUsersFromCompany(companyId: string, userIds: string[]) {
+  return apiFetch<{ removed: number; not_found: string[] }>(`/companies/${companyId}/users:bulk-remove`, {
+    method: 'POST',
+    body: JSON.stringify({ user_ids: userIds }),
+  });
+}
+
 export async function removeUserFromCompany(companyId: string, userId: string) {
   return apiFetch<void>(`/companies/${companyId}/users/${userId}`, {
     method: 'DELETE',
@@ -178,6 +228,7 @@ export async function getAssets(params?: {
   company_id?: string;
   type?: string;
   status?: string;
+  assigned_to?: string;
 }) {
   const searchParams = new URLSearchParams();
   if (params?.limit) searchParams.set('limit', params.limit.toString());
@@ -185,11 +236,29 @@ export async function getAssets(params?: {
   if (params?.company_id) searchParams.set('company_id', params.company_id);
   if (params?.type) searchParams.set('type', params.type);
   if (params?.status) searchParams.set('status', params.status);
+  if (params?.assigned_to) searchParams.set('assigned_to', params.assigned_to);
   
   const query = searchParams.toString();
   return apiFetch<Asset[]>(`/assets${query ? `?${query}` : ''}`);
 }
 
+export async function searchAssets(params: {
+  company_id: string;
+  q: string;
+  limit?: number;
+  cursor?: string;
+}) {
+  const searchParams = new URLSearchParams();
+  searchParams.set('company_id', params.company_id);
+  searchParams.set('q', params.q);
+  if (params.limit) searchParams.set('limit', params.limit.toString());
+  if (params.cursor) searchParams.set('cursor', params.cursor);
+
+  return apiFetch<{ assets: Asset[]; cursor: string | null; has_more: boolean }>(
+    `/assets/search?${searchParams.toString()}`
+  );
+}
+
 export async function createAsset(data: CreateAssetRequest) {
   return apiFetch<Asset>('/assets', {
     method: 'POST',
@@ -1,18 +1,18 @@
 import { useState } from 'react';
 import { Building2, Clock, Trash2, FileText, Package } from 'lucide-react';
 import { Badge, getStatusVariant, getRoleVariant, ExpandableCard, ActivityItem, Select, Button } from './ui';
-import { getUserCompanies, getUserAuditLogs, getCompanies, getAssets, updateAsset } from '../api';
-import type { User, CompanyAccess, AuditLog, Company, Asset } from '../types';
+import { getUserCompanies, getUserAuditLogs, getUserAssets, getAssets, updateAsset } from '../api';
+import type { User, UserMembership, AuditLog, Asset } from '../types';
 
 interface UserCardProps {
   user: User;
+  assetCount?: number;
   onDelete: (user: User) => void;
 }
 
-export function UserCard({ user, onDelete }: UserCardProps) {
-  const [companyAccess, setCompanyAccess] = useState<CompanyAccess[]>([]);
+export function UserCard({ user, assetCount, onDelete }: UserCardProps) {
+  const [companyAccess, setCompanyAccess] = useState<UserMembership[]>([]);
   const [auditLogs, setAuditLogs] = useState<AuditLog[]>([]);
-  const [companies, setCompanies] = useState<Company[]>([]);
   const [assignedAssets, setAssignedAssets] = useState<Asset[]>([]);
   const [availableAssets, setAvailableAssets] = useState<Asset[]>([]);
   const [loading, setLoading] = useState(false);
@@ -22,10 +22,10 @@ export function UserCard({ user, onDelete }: UserCardProps) {
   async function loadDetails() {
     setLoading(true);
     
-    const [accessRes, logsRes, companiesRes, assetsRes] = await Promise.all([
-      getUserCompanies(user.id),
+    const [accessRes, logsRes, assignedRes, assetsRes] = await Promise.all([
+      getUserCompanies(user.id, { limit: 100 }),
       getUserAuditLogs(user.id, { limit: 10 }),
-      getCompanies({ limit: 100 }),
+      getUserAssets(user.id, { limit: 100 }),
       getAssets({ limit: 100 }),
     ]);
 
@@ -37,12 +37,10 @@ export function UserCard({ user, onDelete }: UserCardProps) {
     if (logsRes.success && logsRes.data) {
       setAuditLogs(logsRes.data);
     }
-    if (companiesRes.success && companiesRes.data) {
-      setCompanies(companiesRes.data);
+    if (assignedRes.success && assignedRes.data) {
+      setAssignedAssets(assignedRes.data.assets);
     }
     if (assetsRes.success && assetsRes.data) {
-      // Show all assets assigned to this user
-      setAssignedAssets(assetsRes.data.filter((a) => a.assigned_to === user.id));
       // Only show unassigned assets from companies the user belongs to
       setAvailableAssets(assetsRes.data.filter((a) => 
         !a.assigned_to && userCompanyIds.includes(a.company_id)
@@ -77,11 +75,6 @@ export function UserCard({ user, onDelete }: UserCardProps) {
     setAssigning(false);
   }
 
-  function getCompanyName(companyId: string): string {
-    const company = companies.find(c => c.id === companyId);
-    return company?.name || 'Unknown Company';
-  }
-
   function getActionIcon(action: string) {
     switch (action) {
       case 'create':
@@ -122,6 +115,12 @@ export function UserCard({ user, onDelete }: UserCardProps) {
         </div>
       </div>
       <div className="flex items-center gap-4">
+        {assetCount !== undefined && (
+          <span className="flex items-center gap-1 text-sm text-text-secondary" title="Assigned assets">
+            <Package size={14} />
+            {assetCount}
+          </span>
+        )}
         <Badge variant={getStatusVariant(user.status)}>{user.status}</Badge>
         <span className="text-sm text-text-secondary">
           {new Date(user.created_at).toLocaleDateString()}
@@ -166,7 +165,7 @@ export function UserCard({ user, onDelete }: UserCardProps) {
                     <div className="flex items-center gap-2">
                       <Building2 size={14} className="text-text-secondary" />
                       <span className="text-sm text-text-primary">
-                        {getCompanyName(access.company_id)}
+                        {access.company_name}
                       </span>
                     </div>
                     <Badge variant={getRoleVariant(access.role)}>
@@ -0,0 +1,137 @@
+import { useEffect, useState } from 'react';
+import type { ApiResponse, LookupItem } from '../../types';
+
+interface LookupSelectProps {
+  id?: string;
+  label?: string;
+  placeholder?: string;
+  error?: string;
+  className?: string;
+  'aria-label'?: string;
+  value: string;
+  onChange: (id: string) => void;
+  // Prefix search against a /lookup endpoint
+  lookup: (q: string) => Promise<ApiResponse<LookupItem[]>>;
+  // Label of the "nothing selected" choice, e.g. "All Companies"
+  emptyLabel?: string;
+}
+
+// Typeahead selector: matches are fetched as the user types instead of
+// loading every row up front
+export function LookupSelect({
+  id,
+  label,
+  placeholder,
+  error,
+  className = '',
+  value,
+  onChange,
+  lookup,
+  emptyLabel,
+  ...props
+}: LookupSelectProps) {
+  const inputId = id || label?.toLowerCase().replace(/\s+/g, '-');
+  const [query, setQuery] = useState('');
+  const [items, setItems] = useState<LookupItem[]>([]);
+  const [open, setOpen] = useState(false);
+
+  // A form reset clears the text as well as the selection
+  useEffect(() => {
+    if (!value) {
+      setQuery('');
+    }
+  }, [value]);
+
+  useEffect(() => {
+    if (!open) return;
+    const timeout = setTimeout(async () => {
+      const res = await lookup(query.trim());
+      if (res.success && res.data) {
+        setItems(res.data);
+      }
+    }, 200);
+    return () => clearTimeout(timeout);
+  }, [query, open]);
+
+  function choose(item: LookupItem | null) {
+    setQuery(item ? item.label : '');
+    setOpen(false);
+    onChange(item ? item.id : '');
+  }
+
+  return (
+    <div className={`relative w-full ${className}`}>
+      {label && (
+        <label
+          htmlFor={inputId}
+          className="block text-sm font-medium text-text-primary mb-1.5"
+        >
+          {label}
+        </label>
+      )}
+      <input
+        id={inputId}
+        role="combobox"
+        aria-expanded={open}
+        aria-autocomplete="list"
+        autoComplete="off"
+        placeholder={placeholder || emptyLabel}
+        value={query}
+        onFocus={() => setOpen(true)}
+        onBlur={() => setOpen(false)}
+        onChange={(e) => {
+          setQuery(e.target.value);
+          setOpen(true);
+          if (value) onChange('');
+        }}
+        className={`
+          w-full px-3 py-2
+          bg-surface border rounded-lg
+          text-text-primary placeholder:text-text-secondary/50
+          transition-colors duration-150
+          focus:outline-none focus:ring-2 focus:ring-primary/50 focus:border-primary
+          ${error ? 'border-error focus:ring-error/50 focus:border-error' : 'border-border'}
+        `}
+        {...props}
+      />
+      {open && (emptyLabel || items.length > 0) && (
+        <ul
+          role="listbox"
+          className="absolute z-20 mt-1 w-full max-h-60 overflow-auto bg-surface border border-border rounded-lg shadow-lg"
+        >
+          {emptyLabel && (
+            <li
+              role="option"
+              aria-selected={!value}
+              onMouseDown={(e) => {
+                e.preventDefault();
+                choose(null);
+              }}
+              className="px-3 py-2 text-sm text-text-secondary cursor-pointer hover:bg-surface-muted"
+            >
+              {emptyLabel}
+            </li>
+          )}
+          {items.map((item) => (
+            <li
+              key={item.id}
+              role="option"
+              aria-selected={item.id === value}
+              onMouseDown={(e) => {
+                // Keeps focus in the input until the choice is applied
+                e.preventDefault();
+                choose(item);
+              }}
+              className="px-3 py-2 text-sm text-text-primary cursor-pointer hover:bg-surface-muted"
+            >
+              {item.label}
+            </li>
+          ))}
+        </ul>
+      )}
+      {error && (
+        <p className="mt-1.5 text-sm text-error">{error}</p>
+      )}
+    </div>
+  );
+}
@@ -3,6 +3,7 @@ export { Button } from './Button';
 export { Badge, getStatusVariant, getRoleVariant } from './Badge';
 export { Input } from './Input';
 export { Select } from './Select';
+export { LookupSelect } from './LookupSelect';
 export { Loading, LoadingPage, LoadingSkeleton } from './Loading';
 export { EmptyState } from './EmptyState';
 export { Modal, ConfirmModal } from './Modal';
@@ -6,15 +6,14 @@ import {
   Modal,
   Input,
   Select,
+  LookupSelect,
 } from '../components/ui';
 import { AssetCard } from '../components/AssetCard';
-import { getAssets, getCompanies, getUsers, createAsset, deleteAsset } from '../api';
-import type { Asset, Company, User, CreateAssetRequest, AssetType, AssetStatus } from '../types';
+import { getAssets, searchAssets, lookupCompanies, lookupUsers, createAsset, deleteAsset } from '../api';
+import type { Asset, CreateAssetRequest, AssetType, AssetStatus } from '../types';
 
 export function Assets() {
   const [assets, setAssets] = useState<Asset[]>([]);
-  const [companies, setCompanies] = useState<Company[]>([]);
-  const [users, setUsers] = useState<User[]>([]);
   const [loading, setLoading] = useState(true);
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [formData, setFormData] = useState<Partial<CreateAssetRequest>>({});
@@ -30,9 +29,21 @@ export function Assets() {
   const [filterType, setFilterType] = useState<string>('');
   const [filterStatus, setFilterStatus] = useState<string>('');
   const [filterCompany, setFilterCompany] = useState<string>('');
+  const [searchQuery, setSearchQuery] = useState<string>('');
 
   async function fetchAssets() {
     setLoading(true);
+
+    // Search is scoped to one company
+    if (filterCompany && searchQuery.trim()) {
+      const res = await searchAssets({ company_id: filterCompany, q: searchQuery.trim(), limit: 50 });
+      if (res.success && res.data) {
+        setAssets(res.data.assets);
+      }
+      setLoading(false);
+      return;
+    }
+
     const params: any = { limit: 50 };
     if (filterType) params.type = filterType;
     if (filterStatus) params.status = filterStatus;
@@ -45,28 +56,10 @@ export function Assets() {
     setLoading(false);
   }
 
-  async function fetchCompanies() {
-    const res = await getCompanies({ limit: 100 });
-    if (res.success && res.data) {
-      setCompanies(res.data);
-    }
-  }
-
-  async function fetchUsers() {
-    const res = await getUsers({ limit: 100 });
-    if (res.success && res.data) {
-      setUsers(res.data);
-    }
-  }
-
   useEffect(() => {
-    fetchCompanies();
-    fetchUsers();
-  }, []);
-
-  useEffect(() => {
-    fetchAssets();
-  }, [filterType, filterStatus, filterCompany]);
+    const timeout = setTimeout(fetchAssets, searchQuery ? 250 : 0);
+    return () => clearTimeout(timeout);
+  }, [filterType, filterStatus, filterCompany, searchQuery]);
 
   async function handleCreateAsset(e: React.FormEvent) {
     e.preventDefault();
@@ -156,17 +149,25 @@ export function Assets() {
             onChange={(e) => setFilterStatus(e.target.value)}
             className="w-40"
           />
-          <Select
+          <LookupSelect
             id="filter-company"
             aria-label="Filter by company"
-            options={[
-              { value: '', label: 'All Companies' },
-              ...companies.map((c) => ({ value: c.id, label: c.name })),
-            ]}
+            emptyLabel="All Companies"
+            lookup={(q) => lookupCompanies(q)}
             value={filterCompany}
-            onChange={(e) => setFilterCompany(e.target.value)}
+            onChange={setFilterCompany}
             className="w-48"
           />
+          {filterCompany && (
+            <Input
+              id="search-assets"
+              aria-label="Search assets"
+              placeholder="Search name, identifier or metadata"
+              value={searchQuery}
+              onChange={(e) => setSearchQuery(e.target.value)}
+              className="w-64"
+            />
+          )}
         </div>
       </Card>
 
@@ -221,12 +222,12 @@ export function Assets() {
         size="md"
       >
         <form onSubmit={handleCreateAsset} className="space-y-4">
-          <Select
+          <LookupSelect
             label="Company"
-            placeholder="Select a company"
-            options={companies.map((c) => ({ value: c.id, label: c.name }))}
+            placeholder="Search companies"
+            lookup={(q) => lookupCompanies(q)}
             value={formData.company_id || ''}
-            onChange={(e) => setFormData({ ...formData, company_id: e.target.value })}
+            onChange={(companyId) => setFormData({ ...formData, company_id: companyId })}
           />
           <Input
             label="Asset Name"
@@ -256,15 +257,13 @@ export function Assets() {
             value={formData.identifier || ''}
             onChange={(e) => setFormData({ ...formData, identifier: e.target.value })}
           />
-          <Select
+          <LookupSelect
             label="Assign to User (Optional)"
-            placeholder="Select user"
-            options={[
-              { value: '', label: 'Unassigned' },
-              ...users.map((u) => ({ value: u.id, label: `${u.name} (${u.email})` })),
-            ]}
+            placeholder="Search users by name or email"
+            emptyLabel="Unassigned"
+            lookup={(q) => lookupUsers(q)}
             value={formData.assigned_to || ''}
-            onChange={(e) => setFormData({ ...formData, assigned_to: e.target.value || undefined })}
+            onChange={(userId) => setFormData({ ...formData, assigned_to: userId || undefined })}
           />
           <div className="flex justify-end gap-3 pt-4">
             <Button
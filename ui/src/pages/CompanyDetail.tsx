@@ -15,18 +15,19 @@ import {
   Modal,
   Input,
   Select,
+  LookupSelect,
 } from '../components/ui';
 import {
   getCompany,
   getCompanyUsers,
   getAssets,
   getAuditLogs,
-  getUsers,
+  lookupUsers,
   addUserToCompany,
   createAsset,
   updateCompany,
 } from '../api';
-import type { Company, CompanyAccess, Asset, AuditLog, User, CreateAssetRequest, AssetType, AssetStatus } from '../types';
+import type { Company, CompanyAccess, Asset, AuditLog, CreateAssetRequest, AssetType, AssetStatus } from '../types';
 
 type TabType = 'overview' | 'users' | 'assets' | 'audit';
 
@@ -44,7 +45,6 @@ export function CompanyDetail() {
 
   // Add User modal state
   const [isAddUserModalOpen, setIsAddUserModalOpen] = useState(false);
-  const [availableUsers, setAvailableUsers] = useState<User[]>([]);
   const [selectedUserId, setSelectedUserId] = useState('');
   const [selectedRole, setSelectedRole] = useState<'ADMIN' | 'MEMBER' | 'READ_ONLY'>('MEMBER');
   const [addUserSubmitting, setAddUserSubmitting] = useState(false);
@@ -112,13 +112,9 @@ export function CompanyDetail() {
     }
   }, [id, activeTab]);
 
-  // Fetch available users when Add User modal opens
-  async function openAddUserModal() {
+  // Users are searched as the admin types in the Add User modal
+  function openAddUserModal() {
     setIsAddUserModalOpen(true);
-    const res = await getUsers({ limit: 100 });
-    if (res.success && res.data) {
-      setAvailableUsers(res.data);
-    }
   }
 
   async function handleAddUser(e: React.FormEvent) {
@@ -451,12 +447,12 @@ export function CompanyDetail() {
         size="sm"
       >
         <form onSubmit={handleAddUser} className="space-y-4">
-          <Select
+          <LookupSelect
             label="Select User"
-            placeholder="Choose a user"
-            options={availableUsers.map((u) => ({ value: u.id, label: `${u.name} (${u.email})` }))}
+            placeholder="Search users by name or email"
+            lookup={(q) => lookupUsers(q)}
             value={selectedUserId}
-            onChange={(e) => setSelectedUserId(e.target.value)}
+            onChange={setSelectedUserId}
             error={addUserError}
           />
           <Select
@@ -6,13 +6,15 @@ import {
   Input,
   Select,
   Card,
+  LookupSelect,
 } from '../components/ui';
 import { UserCard } from '../components/UserCard';
-import { getUsers, createUser, getCompanies, addUserToCompany, deleteUser } from '../api';
-import type { User, CreateUserRequest, Company, AccessRole } from '../types';
+import { getUsers, getUserAssetCounts, createUser, lookupCompanies, addUserToCompany, deleteUser } from '../api';
+import type { User, CreateUserRequest, AccessRole } from '../types';
 
 export function Users() {
   const [users, setUsers] = useState<User[]>([]);
+  const [assetCounts, setAssetCounts] = useState<Record<string, number>>({});
   const [loading, setLoading] = useState(true);
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [formData, setFormData] = useState<CreateUserRequest>({ email: '', name: '' });
@@ -20,7 +22,6 @@ export function Users() {
   const [submitting, setSubmitting] = useState(false);
   
   // For company/role assignment
-  const [companies, setCompanies] = useState<Company[]>([]);
   const [selectedCompanyId, setSelectedCompanyId] = useState('');
   const [selectedRole, setSelectedRole] = useState<AccessRole>('MEMBER');
   
@@ -41,25 +42,21 @@ export function Users() {
     const res = await getUsers(params);
     if (res.success && res.data) {
       setUsers(res.data);
+      // One request for the whole page instead of one per card
+      if (res.data.length > 0) {
+        const countsRes = await getUserAssetCounts(res.data.map((u) => u.id));
+        if (countsRes.success && countsRes.data) {
+          setAssetCounts(countsRes.data);
+        }
+      }
     }
     setLoading(false);
   }
 
-  useEffect(() => {
-    fetchCompanies();
-  }, []);
-
   useEffect(() => {
     fetchUsers();
   }, [filterStatus, filterCompany]);
 
-  async function fetchCompanies() {
-    const res = await getCompanies({ limit: 100 });
-    if (res.success && res.data) {
-      setCompanies(res.data);
-    }
-  }
-
   async function handleCreateUser(e: React.FormEvent) {
     e.preventDefault();
     if (!formData.email.trim() || !formData.name.trim()) {
@@ -151,15 +148,13 @@ export function Users() {
             onChange={(e) => setFilterStatus(e.target.value)}
             className="w-40"
           />
-          <Select
+          <LookupSelect
             id="filter-company"
             aria-label="Filter by company"
-            options={[
-              { value: '', label: 'All Companies' },
-              ...companies.map((c) => ({ value: c.id, label: c.name })),
-            ]}
+            emptyLabel="All Companies"
+            lookup={(q) => lookupCompanies(q)}
             value={filterCompany}
-            onChange={(e) => setFilterCompany(e.target.value)}
+            onChange={setFilterCompany}
             className="w-48"
           />
         </div>
@@ -186,6 +181,7 @@ export function Users() {
             <UserCard
               key={user.id}
               user={user}
+              assetCount={assetCounts[user.id]}
               onDelete={(u) => {
                 setUserToDelete(u);
                 setDeleteConfirmOpen(true);
@@ -235,15 +231,13 @@ export function Users() {
               setFormData({ ...formData, status: e.target.value as 'active' | 'inactive' })
             }
           />
-          <Select
+          <LookupSelect
             label="Assign to Company (Optional)"
-            placeholder="Select a company"
-            options={[
-              { value: '', label: 'No company' },
-              ...companies.map((c) => ({ value: c.id, label: c.name })),
-            ]}
+            placeholder="Search companies"
+            emptyLabel="No company"
+            lookup={(q) => lookupCompanies(q)}
             value={selectedCompanyId}
-            onChange={(e) => setSelectedCompanyId(e.target.value)}
+            onChange={setSelectedCompanyId}
           />
           {selectedCompanyId && (
             <Select
@@ -16,6 +16,7 @@ export interface Company {
   id: string;
   name: string;
   status: CompanyStatus;
+  version: number;
   created_at: string;
 }
 
@@ -25,6 +26,7 @@ export interface User {
   name: string;
   primary_company_id: string | null;
   status: UserStatus;
+  version: number;
   created_at: string;
 }
 
@@ -36,6 +38,11 @@ export interface CompanyAccess {
   created_at: string;
 }
 
+export interface UserMembership extends CompanyAccess {
+  company_name: string;
+  company_status: CompanyStatus;
+}
+
 export interface Asset {
   id: string;
   company_id: string;
@@ -45,6 +52,7 @@ export interface Asset {
   status: AssetStatus;
   metadata: Record<string, unknown>;
   assigned_to: string | null;
+  version: number;
   created_at: string;
 }
 
@@ -59,6 +67,12 @@ export interface AuditLog {
   created_at: string;
 }
 
+// Typeahead match from /companies/lookup and /users/lookup
+export interface LookupItem {
+  id: string;
+  label: string;
+}
+
 // API Response wrapper
 export interface ApiResponse<T> {
   success: boolean;